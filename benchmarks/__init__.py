@@ -0,0 +1 @@
+"""Benchmarks and performance tooling for the quizzify application."""
@@ -0,0 +1,73 @@
+"""Compare the catalog graph with SQL joins to look up the neighbors of a song.
+
+For a sample of songs, the other songs of their album and the songs of their
+artist are looked up with one query per song (as an ad-hoc join per question
+would) and with a vectorized lookup in the catalog graph. The full load and the
+incremental refresh of its snapshot are timed too. Run it against the seeded
+database (see ``benchmarks.seed_catalog``).
+
+Usage::
+
+    python -m benchmarks.catalog_graph --songs 1000
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from quizzify.databases.catalog_snapshot import export_catalog_snapshot
+from quizzify.databases.db_connection import close_pool, connect_to_db
+
+NEIGHBORS_QUERY = (
+    "SELECT siblings.id, siblings.album_id = songs.album_id FROM songs "
+    "INNER JOIN songs siblings ON siblings.album_id = songs.album_id "
+    "OR siblings.artist_id = songs.artist_id WHERE songs.id = %(id)s;"
+)
+
+
+def main():
+    """Print the load time of the graph and the lookup time of both methods."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--songs", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    graph = export_catalog_snapshot(full=True)
+    load = time.perf_counter() - start
+    start = time.perf_counter()
+    export_catalog_snapshot()
+    refresh = time.perf_counter() - start
+
+    rng = np.random.default_rng(args.seed)
+    songs = rng.choice(graph.size("songs"), size=args.songs, replace=False)
+    connection = connect_to_db(readonly=True)
+    cursor = connection.cursor()
+    start = time.perf_counter()
+    for song in songs:
+        cursor.execute(NEIGHBORS_QUERY, {"id": graph.ids["songs"][song]})
+        cursor.fetchall()
+    sql = (time.perf_counter() - start) / len(songs) * 1e6
+    connection.rollback()
+    cursor.close()
+    connection.close()
+    close_pool()
+
+    start = time.perf_counter()
+    graph.neighbors("album_songs", graph.parents["songs", "albums"][songs])
+    graph.neighbors("artist_songs", graph.parents["songs", "artists"][songs])
+    csr = (time.perf_counter() - start) / len(songs) * 1e6
+
+    print(
+        f"{graph.size('artists')} artists, {graph.size('albums')} albums, "
+        f"{graph.size('songs')} songs ({graph.nbytes / 1024**2:.1f} MB of arrays)"
+    )
+    print(f"full load: {load:.1f} s, refresh without new rows: {refresh:.1f} s")
+    print(f"{'lookup':<10}{'us/song':>10}")
+    print(f"{'SQL':<10}{sql:>10.1f}")
+    print(f"{'graph':<10}{csr:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
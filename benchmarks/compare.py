@@ -0,0 +1,83 @@
+"""Compare two load test results and flag the regressions.
+
+A scenario regresses when its p95 or p99 latency grows, or its throughput drops,
+by more than the threshold. The exit code is 1 if any scenario regressed, so the
+comparison can gate a CI job.
+
+Usage::
+
+    python -m benchmarks.compare benchmarks/results/base.json \\
+        benchmarks/results/head.json --threshold 0.1
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+# metrics compared, with True if higher is better
+METRICS = {
+    "rps": True,
+    "p95_ms": False,
+    "p99_ms": False,
+}
+
+
+def compare(
+    baseline: dict,
+    candidate: dict,
+    threshold: float,
+) -> list:
+    """Compare the results of two load tests.
+
+    Parameters
+    ----------
+    baseline : dict
+        The reference results (as saved by ``benchmarks/load_test.py``).
+    candidate : dict
+        The results to check.
+    threshold : float
+        The relative change tolerated (e.g. 0.1 for 10 %).
+
+    Returns
+    -------
+    list
+        One row per scenario and metric: the scenario, the metric, the baseline
+        and candidate values, the relative change and whether it regressed.
+    """
+    rows = []
+    for scenario, stats in candidate["results"].items():
+        if scenario not in baseline["results"]:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            before = baseline["results"][scenario][metric]
+            after = stats[metric]
+            change = (after - before) / before if before else 0.0
+            regressed = -change > threshold if higher_is_better else change > threshold
+            rows.append((scenario, metric, before, after, change, regressed))
+    return rows
+
+
+def main():
+    """Print the comparison and exit with 1 if a scenario regressed."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("baseline", type=Path)
+    parser.add_argument("candidate", type=Path)
+    parser.add_argument("--threshold", type=float, default=0.1)
+    args = parser.parse_args()
+
+    baseline = json.loads(args.baseline.read_text())
+    candidate = json.loads(args.candidate.read_text())
+    rows = compare(baseline, candidate, args.threshold)
+    print(f"{baseline['commit']} -> {candidate['commit']}")
+    for scenario, metric, before, after, change, regressed in rows:
+        flag = "REGRESSION" if regressed else ""
+        print(
+            f"{scenario:<18}{metric:<8}{before:>10.1f}{after:>10.1f}"
+            f"{change:>+9.1%}  {flag}"
+        )
+    sys.exit(1 if any(row[-1] for row in rows) else 0)
+
+
+if __name__ == "__main__":
+    main()
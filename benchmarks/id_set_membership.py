@@ -0,0 +1,81 @@
+"""Compare the memory and lookup time of ``IdSet`` against ``set`` and ``list``.
+
+The IDs are random 128-bit integers encoded in base62, like the Spotify ones.
+
+Usage::
+
+    python -m benchmarks.id_set_membership --size 1000000
+"""
+
+import argparse
+import random
+import time
+import tracemalloc
+
+from quizzify.utils.id_set import BASE62_ALPHABET, SPOTIFY_ID_LENGTH, IdSet
+
+
+def random_spotify_id() -> str:
+    """Generate a random 22-character base62 ID."""
+    value = random.getrandbits(128)  # nosec B311
+    digits = []
+    while value:
+        value, digit = divmod(value, len(BASE62_ALPHABET))
+        digits.append(BASE62_ALPHABET[digit])
+    return "".join(reversed(digits)).rjust(SPOTIFY_ID_LENGTH, "0")
+
+
+def measure(build):
+    """Build a container and return it with its build time and memory (MB)."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    container = build()
+    elapsed = time.perf_counter() - start
+    memory_mb = tracemalloc.get_traced_memory()[0] / 1024**2
+    tracemalloc.stop()
+    return container, elapsed, memory_mb
+
+
+def main():
+    """Print build time, memory and lookup time for each container."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=1_000_000)
+    parser.add_argument("--batch", type=int, default=10_000)
+    parser.add_argument("--list-lookups", type=int, default=100)
+    args = parser.parse_args()
+
+    ids = [random_spotify_id() for _ in range(args.size)]
+    # half of the batch is already known, the other half is new
+    batch = random.sample(ids, args.batch // 2) + [
+        random_spotify_id() for _ in range(args.batch - args.batch // 2)
+    ]
+    # the IDs themselves are shared by the list and the set, count them apart
+    _, _, strings_mb = measure(lambda: [id_.encode().decode() for id_ in ids])
+
+    print(f"{args.size} IDs, batch of {args.batch} IDs")
+    print(f"(the ID strings alone take {strings_mb:.1f} MB)")
+    print(f"{'container':<10}{'build (s)':>12}{'memory (MB)':>14}{'ns/lookup':>12}")
+
+    container, elapsed, memory_mb = measure(lambda: list(ids))
+    # membership in a list is O(n): only time a few lookups
+    lookups = batch[: args.list_lookups]
+    start = time.perf_counter()
+    [id_ not in container for id_ in lookups]
+    per_lookup = (time.perf_counter() - start) / len(lookups) * 1e9
+    print(f"{'list':<10}{elapsed:>12.3f}{memory_mb:>14.1f}{per_lookup:>12.0f}")
+
+    container, elapsed, memory_mb = measure(lambda: set(ids))
+    start = time.perf_counter()
+    [id_ for id_ in batch if id_ not in container]
+    per_lookup = (time.perf_counter() - start) / len(batch) * 1e9
+    print(f"{'set':<10}{elapsed:>12.3f}{memory_mb:>14.1f}{per_lookup:>12.0f}")
+
+    container, elapsed, memory_mb = measure(lambda: IdSet.from_ids(ids))
+    start = time.perf_counter()
+    container.new_ids(batch)
+    per_lookup = (time.perf_counter() - start) / len(batch) * 1e9
+    print(f"{'IdSet':<10}{elapsed:>12.3f}{memory_mb:>14.1f}{per_lookup:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Measure the throughput of the dataset importer with more parsing processes.
+
+A synthetic dump of tracks is generated in the CSV layout of the public Spotify
+datasets (artists as list literals, release dates of varying precision, a few
+malformed records), then imported with each number of workers. Every run imports
+a dump of new IDs, so the rows are really inserted: use a dedicated database.
+Each import is followed by a refresh (``--refresh``) from the same dump with the
+popularity of one track in ``CHANGED_EVERY`` changed, which updates those songs
+and skips the unchanged rows.
+
+Usage::
+
+    python -m benchmarks.import_dataset --tracks 200000 --workers 1 2 4
+"""
+
+import argparse
+import csv
+import logging
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.seed_catalog import random_ids, random_names
+from quizzify.databases.importer import OUTCOMES, import_dataset
+
+COLUMNS = (
+    "id",
+    "name",
+    "album",
+    "album_id",
+    "artists",
+    "artist_ids",
+    "track_number",
+    "duration_ms",
+    "popularity",
+    "release_date",
+)
+TRACKS_PER_ALBUM = 10
+ALBUMS_PER_ARTIST = 5
+# one record in this many has no name
+MALFORMED_EVERY = 1000
+# one track in this many has a new popularity in the refreshed dump
+CHANGED_EVERY = 10
+
+
+def write_dump(path: Path, tracks: int, seed: int, changed: bool = False):
+    """Write a CSV dump of random tracks, with some popularities changed."""
+    rng = np.random.default_rng(seed)
+    albums = max(tracks // TRACKS_PER_ALBUM, 1)
+    artists = max(albums // ALBUMS_PER_ARTIST, 1)
+    artist_ids, artist_names = random_ids(rng, artists), random_names(rng, artists)
+    album_ids, album_names = random_ids(rng, albums), random_names(rng, albums)
+    album_artists = rng.integers(0, artists, albums)
+    years = rng.integers(1960, 2024, albums)
+    song_ids, song_names = random_ids(rng, tracks), random_names(rng, tracks)
+    song_albums = rng.integers(0, albums, tracks)
+    durations = rng.integers(60_000, 600_000, tracks)
+    popularities = rng.integers(0, 101, tracks)
+    if changed:
+        popularities[::CHANGED_EVERY] = (popularities[::CHANGED_EVERY] + 1) % 101
+    with open(path, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(COLUMNS)
+        for index in range(tracks):
+            album = song_albums[index]
+            artist = album_artists[album]
+            writer.writerow(
+                (
+                    song_ids[index],
+                    "" if index % MALFORMED_EVERY == 0 else song_names[index],
+                    album_names[album],
+                    album_ids[album],
+                    repr([str(artist_names[artist])]),
+                    repr([str(artist_ids[artist])]),
+                    index % TRACKS_PER_ALBUM + 1,
+                    durations[index],
+                    popularities[index],
+                    years[album] if album % 2 else f"{years[album]}-03-14",
+                )
+            )
+
+
+def main():
+    """Print the throughput of the import for each number of workers."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tracks", type=int, default=200_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--seed", type=int, default=1000)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    print(
+        f"{'workers':>8}{'mode':>9}{'MB':>8}{'seconds':>10}{'records/s':>12}"
+        f"{'inserted':>10}{'updated':>10}{'hashed':>8}{'unchanged':>11}"
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        for run, workers in enumerate(args.workers):
+            path = Path(directory) / f"tracks-{run}.csv"
+            for refresh in (False, True):
+                write_dump(path, args.tracks, args.seed + run, changed=refresh)
+                start = time.perf_counter()
+                stats = import_dataset(
+                    path, workers=workers, restart=refresh, refresh=refresh
+                )
+                elapsed = time.perf_counter() - start
+                songs = [stats[outcome]["songs"] for outcome in OUTCOMES]
+                print(
+                    f"{workers:>8}{'refresh' if refresh else 'import':>9}"
+                    f"{path.stat().st_size / 1024**2:>8.1f}{elapsed:>10.1f}"
+                    f"{stats['records'] / elapsed:>12.0f}"
+                    f"{songs[0]:>10}{songs[1]:>10}{songs[2]:>8}{songs[3]:>11}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""End-to-end load test of the API against a mock Spotify and a seeded PostgreSQL.
+
+The mock Spotify (``benchmarks/mock_spotify.py``) and the API are started in
+subprocesses, the API is authorized through the regular ``/auth/login`` flow,
+then every scenario is loaded in isolation by concurrent clients. The p50, p95
+and p99 latencies and the throughput of each scenario are printed and saved as
+JSON in ``benchmarks/results/``, along with the commit and the configuration, so
+that two commits can be compared with ``benchmarks/compare.py``.
+
+Seed the database first (``python -m benchmarks.seed_catalog --reset``), with
+the ``POSTGRES_*`` variables pointing at it.
+
+Usage::
+
+    python -m benchmarks.load_test --duration 20 --concurrency 32
+    python -m benchmarks.load_test --scenarios index auth_login
+"""
+
+import argparse
+import json
+import platform
+import subprocess  # nosec B404
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+
+from benchmarks.loadgen import Endpoint, run_load, run_server
+from benchmarks.seed_catalog import USER_PASSWORD
+
+RESULTS_DIR = Path(__file__).parent / "results"
+SCENARIOS = {
+    endpoint.name: endpoint
+    for endpoint in (
+        Endpoint(name="index", path="/"),
+        Endpoint(name="auth_tokens", path="/auth/tokens"),
+        Endpoint(
+            name="auth_login",
+            path="/auth/login",
+            method="POST",
+            json={"email": "user1@example.com", "password": USER_PASSWORD},
+        ),
+        Endpoint(
+            name="auth_register",
+            path="/auth/register",
+            method="POST",
+            json={
+                "username": "bench-{uid}",
+                "email": "bench-{uid}@example.com",
+                "password": USER_PASSWORD,
+            },
+            expected_status=201,
+        ),
+        Endpoint(name="export_artists", path="/exports/artists?format=ndjson"),
+    )
+}
+
+
+def git_commit() -> str:
+    """Return the current commit, flagged if the working tree is dirty."""
+    try:
+        commit = subprocess.check_output(  # nosec B603 B607
+            ["git", "rev-parse", "--short", "HEAD"], text=True
+        ).strip()
+        dirty = subprocess.check_output(  # nosec B603 B607
+            ["git", "status", "--porcelain", "--untracked-files=no"], text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{commit}-dirty" if dirty else commit
+
+
+def authorize(base_url: str):
+    """Go through the Spotify authorization flow, answered by the mock."""
+    response = httpx.get(f"{base_url}/auth/login", follow_redirects=True, timeout=30)
+    # the callback answers with a 302 status code but no location
+    if response.is_error:
+        raise RuntimeError(f"The authorization failed: {response.text}")
+
+
+def main():
+    """Run the load test and save the results."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--app", default="quizzify.main:app")
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS))
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--load-processes", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--mock-port", type=int, default=8900)
+    parser.add_argument("--mock-latency-ms", type=float, default=20.0)
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    mock_url = f"http://127.0.0.1:{args.mock_port}"
+    mock_command = [
+        sys.executable,
+        "-m",
+        "benchmarks.mock_spotify",
+        "--port",
+        str(args.mock_port),
+        "--latency-ms",
+        str(args.mock_latency_ms),
+    ]
+    api_command = [
+        sys.executable,
+        "-m",
+        "uvicorn",
+        args.app,
+        "--port",
+        str(args.port),
+        "--workers",
+        str(args.workers),
+        "--log-level",
+        "warning",
+    ]
+    api_env = {
+        "SPOTIFY_CLIENT_ID": "benchmark",
+        "SPOTIFY_CLIENT_SECRET": "benchmark",  # nosec B105
+        "SPOTIFY_AUTH_URL": f"{mock_url}/authorize",
+        "SPOTIFY_TOKEN_URL": f"{mock_url}/api/token",
+        "SPOTIFY_BASE_URL": f"{mock_url}/v1",
+        "SPOTIFY_REDIRECT_URI": f"{base_url}/auth/callback",
+        # every virtual client has the same IP address
+        "QUIZZIFY_RATE_LIMIT_ENABLED": "false",
+    }
+
+    results = {}
+    with run_server(mock_command, ready_url=f"{mock_url}/docs"):
+        with run_server(api_command, ready_url=f"{base_url}/", env=api_env):
+            authorize(base_url)
+            for name in args.scenarios:
+                results[name] = run_load(
+                    base_url=base_url,
+                    endpoints=[SCENARIOS[name]],
+                    duration=args.duration,
+                    concurrency=args.concurrency,
+                    processes=args.load_processes,
+                )[name]
+
+    print(
+        f"{'scenario':<18}{'rps':>9}{'p50 (ms)':>10}{'p95 (ms)':>10}"
+        f"{'p99 (ms)':>10}{'errors':>8}"
+    )
+    for name, stats in results.items():
+        print(
+            f"{name:<18}{stats['rps']:>9.0f}{stats['p50_ms']:>10.1f}"
+            f"{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}{stats['errors']:>8}"
+        )
+
+    commit = git_commit()
+    timestamp = datetime.now(timezone.utc)
+    report = {
+        "commit": commit,
+        "timestamp": timestamp.isoformat(),
+        "config": {
+            "app": args.app,
+            "duration": args.duration,
+            "concurrency": args.concurrency,
+            "load_processes": args.load_processes,
+            "workers": args.workers,
+            "mock_latency_ms": args.mock_latency_ms,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+        },
+        "results": results,
+    }
+    output = args.output or RESULTS_DIR / (f"{timestamp:%Y%m%dT%H%M%S}-{commit}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"Results saved in {output}")
+
+
+if __name__ == "__main__":
+    main()
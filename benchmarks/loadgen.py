@@ -0,0 +1,206 @@
+"""Closed-loop HTTP load generator shared by the benchmarks.
+
+Each load process runs ``concurrency`` virtual clients on an asyncio event loop.
+A client sends its next request as soon as it gets the previous response, going
+through the endpoints in turn.
+"""
+
+import asyncio
+import os
+import signal
+import subprocess  # nosec B404
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+import httpx
+import numpy as np
+
+
+@dataclass
+class Endpoint:
+    """An endpoint to call during a load test.
+
+    Attributes
+    ----------
+    name : str
+        The name used to report the endpoint's statistics.
+    path : str
+        The path of the endpoint (with its query string).
+    method : str
+        The HTTP method.
+    json : dict, optional
+        The JSON body to send. ``{uid}`` in its string values is replaced by a
+        unique value for each request (e.g. to register new users).
+    expected_status : int
+        The status code of a successful response.
+    """
+
+    name: str
+    path: str = "/"
+    method: str = "GET"
+    json: Optional[dict] = None
+    expected_status: int = 200
+
+
+def render_body(body):
+    """Replace ``{uid}`` in the string values of a JSON body by a unique value."""
+    if isinstance(body, dict):
+        return {key: render_body(value) for key, value in body.items()}
+    if isinstance(body, str) and "{uid}" in body:
+        return body.replace("{uid}", uuid.uuid4().hex[:12])
+    return body
+
+
+async def _drive(
+    base_url: str,
+    endpoints: Sequence[Endpoint],
+    duration: float,
+    concurrency: int,
+):
+    """Run the virtual clients of one load process until the deadline."""
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(
+        max_connections=concurrency,
+        max_keepalive_connections=concurrency,
+    )
+    async with httpx.AsyncClient(
+        base_url=base_url, limits=limits, timeout=30
+    ) as client:
+
+        async def virtual_client(offset: int):
+            turn = offset
+            while time.perf_counter() < deadline:
+                endpoint = endpoints[turn % len(endpoints)]
+                turn += 1
+                start = time.perf_counter()
+                try:
+                    response = await client.request(
+                        endpoint.method, endpoint.path, json=render_body(endpoint.json)
+                    )
+                    is_success = response.status_code == endpoint.expected_status
+                except httpx.HTTPError:
+                    is_success = False
+                if is_success:
+                    latencies[endpoint.name].append(time.perf_counter() - start)
+                else:
+                    errors[endpoint.name] += 1
+
+        await asyncio.gather(*(virtual_client(offset) for offset in range(concurrency)))
+    return dict(latencies), dict(errors)
+
+
+def _drive_process(args):
+    """Entry point of a load process."""
+    return asyncio.run(_drive(*args))
+
+
+def run_load(
+    base_url: str,
+    endpoints: Sequence[Endpoint],
+    duration: float = 10.0,
+    concurrency: int = 32,
+    processes: int = 1,
+) -> Dict[str, dict]:
+    """Load the endpoints of a server and return statistics per endpoint.
+
+    Parameters
+    ----------
+    base_url : str
+        The URL of the server.
+    endpoints : Sequence[Endpoint]
+        The endpoints to call.
+    duration : float
+        The duration of the load test, in seconds.
+    concurrency : int
+        The number of virtual clients per load process.
+    processes : int
+        The number of load processes (a single process saturates one core).
+
+    Returns
+    -------
+    dict
+        For each endpoint: the number of requests and errors, the throughput
+        (requests per second) and the p50/p95/p99 latencies in milliseconds.
+    """
+    args = [(base_url, list(endpoints), duration, concurrency)] * processes
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        results = list(executor.map(_drive_process, args))
+
+    stats = {}
+    for endpoint in endpoints:
+        latencies = np.array(
+            [
+                value
+                for latency, _ in results
+                for value in latency.get(endpoint.name, [])
+            ]
+        )
+        errors = sum(error.get(endpoint.name, 0) for _, error in results)
+        percentiles = (
+            np.percentile(latencies, [50, 95, 99]) * 1000
+            if len(latencies)
+            else [float("nan")] * 3
+        )
+        stats[endpoint.name] = {
+            "requests": len(latencies),
+            "errors": errors,
+            "rps": len(latencies) / duration,
+            "p50_ms": float(percentiles[0]),
+            "p95_ms": float(percentiles[1]),
+            "p99_ms": float(percentiles[2]),
+        }
+    return stats
+
+
+@contextmanager
+def run_server(
+    command: Sequence[str],
+    ready_url: str,
+    env: Optional[Dict[str, str]] = None,
+    timeout: float = 60.0,
+):
+    """Run a server in a subprocess for the duration of the block.
+
+    Parameters
+    ----------
+    command : Sequence[str]
+        The command starting the server.
+    ready_url : str
+        A URL answering once the server is ready.
+    env : dict, optional
+        Environment variables added to the current ones.
+    timeout : float
+        The number of seconds to wait for the server to be ready.
+
+    Yields
+    ------
+    subprocess.Popen
+        The server process, stopped with SIGTERM (graceful shutdown) at the end.
+    """
+    server = subprocess.Popen(command, env={**os.environ, **(env or {})})  # nosec B603
+    try:
+        deadline = time.monotonic() + timeout
+        while True:
+            if server.poll() is not None:
+                raise RuntimeError(f"The server exited with code {server.returncode}.")
+            try:
+                httpx.get(ready_url, timeout=1)
+                break
+            except httpx.HTTPError:
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"{ready_url} did not answer in {timeout} s.")
+                time.sleep(0.25)
+        yield server
+    finally:
+        server.send_signal(signal.SIGTERM)
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
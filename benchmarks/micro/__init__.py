@@ -0,0 +1 @@
+"""Micro-benchmarks of the hot paths, run with pytest-benchmark."""
@@ -0,0 +1,94 @@
+"""Shared fixtures of the micro-benchmarks and regression check against baselines.
+
+The median duration of every benchmark is compared with the one recorded in
+``baselines.json``: a benchmark fails when it is slower than its baseline by more
+than its threshold (``DEFAULT_THRESHOLD`` unless the baseline sets its own). The
+baselines depend on the machine, so record them again on the reference machine
+with ``--update-baselines`` after a deliberate change.
+
+Usage::
+
+    pytest benchmarks/micro
+    pytest benchmarks/micro -k helpers --update-baselines
+"""
+
+import json
+from pathlib import Path
+
+import psycopg2
+import pytest
+
+from quizzify.databases.db_connection import connect_to_db
+
+BASELINES_FILE = Path(__file__).parent / "baselines.json"
+# slowdown tolerated before a benchmark is reported as a regression
+DEFAULT_THRESHOLD = 0.25
+
+
+def pytest_addoption(parser):
+    """Add the options of the regression check."""
+    group = parser.getgroup("quizzify baselines")
+    group.addoption(
+        "--update-baselines",
+        action="store_true",
+        help="Record the medians of this run as the new baselines.",
+    )
+    group.addoption(
+        "--baseline-threshold",
+        type=float,
+        default=None,
+        help="Override the regression threshold of every benchmark (e.g. 0.1).",
+    )
+
+
+def pytest_configure(config):
+    """Load the baselines once for the session."""
+    config.quizzify_baselines = (
+        json.loads(BASELINES_FILE.read_text()) if BASELINES_FILE.exists() else {}
+    )
+
+
+def pytest_unconfigure(config):
+    """Save the baselines recorded with ``--update-baselines``."""
+    if config.getoption("--update-baselines", default=False):
+        BASELINES_FILE.write_text(
+            json.dumps(config.quizzify_baselines, indent=2, sort_keys=True) + "\n"
+        )
+
+
+@pytest.fixture(autouse=True)
+def check_baseline(request, benchmark):
+    """Compare the median of the benchmark with its baseline."""
+    yield
+    if benchmark.stats is None or not benchmark.stats.stats.data:
+        # benchmark disabled (--benchmark-disable), skipped or failed
+        return
+    config = request.config
+    name = f"{Path(request.node.fspath).stem}::{request.node.name}"
+    median = benchmark.stats.stats.median
+    baseline = config.quizzify_baselines.get(name)
+
+    if config.getoption("--update-baselines"):
+        threshold = (baseline or {}).get("threshold", DEFAULT_THRESHOLD)
+        config.quizzify_baselines[name] = {"median": median, "threshold": threshold}
+        return
+    if baseline is None:
+        return
+    threshold = config.getoption("--baseline-threshold") or baseline["threshold"]
+    if median > baseline["median"] * (1 + threshold):
+        pytest.fail(
+            f"{name} regressed: median of {median * 1e6:.1f} us against "
+            f"{baseline['median'] * 1e6:.1f} us (threshold {threshold:.0%})."
+        )
+
+
+@pytest.fixture(scope="session")
+def database():
+    """Skip the benchmark when the local PostgreSQL is not reachable.
+
+    The database is expected to be seeded with ``benchmarks/seed_catalog.py``.
+    """
+    try:
+        connect_to_db().close()
+    except psycopg2.OperationalError as error:
+        pytest.skip(f"PostgreSQL is not reachable: {error}")
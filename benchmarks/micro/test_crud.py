@@ -0,0 +1,264 @@
+"""Micro-benchmarks of the database functions, against the local PostgreSQL.
+
+Seed the database with ``python -m benchmarks.seed_catalog --reset`` and build
+the question bank with ``python -m quizzify.databases.question_bank`` first (the
+baselines were recorded with the default sizes). The rows written by the
+benchmarks are prefixed with ``microbench-`` and deleted at the end, but the
+Spotify tokens of the application are overwritten: use a dedicated database.
+"""
+
+import itertools
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from quizzify.databases import crud
+from quizzify.databases.db_connection import connect_to_db
+from quizzify.utils.schemas import Album, Artist, Song
+
+PREFIX = "microbench-"
+# rounds of the benchmarks reading whole tables
+FULL_SCAN_ROUNDS = 5
+
+pytestmark = pytest.mark.usefixtures("database", "cleanup")
+_ids = itertools.count()
+
+
+def unique_id() -> str:
+    """Return an ID that no other row uses."""
+    return f"{PREFIX}{uuid.uuid4().hex[:8]}-{next(_ids)}"
+
+
+@pytest.fixture(scope="module")
+def cleanup(database):
+    """Delete the rows written by the benchmarks."""
+    yield
+    connection = connect_to_db()
+    cursor = connection.cursor()
+    for table, column in (
+        ("spotify_users", "spotify_id"),
+        ("users", "username"),
+        ("songs", "id"),
+        ("albums", "id"),
+        ("artists", "id"),
+        ("oauth_states", "state"),
+    ):
+        cursor.execute(
+            f"DELETE FROM {table} WHERE {column} LIKE %s;",  # nosec B608
+            (f"{PREFIX}%",),
+        )
+    cursor.execute("DELETE FROM spotify_tokens;")
+    connection.commit()
+    cursor.close()
+    connection.close()
+
+
+def new_user() -> dict:
+    """Return the arguments of ``crud.create_user`` for a new user."""
+    username = unique_id()
+    return {
+        "user_id": uuid.uuid4(),
+        "username": username,
+        "email": f"{username}@example.com",
+        "hashed_pwd": "$2b$12$KIXQ1y0.ZvXn0m7E7kL1UOMxq5xX7n0eW7G9oKxv0c6o0R2yS1e3a",
+    }
+
+
+def test_create_user(benchmark):
+    benchmark.pedantic(crud.create_user, setup=lambda: ((), new_user()), rounds=200)
+
+
+def test_create_spotify_user(benchmark):
+    def setup():
+        user = new_user()
+        crud.create_user(**user)
+        spotify_id = unique_id()
+        return (), {
+            "spotify_id": spotify_id,
+            "user_id": user["user_id"],
+            "spotify_username": spotify_id,
+            "spotify_email": f"{spotify_id}@example.com",
+            "spotify_image_url": f"https://i.scdn.co/image/{spotify_id}",
+            "spotify_uri": f"spotify:user:{spotify_id}",
+        }
+
+    benchmark.pedantic(crud.create_spotify_user, setup=setup, rounds=200)
+
+
+def test_get_user_by_email(benchmark):
+    assert benchmark(crud.get_user_by_email, email="user1@example.com")
+
+
+def test_get_user_by_username(benchmark):
+    assert benchmark(crud.get_user_by_username, username="user1")
+
+
+def test_get_user_by_spotify_id(benchmark):
+    assert benchmark(crud.get_user_by_spotify_id, spotify_id="unknown") is None
+
+
+def test_get_random_artist(benchmark):
+    assert benchmark(crud.get_random_artist)
+
+
+def test_get_random_song(benchmark):
+    assert benchmark(crud.get_random_song)
+
+
+def test_get_random_artist_song(benchmark):
+    assert benchmark(crud.get_random_artist_song)
+
+
+def test_get_random_question(benchmark):
+    assert benchmark(crud.get_random_question, question_type="song_artist")
+
+
+def test_get_artists_ids(benchmark):
+    assert benchmark.pedantic(crud.get_artists_ids, rounds=FULL_SCAN_ROUNDS)
+
+
+def test_get_albums_ids(benchmark):
+    assert benchmark.pedantic(crud.get_albums_ids, rounds=FULL_SCAN_ROUNDS)
+
+
+def test_get_songs_ids(benchmark):
+    assert benchmark.pedantic(crud.get_songs_ids, rounds=FULL_SCAN_ROUNDS)
+
+
+def deep_cursor(page: int, limit: int) -> tuple:
+    """Return the position of the last song before a page, by popularity."""
+    connection = connect_to_db()
+    cursor = connection.cursor()
+    cursor.execute(
+        "SELECT COALESCE(popularity, 0), id FROM songs "
+        "ORDER BY COALESCE(popularity, 0) DESC, id DESC OFFSET %s LIMIT 1;",
+        (page * limit - 1,),
+    )
+    position = cursor.fetchone()
+    cursor.close()
+    connection.close()
+    return position
+
+
+def test_list_catalog_first_page(benchmark):
+    assert benchmark(crud.list_catalog, "songs", 50, "popularity")
+
+
+def test_list_catalog_deep_page(benchmark):
+    # the 10,000th page: as fast as the first one
+    after = deep_cursor(page=9_999, limit=50)
+    assert benchmark(crud.list_catalog, "songs", 50, "popularity", after=after)
+
+
+def count(rows) -> int:
+    """Consume a generator of rows and count them."""
+    return sum(1 for _ in rows)
+
+
+def test_iter_artists_ids(benchmark):
+    assert benchmark.pedantic(
+        lambda: count(crud.iter_artists_ids()), rounds=FULL_SCAN_ROUNDS
+    )
+
+
+def test_iter_albums_ids(benchmark):
+    assert benchmark.pedantic(
+        lambda: count(crud.iter_albums_ids()), rounds=FULL_SCAN_ROUNDS
+    )
+
+
+def test_iter_songs_ids(benchmark):
+    assert benchmark.pedantic(
+        lambda: count(crud.iter_songs_ids()), rounds=FULL_SCAN_ROUNDS
+    )
+
+
+def test_iter_catalog(benchmark):
+    assert benchmark.pedantic(
+        lambda: count(crud.iter_catalog("albums")), rounds=FULL_SCAN_ROUNDS
+    )
+
+
+def test_insert_artist(benchmark):
+    def setup():
+        artist_id = unique_id()
+        artist = Artist(
+            id=artist_id,
+            name=artist_id,
+            image_url=f"https://i.scdn.co/image/{artist_id}",
+            popularity=50,
+        )
+        return (artist,), {}
+
+    benchmark.pedantic(crud.insert_artist, setup=setup, rounds=200)
+
+
+def test_insert_album(benchmark):
+    def setup():
+        album_id = unique_id()
+        album = Album(
+            id=album_id,
+            name=album_id,
+            image_url=f"https://i.scdn.co/image/{album_id}",
+            release_year=2020,
+            popularity=50,
+        )
+        return (album,), {}
+
+    benchmark.pedantic(crud.insert_album, setup=setup, rounds=200)
+
+
+def test_insert_song(benchmark):
+    # the foreign keys point to a seeded album and its artist
+    catalog_song = crud.get_random_song()
+
+    def setup():
+        song_id = unique_id()
+        song = Song(
+            id=song_id,
+            name=song_id,
+            artist_id=catalog_song["artist_id"],
+            album_id=catalog_song["album_id"],
+            popularity=50,
+            duration_ms=200_000,
+            track_number=1,
+        )
+        return (song,), {}
+
+    benchmark.pedantic(crud.insert_song, setup=setup, rounds=200)
+
+
+def test_save_oauth_state(benchmark):
+    benchmark.pedantic(
+        crud.save_oauth_state,
+        setup=lambda: ((), {"state": unique_id(), "ttl_seconds": 600}),
+        rounds=200,
+    )
+
+
+def test_consume_oauth_state(benchmark):
+    def setup():
+        state = unique_id()
+        crud.save_oauth_state(state=state, ttl_seconds=600)
+        return (), {"state": state, "ttl_seconds": 600}
+
+    benchmark.pedantic(crud.consume_oauth_state, setup=setup, rounds=200)
+
+
+def test_save_spotify_tokens(benchmark):
+    benchmark(
+        crud.save_spotify_tokens,
+        access_token="access_token",
+        refresh_token="refresh_token",
+        token_expiration_date=datetime.now() + timedelta(hours=1),
+    )
+
+
+def test_get_spotify_tokens(benchmark):
+    crud.save_spotify_tokens(
+        access_token="access_token",
+        refresh_token="refresh_token",
+        token_expiration_date=datetime.now() + timedelta(hours=1),
+    )
+    assert benchmark(crud.get_spotify_tokens)["access_token"] == "access_token"
@@ -0,0 +1,31 @@
+from quizzify.utils.helpers import (
+    check_email,
+    encode_str_to_base64,
+    flatten_list,
+    generate_random_string,
+)
+
+
+def test_generate_random_string(benchmark):
+    # length of the OAuth states
+    assert len(benchmark(generate_random_string, 16)) == 16
+
+
+def test_encode_str_to_base64(benchmark):
+    # client ID and secret of the Spotify application
+    credentials = "5f1b0d3e6c2a4b8f9e7d1c0a3b5e8f2d:9c4e7a1f3b6d2e8c0a5f7b9d1e3c6a4f"
+    assert benchmark(encode_str_to_base64, credentials)
+
+
+def test_check_email(benchmark):
+    assert benchmark(check_email, "john.doe@example.com")
+
+
+def test_check_email_invalid(benchmark):
+    assert not benchmark(check_email, "john.doe@example")
+
+
+def test_flatten_list(benchmark):
+    # rows of a "SELECT id FROM ..." query
+    rows = [(f"{index:022d}",) for index in range(100_000)]
+    assert len(benchmark(flatten_list, rows)) == 100_000
@@ -0,0 +1,52 @@
+"""Micro-benchmarks of the adaptive difficulty, on a million rated questions.
+
+Drawing a question near the skill of a user is an index in the buckets (then a
+primary key lookup, like ``crud.get_random_question`` in ``test_crud``), and
+recording an answer updates the ratings in memory, whatever the number of
+questions.
+"""
+
+import random
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from quizzify.databases import ratings
+from quizzify.utils.ratings import RatingBuckets
+
+QUESTIONS = 1_000_000
+
+
+@pytest.fixture(scope="module")
+def buckets():
+    rng = np.random.default_rng(42)
+    return RatingBuckets(np.arange(QUESTIONS), rng.normal(1500, 250, QUESTIONS))
+
+
+def test_build_buckets(benchmark):
+    rng = np.random.default_rng(42)
+    ids, difficulties = np.arange(QUESTIONS), rng.normal(1500, 250, QUESTIONS)
+    assert len(benchmark(RatingBuckets, ids, difficulties)) == QUESTIONS
+
+
+def test_sample_question_id(benchmark, buckets):
+    rng = random.Random(42)
+    with patch.object(ratings, "_buckets", {None: buckets}), patch.object(
+        ratings, "_skills", {"user": (1600.0, 100)}
+    ), patch.object(ratings, "EXPLORATION_RATE", 0):
+        assert benchmark(ratings.sample_question_id, "user", None, rng) is not None
+
+
+def test_record_result(benchmark):
+    result = {
+        "correct": True,
+        "user_rating": 1600.0,
+        "user_answered": 100,
+        "question_rating": 1400.0,
+        "question_answered": 100,
+    }
+    with patch.object(ratings, "_pending_questions", {}), patch.object(
+        ratings, "_pending_users", {}
+    ), patch.object(ratings, "_skills", {}):
+        assert benchmark(ratings.record_result, "user", 1, result) > 1600.0
@@ -0,0 +1,39 @@
+"""Micro-benchmarks of the validation of a session, against a password check.
+
+An authenticated request validates the access token of its session (an HMAC and
+a dictionary lookup in the revocation list); without sessions, it would check the
+password of the user with bcrypt (plus ``crud.get_user_by_email``, benchmarked in
+``test_crud``).
+"""
+
+from unittest.mock import patch
+
+import bcrypt
+import pytest
+from fastapi.security import HTTPAuthorizationCredentials
+
+from quizzify.utils import sessions
+
+PASSWORD = b"correct horse battery staple"
+
+
+@pytest.fixture(scope="module", autouse=True)
+def signing_key():
+    with patch.object(sessions, "_signing_key", b"microbench-secret"):
+        yield
+
+
+def test_current_session(benchmark):
+    access_token, _, _ = sessions.issue_tokens("user1")
+    credentials = HTTPAuthorizationCredentials(
+        scheme="Bearer", credentials=access_token
+    )
+    assert benchmark(sessions.current_session, credentials)["sub"] == "user1"
+
+
+def test_bcrypt_checkpw(benchmark):
+    # the default cost of bcrypt.gensalt, used by the registration
+    hashed_password = bcrypt.hashpw(PASSWORD, bcrypt.gensalt())
+    assert benchmark.pedantic(
+        bcrypt.checkpw, args=(PASSWORD, hashed_password), rounds=10
+    )
@@ -0,0 +1,95 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from quizzify.databases.state_store import InMemoryStateStore
+from quizzify.spotify.spotify_token_manager import SpotifyTokenManager
+
+# number of threads asking for the token at the same time (threadpool of the API)
+THREADS = 40
+# latency of the token endpoint of Spotify, in seconds
+SPOTIFY_LATENCY = 0.005
+
+
+@pytest.fixture
+def store():
+    # the tokens are shared through an in-memory store instead of PostgreSQL
+    store = InMemoryStateStore()
+    with patch(
+        "quizzify.spotify.spotify_token_manager.get_state_store", return_value=store
+    ):
+        yield store
+
+
+@pytest.fixture
+def token_manager(store):
+    SpotifyTokenManager._instance.pop(SpotifyTokenManager, None)
+    yield SpotifyTokenManager()
+    SpotifyTokenManager._instance.pop(SpotifyTokenManager, None)
+
+
+@pytest.fixture
+def spotify():
+    # the token endpoint answers a refresh with a new access token
+    def refresh(**kwargs):
+        time.sleep(SPOTIFY_LATENCY)
+        response = MagicMock(status_code=200)
+        response.json.return_value = {"access_token": "new_token", "expires_in": 3600}
+        return response
+
+    with patch(
+        "quizzify.spotify.spotify_token_manager.send_request", side_effect=refresh
+    ) as send_request:
+        yield send_request
+
+
+def save_tokens(store, token_manager, expires_in: int):
+    """Save tokens expiring in the given number of seconds and load them."""
+    store.save_tokens(
+        access_token="access_token",
+        refresh_token="refresh_token",
+        token_expiration_date=datetime.now() + timedelta(seconds=expires_in),
+    )
+    token_manager.load_tokens()
+
+
+def run_concurrently(function, threads: int = THREADS):
+    """Call a function from several threads released at the same time."""
+    barrier = threading.Barrier(threads)
+
+    def target():
+        barrier.wait()
+        function()
+
+    workers = [threading.Thread(target=target) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+def test_get_access_token_cached(benchmark, store, token_manager):
+    save_tokens(store, token_manager, expires_in=3600)
+    assert benchmark(token_manager.get_access_token)["access_token"] == "access_token"
+
+
+def test_get_access_token_cached_contention(benchmark, store, token_manager):
+    save_tokens(store, token_manager, expires_in=3600)
+    benchmark(run_concurrently, token_manager.get_access_token)
+
+
+def test_get_access_token_refresh_contention(benchmark, store, token_manager, spotify):
+    # every round starts with an expired token, refreshed by the first thread
+    rounds = 20
+    benchmark.pedantic(
+        run_concurrently,
+        args=(token_manager.get_access_token,),
+        setup=lambda: save_tokens(store, token_manager, expires_in=-1),
+        rounds=rounds,
+    )
+    # ideally one refresh per round: more means the threads refreshed in parallel
+    benchmark.extra_info["refreshes_per_round"] = spotify.call_count / rounds
+    assert token_manager.get_access_token()["access_token"] == "new_token"
@@ -0,0 +1,198 @@
+"""Local mock of the Spotify endpoints called by the API.
+
+It serves the token endpoint (authorization code and refresh token grants), the
+authorization page (redirecting straight to the callback), the current user's
+profile and listening history, with an optional artificial latency. Every call
+to ``/v1/me`` returns a new user, so the benchmarks can register as many accounts
+as they want.
+
+Faults can be injected, to test the retries and the circuit breaker of the API:
+a fraction of the requests (``--error-rate``), or the next ones
+(``PUT /mock/faults?fail_next=3``), get an error status code, with an optional
+``Retry-After`` header. ``GET /mock/faults`` returns the faults and the number of
+requests received.
+
+Usage::
+
+    python -m benchmarks.mock_spotify --port 8900 --latency-ms 20
+    python -m benchmarks.mock_spotify --error-rate 0.2 --error-status 503
+"""
+
+import argparse
+import asyncio
+import itertools
+import random
+import secrets
+from typing import Optional
+from urllib.parse import parse_qs, urlencode
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, RedirectResponse
+
+TOKEN_LIFETIME = 3600
+
+app = FastAPI(title="Mock Spotify")
+app.state.latency = 0.0
+app.state.faults = {
+    "error_rate": 0.0,
+    "error_status": 503,
+    "retry_after": None,
+    "fail_next": 0,
+}
+app.state.requests = 0
+_user_ids = itertools.count()
+
+
+@app.middleware("http")
+async def inject_faults(request: Request, call_next):
+    """Answer some requests with an error instead of the endpoint."""
+    if request.url.path.startswith("/mock/"):
+        return await call_next(request)
+    app.state.requests += 1
+    faults = app.state.faults
+    if faults["fail_next"] > 0 or random.random() < faults["error_rate"]:
+        faults["fail_next"] = max(0, faults["fail_next"] - 1)
+        headers = {}
+        if faults["retry_after"] is not None:
+            headers["Retry-After"] = str(faults["retry_after"])
+        return JSONResponse(
+            {"error": {"status": faults["error_status"], "message": "Injected fault"}},
+            status_code=faults["error_status"],
+            headers=headers,
+        )
+    return await call_next(request)
+
+
+@app.get("/mock/faults")
+async def get_faults():
+    """Return the injected faults and the number of requests received."""
+    return {**app.state.faults, "requests": app.state.requests}
+
+
+@app.put("/mock/faults")
+async def set_faults(
+    error_rate: float = 0.0,
+    error_status: int = 503,
+    retry_after: Optional[int] = None,
+    fail_next: int = 0,
+    latency_ms: float = 0.0,
+):
+    """Change the injected faults and reset the number of requests received."""
+    app.state.faults = {
+        "error_rate": error_rate,
+        "error_status": error_status,
+        "retry_after": retry_after,
+        "fail_next": fail_next,
+    }
+    app.state.latency = latency_ms / 1000
+    app.state.requests = 0
+    return await get_faults()
+
+
+async def _simulate_latency():
+    """Wait for the configured latency."""
+    if app.state.latency:
+        await asyncio.sleep(app.state.latency)
+
+
+@app.get("/authorize")
+async def authorize(redirect_uri: str, state: str):
+    """Authorize the application without asking the user anything."""
+    query = urlencode({"code": secrets.token_urlsafe(16), "state": state})
+    return RedirectResponse(url=f"{redirect_uri}?{query}")
+
+
+@app.post("/api/token")
+async def token(request: Request):
+    """Issue an access token for an authorization code or a refresh token."""
+    await _simulate_latency()
+    form = parse_qs((await request.body()).decode())
+    tokens = {
+        "access_token": secrets.token_urlsafe(32),
+        "token_type": "Bearer",
+        "expires_in": TOKEN_LIFETIME,
+    }
+    if form.get("grant_type") == ["authorization_code"]:
+        tokens["refresh_token"] = secrets.token_urlsafe(32)
+    return tokens
+
+
+@app.get("/v1/me")
+@app.get("/v1/me/")
+async def me():
+    """Return the profile of a new user."""
+    await _simulate_latency()
+    user_id = f"mock-user-{next(_user_ids)}-{secrets.token_hex(4)}"
+    return {
+        "id": user_id,
+        "display_name": user_id,
+        "email": f"{user_id}@example.com",
+        "images": [{"url": f"https://i.scdn.co/image/{user_id}"}],
+        "country": "FR",
+        "uri": f"spotify:user:{user_id}",
+    }
+
+
+def _artist(index: int) -> dict:
+    """Return a fake artist object."""
+    return {"id": f"mock-artist-{index}", "name": f"Mock Artist {index}"}
+
+
+def _album(index: int) -> dict:
+    """Return a fake album object."""
+    return {
+        "id": f"mock-album-{index}",
+        "name": f"Mock Album {index}",
+        "artists": [_artist(index % 20)],
+        "release_date": f"{1970 + index % 50}-01-01",
+    }
+
+
+@app.get("/v1/me/top/{item_type}")
+async def top_items(item_type: str, limit: int = 20):
+    """Return the top artists or tracks of the user."""
+    await _simulate_latency()
+    if item_type == "artists":
+        return {"items": [_artist(index) for index in range(limit)]}
+    return {
+        "items": [
+            {
+                "id": f"mock-track-{index}",
+                "name": f"Mock Track {index}",
+                "artists": [_artist(index % 20)],
+                "album": _album(index % 30),
+                "duration_ms": 120_000 + 7_919 * index % 240_000,
+            }
+            for index in range(limit)
+        ]
+    }
+
+
+@app.get("/v1/me/albums")
+async def saved_albums(limit: int = 20):
+    """Return the albums saved by the user."""
+    await _simulate_latency()
+    return {"items": [{"album": _album(index)} for index in range(limit)]}
+
+
+def main():
+    """Run the mock server."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--retry-after", type=int)
+    args = parser.parse_args()
+    app.state.latency = args.latency_ms / 1000
+    app.state.faults.update(
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        retry_after=args.retry_after,
+    )
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
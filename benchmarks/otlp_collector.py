@@ -0,0 +1,120 @@
+"""Local stand-in for an OpenTelemetry collector, and a viewer for span files.
+
+``serve`` receives spans sent with ``QUIZZIFY_TRACE_EXPORTER=otlp`` (OTLP/JSON
+over HTTP) and appends them to a file, in the same format as the file exporter
+(``QUIZZIFY_TRACE_EXPORTER=file``). ``show`` prints the traces of such a file as
+trees of nested timings.
+
+Usage::
+
+    python -m benchmarks.otlp_collector serve --port 4318 --output spans.jsonl
+    python -m benchmarks.otlp_collector show spans.jsonl --slowest 5
+"""
+
+import argparse
+import json
+from collections import defaultdict
+
+import uvicorn
+from fastapi import FastAPI, Request
+
+
+def otlp_to_spans(payload: dict):
+    """Convert an OTLP/JSON export request to the span file format."""
+    for resource_spans in payload.get("resourceSpans", []):
+        for scope_spans in resource_spans.get("scopeSpans", []):
+            for span in scope_spans.get("spans", []):
+                start, end = int(span["startTimeUnixNano"]), int(
+                    span["endTimeUnixNano"]
+                )
+                yield {
+                    "trace_id": span["traceId"],
+                    "span_id": span["spanId"],
+                    "parent_id": span.get("parentSpanId") or None,
+                    "name": span["name"],
+                    "start_time_ns": start,
+                    "end_time_ns": end,
+                    "duration_ms": (end - start) / 1e6,
+                    "attributes": {
+                        attribute["key"]: next(iter(attribute["value"].values()))
+                        for attribute in span.get("attributes", [])
+                    },
+                    "status": (
+                        "error" if span.get("status", {}).get("code") == 2 else "ok"
+                    ),
+                }
+
+
+def create_collector(output: str) -> FastAPI:
+    """Create the collector application, writing the spans to ``output``."""
+    app = FastAPI(title="OTLP collector stand-in")
+
+    @app.post("/v1/traces")
+    async def receive_traces(request: Request):
+        spans = list(otlp_to_spans(await request.json()))
+        with open(output, "a", encoding="utf-8") as file:
+            for span in spans:
+                file.write(json.dumps(span) + "\n")
+        return {}
+
+    return app
+
+
+def show_traces(path: str, slowest: int):
+    """Print the slowest traces of a span file as trees of nested timings."""
+    traces = defaultdict(list)
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            span = json.loads(line)
+            traces[span["trace_id"]].append(span)
+
+    def root_duration(spans):
+        ids = {span["span_id"] for span in spans}
+        return max(
+            span["duration_ms"] for span in spans if span["parent_id"] not in ids
+        )
+
+    ranked = sorted(traces.values(), key=root_duration, reverse=True)
+    for spans in ranked[:slowest]:
+        children = defaultdict(list)
+        ids = {span["span_id"] for span in spans}
+        for span in sorted(spans, key=lambda span: span["start_time_ns"]):
+            children[span["parent_id"] if span["parent_id"] in ids else None].append(
+                span
+            )
+
+        def print_tree(parent_id, depth):
+            for span in children[parent_id]:
+                status = " [error]" if span["status"] == "error" else ""
+                print(
+                    f"{'  ' * depth}{span['name']:<{50 - 2 * depth}}"
+                    f"{span['duration_ms']:>10.2f} ms{status}"
+                )
+                print_tree(span["span_id"], depth + 1)
+
+        print(f"trace {spans[0]['trace_id']}")
+        print_tree(None, 1)
+        print()
+
+
+def main():
+    """Run the collector or show a span file."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve = commands.add_parser("serve")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=4318)
+    serve.add_argument("--output", default="quizzify-spans.jsonl")
+    show = commands.add_parser("show")
+    show.add_argument("path")
+    show.add_argument("--slowest", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        uvicorn.run(create_collector(args.output), host=args.host, port=args.port)
+    else:
+        show_traces(args.path, args.slowest)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Compare the frequent queries sent as they are against prepared statements.
+
+Each query runs on the same pooled connection, first as a plain query (parsed,
+analyzed and planned by PostgreSQL on each call), then with its prepared
+statement. The client-side latency covers the whole round trip; the planning
+time is the one reported by PostgreSQL with ``EXPLAIN (ANALYZE, SUMMARY)``.
+Run it against the seeded database (see ``benchmarks.seed_catalog``).
+
+Usage::
+
+    python -m benchmarks.prepared_statements --calls 200
+"""
+
+import argparse
+import re
+import statistics
+import time
+
+from quizzify.databases import crud
+from quizzify.databases.db_connection import close_pool, connect_to_db
+
+PLANNING_TIME = re.compile(r"Planning Time: ([\d.]+) ms")
+
+
+def queries(cursor) -> list:
+    """List the benchmarked statements with the values of their parameters."""
+    cursor.execute("SELECT email FROM users ORDER BY email LIMIT 1;")
+    row = cursor.fetchone()
+    email = row[0] if row else "user@example.com"
+    return [
+        (crud.GET_USER_BY_EMAIL, {"email": email}),
+        (crud.GET_RANDOM_ARTIST, None),
+        (crud.GET_RANDOM_SONG, None),
+        (crud.GET_RANDOM_ARTIST_SONG, None),
+        (crud.GET_RANDOM_QUESTION, None),
+    ]
+
+
+def run(cursor, execute, calls: int) -> float:
+    """Return the median latency of a query, in microseconds."""
+    latencies = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        execute()
+        cursor.fetchall()
+        latencies.append(time.perf_counter() - start)
+    return statistics.median(latencies) * 1e6
+
+
+def planning_time(cursor, query: str, vars=None) -> float:
+    """Return the planning time of a query reported by PostgreSQL, in ms."""
+    cursor.execute(f"EXPLAIN (ANALYZE, SUMMARY) {query}", vars)
+    plan = "\n".join(row[0] for row in cursor.fetchall())
+    return float(PLANNING_TIME.search(plan).group(1))
+
+
+def main():
+    """Print the latency and planning time of each query, plain and prepared."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=200)
+    args = parser.parse_args()
+
+    connection = connect_to_db()
+    connection.autocommit = True
+    cursor = connection.cursor()
+    print(
+        f"{'statement':<28}{'plain (us)':>12}{'prepared (us)':>15}"
+        f"{'plan (ms)':>11}{'prepared plan (ms)':>20}"
+    )
+    for statement, vars in queries(cursor):
+        plain = run(cursor, lambda: cursor.execute(statement.query, vars), args.calls)
+        # after a few executions, PostgreSQL may switch to a cached generic plan
+        prepared = run(cursor, lambda: statement.execute(cursor, vars), args.calls)
+        values = [vars[param] for param in statement.params] if vars else None
+        print(
+            f"{statement.name:<28}{plain:>12.0f}{prepared:>15.0f}"
+            f"{planning_time(cursor, statement.query, vars):>11.3f}"
+            f"{planning_time(cursor, statement.execute_query, values):>20.3f}"
+        )
+    cursor.close()
+    connection.close()
+    close_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Benchmark the catalog search, and its keyset pagination against ``OFFSET``.
+
+Run it against a catalog seeded with ``benchmarks.seed_catalog``, e.g. 5M songs::
+
+    python -m benchmarks.seed_catalog --reset --artists 100000 --albums 500000 \\
+        --songs 5000000
+
+The searches are drawn from the vocabulary of the seeded names: a common word, two
+words, the prefix of two words and a misspelled word. For each of them, the first
+page is timed, then the page ``--pages`` pages further, reached with the cursor of
+the previous page (keyset) or by skipping the previous results (``OFFSET``).
+
+Usage::
+
+    python -m benchmarks.search --table songs --runs 20 --pages 50
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+from psycopg2.extras import RealDictCursor
+
+from benchmarks.seed_catalog import WORDS
+from quizzify.databases import crud
+from quizzify.databases.db_connection import close_pool, connect_to_db
+
+
+def searches(rng: random.Random) -> dict:
+    """Draw a search of each kind from the vocabulary of the catalog."""
+    first, second = rng.sample(list(WORDS), 2)
+    typo = list(max(first, second, key=len))
+    typo[len(typo) // 2] = "x"
+    return {
+        "one word": first,
+        "two words": f"{first} {second}",
+        "prefixes": f"{first[:3]} {second[:3]}",
+        "typo": "".join(typo),
+    }
+
+
+def timed(cursor, query: str, values: dict):
+    """Run a query and return its rows and its latency in milliseconds."""
+    start = time.perf_counter()
+    cursor.execute(query, values)
+    rows = cursor.fetchall()
+    return rows, (time.perf_counter() - start) * 1000
+
+
+def main():
+    """Print the latencies of the search, per kind of search."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--table", choices=crud.SEARCH_TABLES, default="songs")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    first_page = crud.search_query(args.table, after=False)
+    next_page = crud.search_query(args.table, after=True)
+    offset_page = first_page.replace(
+        "LIMIT %(limit)s", "LIMIT %(limit)s OFFSET %(offset)s"
+    )
+    rng = random.Random(args.seed)
+    latencies = {}
+    connection = connect_to_db()
+    cursor = connection.cursor(cursor_factory=RealDictCursor)
+    for _ in range(args.runs):
+        for kind, text in searches(rng).items():
+            values = {
+                "words": crud.prefix_tsquery(text),
+                "text": text,
+                "limit": args.limit,
+            }
+            rows, elapsed = timed(cursor, first_page, values)
+            latencies.setdefault((kind, "first page"), []).append(elapsed)
+            # the page reached with the cursor of the previous one
+            offset = args.limit * (args.pages - 1)
+            _, elapsed = timed(cursor, offset_page, {**values, "offset": offset})
+            latencies.setdefault((kind, "offset"), []).append(elapsed)
+            previous, _ = timed(
+                cursor, offset_page, {**values, "offset": offset - args.limit}
+            )
+            if previous:
+                after = {"score": previous[-1]["score"], "id": previous[-1]["id"]}
+                _, elapsed = timed(cursor, next_page, {**values, **after})
+                latencies.setdefault((kind, "keyset"), []).append(elapsed)
+    connection.rollback()
+    cursor.close()
+    connection.close()
+    close_pool()
+
+    print(f"{args.table}, {args.runs} runs, page {args.pages} of {args.limit} results")
+    print(f"{'search':<12}{'page':<12}{'p50 (ms)':>10}{'p95 (ms)':>10}")
+    for (kind, page), values in latencies.items():
+        p95 = statistics.quantiles(values, n=20)[-1] if len(values) > 1 else values[0]
+        print(f"{kind:<12}{page:<12}{statistics.median(values):>10.1f}{p95:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
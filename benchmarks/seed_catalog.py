@@ -0,0 +1,199 @@
+"""Seed PostgreSQL with a synthetic music catalog and benchmark users.
+
+The tables are created from ``quizzify/databases/init.sql`` (with ``--reset``),
+then filled with ``COPY``. The catalog is generated from a fixed random seed, so
+two runs with the same arguments produce the same data. Every user has the
+password ``password``.
+
+Usage::
+
+    python -m benchmarks.seed_catalog --reset --artists 10000 --albums 50000 \\
+        --songs 500000 --users 100
+"""
+
+import argparse
+import io
+import time
+from pathlib import Path
+
+import bcrypt
+import numpy as np
+
+from quizzify.databases.db_connection import connect_to_db
+from quizzify.utils.id_set import BASE62_ALPHABET, SPOTIFY_ID_LENGTH
+
+INIT_SQL = Path(__file__).parent.parent / "quizzify" / "databases" / "init.sql"
+USER_PASSWORD = "password"  # nosec B105
+CHUNK_SIZE = 100_000
+# vocabulary used to generate names that look like music titles
+WORDS = np.array(
+    (
+        "love night heart dance fire summer blue dream rain city girl boy baby "
+        "moon star light dark time world life road home wild young gold soul "
+        "midnight sun river ocean sky shadow ghost angel devil king queen lonely "
+        "sweet crazy broken electric silver golden paradise heaven kiss tears "
+        "memories forever tonight yesterday tomorrow freedom highway thunder "
+        "storm winter spring autumn echo fever velvet neon diamond rebel hero "
+        "lover stranger journey island desert garden mirror window secret"
+    ).split()
+)
+
+
+def random_ids(rng: np.random.Generator, size: int) -> np.ndarray:
+    """Generate random 22-character base62 IDs, all fitting in 128 bits."""
+    alphabet = np.frombuffer(BASE62_ALPHABET.encode(), dtype=np.uint8)
+    chars = alphabet[rng.integers(0, len(alphabet), (size, SPOTIFY_ID_LENGTH))]
+    # like Spotify IDs, the first digit is below 7 (62**22 > 2**128)
+    chars[:, 0] = alphabet[rng.integers(0, 7, size)]
+    return chars.view(f"S{SPOTIFY_ID_LENGTH}").ravel().astype(str)
+
+
+def random_names(rng: np.random.Generator, size: int) -> list:
+    """Generate random names of 1 to 4 words."""
+    lengths = rng.integers(1, 5, size)
+    words = WORDS[rng.integers(0, len(WORDS), (size, 4))]
+    return [" ".join(row[:length]).title() for row, length in zip(words, lengths)]
+
+
+def copy_rows(cursor, table: str, columns: tuple, rows):
+    """Load rows in a table with COPY."""
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write("\t".join("\\N" if value is None else str(value) for value in row))
+        buffer.write("\n")
+    buffer.seek(0)
+    cursor.copy_expert(
+        f"COPY {table} ({', '.join(columns)}) FROM STDIN",  # nosec B608
+        buffer,
+    )
+
+
+def seed(
+    artists: int,
+    albums: int,
+    songs: int,
+    users: int,
+    reset: bool,
+    random_seed: int = 42,
+):
+    """Create and fill the tables.
+
+    Parameters
+    ----------
+    artists : int
+        The number of artists.
+    albums : int
+        The number of albums.
+    songs : int
+        The number of songs.
+    users : int
+        The number of users (``user<i>@example.com``).
+    reset : bool
+        Whether to (re)create the tables from init.sql first.
+    random_seed : int
+        The seed of the random generator.
+    """
+    rng = np.random.default_rng(random_seed)
+    connection = connect_to_db()
+    cursor = connection.cursor()
+    if reset:
+        cursor.execute(INIT_SQL.read_text())
+
+    start = time.perf_counter()
+    artists_ids = random_ids(rng, artists)
+    copy_rows(
+        cursor,
+        "artists",
+        ("id", "name", "popularity", "image_url"),
+        zip(
+            artists_ids,
+            random_names(rng, artists),
+            rng.integers(0, 101, artists),
+            (f"https://i.scdn.co/image/{artist_id}" for artist_id in artists_ids),
+        ),
+    )
+
+    albums_ids = random_ids(rng, albums)
+    albums_artists = artists_ids[rng.integers(0, artists, albums)]
+    release_dates = np.datetime64("1960-01-01") + rng.integers(0, 365 * 64, albums)
+    copy_rows(
+        cursor,
+        "albums",
+        ("id", "name", "artist_id", "popularity", "release_date", "total_tracks"),
+        zip(
+            albums_ids,
+            random_names(rng, albums),
+            albums_artists,
+            rng.integers(0, 101, albums),
+            release_dates,
+            rng.integers(1, 25, albums),
+        ),
+    )
+
+    for offset in range(0, songs, CHUNK_SIZE):
+        size = min(CHUNK_SIZE, songs - offset)
+        songs_albums = rng.integers(0, albums, size)
+        copy_rows(
+            cursor,
+            "songs",
+            (
+                "id",
+                "name",
+                "artist_id",
+                "album_id",
+                "popularity",
+                "duration_ms",
+                "track_number",
+            ),
+            zip(
+                random_ids(rng, size),
+                random_names(rng, size),
+                albums_artists[songs_albums],
+                albums_ids[songs_albums],
+                rng.integers(0, 101, size),
+                rng.integers(90_000, 420_000, size),
+                rng.integers(1, 25, size),
+            ),
+        )
+
+    # hashing is slow on purpose: every user shares the same hash
+    hashed_password = bcrypt.hashpw(USER_PASSWORD.encode("utf-8"), bcrypt.gensalt())
+    copy_rows(
+        cursor,
+        "users",
+        ("user_id", "username", "email", "hashed_pwd"),
+        (
+            (
+                f"00000000-0000-0000-0000-{index:012d}",
+                f"user{index}",
+                f"user{index}@example.com",
+                "\\\\x" + hashed_password.hex(),
+            )
+            for index in range(users)
+        ),
+    )
+    connection.commit()
+    cursor.execute("ANALYZE;")
+    cursor.close()
+    connection.close()
+    print(
+        f"Seeded {artists} artists, {albums} albums, {songs} songs and {users} users "
+        f"in {time.perf_counter() - start:.1f} s."
+    )
+
+
+def main():
+    """Seed the database from the command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--artists", type=int, default=10_000)
+    parser.add_argument("--albums", type=int, default=50_000)
+    parser.add_argument("--songs", type=int, default=500_000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reset", action="store_true")
+    args = parser.parse_args()
+    seed(args.artists, args.albums, args.songs, args.users, args.reset, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Compare the memory of the workers with a private catalog graph or the snapshot.
+
+``--workers`` processes each load the catalog graph, either from the database in
+their own memory (``private``) or by mapping the published catalog snapshot
+(``mmap``), then generate the same questions from it. The memory of each worker
+is read from ``/proc`` before loading the graph and once all of them have
+generated their questions: the RSS, its anonymous (private) and file-backed
+(shared through the page cache) parts, and the PSS, where each shared page is
+divided among the processes mapping it. Run it against the seeded database (see
+``benchmarks.seed_catalog``).
+
+Usage::
+
+    python -m benchmarks.snapshot_memory --workers 4
+"""
+
+import argparse
+import multiprocessing
+import random
+from pathlib import Path
+
+import numpy as np
+
+MODES = ("private", "mmap")
+# fields of /proc/self/status and /proc/self/smaps_rollup, in kB
+MEMORY_FIELDS = ("VmRSS", "RssAnon", "RssFile", "Pss")
+
+
+def memory_mb() -> dict:
+    """Read the memory of the current process, in MB."""
+    values = {}
+    for name in ("status", "smaps_rollup"):
+        for line in Path(f"/proc/self/{name}").read_text().splitlines():
+            field, _, value = line.partition(":")
+            if field in MEMORY_FIELDS:
+                values[field] = int(value.split()[0]) / 1024
+    return values
+
+
+def run_worker(
+    mode: str,
+    barrier: multiprocessing.Barrier,
+    queue: multiprocessing.Queue,
+):
+    """Load the catalog graph, generate questions and report the memory.
+
+    Parameters
+    ----------
+    mode : str
+        One of ``MODES``.
+    barrier : multiprocessing.Barrier
+        The barrier the workers wait at before measuring their memory, so that
+        they all hold the graph at the same time.
+    queue : multiprocessing.Queue
+        The queue to send the results to the parent process.
+    """
+    from quizzify.databases import catalog_snapshot, crud, question_bank
+    from quizzify.utils.catalog_graph import GRAPH_TABLES, CatalogGraph
+
+    before = memory_mb()
+    if mode == "private":
+        graph = CatalogGraph()
+        for table in GRAPH_TABLES:
+            graph.add(table, crud.iter_graph_rows(table))
+    else:
+        graph = catalog_snapshot.get_catalog_graph()
+    rng = random.Random(0)
+    for question_type, table in question_bank.GRAPH_SUBJECTS.items():
+        subjects = np.arange(graph.size(table), dtype=np.int32)
+        generate = getattr(question_bank, f"{question_type}_questions")
+        for _ in generate(graph, subjects, rng):
+            pass
+    barrier.wait()
+    after = memory_mb()
+    barrier.wait()
+    queue.put((before, after))
+
+
+def main():
+    """Run the workers of each mode and print their mean memory."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    from quizzify.databases.catalog_snapshot import export_catalog_snapshot
+
+    # publish the snapshot the mmap workers will map
+    graph = export_catalog_snapshot()
+    print(
+        f"{graph.size('artists')} artists, {graph.size('albums')} albums, "
+        f"{graph.size('songs')} songs, {args.workers} workers"
+    )
+    del graph
+
+    context = multiprocessing.get_context("spawn")
+    header = "".join(f"{field + ' (MB)':>15}" for field in MEMORY_FIELDS)
+    print(f"{'mode':<10}{'when':<8}{header}")
+    for mode in MODES:
+        barrier = context.Barrier(args.workers)
+        queue = context.Queue()
+        workers = [
+            context.Process(target=run_worker, args=(mode, barrier, queue))
+            for _ in range(args.workers)
+        ]
+        for worker in workers:
+            worker.start()
+        results = [queue.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+        for when, index in (("before", 0), ("after", 1)):
+            means = "".join(
+                f"{np.mean([result[index][field] for result in results]):>15.1f}"
+                for field in MEMORY_FIELDS
+            )
+            print(f"{mode:<10}{when:<8}{means}")
+
+
+if __name__ == "__main__":
+    main()
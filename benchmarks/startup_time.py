@@ -0,0 +1,130 @@
+"""Measure the import time of the application, module by module.
+
+Each run imports the module in a fresh interpreter with ``python -X importtime``,
+so nothing is cached between runs. The slowest modules are listed by cumulative
+time (the module and everything it imports) and by self time.
+
+Usage::
+
+    python -m benchmarks.startup_time --module quizzify.main --runs 5
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+# e.g. "import time:       412 |       1290 |   quizzify.config"
+IMPORTTIME_PREFIX = "import time:"
+
+
+def parse_importtime(output: str) -> dict:
+    """Parse the report of ``python -X importtime``.
+
+    Parameters
+    ----------
+    output : str
+        The standard error of the interpreter.
+
+    Returns
+    -------
+    dict
+        The self and cumulative import times in microseconds, per module.
+    """
+    modules = {}
+    for line in output.splitlines():
+        if not line.startswith(IMPORTTIME_PREFIX):
+            continue
+        fields = line[len(IMPORTTIME_PREFIX) :].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            # header line
+            continue
+        modules[fields[2].strip()] = (int(fields[0]), int(fields[1]))
+    return modules
+
+
+def import_once(module: str) -> tuple:
+    """Import the module in a fresh interpreter.
+
+    Parameters
+    ----------
+    module : str
+        The module to import.
+
+    Returns
+    -------
+    tuple
+        The wall time of the interpreter in seconds, and the import times per
+        module.
+    """
+    start = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return time.perf_counter() - start, parse_importtime(process.stderr)
+
+
+def main():
+    """Import the module several times and print the slowest modules."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--module", default="quizzify.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--output", type=Path, help="save the report as JSON")
+    args = parser.parse_args()
+
+    wall_times = []
+    self_times = defaultdict(list)
+    cumulative_times = defaultdict(list)
+    for _ in range(args.runs):
+        wall_time, modules = import_once(args.module)
+        wall_times.append(wall_time)
+        for name, (self_us, cumulative_us) in modules.items():
+            self_times[name].append(self_us)
+            cumulative_times[name].append(cumulative_us)
+
+    # median over the runs, in milliseconds
+    self_ms = {name: statistics.median(t) / 1000 for name, t in self_times.items()}
+    cumulative_ms = {
+        name: statistics.median(t) / 1000 for name, t in cumulative_times.items()
+    }
+    project = args.module.split(".")[0]
+    project_self_ms = sum(t for name, t in self_ms.items() if name.startswith(project))
+    report = {
+        "module": args.module,
+        "runs": args.runs,
+        "wall_time_ms": statistics.median(wall_times) * 1000,
+        "import_time_ms": cumulative_ms.get(args.module, 0.0),
+        "project_self_time_ms": project_self_ms,
+        "slowest_cumulative": sorted(
+            cumulative_ms.items(), key=lambda item: item[1], reverse=True
+        )[: args.top],
+        "slowest_self": sorted(self_ms.items(), key=lambda item: item[1], reverse=True)[
+            : args.top
+        ],
+    }
+
+    print(f"import {args.module}, median of {args.runs} runs")
+    print(f"  interpreter wall time: {report['wall_time_ms']:8.1f} ms")
+    print(f"  import time:           {report['import_time_ms']:8.1f} ms")
+    print(f"  self time of {project}.*: {project_self_ms:8.1f} ms")
+    for title in ("slowest_cumulative", "slowest_self"):
+        print(f"\n{title.replace('_', ' ')} (ms)")
+        for name, elapsed in report[title]:
+            print(f"  {elapsed:8.1f}  {name}")
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, indent=2))
+        print(f"\nsaved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Compare the peak RSS of loading the catalog IDs at once or streaming them.
+
+Each strategy runs in its own process because the peak RSS of a process never
+decreases. The database is configured with the usual ``POSTGRES_*`` variables.
+
+Usage::
+
+    python -m benchmarks.streaming_memory --table songs
+"""
+
+import argparse
+import multiprocessing
+import resource
+import time
+
+STRATEGIES = ("fetchall", "stream", "export_ndjson", "export_csv")
+
+
+def run_strategy(
+    strategy: str,
+    table: str,
+    queue: multiprocessing.Queue,
+):
+    """Consume the table with the given strategy and report the peak RSS.
+
+    Parameters
+    ----------
+    strategy : str
+        One of ``STRATEGIES``.
+    table : str
+        The catalog table to read (artists, albums or songs).
+    queue : multiprocessing.Queue
+        The queue to send the results to the parent process.
+    """
+    from quizzify.api.exports import service
+    from quizzify.databases import crud
+
+    start = time.perf_counter()
+    if strategy == "fetchall":
+        get_ids = getattr(crud, f"get_{table}_ids")
+        rows = len(get_ids())
+    elif strategy == "stream":
+        iter_ids = getattr(crud, f"iter_{table}_ids")
+        rows = sum(1 for _ in iter_ids())
+    else:
+        export_format = strategy.split("_")[1]
+        rows = sum(
+            chunk.count("\n") for chunk in service.export_catalog(table, export_format)
+        )
+    elapsed = time.perf_counter() - start
+    # ru_maxrss is expressed in kilobytes on Linux
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    queue.put((strategy, rows, elapsed, peak_rss_mb))
+
+
+def main():
+    """Run every strategy in a fresh process and print a comparison table."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--table", default="songs", choices=("artists", "albums", "songs")
+    )
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    print(f"{'strategy':<15}{'rows':>12}{'seconds':>10}{'peak RSS (MB)':>16}")
+    for strategy in STRATEGIES:
+        process = context.Process(
+            target=run_strategy, args=(strategy, args.table, queue)
+        )
+        process.start()
+        strategy, rows, elapsed, peak_rss_mb = queue.get()
+        process.join()
+        print(f"{strategy:<15}{rows:>12}{elapsed:>10.2f}{peak_rss_mb:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
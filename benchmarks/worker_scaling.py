@@ -0,0 +1,72 @@
+"""Measure how the throughput of the API scales with the number of workers.
+
+The API is started with the production configuration (``quizzify/gunicorn.conf.py``)
+for each number of workers, then loaded by separate client processes. Keep enough
+free cores for the load processes, otherwise they become the bottleneck.
+
+Usage::
+
+    python -m benchmarks.worker_scaling --workers 1 2 4 --path /
+"""
+
+import argparse
+import sys
+
+from benchmarks.loadgen import Endpoint, run_load, run_server
+
+
+def gunicorn_command(app: str, workers: int, port: int):
+    """Return the command running the API with the production configuration."""
+    return [
+        sys.executable,
+        "-m",
+        "gunicorn",
+        "-c",
+        "quizzify/gunicorn.conf.py",
+        "--workers",
+        str(workers),
+        "--bind",
+        f"127.0.0.1:{port}",
+        app,
+    ]
+
+
+def main():
+    """Load the API for each number of workers and print the scaling."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--app", default="quizzify.main:app")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--path", default="/")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--load-processes", type=int, default=2)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    endpoint = Endpoint(name=args.path, path=args.path)
+    baseline = None
+    print(f"{'workers':>8}{'rps':>10}{'p99 (ms)':>10}{'speedup':>9}{'efficiency':>12}")
+    for workers in args.workers:
+        base_url = f"http://127.0.0.1:{args.port}"
+        with run_server(
+            gunicorn_command(args.app, workers, args.port),
+            ready_url=f"{base_url}/",
+            env={"WEB_CONCURRENCY": str(workers)},
+        ):
+            stats = run_load(
+                base_url=base_url,
+                endpoints=[endpoint],
+                duration=args.duration,
+                concurrency=args.concurrency,
+                processes=args.load_processes,
+            )[endpoint.name]
+        baseline = baseline or stats["rps"] / workers
+        speedup = stats["rps"] / baseline
+        print(
+            f"{workers:>8}{stats['rps']:>10.0f}{stats['p99_ms']:>10.1f}"
+            f"{speedup:>9.2f}{speedup / workers:>12.0%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+"""Measure the broadcast latency of a live quiz room with many connected players.
+
+The benchmark starts one worker, creates a room, connects ``--clients`` players
+to it and plays the game: every player answers each question as soon as it is
+received, so the rounds end early. The latency of a message is the time between
+its ``sent_at`` timestamp (set by the host of the room) and its reception by a
+player; the clients run on the same machine, so the clocks agree, but they also
+compete with the server for the CPU.
+
+The questions come from the question bank: build it first with
+``python -m quizzify.databases.question_bank``.
+
+Usage::
+
+    python -m benchmarks.ws_broadcast --clients 1000 --rounds 5
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import httpx
+import websockets
+
+from benchmarks.loadgen import run_server
+
+# events of the room whose latency is measured
+MEASURED_EVENTS = ("question", "results", "end")
+# players connecting at once
+CONNECT_BATCH_SIZE = 100
+
+
+def percentile(values: list, fraction: float) -> float:
+    """Return the given percentile of the values (nearest rank)."""
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+async def player(
+    url: str,
+    joined: asyncio.Event,
+    start: asyncio.Event,
+    latencies: dict,
+    is_host: bool,
+):
+    """Play the game as one client, recording the latency of the events.
+
+    Parameters
+    ----------
+    url : str
+        The WebSocket URL of the room, with the name of the player.
+    joined : asyncio.Event
+        Set once the player has been accepted in the room.
+    start : asyncio.Event
+        Set once all the players are in the room.
+    latencies : dict
+        The latencies in seconds, per (event type, round), filled by the player.
+    is_host : bool
+        Whether this player starts the game.
+    """
+    try:
+        await play_events(url, joined, start, latencies, is_host)
+    finally:
+        # disconnected players must not block the start of the game
+        joined.set()
+
+
+async def play_events(url, joined, start, latencies, is_host):
+    """Receive the events of the room until the end of the game."""
+    async with websockets.connect(url, max_queue=None) as websocket:
+        async for message in websocket:
+            received_at = time.time()
+            event = json.loads(message)
+            if event["type"] == "joined" and not joined.is_set():
+                joined.set()
+                if is_host:
+                    await start.wait()
+                    await websocket.send(json.dumps({"type": "start"}))
+            if event["type"] not in MEASURED_EVENTS:
+                continue
+            latencies[event["type"], event.get("round")].append(
+                received_at - event["sent_at"]
+            )
+            if event["type"] == "question":
+                await websocket.send(
+                    json.dumps(
+                        {
+                            "type": "answer",
+                            "question_id": event["question_id"],
+                            "choice": event["choices"][0],
+                        }
+                    )
+                )
+            elif event["type"] == "end":
+                return
+
+
+async def play_game(
+    base_url: str,
+    clients: int,
+    rounds: int,
+) -> dict:
+    """Create a room, connect the players and play a game.
+
+    Returns
+    -------
+    dict
+        The latencies in seconds, per (event type, round).
+    """
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        response = await client.post(
+            "/rooms", params={"rounds": rounds, "round_seconds": 60}
+        )
+        response.raise_for_status()
+        room = response.json()
+    url = base_url.replace("http", "ws", 1) + room["websocket_path"]
+
+    latencies = defaultdict(list)
+    start = asyncio.Event()
+    tasks = []
+    connect_start = time.perf_counter()
+    for batch in range(0, clients, CONNECT_BATCH_SIZE):
+        joined = []
+        for index in range(batch, min(clients, batch + CONNECT_BATCH_SIZE)):
+            joined.append(asyncio.Event())
+            tasks.append(
+                asyncio.create_task(
+                    player(
+                        f"{url}?name=player{index}",
+                        joined[-1],
+                        start,
+                        latencies,
+                        is_host=index == 0,
+                    )
+                )
+            )
+        await asyncio.gather(*(event.wait() for event in joined))
+    print(f"{clients} players joined in {time.perf_counter() - connect_start:.1f} s")
+    start.set()
+    await asyncio.gather(*tasks)
+    return latencies
+
+
+def summarize(latencies: dict, clients: int) -> dict:
+    """Compute the latency percentiles of each type of event, in milliseconds.
+
+    The completion time of a broadcast is the latency of its last delivery.
+    """
+    summary = {}
+    for event_type in MEASURED_EVENTS:
+        broadcasts = [
+            values for (kind, _), values in latencies.items() if kind == event_type
+        ]
+        deliveries = [value for values in broadcasts for value in values]
+        if not deliveries:
+            continue
+        summary[event_type] = {
+            "broadcasts": len(broadcasts),
+            "deliveries": len(deliveries),
+            "missed": len(broadcasts) * clients - len(deliveries),
+            "p50_ms": percentile(deliveries, 0.50) * 1000,
+            "p95_ms": percentile(deliveries, 0.95) * 1000,
+            "p99_ms": percentile(deliveries, 0.99) * 1000,
+            "completion_ms": statistics.median(max(values) for values in broadcasts)
+            * 1000,
+        }
+    return summary
+
+
+def main():
+    """Run the benchmark and print the latencies."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--app", default="quizzify.main:app")
+    parser.add_argument("--port", type=int, default=8010)
+    parser.add_argument("--pubsub", choices=("memory", "postgres"), default="memory")
+    parser.add_argument("--output", type=Path, help="save the results as JSON")
+    args = parser.parse_args()
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    command = [
+        sys.executable,
+        "-m",
+        "uvicorn",
+        args.app,
+        "--port",
+        str(args.port),
+        "--log-level",
+        "warning",
+        "--ws-max-queue",
+        "1024",
+    ]
+    env = {"QUIZZIFY_PUBSUB": args.pubsub, "QUIZZIFY_RATE_LIMIT_ENABLED": "false"}
+    with run_server(command, ready_url=f"{base_url}/", env=env):
+        latencies = asyncio.run(play_game(base_url, args.clients, args.rounds))
+
+    summary = summarize(latencies, args.clients)
+    print(
+        f"{'event':10} {'deliveries':>10} {'missed':>6} {'p50 (ms)':>9} "
+        f"{'p95 (ms)':>9} {'p99 (ms)':>9} {'last (ms)':>9}"
+    )
+    for event_type, stats in summary.items():
+        print(
+            f"{event_type:10} {stats['deliveries']:10d} {stats['missed']:6d} "
+            f"{stats['p50_ms']:9.1f} {stats['p95_ms']:9.1f} {stats['p99_ms']:9.1f} "
+            f"{stats['completion_ms']:9.1f}"
+        )
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(
+            json.dumps({"config": vars(args) | {"output": None}, "results": summary})
+        )
+        print(f"saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
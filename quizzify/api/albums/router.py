@@ -0,0 +1,60 @@
+import logging
+from enum import Enum
+from typing import Optional
+
+from fastapi import APIRouter, Query, status
+
+from quizzify.api.albums import service
+from quizzify.utils import schemas
+
+# define router for album endpoints
+router = APIRouter()
+# define logger
+logger = logging.getLogger(__name__)
+
+
+class AlbumSort(str, Enum):
+    """Sorts of the listing of the albums."""
+
+    id = "id"
+    popularity = "popularity"
+    release_date = "release_date"
+
+
+@router.get(
+    path="",
+    status_code=status.HTTP_200_OK,
+    response_model=schemas.AlbumPage,
+    summary="List the albums",
+    description=(
+        "List the albums of the catalog, or of an artist, by ID, the most popular "
+        "first or the most recent first. Pass the `next_cursor` of a page as "
+        "`cursor` to get the next one: every page is read from an index, as fast "
+        "as the first one."
+    ),
+)
+def list_albums(
+    artist_id: Optional[str] = None,
+    sort: AlbumSort = AlbumSort.id,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+):
+    """List the albums.
+
+    Parameters
+    ----------
+    artist_id : str, optional
+        Only list the albums of this artist.
+    sort : AlbumSort
+        The sort of the albums.
+    limit : int
+        The number of albums of the page.
+    cursor : str, optional
+        The cursor of the page, returned with the previous one.
+
+    Returns
+    -------
+    schemas.AlbumPage
+        The albums and the cursor of the next page.
+    """
+    return service.list_albums(limit, sort.value, artist_id, cursor)
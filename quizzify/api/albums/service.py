@@ -0,0 +1,50 @@
+import logging
+from typing import Optional
+
+from quizzify.databases import crud
+from quizzify.utils import schemas
+from quizzify.utils.pagination import decode_cursor, next_cursor
+
+logger = logging.getLogger(__name__)
+
+
+def list_albums(
+    limit: int,
+    sort: str,
+    artist_id: Optional[str] = None,
+    cursor: Optional[str] = None,
+) -> schemas.AlbumPage:
+    """List a page of the albums of the catalog.
+
+    Parameters
+    ----------
+    limit : int
+        The number of albums of the page.
+    sort : str
+        ``id``, ``popularity`` for the most popular first, or ``release_date``
+        for the most recent first.
+    artist_id : str, optional
+        Only list the albums of this artist.
+    cursor : str, optional
+        The cursor of the page (the first page by default).
+
+    Returns
+    -------
+    schemas.AlbumPage
+        The albums, and the cursor of the next page if there may be one.
+    """
+    after = decode_cursor(cursor, sort) if cursor else None
+    rows = crud.list_catalog(
+        "albums", limit, sort, filters={"artist_id": artist_id}, after=after
+    )
+    albums = [
+        schemas.Album(
+            id=row["id"],
+            name=row["name"],
+            artist_id=row["artist_id"],
+            release_year=row["release_date"].year if row["release_date"] else None,
+            popularity=row["popularity"],
+        )
+        for row in rows
+    ]
+    return schemas.AlbumPage(items=albums, next_cursor=next_cursor(rows, limit, sort))
@@ -0,0 +1,55 @@
+import logging
+from enum import Enum
+from typing import Optional
+
+from fastapi import APIRouter, Query, status
+
+from quizzify.api.artists import service
+from quizzify.utils import schemas
+
+# define router for artist endpoints
+router = APIRouter()
+# define logger
+logger = logging.getLogger(__name__)
+
+
+class ArtistSort(str, Enum):
+    """Sorts of the listing of the artists."""
+
+    id = "id"
+    popularity = "popularity"
+
+
+@router.get(
+    path="",
+    status_code=status.HTTP_200_OK,
+    response_model=schemas.ArtistPage,
+    summary="List the artists",
+    description=(
+        "List the artists of the catalog by ID, or the most popular first. Pass "
+        "the `next_cursor` of a page as `cursor` to get the next one: every page "
+        "is read from an index, as fast as the first one."
+    ),
+)
+def list_artists(
+    sort: ArtistSort = ArtistSort.id,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+):
+    """List the artists.
+
+    Parameters
+    ----------
+    sort : ArtistSort
+        The sort of the artists.
+    limit : int
+        The number of artists of the page.
+    cursor : str, optional
+        The cursor of the page, returned with the previous one.
+
+    Returns
+    -------
+    schemas.ArtistPage
+        The artists and the cursor of the next page.
+    """
+    return service.list_artists(limit, sort.value, cursor)
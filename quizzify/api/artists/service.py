@@ -0,0 +1,37 @@
+import logging
+from typing import Optional
+
+from quizzify.databases import crud
+from quizzify.utils import schemas
+from quizzify.utils.pagination import decode_cursor, next_cursor
+
+logger = logging.getLogger(__name__)
+
+
+def list_artists(
+    limit: int,
+    sort: str,
+    cursor: Optional[str] = None,
+) -> schemas.ArtistPage:
+    """List a page of the artists of the catalog.
+
+    Parameters
+    ----------
+    limit : int
+        The number of artists of the page.
+    sort : str
+        ``id``, or ``popularity`` for the most popular first.
+    cursor : str, optional
+        The cursor of the page (the first page by default).
+
+    Returns
+    -------
+    schemas.ArtistPage
+        The artists, and the cursor of the next page if there may be one.
+    """
+    after = decode_cursor(cursor, sort) if cursor else None
+    rows = crud.list_catalog("artists", limit, sort, after=after)
+    return schemas.ArtistPage(
+        items=[schemas.Artist(**row) for row in rows],
+        next_cursor=next_cursor(rows, limit, sort),
+    )
@@ -1,33 +1,43 @@
 import logging
-import os
+from typing import Dict
 
-from dotenv import load_dotenv
-from fastapi import APIRouter, Request, status
+from fastapi import APIRouter, Depends, Request, status
 from fastapi.responses import RedirectResponse
 
 from quizzify.api.auth import service
+from quizzify.config import get_settings
 from quizzify.utils import schemas
+from quizzify.utils.admission import ConcurrencyLimiter, RateLimiter, account_email
+from quizzify.utils.sessions import current_session
 
-# load environment variables
-load_dotenv()
 # define router for authentication endpoints
 router = APIRouter()
 # define logger
 logger = logging.getLogger(__name__)
 
-
-SPOTIFY_CLIENT_ID = os.environ.get("SPOTIFY_CLIENT_ID")
-SPOTIFY_CLIENT_SECRET = os.environ.get("SPOTIFY_CLIENT_SECRET")
-SPOTIFY_REDIRECT_URI = os.environ.get("SPOTIFY_REDIRECT_URI")
-SPOTIFY_TOKEN_URL = os.environ.get("SPOTIFY_TOKEN_URL")
-SPOTIFY_AUTH_URL = os.environ.get("SPOTIFY_AUTH_URL")
-SPOTIFY_AUTH_SCOPE = os.environ.get("SPOTIFY_AUTH_SCOPE")
+# admission control: rate limits per client IP and per account, and a cap on the
+# bcrypt requests processed at once so they cannot exhaust the threadpool
+settings = get_settings()
+auth_rate_limit = RateLimiter(
+    "auth", rate=settings.auth_rate, burst=settings.auth_burst
+)
+login_account_rate_limit = RateLimiter(
+    "auth_login_account",
+    rate=settings.login_account_rate,
+    burst=settings.login_account_burst,
+    key=account_email,
+)
+register_concurrency = ConcurrencyLimiter(
+    "auth_register", limit=settings.bcrypt_concurrency
+)
+login_concurrency = ConcurrencyLimiter("auth_login", limit=settings.bcrypt_concurrency)
 
 
 @router.get(
     path="/login",
     status_code=status.HTTP_307_TEMPORARY_REDIRECT,
     response_class=RedirectResponse,
+    dependencies=[Depends(auth_rate_limit)],
     summary="Redirect user to Spotify Authorization URL",
     description=(
         "The user will be redirected to the Spotify Authorization URL to authorize "
@@ -133,6 +143,7 @@ async def get_token():
 @router.post(
     path="/register",
     status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(auth_rate_limit), Depends(register_concurrency)],
     summary="Create an account for the quiz app",
     description=(
         "Create a new account for quizzify. This will enable the user to login to the "
@@ -140,7 +151,7 @@ async def get_token():
     ),
 )
 async def register_user(
-    user: schemas.User,
+    user: schemas.NewUser,
 ):
     """Create an account for the quiz app.
 
@@ -149,7 +160,7 @@ async def register_user(
 
     Parameters
     ----------
-    user : schemas.User
+    user : schemas.NewUser
         The user information to create the account (username, email, password).
 
     Returns
@@ -169,10 +180,18 @@ async def register_user(
 @router.post(
     path="/login",
     status_code=status.HTTP_200_OK,
+    response_model=schemas.Session,
+    dependencies=[
+        Depends(auth_rate_limit),
+        Depends(login_account_rate_limit),
+        Depends(login_concurrency),
+    ],
     summary="Log in to the quiz app",
     description=(
         "Log in to the quizzify application. The user will be able to connect to the "
-        "account previously created."
+        "account previously created. The returned access token authenticates the "
+        "requests of the user (`Authorization: Bearer <access_token>`) until it "
+        "expires; the refresh token is then exchanged for new tokens."
     ),
 )
 async def login_user(
@@ -191,8 +210,8 @@ async def login_user(
 
     Returns
     -------
-    dict
-        A dictionary containing the user's Spotify information.
+    schemas.Session
+        The tokens of the new session of the user.
     """
     logger.info(f"Logging in to the account for the user {user.email}.")
     user = await service.login_user(
@@ -200,3 +219,56 @@ async def login_user(
         password=user.password,
     )
     return user
+
+
+@router.post(
+    path="/sessions/refresh",
+    status_code=status.HTTP_200_OK,
+    response_model=schemas.Session,
+    dependencies=[Depends(auth_rate_limit)],
+    summary="Refresh the session tokens",
+    description=(
+        "Exchange the refresh token of a session for a new access token and a new "
+        "refresh token. A refresh token can only be used once: using it again "
+        "revokes the session."
+    ),
+)
+async def refresh_session(
+    token: schemas.RefreshToken,
+):
+    """Refresh the session tokens.
+
+    Parameters
+    ----------
+    token : schemas.RefreshToken
+        The refresh token of the session.
+
+    Returns
+    -------
+    schemas.Session
+        The new tokens of the session.
+    """
+    return await service.refresh_session(token.refresh_token)
+
+
+@router.post(
+    path="/logout",
+    status_code=status.HTTP_204_NO_CONTENT,
+    summary="Log out of the quiz app",
+    description=(
+        "Revoke the session of the access token: neither its access token nor its "
+        "refresh token are accepted anymore, by any worker."
+    ),
+)
+async def logout(
+    session: Dict = Depends(current_session),
+):
+    """Log out of the quiz app.
+
+    Parameters
+    ----------
+    session : dict
+        The claims of the access token of the request.
+    """
+    logger.info(f"Logging out the user {session['sub']}.")
+    await service.revoke_session(session["sid"])
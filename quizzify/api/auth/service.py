@@ -1,36 +1,36 @@
+import json
 import logging
-import os
+import time
 import uuid
+from typing import Optional
 from urllib.parse import urlencode
 
 import bcrypt
-from dotenv import load_dotenv
 from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
 
+from quizzify.api.personalization.service import schedule_refresh
+from quizzify.config import get_settings
 from quizzify.databases import crud
+from quizzify.databases.pubsub import get_pubsub
+from quizzify.databases.state_store import get_state_store
 from quizzify.spotify.spotify_token_manager import SpotifyTokenManager
 from quizzify.spotify.spotify_user_info import get_spotify_user_info
+from quizzify.utils import schemas
 from quizzify.utils.helpers import check_email, generate_random_string
+from quizzify.utils.metrics import PASSWORD_HASHING_LATENCY
+from quizzify.utils.sessions import (
+    decode_token,
+    issue_tokens,
+    revoked_sessions,
+    unauthorized,
+)
+from quizzify.utils.tracing import start_span, traced
 
-load_dotenv()
 logger = logging.getLogger(__name__)
 
-# load environment variables
-SPOTIFY_CLIENT_ID = os.environ.get("SPOTIFY_CLIENT_ID")
-SPOTIFY_CLIENT_SECRET = os.environ.get("SPOTIFY_CLIENT_SECRET")
-SPOTIFY_REDIRECT_URI = os.environ.get("SPOTIFY_REDIRECT_URI")
-SPOTIFY_AUTH_URL = os.environ.get("SPOTIFY_AUTH_URL")
-SPOTIFY_AUTH_SCOPE = os.environ.get("SPOTIFY_AUTH_SCOPE")
-SPOTIFY_TOKEN_URL = os.environ.get("SPOTIFY_TOKEN_URL")
-POSTGRES_USER = os.environ.get("POSTGRES_USER")
-POSTGRES_PASSWORD = os.environ.get("POSTGRES_PASSWORD")
-POSTGRES_HOST = os.environ.get("POSTGRES_HOST")
-POSTGRES_PORT = os.environ.get("POSTGRES_PORT")
-POSTGRES_DB = os.environ.get("POSTGRES_DB")
-
-
-# instantiate token manager for Spotify access token
-spotify_auth = SpotifyTokenManager()
+# channel of the sessions revoked by a worker, for the revocation lists of the others
+REVOCATION_CHANNEL = "session_revocations"
 
 
 async def login_redirect_url():
@@ -43,18 +43,19 @@ async def login_redirect_url():
     """
     # generate random state
     state = generate_random_string(16)
-    # save state to environment variable
-    os.environ["STATE"] = state
+    # save state in the store shared by all the workers
+    await run_in_threadpool(get_state_store().save_state, state)
     # generate authorization URL
+    settings = get_settings()
     authorization_url = (
-        SPOTIFY_AUTH_URL
+        str(settings.spotify_auth_url)
         + "?"
         + urlencode(
             {
-                "client_id": SPOTIFY_CLIENT_ID,
-                "redirect_uri": SPOTIFY_REDIRECT_URI,
+                "client_id": settings.spotify_client_id,
+                "redirect_uri": settings.spotify_redirect_uri,
                 "response_type": "code",
-                "scope": SPOTIFY_AUTH_SCOPE,
+                "scope": settings.spotify_auth_scope,
                 "state": state,
                 "show_dialog": False,  # ask user to reauthorize if already authorized
             }
@@ -82,8 +83,10 @@ async def generate_access_token(
         A dictionary containing the access token, refresh token, and token
         expiration date.
     """
-    global spotify_auth
-    spotify_auth.generate_access_token(code, state)
+    # the token manager is a singleton, created by the lifespan of the app
+    spotify_auth = SpotifyTokenManager()
+    # the requests to Spotify may be retried: do not block the event loop
+    await run_in_threadpool(spotify_auth.generate_access_token, code, state)
     return spotify_auth.to_dict()
 
 
@@ -96,8 +99,8 @@ async def refresh_access_token():
         A dictionary containing the access token, refresh token, and token
         expiration date.
     """
-    global spotify_auth
-    spotify_auth.refresh_access_token()
+    spotify_auth = SpotifyTokenManager()
+    await run_in_threadpool(spotify_auth.refresh_access_token)
     return spotify_auth.to_dict()
 
 
@@ -109,10 +112,10 @@ async def get_token():
     str
         The newest access token.
     """
-    global spotify_auth
-    return spotify_auth.get_access_token()
+    return await run_in_threadpool(SpotifyTokenManager().get_access_token)
 
 
+@traced("auth.register_user")
 async def register_user(
     username: str,
     email: str,
@@ -133,11 +136,11 @@ async def register_user(
     user_id = uuid.uuid4()
 
     # Get the user's information from Spotify
-    spotify_user_info = get_spotify_user_info()
+    spotify_user_info = await run_in_threadpool(get_spotify_user_info)
     spotify_id = spotify_user_info["spotify_id"]
 
     # check if the Spotify account is already in registered
-    if crud.get_user_by_spotify_id(spotify_id=spotify_id):
+    if await run_in_threadpool(crud.get_user_by_spotify_id, spotify_id=spotify_id):
         msg = "Spotify account already registered, please login."
         logger.error(msg)
         raise HTTPException(
@@ -146,7 +149,7 @@ async def register_user(
         )
 
     # check if the username is already in use
-    if crud.get_user_by_username(username=username):
+    if await run_in_threadpool(crud.get_user_by_username, username=username):
         msg = "Username already in use. Please enter a different username."
         logger.error(msg)
         raise HTTPException(
@@ -164,7 +167,7 @@ async def register_user(
         )
 
     # check if the email is already in use
-    if crud.get_user_by_email(email=email):
+    if await run_in_threadpool(crud.get_user_by_email, email=email):
         msg = "Email already in use. Please enter a different email address."
         logger.error(msg)
         raise HTTPException(
@@ -176,17 +179,24 @@ async def register_user(
     # Generate a salt (typically a random value)
     salt = bcrypt.gensalt()
     # Hash the password with the generated salt
-    hashed_password = bcrypt.hashpw(password.encode("utf-8"), salt)
+    with start_span("bcrypt.hashpw"):
+        with PASSWORD_HASHING_LATENCY.labels("hashpw").time():
+            # bcrypt is slow on purpose: do not block the event loop
+            hashed_password = await run_in_threadpool(
+                bcrypt.hashpw, password.encode("utf-8"), salt
+            )
 
     # Add the user's information to the database
-    crud.create_user(
+    await run_in_threadpool(
+        crud.create_user,
         user_id=user_id,
         username=username,
         email=email,
         hashed_pwd=str(hashed_password.decode("utf-8")),
     )
     # Add the user's Spotify information to the database
-    crud.create_spotify_user(
+    await run_in_threadpool(
+        crud.create_spotify_user,
         spotify_id=spotify_id,
         user_id=user_id,
         spotify_username=spotify_user_info["spotify_name"],
@@ -194,9 +204,12 @@ async def register_user(
         spotify_image_url=spotify_user_info["image_url"],
         spotify_uri=spotify_user_info["spotify_uri"],
     )
+    # prefetch the listening history for the personal quizzes, in the background
+    schedule_refresh(username)
     return spotify_user_info
 
 
+@traced("auth.login_user")
 async def login_user(
     email: str,
     password: str,
@@ -212,21 +225,138 @@ async def login_user(
 
     Returns
     -------
-    dict
-        A dictionary containing the user's information.
+    schemas.Session
+        The tokens of a new session of the user.
+
+    Raises
+    ------
+    HTTPException
+        401 if no user has this email, 400 if the password does not match.
     """
-    username, email, hashed_password = crud.get_user_by_email(email)
-    if not email:
-        raise ValueError("User not found")
+    user = await run_in_threadpool(crud.get_user_by_email, email)
+    if user is None:
+        raise unauthorized("Unknown email.")
+    username, email, hashed_password = user
 
     # Verify the hashed password
-    if not bcrypt.checkpw(
-        password.encode("utf-8"),
-        hashed_password.tobytes(),
-    ):
+    with start_span("bcrypt.checkpw"):
+        with PASSWORD_HASHING_LATENCY.labels("checkpw").time():
+            is_password_valid = await run_in_threadpool(
+                bcrypt.checkpw,
+                password.encode("utf-8"),
+                hashed_password.tobytes(),
+            )
+    if not is_password_valid:
         raise HTTPException(
             status_code=400,
             detail="Password does not match.",
         )
 
-    return f"{username} logged in successfully."
+    # prefetch the listening history for the personal quizzes, in the background
+    schedule_refresh(username)
+    return new_session(username)
+
+
+def new_session(
+    username: str,
+    session_id: Optional[str] = None,
+) -> schemas.Session:
+    """Issue the tokens of a session.
+
+    Parameters
+    ----------
+    username : str
+        The username of the user.
+    session_id : str, optional
+        The ID of the session to extend (a new session by default).
+
+    Returns
+    -------
+    schemas.Session
+        The tokens of the session.
+    """
+    access_token, refresh_token, _ = issue_tokens(username, session_id)
+    return schemas.Session(
+        username=username,
+        access_token=access_token,
+        refresh_token=refresh_token,
+        expires_in=get_settings().session_ttl,
+    )
+
+
+@traced("auth.refresh_session")
+async def refresh_session(
+    refresh_token: str,
+) -> schemas.Session:
+    """Exchange a refresh token for new tokens of its session.
+
+    A refresh token can only be exchanged once: if it is used again (stolen, or
+    replayed by an attacker), the whole session is revoked.
+
+    Parameters
+    ----------
+    refresh_token : str
+        The refresh token returned by the login or the last refresh.
+
+    Returns
+    -------
+    schemas.Session
+        The new tokens of the session.
+
+    Raises
+    ------
+    HTTPException
+        401 if the token is invalid, expired, already used or of a revoked
+        session.
+    """
+    claims = decode_token(refresh_token, "refresh")
+    if claims["sid"] in revoked_sessions:
+        raise unauthorized("Session revoked.")
+    is_first_use = await run_in_threadpool(
+        get_state_store().use_refresh_token, claims["jti"], claims["exp"]
+    )
+    if not is_first_use:
+        logger.warning("Refresh token reused: session of %s revoked.", claims["sub"])
+        await revoke_session(claims["sid"])
+        raise unauthorized("Session revoked.")
+    return new_session(claims["sub"], claims["sid"])
+
+
+async def revoke_session(
+    session_id: str,
+):
+    """Revoke a session in every worker, until all its tokens have expired.
+
+    Parameters
+    ----------
+    session_id : str
+        The ID of the session.
+    """
+    # the refresh token issued last expires the latest
+    expires_at = int(time.time()) + get_settings().session_refresh_ttl
+    await run_in_threadpool(get_state_store().revoke_session, session_id, expires_at)
+    revoked_sessions.add(session_id, expires_at)
+    await get_pubsub().publish(
+        REVOCATION_CHANNEL, json.dumps({"sid": session_id, "exp": expires_at})
+    )
+
+
+def on_revocation(message: str):
+    """Add a session revoked by another worker to the revocation list."""
+    revocation = json.loads(message)
+    revoked_sessions.add(revocation["sid"], revocation["exp"])
+
+
+async def load_revoked_sessions() -> int:
+    """Load the revoked sessions and follow the revocations of the other workers.
+
+    Returns
+    -------
+    int
+        The number of revoked sessions of the worker.
+    """
+    # subscribe first: a session revoked during the load is not missed
+    get_pubsub().subscribe(REVOCATION_CHANNEL, on_revocation)
+    sessions = await run_in_threadpool(get_state_store().get_revoked_sessions)
+    revoked_sessions.update(sessions)
+    return len(revoked_sessions)
@@ -0,0 +1 @@
+"""API module for exporting the music catalog."""
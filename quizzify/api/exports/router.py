@@ -0,0 +1,72 @@
+import logging
+from enum import Enum
+
+from fastapi import APIRouter, status
+from fastapi.responses import StreamingResponse
+
+from quizzify.api.exports import service
+
+# define router for export endpoints
+router = APIRouter()
+# define logger
+logger = logging.getLogger(__name__)
+
+
+class CatalogTable(str, Enum):
+    """Catalog tables that can be exported."""
+
+    artists = "artists"
+    albums = "albums"
+    songs = "songs"
+
+
+class ExportFormat(str, Enum):
+    """Supported export formats."""
+
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+MEDIA_TYPES = {
+    ExportFormat.ndjson: "application/x-ndjson",
+    ExportFormat.csv: "text/csv",
+}
+
+
+@router.get(
+    path="/{table}",
+    status_code=status.HTTP_200_OK,
+    response_class=StreamingResponse,
+    summary="Export a catalog table",
+    description=(
+        "Stream the whole content of a catalog table (artists, albums or songs) as "
+        "NDJSON or CSV. The rows are read with a server-side cursor and sent as soon "
+        "as they are serialized, so the memory used does not grow with the catalog."
+    ),
+)
+def export_catalog(
+    table: CatalogTable,
+    format: ExportFormat = ExportFormat.ndjson,
+):
+    """Export a catalog table.
+
+    Parameters
+    ----------
+    table : CatalogTable
+        The catalog table to export.
+    format : ExportFormat
+        The export format (ndjson or csv).
+
+    Returns
+    -------
+    StreamingResponse
+        The streamed content of the table.
+    """
+    content = service.export_catalog(table.value, format.value)
+    return StreamingResponse(
+        content=content,
+        media_type=MEDIA_TYPES[format],
+        headers={
+            "Content-Disposition": f"attachment; filename={table.value}.{format.value}"
+        },
+    )
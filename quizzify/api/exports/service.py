@@ -0,0 +1,104 @@
+import csv
+import io
+import json
+import logging
+from typing import Iterable, Iterator, Sequence
+
+from quizzify.databases import crud
+
+logger = logging.getLogger(__name__)
+
+# number of rows serialized together before being sent to the client
+EXPORT_CHUNK_SIZE = 1_000
+
+
+def to_ndjson(
+    rows: Iterable[dict],
+    chunk_size: int = EXPORT_CHUNK_SIZE,
+) -> Iterator[str]:
+    """Serialize rows as newline-delimited JSON.
+
+    Parameters
+    ----------
+    rows : Iterable[dict]
+        The rows to serialize.
+    chunk_size : int
+        The number of rows serialized in each chunk.
+
+    Yields
+    ------
+    str
+        Chunks of NDJSON, each one holding up to ``chunk_size`` lines.
+    """
+    lines = []
+    for row in rows:
+        # dates (e.g. albums' release date) are exported in ISO format
+        lines.append(json.dumps(row, default=str))
+        if len(lines) == chunk_size:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+def to_csv(
+    rows: Iterable[dict],
+    columns: Sequence[str],
+    chunk_size: int = EXPORT_CHUNK_SIZE,
+) -> Iterator[str]:
+    """Serialize rows as CSV, starting with a header line.
+
+    Parameters
+    ----------
+    rows : Iterable[dict]
+        The rows to serialize.
+    columns : Sequence[str]
+        The columns to export, in order.
+    chunk_size : int
+        The number of rows serialized in each chunk.
+
+    Yields
+    ------
+    str
+        Chunks of CSV, each one holding up to ``chunk_size`` lines.
+    """
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, lineterminator="\n")
+    writer.writeheader()
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+        if count == chunk_size:
+            yield buffer.getvalue()
+            # reuse the same buffer to keep the memory footprint constant
+            buffer.seek(0)
+            buffer.truncate()
+            count = 0
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def export_catalog(
+    table: str,
+    export_format: str,
+) -> Iterator[str]:
+    """Stream a catalog table in the requested format.
+
+    Parameters
+    ----------
+    table : str
+        The catalog table to export (artists, albums or songs).
+    export_format : str
+        The export format, either ``ndjson`` or ``csv``.
+
+    Returns
+    -------
+    Iterator[str]
+        The serialized table, chunk by chunk.
+    """
+    logger.info(f"Exporting the {table} table as {export_format}.")
+    rows = crud.iter_catalog(table)
+    if export_format == "csv":
+        return to_csv(rows, columns=crud.CATALOG_COLUMNS[table])
+    return to_ndjson(rows)
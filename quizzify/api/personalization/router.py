@@ -0,0 +1,54 @@
+import logging
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+
+from quizzify.api.personalization import service
+from quizzify.utils import schemas
+from quizzify.utils.sessions import current_user
+
+# define router for personalization endpoints
+router = APIRouter()
+# define logger
+logger = logging.getLogger(__name__)
+
+
+@router.get(
+    path="/{username}/quiz",
+    status_code=status.HTTP_200_OK,
+    response_model=List[schemas.Question],
+    summary="Get a personal quiz",
+    description=(
+        "Generate a quiz about the artists, tracks and albums the user listens to "
+        "on Spotify. The listening history is fetched at login and refreshed in "
+        "the background, so the quiz is generated without calling Spotify. Only "
+        "the user of the session can get its quiz."
+    ),
+)
+async def personal_quiz(
+    username: str,
+    size: int = Query(10, ge=1, le=50),
+    session_user: str = Depends(current_user),
+):
+    """Get a personal quiz.
+
+    Parameters
+    ----------
+    username : str
+        The username of the user.
+    size : int
+        The number of questions.
+    session_user : str
+        The username of the session of the request.
+
+    Returns
+    -------
+    List[schemas.Question]
+        The questions of the quiz.
+    """
+    if session_user != username:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="The quiz of another user cannot be requested.",
+        )
+    return await service.get_personal_quiz(username, size)
@@ -0,0 +1,327 @@
+"""Personal quizzes, built from the Spotify listening history of the user.
+
+At login, the top artists, top tracks and saved albums of the user are fetched
+concurrently from Spotify, reduced to compact candidate pools and saved in the
+database. The pools are cached in the memory of each worker, so a personal quiz
+is generated in memory, without calling Spotify while the user is playing. Once
+older than ``QUIZZIFY_PERSONALIZATION_TTL``, the pools are still used, but
+refreshed in the background.
+"""
+
+import asyncio
+import logging
+import random
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from fastapi import HTTPException, status
+from starlette.concurrency import run_in_threadpool
+
+from quizzify.config import get_settings
+from quizzify.databases import crud, question_bank
+from quizzify.spotify import spotify_listening_history
+from quizzify.spotify.spotify_user_info import get_spotify_user_info
+from quizzify.utils import schemas
+from quizzify.utils.metrics import CACHE_ENTRIES, record_cache_lookup
+
+logger = logging.getLogger(__name__)
+
+# maximum number of users whose pools are cached by a worker
+POOL_CACHE_SIZE = 10_000
+# number of users whose pools are loaded when a worker starts
+POOL_WARM_SIZE = 1_000
+
+# pools of the users seen most recently by this worker (least recent first)
+_pools: OrderedDict = OrderedDict()
+# refreshes in progress, per username
+_refreshes: Dict[str, asyncio.Task] = {}
+
+
+def build_pools(
+    top_artists: list,
+    top_tracks: list,
+    saved_albums: list,
+) -> dict:
+    """Reduce the listening history of a user to compact candidate pools.
+
+    Parameters
+    ----------
+    top_artists : list
+        The top artists, as returned by the Spotify Web API.
+    top_tracks : list
+        The top tracks, as returned by the Spotify Web API.
+    saved_albums : list
+        The saved albums, as returned by the Spotify Web API.
+
+    Returns
+    -------
+    dict
+        The names of the artists, the tracks as [id, name, artist name, album
+        name, duration in ms] lists and the albums as [id, name, artist name,
+        release year] lists, without duplicates.
+    """
+    # dictionaries keep the order of the history and drop the duplicates
+    artists = dict.fromkeys(artist["name"] for artist in top_artists)
+    tracks = []
+    for track in top_tracks:
+        artists.setdefault(track["artists"][0]["name"])
+        tracks.append(
+            [
+                track["id"],
+                track["name"],
+                track["artists"][0]["name"],
+                track["album"]["name"],
+                track["duration_ms"],
+            ]
+        )
+    albums = {}
+    # the albums of the top tracks are candidates too
+    for album in [*saved_albums, *(track["album"] for track in top_tracks)]:
+        release_year = (album.get("release_date") or "")[:4]
+        if album["id"] not in albums and release_year.isdigit():
+            albums[album["id"]] = [
+                album["id"],
+                album["name"],
+                album["artists"][0]["name"],
+                int(release_year),
+            ]
+    return {
+        "artists": list(artists),
+        "tracks": tracks,
+        "albums": list(albums.values()),
+    }
+
+
+def generate_personal_questions(
+    pools: dict,
+    size: int,
+    rng: random.Random,
+) -> List[schemas.Question]:
+    """Generate a quiz from the candidate pools of a user, in memory.
+
+    The questions are the same as the ones of the question bank, but about the
+    artists, tracks and albums the user listens to, the distractors being drawn
+    from the same pools.
+
+    Parameters
+    ----------
+    pools : dict
+        The candidate pools of the user, as built by ``build_pools``.
+    size : int
+        The number of questions.
+    rng : random.Random
+        The random number generator.
+
+    Returns
+    -------
+    List[schemas.Question]
+        Up to ``size`` questions, fewer if the pools are too small.
+    """
+    # rows in the format of the catalog queries of the question bank
+    tracks = [
+        {
+            "id": track_id,
+            "name": name,
+            "artist_name": artist_name,
+            "album_name": album_name,
+            "duration_ms": duration_ms,
+        }
+        for track_id, name, artist_name, album_name, duration_ms in pools["tracks"]
+    ]
+    albums = [
+        {"id": album_id, "name": name, "release_year": release_year}
+        for album_id, name, _, release_year in pools["albums"]
+    ]
+    album_names = list(dict.fromkeys(album[1] for album in pools["albums"]))
+    rng.shuffle(tracks)
+    candidates = [
+        *question_bank.song_artist_questions(tracks, pools["artists"], rng),
+        *question_bank.song_album_questions(tracks, album_names, rng),
+        *question_bank.album_year_questions(albums, rng),
+        *question_bank.song_longer_questions(tracks, rng),
+    ]
+    questions = rng.sample(candidates, min(size, len(candidates)))
+    return [
+        schemas.Question(
+            question_type=question_type,
+            question=question,
+            answer=answer,
+            choices=choices,
+        )
+        for question_type, _, question, answer, choices in questions
+    ]
+
+
+def cache_pools(username: str, pools: dict):
+    """Keep the pools of a user in the memory of the worker."""
+    _pools[username] = pools
+    _pools.move_to_end(username)
+    if len(_pools) > POOL_CACHE_SIZE:
+        _pools.popitem(last=False)
+    CACHE_ENTRIES.labels("listening_pools").set(len(_pools))
+
+
+async def warm_pools(limit: int = POOL_WARM_SIZE) -> int:
+    """Load the pools of the most recent users in the memory of the worker.
+
+    Parameters
+    ----------
+    limit : int
+        The number of users.
+
+    Returns
+    -------
+    int
+        The number of users whose pools were loaded.
+    """
+    rows = await run_in_threadpool(crud.get_recent_listening_pools, limit)
+    # least recent first, so they are evicted first
+    for row in reversed(rows):
+        username = row.pop("username")
+        # the pools cached meanwhile are at least as fresh
+        if username not in _pools:
+            cache_pools(username, row)
+    return len(rows)
+
+
+async def refresh_pools(username: str) -> Optional[dict]:
+    """Fetch the listening history of a user and save its candidate pools.
+
+    The history is fetched with the Spotify token of the application, i.e. of the
+    last user logged in with Spotify: it is only saved as the history of the
+    user if the user registered with this Spotify account. The three requests to
+    Spotify are sent concurrently.
+
+    Parameters
+    ----------
+    username : str
+        The username of the user, logged in with Spotify.
+
+    Returns
+    -------
+    dict
+        The candidate pools of the user, or None if Spotify is logged in as
+        another user.
+    """
+    spotify_user_info = await run_in_threadpool(get_spotify_user_info)
+    owner = await run_in_threadpool(
+        crud.get_username_by_spotify_id, spotify_user_info["spotify_id"]
+    )
+    if owner != username:
+        logger.info(
+            "Spotify is logged in as another user than %s: listening history "
+            "not refreshed.",
+            username,
+        )
+        return None
+    top_artists, top_tracks, saved_albums = await asyncio.gather(
+        run_in_threadpool(spotify_listening_history.get_top_artists),
+        run_in_threadpool(spotify_listening_history.get_top_tracks),
+        run_in_threadpool(spotify_listening_history.get_saved_albums),
+    )
+    pools = build_pools(top_artists, top_tracks, saved_albums)
+    await run_in_threadpool(crud.save_listening_pools, username, **pools)
+    pools["fetched_at"] = datetime.now()
+    cache_pools(username, pools)
+    logger.info(
+        "Listening history of %s refreshed: %d artists, %d tracks, %d albums.",
+        username,
+        len(pools["artists"]),
+        len(pools["tracks"]),
+        len(pools["albums"]),
+    )
+    return pools
+
+
+def schedule_refresh(username: str) -> asyncio.Task:
+    """Refresh the pools of a user in the background, once at a time.
+
+    Parameters
+    ----------
+    username : str
+        The username of the user.
+
+    Returns
+    -------
+    asyncio.Task
+        The refresh in progress.
+    """
+    task = _refreshes.get(username)
+    if task is None:
+        task = asyncio.get_running_loop().create_task(refresh_pools(username))
+        _refreshes[username] = task
+        task.add_done_callback(lambda task: _on_refreshed(username, task))
+    return task
+
+
+def _on_refreshed(username: str, task: asyncio.Task):
+    """Forget a finished refresh, logging its error if any."""
+    _refreshes.pop(username, None)
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning(
+            "Failed to refresh the listening history of %s: %s",
+            username,
+            task.exception(),
+        )
+
+
+async def get_pools(username: str) -> Optional[dict]:
+    """Get the candidate pools of a user, without calling Spotify.
+
+    The pools come from the memory of the worker, or else from the database.
+    Expired pools are returned as they are, and refreshed in the background.
+
+    Parameters
+    ----------
+    username : str
+        The username of the user.
+
+    Returns
+    -------
+    dict
+        The candidate pools, or None if they have never been fetched.
+    """
+    pools = _pools.get(username)
+    record_cache_lookup("listening_pools", pools is not None)
+    if pools is None:
+        pools = await run_in_threadpool(crud.get_listening_pools, username)
+        if pools is None:
+            return None
+        cache_pools(username, pools)
+    ttl = timedelta(seconds=get_settings().personalization_ttl)
+    if datetime.now() - pools["fetched_at"] > ttl:
+        schedule_refresh(username)
+    return pools
+
+
+async def get_personal_quiz(
+    username: str,
+    size: int,
+) -> List[schemas.Question]:
+    """Generate a personal quiz for a user.
+
+    Parameters
+    ----------
+    username : str
+        The username of the user.
+    size : int
+        The number of questions.
+
+    Returns
+    -------
+    List[schemas.Question]
+        The questions, fewer than ``size`` if the listening history is short.
+
+    Raises
+    ------
+    HTTPException
+        If the listening history of the user has never been fetched.
+    """
+    pools = await get_pools(username)
+    if pools is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No listening history yet, please log in with Spotify.",
+        )
+    return generate_personal_questions(pools, size, random.Random())
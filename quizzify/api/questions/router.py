@@ -0,0 +1,126 @@
+import logging
+from enum import Enum
+from typing import Optional
+
+from fastapi import APIRouter, Depends, status
+
+from quizzify.api.questions import service
+from quizzify.utils import schemas
+from quizzify.utils.sessions import current_user
+
+# define router for question endpoints
+router = APIRouter()
+# define logger
+logger = logging.getLogger(__name__)
+
+
+class QuestionType(str, Enum):
+    """Types of question of the question bank."""
+
+    song_artist = "song_artist"
+    song_album = "song_album"
+    album_year = "album_year"
+    song_longer = "song_longer"
+    same_album = "same_album"
+    shared_artist = "shared_artist"
+
+
+@router.get(
+    path="/random",
+    status_code=status.HTTP_200_OK,
+    response_model=schemas.QuestionPrompt,
+    summary="Get a random question",
+    description=(
+        "Sample a question from the question bank, precomputed from the catalog by "
+        "`python -m quizzify.databases.question_bank`. The sampling is an index "
+        "lookup, whatever the size of the catalog. The right answer is only "
+        "revealed by the correction of an answer."
+    ),
+)
+def random_question(
+    question_type: Optional[QuestionType] = None,
+):
+    """Get a random question.
+
+    Parameters
+    ----------
+    question_type : QuestionType, optional
+        The type of question (any type by default).
+
+    Returns
+    -------
+    schemas.QuestionPrompt
+        A random question.
+    """
+    return service.get_random_question(question_type.value if question_type else None)
+
+
+@router.get(
+    path="/adaptive",
+    status_code=status.HTTP_200_OK,
+    response_model=schemas.QuestionPrompt,
+    summary="Get a question near the skill of the user",
+    description=(
+        "Sample a question whose difficulty suits the user of the session: the "
+        "questions and users are rated (Elo) with the answers, and the question is "
+        "drawn among those the user should answer right 70% of the time. Some "
+        "random questions are served too, to rate the new questions."
+    ),
+)
+def adaptive_question(
+    question_type: Optional[QuestionType] = None,
+    username: str = Depends(current_user),
+):
+    """Get a question near the skill of the user.
+
+    Parameters
+    ----------
+    question_type : QuestionType, optional
+        The type of question (any type by default).
+    username : str
+        The username of the session of the request.
+
+    Returns
+    -------
+    schemas.QuestionPrompt
+        A question near the skill of the user.
+    """
+    return service.get_adaptive_question(
+        username, question_type.value if question_type else None
+    )
+
+
+@router.post(
+    path="/{question_id}/answers",
+    status_code=status.HTTP_201_CREATED,
+    response_model=schemas.AnswerResult,
+    summary="Answer a question",
+    description=(
+        "Correct the answer of the user of the session to a question of the "
+        "question bank. The answer is appended to the history of the user and "
+        "counted in the statistics returned by `/stats` and in the ratings used by "
+        "`/questions/adaptive`."
+    ),
+)
+def answer_question(
+    question_id: int,
+    answer: schemas.Answer,
+    username: str = Depends(current_user),
+):
+    """Answer a question.
+
+    Parameters
+    ----------
+    question_id : int
+        The ID of the question in the question bank.
+    answer : schemas.Answer
+        The choice of the user.
+    username : str
+        The username of the session of the request.
+
+    Returns
+    -------
+    schemas.AnswerResult
+        Whether the choice is right, and the right answer.
+    """
+    return service.answer_question(question_id, answer, username)
@@ -0,0 +1,109 @@
+import logging
+from typing import Optional
+
+from fastapi import HTTPException, status
+
+from quizzify.databases import crud, ratings
+from quizzify.utils import schemas
+
+logger = logging.getLogger(__name__)
+
+
+def get_random_question(
+    question_type: Optional[str] = None,
+) -> schemas.QuestionPrompt:
+    """Sample a question from the question bank.
+
+    Parameters
+    ----------
+    question_type : str, optional
+        The type of question (any type by default).
+
+    Returns
+    -------
+    schemas.QuestionPrompt
+        A random question.
+
+    Raises
+    ------
+    HTTPException
+        If the question bank has no question of this type.
+    """
+    question = crud.get_random_question(question_type)
+    if question is None:
+        logger.warning("No question of type %s in the question bank.", question_type)
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No question available, the question bank has not been built.",
+        )
+    return schemas.QuestionPrompt(**question)
+
+
+def get_adaptive_question(
+    username: str,
+    question_type: Optional[str] = None,
+) -> schemas.QuestionPrompt:
+    """Sample a question near the skill of a user.
+
+    Parameters
+    ----------
+    username : str
+        The username of the user.
+    question_type : str, optional
+        The type of question (any type by default).
+
+    Returns
+    -------
+    schemas.QuestionPrompt
+        A question rated near the skill of the user, or a random question.
+
+    Raises
+    ------
+    HTTPException
+        If the question bank has no question of this type.
+    """
+    question_id = ratings.sample_question_id(username, question_type)
+    # the question may have been removed from the bank since the buckets were built
+    question = None if question_id is None else crud.get_question(question_id)
+    if question is None:
+        return get_random_question(question_type)
+    return schemas.QuestionPrompt(**question)
+
+
+def answer_question(
+    question_id: int,
+    answer: schemas.Answer,
+    username: str,
+) -> schemas.AnswerResult:
+    """Correct the answer of a user and add it to the history and statistics.
+
+    The ratings of the user and of the question are updated in memory, and
+    flushed to the database by the ``flush_ratings`` job.
+
+    Parameters
+    ----------
+    question_id : int
+        The ID of the question in the question bank.
+    answer : schemas.Answer
+        The choice of the user.
+    username : str
+        The username of the user.
+
+    Returns
+    -------
+    schemas.AnswerResult
+        Whether the choice is right, and the right answer.
+
+    Raises
+    ------
+    HTTPException
+        If the question or the user does not exist.
+    """
+    result = crud.record_answer(username, question_id, answer.choice)
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Unknown question or user.",
+        )
+    ratings.record_result(username, question_id, result)
+    return schemas.AnswerResult(correct=result["correct"], answer=result["answer"])
@@ -0,0 +1,77 @@
+import logging
+
+from fastapi import APIRouter, Query, Request, WebSocket, status
+
+from quizzify.api.rooms import service
+from quizzify.utils import schemas
+
+# define router for live quiz room endpoints
+router = APIRouter()
+# define logger
+logger = logging.getLogger(__name__)
+
+
+@router.post(
+    path="",
+    status_code=status.HTTP_201_CREATED,
+    response_model=schemas.Room,
+    summary="Create a live quiz room",
+    description=(
+        "Create a room where players answer the same questions at the same time. "
+        "The players connect to the WebSocket of the room, and any of them starts "
+        "the game."
+    ),
+)
+async def create_room(
+    request: Request,
+    rounds: int = Query(10, ge=1, le=50),
+    round_seconds: float = Query(15.0, ge=1, le=120),
+):
+    """Create a live quiz room.
+
+    Parameters
+    ----------
+    request : Request
+        The request, to build the path of the WebSocket.
+    rounds : int
+        The number of questions of the game.
+    round_seconds : float
+        The number of seconds to answer a question.
+
+    Returns
+    -------
+    schemas.Room
+        The room created.
+    """
+    room_id = service.create_room(rounds, round_seconds)
+    return schemas.Room(
+        room_id=room_id,
+        rounds=rounds,
+        round_seconds=round_seconds,
+        websocket_path=request.app.url_path_for("play_room", room_id=room_id),
+    )
+
+
+@router.websocket("/{room_id}/ws", name="play_room")
+async def play(
+    websocket: WebSocket,
+    room_id: str,
+    name: str = Query(..., min_length=1, max_length=50),
+):
+    """Play in a live quiz room.
+
+    The server sends the events of the room (``joined``, ``question``,
+    ``results``, ``end``) as JSON. The player sends ``{"type": "start"}`` to start
+    the game and ``{"type": "answer", "question_id": ..., "choice": ...}`` to
+    answer the current question.
+
+    Parameters
+    ----------
+    websocket : WebSocket
+        The connection of the player.
+    room_id : str
+        The ID of the room.
+    name : str
+        The name of the player.
+    """
+    await service.play(websocket, room_id, name)
@@ -0,0 +1,508 @@
+"""Live quiz rooms, played by many players at once over WebSockets.
+
+A room is hosted by the worker that created it: its ``Game`` runs the timers,
+draws the questions and aggregates the answers in memory. The players may be
+connected to any worker: each worker keeps the ``Room`` of its local players,
+which forwards their commands to the host and fans the events of the host out to
+them. The host and the rooms talk through the publish/subscribe backend, so the
+rooms are sharded across the workers.
+
+Each event is serialized once, by the host, and the same text is queued for every
+player: the fan-out costs one queue insertion per player, and a player who does
+not read its messages is disconnected instead of slowing down the room.
+"""
+
+import asyncio
+import heapq
+import json
+import logging
+import secrets
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+from fastapi import WebSocket, WebSocketDisconnect
+from starlette.concurrency import run_in_threadpool
+
+from quizzify.databases import crud
+from quizzify.databases.pubsub import get_pubsub
+from quizzify.utils.metrics import (
+    BROADCAST_FANOUT_LATENCY,
+    ROOMS,
+    SLOW_CONSUMERS,
+    WEBSOCKET_CONNECTIONS,
+)
+
+logger = logging.getLogger(__name__)
+
+# messages waiting to be sent to a player before it is disconnected as too slow
+SEND_QUEUE_SIZE = 64
+# number of seconds a player waits for the host of the room to accept it
+JOIN_TIMEOUT = 2.0
+# number of seconds a room waits for its game to start before being closed
+LOBBY_TIMEOUT = 600.0
+# number of seconds between two updates of the number of players in the room
+PLAYERS_UPDATE_SECONDS = 1.0
+# number of seconds the results of a round are shown before the next question
+RESULTS_SECONDS = 3.0
+LEADERBOARD_SIZE = 10
+# points of a right answer, half of them decreasing with the time taken to answer
+MAX_POINTS = 1000
+# WebSocket close code sent when the room does not exist (4000-4999: application)
+UNKNOWN_ROOM_CLOSE_CODE = 4404
+
+
+def event_channel(room_id: str) -> str:
+    """Return the channel of the events sent by the host of a room."""
+    return f"quizzify_room_{room_id}"
+
+
+def command_channel(room_id: str) -> str:
+    """Return the channel of the commands sent by the players of a room."""
+    return f"quizzify_room_{room_id}_commands"
+
+
+def dumps(message: dict) -> str:
+    """Serialize a message in compact JSON."""
+    return json.dumps(message, separators=(",", ":"))
+
+
+class Game:
+    """Game of a room, run by the worker hosting the room.
+
+    Attributes
+    ----------
+    room_id : str
+        The ID of the room.
+    rounds : int
+        The number of questions of the game.
+    round_seconds : float
+        The number of seconds to answer a question.
+    status : str
+        ``lobby``, ``playing`` or ``ended``.
+    players : Dict[str, str]
+        The names of the players, per player ID.
+    scores : Counter
+        The scores of the players, per player ID.
+    """
+
+    def __init__(
+        self,
+        room_id: str,
+        rounds: int,
+        round_seconds: float,
+    ):
+        self.room_id = room_id
+        self.rounds = rounds
+        self.round_seconds = round_seconds
+        self.status = "lobby"
+        self.players: Dict[str, str] = {}
+        self.scores: Counter = Counter()
+        # question of the current round, its deadline and the answers received
+        self.question: Optional[dict] = None
+        self.deadline = 0.0
+        self.answers: Dict[str, str] = {}
+        self._started = asyncio.Event()
+        self._all_answered = asyncio.Event()
+        self._players_update_pending = False
+        self._tasks = set()
+
+    def _spawn(self, coroutine):
+        """Run a coroutine in the background, keeping a reference to it."""
+        task = asyncio.get_running_loop().create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def publish(self, message: dict):
+        """Send an event to all the players of the room."""
+        message["sent_at"] = time.time()
+        await get_pubsub().publish(event_channel(self.room_id), dumps(message))
+
+    def record_answer(
+        self,
+        player_id: str,
+        question_id: int,
+        choice: str,
+        now: Optional[float] = None,
+    ) -> Optional[int]:
+        """Record the answer of a player to the current question.
+
+        Parameters
+        ----------
+        player_id : str
+            The player.
+        question_id : int
+            The question answered.
+        choice : str
+            The choice of the player.
+        now : float, optional
+            The time of the answer (``time.monotonic()`` by default).
+
+        Returns
+        -------
+        int
+            The points scored, or None if the answer is ignored (late, second
+            answer, or not to the current question).
+        """
+        question = self.question
+        if (
+            question is None
+            or question_id != question["id"]
+            or player_id not in self.players
+            or player_id in self.answers
+        ):
+            return None
+        now = time.monotonic() if now is None else now
+        if now > self.deadline:
+            return None
+        self.answers[player_id] = choice
+        points = 0
+        if choice == question["answer"]:
+            remaining = (self.deadline - now) / self.round_seconds
+            points = MAX_POINTS // 2 + int(MAX_POINTS // 2 * remaining)
+            self.scores[player_id] += points
+        if len(self.answers) >= len(self.players):
+            self._all_answered.set()
+        return points
+
+    def leaderboard(self) -> list:
+        """Return the best players, by decreasing score."""
+        best = heapq.nlargest(
+            LEADERBOARD_SIZE, self.players, key=lambda player: self.scores[player]
+        )
+        return [
+            {
+                "player_id": player,
+                "name": self.players[player],
+                "score": self.scores[player],
+            }
+            for player in best
+        ]
+
+    def on_command(self, payload: str):
+        """Handle a command sent by a player, from any worker."""
+        try:
+            command = json.loads(payload)
+            kind, player_id = command["type"], command["player_id"]
+        except (ValueError, KeyError, TypeError):
+            return
+        if kind == "join" and self.status != "ended":
+            self.players[player_id] = str(command.get("name"))
+            self._spawn(
+                self.publish(
+                    {
+                        "type": "joined",
+                        "player_id": player_id,
+                        "name": self.players[player_id],
+                        "players": len(self.players),
+                        "status": self.status,
+                    }
+                )
+            )
+            self.update_players()
+        elif kind == "leave":
+            self.players.pop(player_id, None)
+            self.update_players()
+            if self.question is not None and len(self.answers) >= len(self.players):
+                self._all_answered.set()
+        elif kind == "start":
+            self._started.set()
+        elif kind == "answer":
+            self.record_answer(
+                player_id, command.get("question_id"), command.get("choice")
+            )
+
+    def update_players(self):
+        """Send the number of players to the room, at most once per period.
+
+        The joins and leaves of a period are coalesced in a single broadcast,
+        instead of sending each one to all the players.
+        """
+        if self._players_update_pending:
+            return
+        self._players_update_pending = True
+
+        async def update():
+            await asyncio.sleep(PLAYERS_UPDATE_SECONDS)
+            self._players_update_pending = False
+            await self.publish({"type": "players", "players": len(self.players)})
+
+        self._spawn(update())
+
+    def open(self):
+        """Start hosting the room."""
+        get_pubsub().subscribe(command_channel(self.room_id), self.on_command)
+        self._spawn(self.run())
+        ROOMS.inc()
+
+    def close(self):
+        """Stop hosting the room."""
+        get_pubsub().unsubscribe(command_channel(self.room_id), self.on_command)
+        if _games.pop(self.room_id, None) is not None:
+            ROOMS.dec()
+
+    async def run(self):
+        """Wait for the start of the game, then play its rounds."""
+        try:
+            try:
+                await asyncio.wait_for(self._started.wait(), LOBBY_TIMEOUT)
+            except asyncio.TimeoutError:
+                await self.publish({"type": "closed", "reason": "lobby_timeout"})
+                return
+            self.status = "playing"
+            for round_number in range(1, self.rounds + 1):
+                question = await run_in_threadpool(crud.get_random_question)
+                if question is None:
+                    await self.publish({"type": "closed", "reason": "no_question"})
+                    return
+                await self.play_round(round_number, question)
+                if round_number < self.rounds:
+                    await asyncio.sleep(RESULTS_SECONDS)
+            self.status = "ended"
+            await self.publish({"type": "end", "leaderboard": self.leaderboard()})
+        finally:
+            self.status = "ended"
+            self.close()
+
+    async def play_round(
+        self,
+        round_number: int,
+        question: dict,
+    ):
+        """Ask a question, wait for the answers and send the results."""
+        self.question, self.answers = question, {}
+        self._all_answered.clear()
+        self.deadline = time.monotonic() + self.round_seconds
+        await self.publish(
+            {
+                "type": "question",
+                "round": round_number,
+                "rounds": self.rounds,
+                "question_id": question["id"],
+                "question": question["question"],
+                "choices": question["choices"],
+                "seconds": self.round_seconds,
+            }
+        )
+        try:
+            # the round ends early when every player has answered
+            await asyncio.wait_for(self._all_answered.wait(), self.round_seconds)
+        except asyncio.TimeoutError:
+            pass
+        self.question = None
+        await self.publish(
+            {
+                "type": "results",
+                "round": round_number,
+                "question_id": question["id"],
+                "answer": question["answer"],
+                "counts": Counter(self.answers.values()),
+                "leaderboard": self.leaderboard(),
+            }
+        )
+
+
+class Player:
+    """Player connected to this worker.
+
+    The messages are queued, then sent by a writer task, so that a slow player
+    never delays the others.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        name: str,
+    ):
+        self.player_id = secrets.token_hex(8)
+        self.name = name
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(SEND_QUEUE_SIZE)
+        self.writer = asyncio.get_running_loop().create_task(self.write())
+
+    def send(self, message: Optional[str]) -> bool:
+        """Queue a message (None closes the connection once the queue is sent).
+
+        Returns
+        -------
+        bool
+            False if the queue of the player is full.
+        """
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            return False
+        return True
+
+    async def write(self):
+        """Send the queued messages to the player."""
+        while (message := await self.queue.get()) is not None:
+            await self.websocket.send_text(message)
+        await self.websocket.close()
+
+
+class Room:
+    """Players of a room connected to this worker."""
+
+    def __init__(self, room_id: str):
+        self.room_id = room_id
+        self.players: Dict[str, Player] = {}
+        # players waiting for the host to accept them
+        self._joining: Dict[str, asyncio.Future] = {}
+        get_pubsub().subscribe(event_channel(room_id), self.on_event)
+
+    def on_event(self, payload: str):
+        """Fan an event of the host out to the local players."""
+        # parsed once per worker, whatever the number of players
+        event = json.loads(payload)
+        if event["type"] == "joined":
+            # only sent to the player who joined, if connected to this worker
+            player = self.players.get(event["player_id"])
+            future = self._joining.pop(event["player_id"], None)
+            if player is not None and future is not None and not future.done():
+                future.set_result(event)
+                self.send(player, payload)
+            return
+
+        start = time.perf_counter()
+        for player in list(self.players.values()):
+            self.send(player, payload)
+        BROADCAST_FANOUT_LATENCY.observe(time.perf_counter() - start)
+        if event["type"] in ("end", "closed"):
+            for player in self.players.values():
+                player.send(None)
+
+    def send(self, player: Player, payload: str):
+        """Queue a message for a player, disconnecting the player if too slow."""
+        if player.send(payload):
+            return
+        SLOW_CONSUMERS.inc()
+        logger.warning("Disconnecting slow player %s.", player.player_id)
+        self.remove(player)
+        player.writer.cancel()
+        asyncio.get_running_loop().create_task(player.websocket.close(1013))
+
+    def add(self, player: Player) -> asyncio.Future:
+        """Add a player, returning a future resolved when the host accepts it."""
+        self.players[player.player_id] = player
+        future = asyncio.get_running_loop().create_future()
+        self._joining[player.player_id] = future
+        return future
+
+    def remove(self, player: Player):
+        """Remove a player, and the room once empty."""
+        self.players.pop(player.player_id, None)
+        self._joining.pop(player.player_id, None)
+        if not self.players and _rooms.get(self.room_id) is self:
+            get_pubsub().unsubscribe(event_channel(self.room_id), self.on_event)
+            del _rooms[self.room_id]
+
+
+# rooms hosted by this worker, and rooms of the players connected to it
+_games: Dict[str, Game] = {}
+_rooms: Dict[str, Room] = {}
+
+
+def create_room(
+    rounds: int,
+    round_seconds: float,
+) -> str:
+    """Create a room hosted by this worker.
+
+    Parameters
+    ----------
+    rounds : int
+        The number of questions of the game.
+    round_seconds : float
+        The number of seconds to answer a question.
+
+    Returns
+    -------
+    str
+        The ID of the room.
+    """
+    room_id = secrets.token_hex(8)
+    game = Game(room_id, rounds, round_seconds)
+    _games[room_id] = game
+    game.open()
+    logger.info("Room %s created.", room_id)
+    return room_id
+
+
+async def play(
+    websocket: WebSocket,
+    room_id: str,
+    name: str,
+):
+    """Connect a player to a room until the end of the game.
+
+    The player sends ``{"type": "start"}`` to start the game, and
+    ``{"type": "answer", "question_id": ..., "choice": ...}`` to answer.
+
+    Parameters
+    ----------
+    websocket : WebSocket
+        The connection of the player.
+    room_id : str
+        The ID of the room.
+    name : str
+        The name of the player.
+    """
+    await websocket.accept()
+    room = _rooms.get(room_id)
+    if room is None:
+        room = _rooms[room_id] = Room(room_id)
+    player = Player(websocket, name)
+    joined = room.add(player)
+    WEBSOCKET_CONNECTIONS.inc()
+    pubsub = get_pubsub()
+    channel = command_channel(room_id)
+    try:
+        await pubsub.publish(
+            channel,
+            dumps({"type": "join", "player_id": player.player_id, "name": name}),
+        )
+        try:
+            await asyncio.wait_for(joined, JOIN_TIMEOUT)
+        except asyncio.TimeoutError:
+            await websocket.close(UNKNOWN_ROOM_CLOSE_CODE, "Unknown room")
+            return
+        while True:
+            try:
+                command = json.loads(await websocket.receive_text())
+            except ValueError:
+                continue
+            if not isinstance(command, dict) or command.get("type") not in (
+                "start",
+                "answer",
+            ):
+                continue
+            await pubsub.publish(
+                channel,
+                dumps(
+                    {
+                        "type": command["type"],
+                        "player_id": player.player_id,
+                        "question_id": command.get("question_id"),
+                        "choice": command.get("choice"),
+                    }
+                ),
+            )
+    except WebSocketDisconnect:
+        pass
+    finally:
+        room.remove(player)
+        player.writer.cancel()
+        WEBSOCKET_CONNECTIONS.dec()
+        await pubsub.publish(
+            channel, dumps({"type": "leave", "player_id": player.player_id})
+        )
+
+
+def close_rooms():
+    """Stop the games hosted by this worker (on shutdown)."""
+    for game in list(_games.values()):
+        for task in list(game._tasks):
+            task.cancel()
+        game.close()
@@ -0,0 +1,60 @@
+import logging
+from enum import Enum
+from typing import Optional
+
+from fastapi import APIRouter, Query, status
+
+from quizzify.api.search import service
+from quizzify.utils import schemas
+
+# define router for search endpoints
+router = APIRouter()
+# define logger
+logger = logging.getLogger(__name__)
+
+
+class SearchTable(str, Enum):
+    """Catalog tables that can be searched."""
+
+    artists = "artists"
+    albums = "albums"
+    songs = "songs"
+
+
+@router.get(
+    path="/{table}",
+    status_code=status.HTTP_200_OK,
+    response_model=schemas.SearchResults,
+    summary="Search the catalog",
+    description=(
+        "Search artists, albums or songs by name. The words of the search, or "
+        "their beginning, and close spellings are matched, and the results are "
+        "ranked by relevance, then popularity. Pass the `next_cursor` of a page as "
+        "`cursor` to get the next one."
+    ),
+)
+def search(
+    table: SearchTable,
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+):
+    """Search the catalog.
+
+    Parameters
+    ----------
+    table : SearchTable
+        The catalog table to search.
+    q : str
+        The text searched.
+    limit : int
+        The number of results of the page.
+    cursor : str, optional
+        The cursor of the page, returned with the previous one.
+
+    Returns
+    -------
+    schemas.SearchResults
+        The results and the cursor of the next page.
+    """
+    return service.search(table.value, q, limit, cursor)
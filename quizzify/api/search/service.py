@@ -0,0 +1,61 @@
+"""Search of the music catalog by name.
+
+The names are matched by words and prefixes (full-text search) or by trigrams
+(typos, substrings), with the GIN indexes of the catalog tables, and the results
+are ranked by relevance and popularity. The pages are chained by an opaque cursor
+holding the score and ID of the last result, so a page is read without counting
+the results of the previous ones, and stays consistent while the user scrolls.
+"""
+
+import logging
+from typing import Optional
+
+from fastapi import HTTPException, status
+
+from quizzify.databases import crud
+from quizzify.utils import schemas
+from quizzify.utils.pagination import decode_cursor, next_cursor
+
+logger = logging.getLogger(__name__)
+
+
+def search(
+    table: str,
+    text: str,
+    limit: int,
+    cursor: Optional[str] = None,
+) -> schemas.SearchResults:
+    """Search a catalog table by name.
+
+    Parameters
+    ----------
+    table : str
+        The catalog table (artists, albums or songs).
+    text : str
+        The text searched.
+    limit : int
+        The number of results of the page.
+    cursor : str, optional
+        The cursor of the page (the first page by default).
+
+    Returns
+    -------
+    schemas.SearchResults
+        The results, and the cursor of the next page if there may be one.
+
+    Raises
+    ------
+    HTTPException
+        If the text has no word or the cursor is invalid.
+    """
+    if crud.prefix_tsquery(text) is None:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="The text searched has no word.",
+        )
+    after = decode_cursor(cursor, "relevance") if cursor else None
+    rows = crud.search_catalog(table, text, limit, after)
+    return schemas.SearchResults(
+        results=[schemas.SearchResult(**row) for row in rows],
+        next_cursor=next_cursor(rows, limit, "relevance", key="score"),
+    )
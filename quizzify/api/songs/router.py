@@ -0,0 +1,61 @@
+import logging
+from enum import Enum
+from typing import Optional
+
+from fastapi import APIRouter, Query, status
+
+from quizzify.api.songs import service
+from quizzify.utils import schemas
+
+# define router for song endpoints
+router = APIRouter()
+# define logger
+logger = logging.getLogger(__name__)
+
+
+class SongSort(str, Enum):
+    """Sorts of the listing of the songs."""
+
+    id = "id"
+    popularity = "popularity"
+
+
+@router.get(
+    path="",
+    status_code=status.HTTP_200_OK,
+    response_model=schemas.SongPage,
+    summary="List the songs",
+    description=(
+        "List the songs of the catalog, of an artist or of an album, by ID or the "
+        "most popular first. Pass the `next_cursor` of a page as `cursor` to get "
+        "the next one: every page is read from an index, as fast as the first one."
+    ),
+)
+def list_songs(
+    artist_id: Optional[str] = None,
+    album_id: Optional[str] = None,
+    sort: SongSort = SongSort.id,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+):
+    """List the songs.
+
+    Parameters
+    ----------
+    artist_id : str, optional
+        Only list the songs of this artist.
+    album_id : str, optional
+        Only list the songs of this album.
+    sort : SongSort
+        The sort of the songs.
+    limit : int
+        The number of songs of the page.
+    cursor : str, optional
+        The cursor of the page, returned with the previous one.
+
+    Returns
+    -------
+    schemas.SongPage
+        The songs and the cursor of the next page.
+    """
+    return service.list_songs(limit, sort.value, artist_id, album_id, cursor)
@@ -0,0 +1,49 @@
+import logging
+from typing import Optional
+
+from quizzify.databases import crud
+from quizzify.utils import schemas
+from quizzify.utils.pagination import decode_cursor, next_cursor
+
+logger = logging.getLogger(__name__)
+
+
+def list_songs(
+    limit: int,
+    sort: str,
+    artist_id: Optional[str] = None,
+    album_id: Optional[str] = None,
+    cursor: Optional[str] = None,
+) -> schemas.SongPage:
+    """List a page of the songs of the catalog.
+
+    Parameters
+    ----------
+    limit : int
+        The number of songs of the page.
+    sort : str
+        ``id``, or ``popularity`` for the most popular first.
+    artist_id : str, optional
+        Only list the songs of this artist.
+    album_id : str, optional
+        Only list the songs of this album.
+    cursor : str, optional
+        The cursor of the page (the first page by default).
+
+    Returns
+    -------
+    schemas.SongPage
+        The songs, and the cursor of the next page if there may be one.
+    """
+    after = decode_cursor(cursor, sort) if cursor else None
+    rows = crud.list_catalog(
+        "songs",
+        limit,
+        sort,
+        filters={"artist_id": artist_id, "album_id": album_id},
+        after=after,
+    )
+    return schemas.SongPage(
+        items=[schemas.Song(**row) for row in rows],
+        next_cursor=next_cursor(rows, limit, sort),
+    )
@@ -0,0 +1,68 @@
+import logging
+
+from fastapi import APIRouter, Query, status
+
+from quizzify.api.stats import service
+from quizzify.utils import schemas
+
+# define router for statistics endpoints
+router = APIRouter()
+# define logger
+logger = logging.getLogger(__name__)
+
+
+@router.get(
+    path="/users/{username}",
+    status_code=status.HTTP_200_OK,
+    response_model=schemas.UserStats,
+    summary="Get the statistics of a user",
+    description=(
+        "Get the accuracy of a user, overall, per type of question and on the "
+        "artists the user answered the most about. The statistics are maintained "
+        "with each answer, so they are read without scanning the answer history."
+    ),
+)
+def user_stats(
+    username: str,
+    artists: int = Query(10, ge=0, le=100),
+):
+    """Get the statistics of a user.
+
+    Parameters
+    ----------
+    username : str
+        The username of the user.
+    artists : int
+        The number of artists returned, the most answered about first.
+
+    Returns
+    -------
+    schemas.UserStats
+        The statistics of the user.
+    """
+    return service.get_user_stats(username, artists)
+
+
+@router.get(
+    path="/artists/{artist_id}",
+    status_code=status.HTTP_200_OK,
+    response_model=schemas.ArtistStats,
+    summary="Get the statistics of an artist",
+    description="Get the accuracy of all the users on the questions about an artist.",
+)
+def artist_stats(
+    artist_id: str,
+):
+    """Get the statistics of an artist.
+
+    Parameters
+    ----------
+    artist_id : str
+        The Spotify ID of the artist.
+
+    Returns
+    -------
+    schemas.ArtistStats
+        The statistics of the artist.
+    """
+    return service.get_artist_stats(artist_id)
@@ -0,0 +1,98 @@
+"""Statistics of the answers of the users.
+
+The statistics are read from the rollup tables, incremented with each answer, so
+reading them does not aggregate the answer history, whatever its size.
+"""
+
+import logging
+
+from fastapi import HTTPException, status
+
+from quizzify.databases import crud
+from quizzify.utils import schemas
+
+logger = logging.getLogger(__name__)
+
+
+def accuracy(
+    answered: int,
+    correct: int,
+) -> float:
+    """Return the fraction of right answers (0 without answers)."""
+    return round(correct / answered, 4) if answered else 0.0
+
+
+def get_user_stats(
+    username: str,
+    artists: int,
+) -> schemas.UserStats:
+    """Get the statistics of the answers of a user.
+
+    Parameters
+    ----------
+    username : str
+        The username of the user.
+    artists : int
+        The number of artists returned, the most answered about first.
+
+    Returns
+    -------
+    schemas.UserStats
+        The statistics of the user, overall, per type of question and per artist.
+    """
+    stats = crud.get_user_answer_stats(username, artists)
+    question_types = [
+        schemas.QuestionTypeStats(
+            question_type=row["question_type"],
+            answered=row["answered"],
+            correct=row["correct"],
+            accuracy=accuracy(row["answered"], row["correct"]),
+        )
+        for row in stats["types"]
+    ]
+    answered = sum(row.answered for row in question_types)
+    correct = sum(row.correct for row in question_types)
+    return schemas.UserStats(
+        username=username,
+        answered=answered,
+        correct=correct,
+        accuracy=accuracy(answered, correct),
+        question_types=question_types,
+        artists=[
+            schemas.ArtistStats(
+                **row, accuracy=accuracy(row["answered"], row["correct"])
+            )
+            for row in stats["artists"]
+        ],
+    )
+
+
+def get_artist_stats(
+    artist_id: str,
+) -> schemas.ArtistStats:
+    """Get the statistics of the answers about an artist, from all the users.
+
+    Parameters
+    ----------
+    artist_id : str
+        The Spotify ID of the artist.
+
+    Returns
+    -------
+    schemas.ArtistStats
+        The statistics of the artist.
+
+    Raises
+    ------
+    HTTPException
+        If no question about this artist has been answered.
+    """
+    stats = crud.get_artist_answer_stats(artist_id)
+    if stats is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No answer about this artist.",
+        )
+    return schemas.ArtistStats(
+        **stats, accuracy=accuracy(stats["answered"], stats["correct"])
+    )
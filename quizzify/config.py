@@ -0,0 +1,236 @@
+import functools
+import os
+from typing import List, Literal, Optional, Tuple
+
+from dotenv import load_dotenv
+from pydantic import BaseModel, ConfigDict, Field, ValidationInfo, field_validator
+
+
+class Settings(BaseModel):
+    """Configuration of the application, read from the environment.
+
+    Every variable is read (and the ``.env`` file loaded) once, by
+    ``get_settings()``, and validated: a malformed value stops the application at
+    startup instead of failing on the first request that uses it.
+
+    Attributes
+    ----------
+    spotify_client_id : str, optional
+        The client ID of the Spotify application (``SPOTIFY_CLIENT_ID``).
+    spotify_client_secret : str, optional
+        The client secret of the Spotify application (``SPOTIFY_CLIENT_SECRET``).
+    spotify_redirect_uri : str, optional
+        The callback URL of the authorization flow (``SPOTIFY_REDIRECT_URI``).
+    spotify_auth_url : str, optional
+        The authorization URL of Spotify (``SPOTIFY_AUTH_URL``).
+    spotify_auth_scope : str, optional
+        The scopes requested to the user (``SPOTIFY_AUTH_SCOPE``).
+    spotify_token_url : str, optional
+        The token URL of Spotify (``SPOTIFY_TOKEN_URL``).
+    spotify_base_url : str, optional
+        The base URL of the Spotify Web API (``SPOTIFY_BASE_URL``).
+    spotify_timeout : float
+        The number of seconds to wait for each attempt of a request to Spotify.
+    spotify_max_retries : int
+        The number of times a failed request to Spotify is sent again.
+    spotify_breaker_threshold : int
+        The consecutive failures after which the requests to Spotify fail fast.
+    spotify_breaker_reset : float
+        The number of seconds the requests to Spotify fail fast.
+    postgres_user, postgres_password, postgres_host, postgres_port, postgres_db
+        The connection parameters of PostgreSQL (``POSTGRES_*``).
+    db_pool_min_size : int, optional
+        The number of idle connections kept by the pool of each worker: all of
+        them (``db_pool_max_size``) by default with prepared statements, as the
+        connections closed beyond it lose their statements, 5 otherwise.
+    db_pool_max_size : int
+        The maximum number of connections opened by each worker.
+    db_pool_timeout : float
+        The number of seconds to wait for a free connection.
+    db_prepared_statements : bool
+        Whether the frequent queries are prepared on each pooled connection.
+    db_replicas : List[Tuple[str, int]]
+        The read replicas, as comma-separated ``host:port`` addresses
+        (``QUIZZIFY_DB_REPLICAS``), sharing the credentials of the primary.
+    db_replica_max_lag : float
+        The replication lag, in seconds, beyond which a replica is not read.
+    db_replica_check_interval : float
+        The number of seconds between two measures of the replication lag.
+    db_read_your_writes_seconds : float
+        The number of seconds the reads go to the primary after a write.
+    state_store : str
+        The backend of the shared state: ``postgres`` or ``memory``.
+    oauth_state_ttl : int
+        The number of seconds a user has to complete the authorization flow.
+    pubsub : str
+        The backend of the messages between workers: ``postgres`` or ``memory``.
+    personalization_ttl : int
+        The number of seconds before the listening history of a user is refreshed.
+    scheduler_enabled : bool
+        Whether each worker runs the background jobs.
+    question_bank_cron : str
+        When the new songs and albums are added to the question bank (cron).
+    history_retention_months : int
+        The number of past months of answer history kept (the statistics are kept).
+    catalog_snapshot_dir : str
+        The directory of the catalog snapshots mapped by the workers.
+    session_secret : str, optional
+        The key the session tokens are signed with, shared by all the workers
+        (``QUIZZIFY_SESSION_SECRET``). Required to run several workers; a
+        random key, lost on restart, if not set.
+    session_ttl : int
+        The number of seconds an access token is valid.
+    session_refresh_ttl : int
+        The number of seconds a refresh token is valid.
+    trace_exporter : str
+        Where the spans are exported: ``none``, ``file`` or ``otlp``.
+    trace_sample_rate : float
+        The fraction of the requests traced.
+    trace_file : str
+        The file the spans are written to by the ``file`` exporter.
+    trace_otlp_endpoint : str
+        The URL the spans are sent to by the ``otlp`` exporter.
+    rate_limit_enabled : bool
+        Whether the rate limits are enforced.
+    auth_rate, auth_burst
+        The requests per second and burst allowed per IP on the auth endpoints.
+    login_account_rate, login_account_burst
+        The login attempts per second and burst allowed per account.
+    bcrypt_concurrency : int
+        The bcrypt requests processed at once by a worker, per route.
+    admission_queue_size : int
+        The requests waiting for a concurrency slot.
+    admission_queue_timeout : float
+        The number of seconds a request waits for a concurrency slot.
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+    spotify_client_id: Optional[str] = Field(None, alias="SPOTIFY_CLIENT_ID")
+    spotify_client_secret: Optional[str] = Field(None, alias="SPOTIFY_CLIENT_SECRET")
+    spotify_redirect_uri: Optional[str] = Field(None, alias="SPOTIFY_REDIRECT_URI")
+    spotify_auth_url: Optional[str] = Field(None, alias="SPOTIFY_AUTH_URL")
+    spotify_auth_scope: Optional[str] = Field(None, alias="SPOTIFY_AUTH_SCOPE")
+    spotify_token_url: Optional[str] = Field(None, alias="SPOTIFY_TOKEN_URL")
+    spotify_base_url: Optional[str] = Field(None, alias="SPOTIFY_BASE_URL")
+    spotify_timeout: float = Field(10.0, gt=0, alias="QUIZZIFY_SPOTIFY_TIMEOUT")
+    spotify_max_retries: int = Field(2, ge=0, alias="QUIZZIFY_SPOTIFY_MAX_RETRIES")
+    spotify_breaker_threshold: int = Field(
+        5, ge=1, alias="QUIZZIFY_SPOTIFY_BREAKER_THRESHOLD"
+    )
+    spotify_breaker_reset: float = Field(
+        30.0, gt=0, alias="QUIZZIFY_SPOTIFY_BREAKER_RESET"
+    )
+
+    postgres_user: Optional[str] = Field(None, alias="POSTGRES_USER")
+    postgres_password: Optional[str] = Field(None, alias="POSTGRES_PASSWORD")
+    postgres_host: Optional[str] = Field(None, alias="POSTGRES_HOST")
+    postgres_port: Optional[int] = Field(None, alias="POSTGRES_PORT")
+    postgres_db: Optional[str] = Field(None, alias="POSTGRES_DB")
+    db_pool_max_size: int = Field(10, ge=1, alias="QUIZZIFY_DB_POOL_MAX_SIZE")
+    db_pool_timeout: float = Field(5.0, gt=0, alias="QUIZZIFY_DB_POOL_TIMEOUT")
+    db_prepared_statements: bool = Field(True, alias="QUIZZIFY_DB_PREPARED_STATEMENTS")
+    # after the fields its default depends on
+    db_pool_min_size: Optional[int] = Field(
+        None, ge=1, alias="QUIZZIFY_DB_POOL_MIN_SIZE", validate_default=True
+    )
+    db_replicas: List[Tuple[str, int]] = Field([], alias="QUIZZIFY_DB_REPLICAS")
+    db_replica_max_lag: float = Field(5.0, ge=0, alias="QUIZZIFY_DB_REPLICA_MAX_LAG")
+    db_replica_check_interval: float = Field(
+        5.0, gt=0, alias="QUIZZIFY_DB_REPLICA_CHECK_INTERVAL"
+    )
+    db_read_your_writes_seconds: float = Field(
+        5.0, ge=0, alias="QUIZZIFY_DB_READ_YOUR_WRITES"
+    )
+
+    state_store: Literal["postgres", "memory"] = Field(
+        "postgres", alias="QUIZZIFY_STATE_STORE"
+    )
+    oauth_state_ttl: int = Field(600, gt=0, alias="QUIZZIFY_OAUTH_STATE_TTL")
+    pubsub: Literal["postgres", "memory"] = Field("postgres", alias="QUIZZIFY_PUBSUB")
+    personalization_ttl: int = Field(3600, gt=0, alias="QUIZZIFY_PERSONALIZATION_TTL")
+    scheduler_enabled: bool = Field(True, alias="QUIZZIFY_SCHEDULER_ENABLED")
+    question_bank_cron: str = Field("30 3 * * *", alias="QUIZZIFY_QUESTION_BANK_CRON")
+    history_retention_months: int = Field(
+        12, ge=0, alias="QUIZZIFY_HISTORY_RETENTION_MONTHS"
+    )
+    catalog_snapshot_dir: str = Field(
+        "catalog-snapshots", alias="QUIZZIFY_CATALOG_SNAPSHOT_DIR"
+    )
+    session_secret: Optional[str] = Field(None, alias="QUIZZIFY_SESSION_SECRET")
+    session_ttl: int = Field(900, gt=0, alias="QUIZZIFY_SESSION_TTL")
+    session_refresh_ttl: int = Field(
+        30 * 24 * 3600, gt=0, alias="QUIZZIFY_SESSION_REFRESH_TTL"
+    )
+
+    trace_exporter: Literal["none", "file", "otlp"] = Field(
+        "none", alias="QUIZZIFY_TRACE_EXPORTER"
+    )
+    trace_sample_rate: float = Field(
+        0.1, ge=0, le=1, alias="QUIZZIFY_TRACE_SAMPLE_RATE"
+    )
+    trace_file: str = Field("quizzify-spans.jsonl", alias="QUIZZIFY_TRACE_FILE")
+    trace_otlp_endpoint: str = Field(
+        "http://localhost:4318/v1/traces", alias="QUIZZIFY_TRACE_OTLP_ENDPOINT"
+    )
+
+    rate_limit_enabled: bool = Field(True, alias="QUIZZIFY_RATE_LIMIT_ENABLED")
+    auth_rate: float = Field(5.0, gt=0, alias="QUIZZIFY_AUTH_RATE")
+    auth_burst: int = Field(20, ge=1, alias="QUIZZIFY_AUTH_BURST")
+    login_account_rate: float = Field(0.2, gt=0, alias="QUIZZIFY_LOGIN_ACCOUNT_RATE")
+    login_account_burst: int = Field(5, ge=1, alias="QUIZZIFY_LOGIN_ACCOUNT_BURST")
+    bcrypt_concurrency: int = Field(
+        os.cpu_count() or 1, ge=1, alias="QUIZZIFY_BCRYPT_CONCURRENCY"
+    )
+    admission_queue_size: int = Field(32, ge=0, alias="QUIZZIFY_ADMISSION_QUEUE_SIZE")
+    admission_queue_timeout: float = Field(
+        2.0, gt=0, alias="QUIZZIFY_ADMISSION_QUEUE_TIMEOUT"
+    )
+
+    @field_validator("db_pool_min_size")
+    @classmethod
+    def default_pool_min_size(cls, value, info: ValidationInfo):
+        """Keep all the connections of the pool by default with prepared statements.
+
+        The pool closes the connections given back beyond its minimum size, and
+        the statements are prepared again on the connections opened next.
+        """
+        if value is not None:
+            return value
+        max_size = info.data.get("db_pool_max_size", 1)
+        if info.data.get("db_prepared_statements", True):
+            return max_size
+        return min(5, max_size)
+
+    @field_validator("db_replicas", mode="before")
+    @classmethod
+    def parse_addresses(cls, value):
+        """Parse comma-separated ``host:port`` addresses (5432 by default)."""
+        if not isinstance(value, str):
+            return value
+        addresses = []
+        for address in value.split(","):
+            host, _, port = address.strip().partition(":")
+            if host:
+                addresses.append((host, port or 5432))
+        return addresses
+
+
+@functools.lru_cache(maxsize=None)
+def get_settings() -> Settings:
+    """Return the settings of the application.
+
+    The ``.env`` file is loaded and the environment read on the first call only.
+
+    Returns
+    -------
+    Settings
+        The validated settings.
+
+    Raises
+    ------
+    pydantic.ValidationError
+        If a variable has an invalid value.
+    """
+    load_dotenv()
+    return Settings.model_validate(os.environ)
@@ -0,0 +1,173 @@
+"""Export the catalog graph to a snapshot file shared by the workers.
+
+The catalog graph (``quizzify.utils.catalog_graph``) is written as flat arrays to
+a versioned snapshot file of ``QUIZZIFY_CATALOG_SNAPSHOT_DIR``. The workers map
+the published snapshot read-only instead of each loading its own copy of the
+catalog: the pages are shared through the page cache, whatever the number of
+workers. Each worker checks for a new snapshot from time to time and swaps to it;
+the graph a job is using stays valid until the job drops it.
+
+An export reads the whole catalog when there is no snapshot yet, or with
+``--full``. Otherwise it opens the published snapshot, fetches the rows whose IDs
+it does not contain, and only writes a new version if there are some.
+
+Usage::
+
+    python -m quizzify.databases.catalog_snapshot [--full]
+"""
+
+import argparse
+import itertools
+import logging
+import time
+from typing import Iterator, Optional
+
+from quizzify.config import get_settings
+from quizzify.databases import crud
+from quizzify.utils.catalog_graph import GRAPH_TABLES, CatalogGraph
+from quizzify.utils.snapshot import (
+    SNAPSHOT_NAME,
+    Snapshot,
+    current_snapshot,
+    write_snapshot,
+)
+
+logger = logging.getLogger(__name__)
+
+# name of the snapshot files of the catalog graph
+CATALOG_SNAPSHOT = "catalog"
+# number of new catalog rows fetched at once when the graph is refreshed
+REFRESH_BATCH_SIZE = 10_000
+# streams of the IDs of each table of the graph
+CATALOG_IDS = {
+    "artists": crud.iter_artists_ids,
+    "albums": crud.iter_albums_ids,
+    "songs": crud.iter_songs_ids,
+}
+
+# catalog graph mapped from the published snapshot, and its version
+_graph: Optional[CatalogGraph] = None
+_version: Optional[int] = None
+
+
+def reload_catalog_graph() -> bool:
+    """Swap to the published snapshot if it is not the one already mapped.
+
+    Returns
+    -------
+    bool
+        Whether a new snapshot was mapped.
+    """
+    global _graph, _version
+    path = current_snapshot(get_settings().catalog_snapshot_dir, CATALOG_SNAPSHOT)
+    if path is None:
+        return False
+    version = int(SNAPSHOT_NAME.match(path.name)["version"])
+    if version == _version:
+        return False
+    graph = CatalogGraph.from_arrays(Snapshot(path).arrays)
+    # a single assignment: the callers holding the previous graph keep using it
+    _graph, _version = graph, version
+    logger.info("Catalog snapshot %s mapped.", path.name)
+    return True
+
+
+def get_catalog_graph() -> Optional[CatalogGraph]:
+    """Return the catalog graph of the published snapshot (None if there is none).
+
+    The snapshot is mapped on the first call, then swapped by
+    ``reload_catalog_graph``.
+    """
+    if _graph is None:
+        reload_catalog_graph()
+    return _graph
+
+
+def iter_new_graph_rows(
+    graph: CatalogGraph,
+    table: str,
+) -> Iterator[tuple]:
+    """Stream the rows of a catalog table that are not in the catalog graph yet.
+
+    Only the IDs of the table are scanned (an index-only scan of its primary
+    key); the rows of the new IDs are then fetched by batches.
+
+    Parameters
+    ----------
+    graph : CatalogGraph
+        The catalog graph.
+    table : str
+        The catalog table, one of ``GRAPH_TABLES``.
+
+    Yields
+    ------
+    tuple
+        The new rows, in the format of ``crud.iter_graph_rows``.
+    """
+    ids = CATALOG_IDS[table]()
+    while batch := list(itertools.islice(ids, REFRESH_BATCH_SIZE)):
+        new_ids = graph.new_ids(table, batch)
+        if new_ids:
+            yield from crud.get_graph_rows(table, new_ids)
+
+
+def export_catalog_snapshot(
+    full: bool = False,
+) -> CatalogGraph:
+    """Publish a snapshot of the catalog graph with the rows added to the catalog.
+
+    Parameters
+    ----------
+    full : bool
+        Whether to read the whole catalog again, instead of only the rows that are
+        not in the published snapshot.
+
+    Returns
+    -------
+    CatalogGraph
+        The catalog graph of the published snapshot.
+    """
+    directory = get_settings().catalog_snapshot_dir
+    start = time.perf_counter()
+    path = None if full else current_snapshot(directory, CATALOG_SNAPSHOT)
+    if path is None:
+        graph = CatalogGraph()
+        added = {
+            table: graph.add(table, crud.iter_graph_rows(table))
+            for table in GRAPH_TABLES
+        }
+    else:
+        # a private graph: the one mapped by the worker is not modified
+        graph = CatalogGraph.from_arrays(Snapshot(path).arrays)
+        added = {
+            table: graph.add(table, iter_new_graph_rows(graph, table))
+            for table in GRAPH_TABLES
+        }
+    if path is None or any(added.values()):
+        path = write_snapshot(directory, CATALOG_SNAPSHOT, graph.to_arrays())
+    # drop the copy of the graph in memory for the mapped one
+    del graph
+    reload_catalog_graph()
+    logger.info(
+        "Catalog snapshot %s published in %.1f s: %s added.",
+        path.name,
+        time.perf_counter() - start,
+        ", ".join(f"{count} {table}" for table, count in added.items()),
+    )
+    return get_catalog_graph()
+
+
+def main():
+    """Export the catalog snapshot from the command line."""
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--full", action="store_true", help="read the whole catalog again"
+    )
+    args = parser.parse_args()
+
+    export_catalog_snapshot(args.full)
+
+
+if __name__ == "__main__":
+    main()
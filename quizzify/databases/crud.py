@@ -1,17 +1,167 @@
+import csv
+import hashlib
+import io
+import itertools
+import json
 import logging
+import re
+from contextlib import contextmanager
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Dict, Iterable, Optional, Sequence, Tuple
 from uuid import UUID
 
-from dotenv import load_dotenv
 from psycopg2.extras import RealDictCursor
 
 from quizzify.databases.db_connection import connect_to_db
+from quizzify.databases.statements import Statement
 from quizzify.utils.helpers import flatten_list
+from quizzify.utils.metrics import DB_QUERY_LATENCY, timed
 from quizzify.utils.schemas import Album, Artist, Song
+from quizzify.utils.tracing import traced
 
-load_dotenv()
 logger = logging.getLogger(__name__)
 
+# number of rows fetched at each round trip by the server-side cursors
+STREAM_ITERSIZE = 10_000
+# columns of the catalog tables, as defined in init.sql
+CATALOG_COLUMNS = {
+    "artists": ("id", "name", "popularity", "image_url"),
+    "albums": ("id", "name", "artist_id", "popularity", "release_date", "total_tracks"),
+    "songs": (
+        "id",
+        "name",
+        "artist_id",
+        "album_id",
+        "popularity",
+        "duration_ms",
+        "track_number",
+    ),
+}
+# outcomes of the upsert of the catalog rows written (the others are unchanged);
+# hashed: stored before the content hashes, so rewritten with their hash
+UPSERT_OUTCOMES = ("inserted", "updated", "hashed")
+# rows read to build each type of question of the question bank, the subject of
+# the question (a song or an album) being aliased "s"
+QUESTION_SOURCES = {
+    "song_artist": (
+        "SELECT s.id, s.name, artists.name AS artist_name FROM songs s "
+        "INNER JOIN artists ON artists.id = s.artist_id "
+        "WHERE s.name IS NOT NULL AND artists.name IS NOT NULL"
+    ),
+    "song_album": (
+        "SELECT s.id, s.name, albums.name AS album_name FROM songs s "
+        "INNER JOIN albums ON albums.id = s.album_id "
+        "WHERE s.name IS NOT NULL AND albums.name IS NOT NULL"
+    ),
+    "album_year": (
+        "SELECT s.id, s.name, extract(year FROM s.release_date)::int AS release_year "
+        "FROM albums s WHERE s.name IS NOT NULL AND s.release_date IS NOT NULL"
+    ),
+    "song_longer": (
+        "SELECT s.id, s.name, s.duration_ms FROM songs s "
+        "WHERE s.name IS NOT NULL AND s.duration_ms IS NOT NULL"
+    ),
+}
+# types of question of the question bank built from the catalog graph
+# (``quizzify.utils.catalog_graph``) rather than from a query, the subject being a
+# song (same_album) or an album (shared_artist)
+GRAPH_QUESTION_TYPES = ("same_album", "shared_artist")
+# columns of the catalog graph: the ID, the name and the IDs of the parents
+GRAPH_COLUMNS = {
+    "artists": ("id", "name"),
+    "albums": ("id", "name", "artist_id"),
+    "songs": ("id", "name", "artist_id", "album_id"),
+}
+# number of questions copied to the question bank at once
+QUESTION_BATCH_SIZE = 50_000
+# sort keys of the catalog listings, in descending order then by ID (missing
+# values last), each backed by an index of init.sql
+LISTING_SORTS = {
+    "popularity": "COALESCE(popularity, 0)",
+    "release_date": "COALESCE(release_date, DATE '0001-01-01')",
+}
+# filters and sorts of the listing of each catalog table (besides the ID sort)
+LISTINGS = {
+    "artists": ((), ("popularity",)),
+    "albums": (("artist_id",), ("popularity", "release_date")),
+    "songs": (("artist_id", "album_id"), ("popularity",)),
+}
+# catalog tables searched by name
+SEARCH_TABLES = ("artists", "albums", "songs")
+# the score of a search result is its text relevance, increased by up to this
+# fraction with the popularity
+SEARCH_POPULARITY_WEIGHT = 0.5
 
+
+def instrumented(function: str):
+    """Time and trace a database function.
+
+    Parameters
+    ----------
+    function : str
+        The name of the function, used to label its metrics and spans.
+
+    Returns
+    -------
+    Callable
+        The decorator.
+    """
+
+    def decorator(func):
+        return traced(f"db.{function}")(
+            timed(DB_QUERY_LATENCY, function=function)(func)
+        )
+
+    return decorator
+
+
+@contextmanager
+def open_cursor(
+    readonly: bool = False,
+    cursor_factory=None,
+):
+    """Take a connection from the pool and open a cursor, for a block.
+
+    The cursor is closed and the connection given back to the pool when the block
+    ends, even if a query failed: the pool rolls back the transaction left open.
+
+    Parameters
+    ----------
+    readonly : bool
+        Whether the connection is only used to read (see ``connect_to_db``).
+    cursor_factory : type, optional
+        The cursor factory to use (e.g. ``RealDictCursor`` to get dictionaries).
+
+    Yields
+    ------
+    tuple
+        The connection and the cursor.
+    """
+    connection = connect_to_db(readonly=readonly)
+    try:
+        if cursor_factory is None:
+            cursor = connection.cursor()
+        else:
+            cursor = connection.cursor(cursor_factory=cursor_factory)
+        try:
+            yield connection, cursor
+        finally:
+            cursor.close()
+    finally:
+        connection.close()
+
+
+CREATE_USER = Statement(
+    "create_user",
+    "INSERT INTO users "
+    "(user_id, username, email, hashed_pwd) "
+    "VALUES"
+    "(%(user_id)s, %(username)s, %(email)s, %(hashed_pwd)s );",
+)
+
+
+@instrumented("create_user")
 def create_user(
     user_id: UUID,
     username: str,
@@ -32,33 +182,35 @@ def create_user(
     hashed_pwd : str
         The hashed password for the new account.
     """
-    # Connect to your PostgreSQL database
-    connection = connect_to_db()
-    # Create a cursor object
-    cursor = connection.cursor()
-    cursor.execute(
-        query=(
-            "INSERT INTO users "
-            "(user_id, username, email, hashed_pwd) "
-            "VALUES"
-            "(%(user_id)s, %(username)s, %(email)s, %(hashed_pwd)s );"
-        ),
-        vars={
-            "user_id": str(user_id),
-            "username": username,
-            "email": email,
-            "hashed_pwd": hashed_pwd,
-        },
-    )
-    # Make the changes to the database persistent
-    connection.commit()
-    logger.info("User successfully created.")
+    with open_cursor() as (connection, cursor):
+        CREATE_USER.execute(
+            cursor,
+            {
+                "user_id": str(user_id),
+                "username": username,
+                "email": email,
+                "hashed_pwd": hashed_pwd,
+            },
+        )
+        # Make the changes to the database persistent
+        connection.commit()
+        logger.info("User successfully created.")
+
 
-    # Close communication with the database
-    cursor.close()
-    connection.close()
+CREATE_SPOTIFY_USER = Statement(
+    "create_spotify_user",
+    "INSERT INTO spotify_users "
+    "(spotify_id, user_id, spotify_username, spotify_email, spotify_image_url, "
+    "spotify_uri) "
+    "VALUES"
+    "("
+    "%(spotify_id)s, %(user_id)s, %(spotify_username)s, %(spotify_email)s, "
+    "%(spotify_image_url)s, %(spotify_uri)s"
+    ");",
+)
 
 
+@instrumented("create_spotify_user")
 def create_spotify_user(
     spotify_id: UUID,
     user_id: UUID,
@@ -84,39 +236,30 @@ def create_spotify_user(
     spotify_uri : str
         The user's Spotify URI.
     """
-    # Connect to the PostgreSQL database
-    connection = connect_to_db()
-    # Create a cursor object
-    cursor = connection.cursor()
-    cursor.execute(
-        query=(
-            "INSERT INTO spotify_users "
-            "(spotify_id, user_id, spotify_username, spotify_email, spotify_image_url, "
-            "spotify_uri) "
-            "VALUES"
-            "("
-            "%(spotify_id)s, %(user_id)s, %(spotify_username)s, %(spotify_email)s, "
-            "%(spotify_image_url)s, %(spotify_uri)s"
-            ");"
-        ),
-        vars={
-            "spotify_id": spotify_id,
-            "user_id": str(user_id),
-            "spotify_username": spotify_username,
-            "spotify_email": spotify_email,
-            "spotify_image_url": spotify_image_url,
-            "spotify_uri": spotify_uri,
-        },
-    )
-    # Make the changes to the database persistent
-    connection.commit()
-    logger.info("Spotify user successfully created.")
+    with open_cursor() as (connection, cursor):
+        CREATE_SPOTIFY_USER.execute(
+            cursor,
+            {
+                "spotify_id": spotify_id,
+                "user_id": str(user_id),
+                "spotify_username": spotify_username,
+                "spotify_email": spotify_email,
+                "spotify_image_url": spotify_image_url,
+                "spotify_uri": spotify_uri,
+            },
+        )
+        # Make the changes to the database persistent
+        connection.commit()
+        logger.info("Spotify user successfully created.")
 
-    # Close communication with the database
-    cursor.close()
-    connection.close()
 
+GET_USER_BY_EMAIL = Statement(
+    "get_user_by_email",
+    "SELECT username, email, hashed_pwd FROM users WHERE email = %(email)s;",
+)
 
+
+@instrumented("get_user_by_email")
 def get_user_by_email(
     email: str,
 ):
@@ -132,21 +275,19 @@ def get_user_by_email(
     tuple
         The user's email and hashed password.
     """
-    # Connect to your PostgreSQL database
-    connection = connect_to_db()
-    # Create a cursor object
-    cursor = connection.cursor()
-    cursor.execute(
-        query="SELECT username, email, hashed_pwd FROM users WHERE email = %(email)s;",
-        vars={"email": email},
-    )
-    user_email = cursor.fetchone()
-    # Close communication with the database
-    cursor.close()
-    connection.close()
+    with open_cursor(readonly=True) as (connection, cursor):
+        GET_USER_BY_EMAIL.execute(cursor, {"email": email})
+        user_email = cursor.fetchone()
     return user_email
 
 
+GET_USER_BY_USERNAME = Statement(
+    "get_user_by_username",
+    "SELECT username FROM users WHERE username = %(username)s;",
+)
+
+
+@instrumented("get_user_by_username")
 def get_user_by_username(
     username: str,
 ):
@@ -162,21 +303,19 @@ def get_user_by_username(
     str
         The user's username.
     """
-    # Connect to your PostgreSQL database
-    connection = connect_to_db()
-    # Create a cursor object
-    cursor = connection.cursor()
-    cursor.execute(
-        query="SELECT username FROM users WHERE username = %(username)s;",
-        vars={"username": username},
-    )
-    user_email = cursor.fetchone()
-    # Close communication with the database
-    cursor.close()
-    connection.close()
+    with open_cursor(readonly=True) as (connection, cursor):
+        GET_USER_BY_USERNAME.execute(cursor, {"username": username})
+        user_email = cursor.fetchone()
     return user_email
 
 
+GET_USER_BY_SPOTIFY_ID = Statement(
+    "get_user_by_spotify_id",
+    "SELECT spotify_id FROM spotify_users WHERE spotify_id = %(spotify_id)s;",
+)
+
+
+@instrumented("get_user_by_spotify_id")
 def get_user_by_spotify_id(
     spotify_id: str,
 ):
@@ -192,21 +331,49 @@ def get_user_by_spotify_id(
     str
         The user's Spotify ID.
     """
-    # Connect to your PostgreSQL database
-    connection = connect_to_db()
-    # Create a cursor object
-    cursor = connection.cursor()
-    cursor.execute(
-        query="SELECT spotify_id FROM spotify_users WHERE spotify_id = %(spotify_id)s;",
-        vars={"spotify_id": spotify_id},
-    )
-    user_email = cursor.fetchone()
-    # Close communication with the database
-    cursor.close()
-    connection.close()
+    with open_cursor(readonly=True) as (connection, cursor):
+        GET_USER_BY_SPOTIFY_ID.execute(cursor, {"spotify_id": spotify_id})
+        user_email = cursor.fetchone()
     return user_email
 
 
+GET_USERNAME_BY_SPOTIFY_ID = Statement(
+    "get_username_by_spotify_id",
+    "SELECT u.username FROM spotify_users s JOIN users u ON u.user_id = s.user_id "
+    "WHERE s.spotify_id = %(spotify_id)s;",
+)
+
+
+@instrumented("get_username_by_spotify_id")
+def get_username_by_spotify_id(
+    spotify_id: str,
+) -> Optional[str]:
+    """Get the username of the user registered with a Spotify account.
+
+    Parameters
+    ----------
+    spotify_id : str
+        The Spotify ID of the account.
+
+    Returns
+    -------
+    str
+        The username, or None if no user registered with this account.
+    """
+    with open_cursor(readonly=True) as (connection, cursor):
+        GET_USERNAME_BY_SPOTIFY_ID.execute(cursor, {"spotify_id": spotify_id})
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+GET_RANDOM_ARTIST = Statement(
+    "get_random_artist",
+    "SELECT id, name, popularity, image_url FROM artists OFFSET floor("
+    "random() * (SELECT COUNT(*) FROM artists)) LIMIT 1;",
+)
+
+
+@instrumented("get_random_artist")
 def get_random_artist():
     """Get a random artist from the database.
 
@@ -215,20 +382,24 @@ def get_random_artist():
     dict
         A random artist.
     """
-    connection = connect_to_db()
-    cursor = connection.cursor(cursor_factory=RealDictCursor)
-    cursor.execute(
-        query=(
-            "SELECT id, name, popularity, image_url FROM artists OFFSET floor("
-            "random() * (SELECT COUNT(*) FROM artists)) LIMIT 1;"
-        )
-    )
-    random_artist = cursor.fetchone()
-    cursor.close()
-    connection.close()
+    with open_cursor(readonly=True, cursor_factory=RealDictCursor) as (
+        connection,
+        cursor,
+    ):
+        GET_RANDOM_ARTIST.execute(cursor)
+        random_artist = cursor.fetchone()
     return random_artist
 
 
+GET_RANDOM_SONG = Statement(
+    "get_random_song",
+    "SELECT id, name, artist_id, album_id, popularity, duration_ms, "
+    "track_number FROM songs OFFSET floor("
+    "random() * (SELECT COUNT(*) FROM songs)) LIMIT 1;",
+)
+
+
+@instrumented("get_random_song")
 def get_random_song():
     """Get a random song from the database.
 
@@ -237,21 +408,16 @@ def get_random_song():
     dict
         A random song.
     """
-    connection = connect_to_db()
-    cursor = connection.cursor(cursor_factory=RealDictCursor)
-    cursor.execute(
-        query=(
-            "SELECT id, name, artist_id, album_id, popularity, duration_ms, "
-            "track_number FROM songs OFFSET floor("
-            "random() * (SELECT COUNT(*) FROM songs)) LIMIT 1;"
-        )
-    )
-    random_song = cursor.fetchone()
-    cursor.close()
-    connection.close()
+    with open_cursor(readonly=True, cursor_factory=RealDictCursor) as (
+        connection,
+        cursor,
+    ):
+        GET_RANDOM_SONG.execute(cursor)
+        random_song = cursor.fetchone()
     return random_song
 
 
+@instrumented("get_artists_ids")
 def get_artists_ids():
     """Get all the artists' IDs from the database.
 
@@ -260,46 +426,285 @@ def get_artists_ids():
     list
         A list of all the artists' IDs.
     """
-    connection = connect_to_db()
-    cursor = connection.cursor()
-    cursor.execute(query="SELECT id FROM artists;")
-    artists_ids = cursor.fetchall()
-    cursor.close()
-    connection.close()
+    with open_cursor(readonly=True) as (connection, cursor):
+        cursor.execute(query="SELECT id FROM artists;")
+        artists_ids = cursor.fetchall()
     return flatten_list(artists_ids)
 
 
+def content_hash(
+    row: Sequence,
+) -> int:
+    """Hash the values of a catalog row, to find the rows that changed.
+
+    Parameters
+    ----------
+    row : Sequence
+        The values of the ``CATALOG_COLUMNS`` of the row.
+
+    Returns
+    -------
+    int
+        A 64-bit hash of the values, stored in the ``content_hash`` column.
+    """
+    # JSON rather than repr: stable across Python versions and value classes
+    encoded = json.dumps(
+        list(row), default=_encode_value, ensure_ascii=False, separators=(",", ":")
+    )
+    digest = hashlib.blake2b(encoded.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+def _encode_value(
+    value,
+) -> str:
+    """Encode the values of a catalog row that JSON does not, for their hash."""
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"Cannot hash a {type(value).__name__} value.")
+
+
+def upsert_query(
+    table: str,
+    rows: str,
+) -> str:
+    """Build the query upserting rows into a catalog table.
+
+    The rows already in the table are only updated if their content hash
+    differs: an unchanged row is not rewritten (no new row version, no index
+    update). The query returns the ID of each row written and whether it was
+    inserted.
+
+    Parameters
+    ----------
+    table : str
+        The name of the catalog table, one of ``CATALOG_COLUMNS``.
+    rows : str
+        The ``VALUES`` or ``SELECT`` clause of the rows, giving the
+        ``CATALOG_COLUMNS`` of the table and the content hash.
+
+    Returns
+    -------
+    str
+        The query.
+    """
+    columns = CATALOG_COLUMNS[table] + ("content_hash",)
+    updates = ", ".join(f"{column} = EXCLUDED.{column}" for column in columns[1:])
+    return (
+        f"INSERT INTO {table} AS current ({', '.join(columns)}) {rows} "  # nosec B608
+        f"ON CONFLICT (id) DO UPDATE SET {updates} "
+        "WHERE current.content_hash IS DISTINCT FROM EXCLUDED.content_hash "
+        # xmax is only set on the row versions written by an update
+        "RETURNING id, (xmax = 0) AS inserted"
+    )
+
+
+def upsert_outcomes_query(
+    table: str,
+    rows: str,
+) -> str:
+    """Build the query upserting rows into a catalog table and counting them.
+
+    The rows stored before the content hashes (``NULL`` hash) are rewritten with
+    their hash, whether they changed or not: they are counted apart, as hashed,
+    instead of as updated. The query reads their previous hash from the table as
+    it was before the upsert, the snapshot of the whole statement.
+
+    Parameters
+    ----------
+    table : str
+        The name of the catalog table, one of ``CATALOG_COLUMNS``.
+    rows : str
+        The ``VALUES`` or ``SELECT`` clause of the rows (see ``upsert_query``).
+
+    Returns
+    -------
+    str
+        The query, returning the number of rows inserted, updated and hashed.
+    """
+    return (
+        f"WITH written AS ({upsert_query(table, rows)}) "  # nosec B608
+        "SELECT count(*) FILTER (WHERE written.inserted), "
+        "count(*) FILTER (WHERE NOT written.inserted "
+        "AND previous.content_hash IS NOT NULL), "
+        "count(*) FILTER (WHERE NOT written.inserted "
+        "AND previous.content_hash IS NULL) "
+        f"FROM written LEFT JOIN {table} previous ON previous.id = written.id;"
+    )
+
+
+UPSERT_CATALOG_ROW = {
+    table: Statement(
+        f"upsert_{table}",
+        upsert_outcomes_query(
+            table,
+            "VALUES ("
+            + ", ".join(f"%({column})s" for column in columns + ("content_hash",))
+            + ")",
+        ),
+    )
+    for table, columns in CATALOG_COLUMNS.items()
+}
+
+
+def upsert_catalog_row(
+    table: str,
+    model,
+) -> str:
+    """Insert a row into a catalog table, or update it if it changed.
+
+    Parameters
+    ----------
+    table : str
+        The name of the catalog table, one of ``CATALOG_COLUMNS``.
+    model : Artist, Album or Song
+        The row.
+
+    Returns
+    -------
+    str
+        ``inserted``, ``updated``, ``hashed`` (stored without a content hash) or
+        ``unchanged``.
+    """
+    values = {column: getattr(model, column) for column in CATALOG_COLUMNS[table]}
+    values["content_hash"] = content_hash(values.values())
+    with open_cursor() as (connection, cursor):
+        UPSERT_CATALOG_ROW[table].execute(cursor, values)
+        counts = cursor.fetchone()
+        connection.commit()
+    for outcome, count in zip(UPSERT_OUTCOMES, counts):
+        if count:
+            return outcome
+    return "unchanged"
+
+
+@instrumented("insert_artist")
 def insert_artist(
     artist: Artist,
-):
-    """Insert an artist into the database.
+) -> str:
+    """Insert an artist into the database, or update it if it changed.
 
     Parameters
     ----------
     artist : Artist
         The artist to insert into the database.
+
+    Returns
+    -------
+    str
+        ``inserted``, ``updated``, ``hashed`` or ``unchanged``.
     """
-    connection = connect_to_db()
-    cursor = connection.cursor()
-    cursor.execute(
-        query=(
-            "INSERT INTO artists "
-            "(id, name, image_url, popularity) "
-            "VALUES"
-            "(%(artist_id)s, %(artist_name)s, %(artist_image)s, %(popularity)s);"
-        ),
-        vars={
-            "artist_id": artist.id,
-            "artist_name": artist.name,
-            "artist_image": artist.image_url,
-            "popularity": artist.popularity,
-        },
+    return upsert_catalog_row("artists", artist)
+
+
+def listing_query(
+    table: str,
+    filters: tuple,
+    sort: str,
+    after: bool,
+) -> str:
+    """Build the query listing a page of a catalog table.
+
+    The rows are sorted by ID, or by a key of ``LISTING_SORTS`` in descending
+    order then by ID, and the next pages start after the (key, ID) pair of the
+    last row: each page is an index range scan, whatever its number.
+    """
+    conditions = [f"{column} = %({column})s" for column in filters]
+    if sort == "id":
+        select, order = "", "id"
+        if after:
+            conditions.append("id > %(id)s")
+    else:
+        key = LISTING_SORTS[sort]
+        select, order = f", {key} AS sort_key", f"{key} DESC, id DESC"
+        if after:
+            conditions.append(f"({key}, id) < (%(key)s, %(id)s)")
+    where = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+    # the table, column and key names come from LISTINGS, not from the user
+    return (
+        f"SELECT {', '.join(CATALOG_COLUMNS[table])}{select} "  # nosec B608
+        f"FROM {table} {where}ORDER BY {order} LIMIT %(limit)s;"
+    )
+
+
+LISTING_STATEMENTS = {
+    (table, filters, sort, after): Statement(
+        "_".join(("list", table, *filters, "by", sort, *(["after"] if after else []))),
+        listing_query(table, filters, sort, after),
     )
-    connection.commit()
-    cursor.close()
-    connection.close()
+    for table, (columns, sorts) in LISTINGS.items()
+    for size in range(len(columns) + 1)
+    for filters in itertools.combinations(columns, size)
+    for sort in ("id", *sorts)
+    for after in (False, True)
+}
+
+
+@instrumented("list_catalog")
+def list_catalog(
+    table: str,
+    limit: int,
+    sort: str = "id",
+    filters: Optional[dict] = None,
+    after: Optional[tuple] = None,
+):
+    """List a page of a catalog table.
+
+    Parameters
+    ----------
+    table : str
+        The name of the catalog table, one of ``LISTINGS``.
+    limit : int
+        The number of rows.
+    sort : str
+        ``id``, or a sort key of the table (in descending order).
+    filters : dict, optional
+        The values of the filters of the table (e.g. ``artist_id``); the filters
+        set to None are ignored.
+    after : tuple, optional
+        The sort key (None for the ``id`` sort) and ID of the last row of the
+        previous page.
+
+    Returns
+    -------
+    list
+        The rows, with their ``sort_key`` unless sorted by ID.
+
+    Raises
+    ------
+    ValueError
+        If the table, the sort or a filter is unknown.
+    """
+    if table not in LISTINGS:
+        raise ValueError(f"Unknown catalog table: {table}")
+    columns, sorts = LISTINGS[table]
+    if sort != "id" and sort not in sorts:
+        raise ValueError(f"Unknown sort of the {table}: {sort}")
+    filters = {
+        column: value for column, value in (filters or {}).items() if value is not None
+    }
+    if set(filters) - set(columns):
+        raise ValueError(f"Unknown filters of the {table}: {sorted(filters)}")
+    values = {**filters, "limit": limit}
+    if after is not None:
+        values["key"], values["id"] = after
+    # the filters in the order of LISTINGS, as in the name of the statement
+    statement = LISTING_STATEMENTS[
+        table,
+        tuple(column for column in columns if column in filters),
+        sort,
+        after is not None,
+    ]
+    with open_cursor(readonly=True, cursor_factory=RealDictCursor) as (
+        connection,
+        cursor,
+    ):
+        statement.execute(cursor, values)
+        rows = cursor.fetchall()
+    return rows
 
 
+@instrumented("get_albums_ids")
 def get_albums_ids():
     """Get all the albums' IDs from the database.
 
@@ -308,15 +713,13 @@ def get_albums_ids():
     list
         A list of all the albums' IDs.
     """
-    connection = connect_to_db()
-    cursor = connection.cursor()
-    cursor.execute(query="SELECT id FROM albums;")
-    albums_ids = cursor.fetchall()
-    cursor.close()
-    connection.close()
+    with open_cursor(readonly=True) as (connection, cursor):
+        cursor.execute(query="SELECT id FROM albums;")
+        albums_ids = cursor.fetchall()
     return flatten_list(albums_ids)
 
 
+@instrumented("get_songs_ids")
 def get_songs_ids():
     """Get all the songs' IDs from the database.
 
@@ -325,104 +728,1546 @@ def get_songs_ids():
     list
         A list of all the songs' IDs.
     """
-    connection = connect_to_db()
-    cursor = connection.cursor()
-    cursor.execute(query="SELECT id FROM songs;")
-    songs_ids = cursor.fetchall()
-    cursor.close()
-    connection.close()
+    with open_cursor(readonly=True) as (connection, cursor):
+        cursor.execute(query="SELECT id FROM songs;")
+        songs_ids = cursor.fetchall()
     return flatten_list(songs_ids)
 
 
-def insert_album(
-    album: Album,
+def stream_rows(
+    query: str,
+    cursor_name: str,
+    cursor_factory=None,
+    itersize: int = STREAM_ITERSIZE,
 ):
-    """Insert an album into the database.
+    """Stream the rows of a query using a server-side (named) cursor.
+
+    Unlike ``fetchall()``, the rows are kept on the PostgreSQL server and fetched
+    by batches of ``itersize`` rows, so the memory used does not depend on the
+    size of the result set.
 
     Parameters
     ----------
-    album : Album
-        The album to insert into the database.
+    query : str
+        The SQL query to execute.
+    cursor_name : str
+        The name of the server-side cursor.
+    cursor_factory : type, optional
+        The cursor factory to use (e.g. ``RealDictCursor`` to get dictionaries).
+    itersize : int
+        The number of rows fetched from the server at each round trip.
+
+    Yields
+    ------
+    tuple or dict
+        The rows of the query, one at a time.
     """
-    connection = connect_to_db()
-    cursor = connection.cursor()
-    cursor.execute(
-        query=(
-            "INSERT INTO albums "
-            "(id, name, image_url, release_year, popularity) "
-            "VALUES"
-            "(%(album_id)s, %(album_name)s, %(album_image)s, %(album_release_year)s, "
-            "%(popularity)s);"
-        ),
-        vars={
-            "album_id": album.id,
-            "album_name": album.name,
-            "album_image": album.image_url,
-            "album_release_year": album.release_year,
-            "popularity": album.popularity,
-        },
+    connection = connect_to_db(readonly=True)
+    cursor = connection.cursor(name=cursor_name, cursor_factory=cursor_factory)
+    cursor.itersize = itersize
+    try:
+        cursor.execute(query=query)
+        yield from cursor
+    finally:
+        # also called when the consumer stops early (e.g. client disconnected)
+        cursor.close()
+        connection.close()
+
+
+@instrumented("iter_artists_ids")
+def iter_artists_ids(
+    itersize: int = STREAM_ITERSIZE,
+):
+    """Stream all the artists' IDs from the database.
+
+    Parameters
+    ----------
+    itersize : int
+        The number of IDs fetched from the server at each round trip.
+
+    Yields
+    ------
+    str
+        The artists' IDs, one at a time.
+    """
+    for (artist_id,) in stream_rows(
+        query="SELECT id FROM artists;",
+        cursor_name="iter_artists_ids",
+        itersize=itersize,
+    ):
+        yield artist_id
+
+
+@instrumented("iter_albums_ids")
+def iter_albums_ids(
+    itersize: int = STREAM_ITERSIZE,
+):
+    """Stream all the albums' IDs from the database.
+
+    Parameters
+    ----------
+    itersize : int
+        The number of IDs fetched from the server at each round trip.
+
+    Yields
+    ------
+    str
+        The albums' IDs, one at a time.
+    """
+    for (album_id,) in stream_rows(
+        query="SELECT id FROM albums;",
+        cursor_name="iter_albums_ids",
+        itersize=itersize,
+    ):
+        yield album_id
+
+
+@instrumented("iter_songs_ids")
+def iter_songs_ids(
+    itersize: int = STREAM_ITERSIZE,
+):
+    """Stream all the songs' IDs from the database.
+
+    Parameters
+    ----------
+    itersize : int
+        The number of IDs fetched from the server at each round trip.
+
+    Yields
+    ------
+    str
+        The songs' IDs, one at a time.
+    """
+    for (song_id,) in stream_rows(
+        query="SELECT id FROM songs;",
+        cursor_name="iter_songs_ids",
+        itersize=itersize,
+    ):
+        yield song_id
+
+
+@instrumented("iter_catalog")
+def iter_catalog(
+    table: str,
+    itersize: int = STREAM_ITERSIZE,
+):
+    """Stream all the rows of a catalog table (artists, albums or songs).
+
+    Parameters
+    ----------
+    table : str
+        The name of the catalog table, one of ``CATALOG_COLUMNS``.
+    itersize : int
+        The number of rows fetched from the server at each round trip.
+
+    Yields
+    ------
+    dict
+        The rows of the table, one at a time.
+
+    Raises
+    ------
+    ValueError
+        If the table is not a catalog table.
+    """
+    if table not in CATALOG_COLUMNS:
+        raise ValueError(f"Unknown catalog table: {table}")
+    # the table and column names come from CATALOG_COLUMNS, not from the user
+    columns = ", ".join(CATALOG_COLUMNS[table])
+    yield from stream_rows(
+        query=f"SELECT {columns} FROM {table};",  # nosec B608
+        cursor_name=f"iter_{table}",
+        cursor_factory=RealDictCursor,
+        itersize=itersize,
     )
-    connection.commit()
-    cursor.close()
-    connection.close()
 
 
-def insert_song(
-    song: Song,
+@instrumented("iter_graph_rows")
+def iter_graph_rows(
+    table: str,
+    itersize: int = STREAM_ITERSIZE,
 ):
-    """Insert a song into the database.
+    """Stream the columns of a catalog table held by the catalog graph.
 
     Parameters
     ----------
-    song : Song
-        The song to insert into the database.
+    table : str
+        The name of the catalog table, one of ``GRAPH_COLUMNS``.
+    itersize : int
+        The number of rows fetched from the server at each round trip.
+
+    Yields
+    ------
+    tuple
+        The ID, the name and the IDs of the parents of the rows, one at a time.
+
+    Raises
+    ------
+    ValueError
+        If the table is not a catalog table.
     """
-    connection = connect_to_db()
-    cursor = connection.cursor()
-    cursor.execute(
-        query=(
-            "INSERT INTO songs "
-            "(id, name, artist_id, album_id, popularity, duration_ms, track_number) "
-            "VALUES"
-            "(%(song_id)s, %(song_name)s, %(artist_id)s, %(album_id)s, %(popularity)s, "
-            "%(duration_ms)s, %(track_number)s);"
-        ),
-        vars={
-            "song_id": song.id,
-            "song_name": song.name,
-            "artist_id": song.artist_id,
-            "album_id": song.album_id,
-            "popularity": song.popularity,
-            "duration_ms": song.duration_ms,
-            "track_number": song.track_number,
-        },
+    if table not in GRAPH_COLUMNS:
+        raise ValueError(f"Unknown catalog table: {table}")
+    # the table and column names come from GRAPH_COLUMNS, not from the user
+    columns = ", ".join(GRAPH_COLUMNS[table])
+    yield from stream_rows(
+        query=f"SELECT {columns} FROM {table} WHERE name IS NOT NULL;",  # nosec B608
+        cursor_name=f"iter_{table}_graph_rows",
+        itersize=itersize,
     )
-    connection.commit()
-    cursor.close()
-    connection.close()
 
 
-def get_random_artist_song():
-    """Get a random artist and song from the database.
+@instrumented("get_graph_rows")
+def get_graph_rows(
+    table: str,
+    ids: Sequence[str],
+) -> list:
+    """Get the columns held by the catalog graph of some rows of a catalog table.
+
+    Parameters
+    ----------
+    table : str
+        The name of the catalog table, one of ``GRAPH_COLUMNS``.
+    ids : Sequence[str]
+        The IDs of the rows.
 
     Returns
     -------
-    dict
-        A random song and its artist.
+    list
+        The ID, the name and the IDs of the parents of the rows.
+
+    Raises
+    ------
+    ValueError
+        If the table is not a catalog table.
     """
-    connection = connect_to_db()
-    cursor = connection.cursor(cursor_factory=RealDictCursor)
-    cursor.execute(
-        query=(
-            "SELECT songs.name AS song_name, artists.name AS artist_name "
-            "FROM songs "
-            "INNER JOIN artists "
-            "ON songs.artist_id = artists.id "
-            "OFFSET floor(random() * (SELECT COUNT(*) FROM songs))"
-            "LIMIT 1;"
+    if table not in GRAPH_COLUMNS:
+        raise ValueError(f"Unknown catalog table: {table}")
+    with open_cursor(readonly=True) as (connection, cursor):
+        # the table and column names come from GRAPH_COLUMNS, not from the user
+        cursor.execute(
+            query=(
+                f"SELECT {', '.join(GRAPH_COLUMNS[table])} FROM {table} "  # nosec B608
+                "WHERE id = ANY(%(ids)s) AND name IS NOT NULL;"
+            ),
+            vars={"ids": list(ids)},
         )
-    )
-    random_artist_song = cursor.fetchone()
-    cursor.close()
-    connection.close()
-    return random_artist_song
+        rows = cursor.fetchall()
+    return rows
+
+
+@instrumented("insert_album")
+def insert_album(
+    album: Album,
+) -> str:
+    """Insert an album into the database, or update it if it changed.
+
+    Parameters
+    ----------
+    album : Album
+        The album to insert into the database.
+
+    Returns
+    -------
+    str
+        ``inserted``, ``updated``, ``hashed`` or ``unchanged``.
+    """
+    return upsert_catalog_row("albums", album)
+
+
+@instrumented("insert_song")
+def insert_song(
+    song: Song,
+) -> str:
+    """Insert a song into the database, or update it if it changed.
+
+    Parameters
+    ----------
+    song : Song
+        The song to insert into the database.
+
+    Returns
+    -------
+    str
+        ``inserted``, ``updated``, ``hashed`` or ``unchanged``.
+    """
+    return upsert_catalog_row("songs", song)
+
+
+SAVE_IMPORT_PROGRESS = Statement(
+    "save_import_progress",
+    "INSERT INTO catalog_imports (source, byte_offset, records) "
+    "VALUES (%(source)s, %(byte_offset)s, %(records)s) "
+    "ON CONFLICT (source) DO UPDATE SET "
+    "byte_offset = EXCLUDED.byte_offset, records = EXCLUDED.records, "
+    "updated_at = CURRENT_TIMESTAMP;",
+)
+
+
+@instrumented("copy_catalog_rows")
+def copy_catalog_rows(
+    rows: Dict[str, Sequence[tuple]],
+    source: str,
+    byte_offset: int,
+    records: int,
+) -> Dict[str, Dict[str, int]]:
+    """Upsert catalog rows with COPY and save the progress of their import.
+
+    The rows of each table are copied into a temporary table, then upserted into
+    the catalog (``upsert_query``): the new IDs are inserted, and the rows already
+    there are only updated if their content hash differs. The artists are
+    upserted first, then the albums and the songs referencing them. The progress
+    of the import is saved in the same transaction, so an interrupted import
+    resumes right after the last rows committed.
+
+    Parameters
+    ----------
+    rows : dict
+        The rows of each catalog table, as tuples of its ``CATALOG_COLUMNS``
+        followed by their ``content_hash``.
+    source : str
+        The name of the imported file.
+    byte_offset : int
+        The position in the file of the end of the records holding the rows.
+    records : int
+        The number of records of the file read up to ``byte_offset``.
+
+    Returns
+    -------
+    dict
+        The number of rows inserted, updated, hashed (stored without a content
+        hash) and unchanged in each table.
+    """
+    connection = connect_to_db()
+    cursor = connection.cursor()
+    written = {}
+    try:
+        for table, columns in CATALOG_COLUMNS.items():
+            table_rows = rows.get(table) or []
+            written[table] = dict.fromkeys(UPSERT_OUTCOMES + ("unchanged",), 0)
+            if not table_rows:
+                continue
+            buffer = io.StringIO()
+            csv.writer(buffer, lineterminator="\n").writerows(table_rows)
+            buffer.seek(0)
+            column_list = ", ".join(columns + ("content_hash",))
+            # the table names come from CATALOG_COLUMNS, not from the file
+            cursor.execute(
+                query=(
+                    f"CREATE TEMPORARY TABLE {table}_staging "  # nosec B608
+                    f"(LIKE {table}) ON COMMIT DROP;"
+                )
+            )
+            cursor.copy_expert(
+                f"COPY {table}_staging ({column_list}) FROM STDIN WITH (FORMAT csv);",
+                buffer,
+            )
+            # an upsert cannot write a row twice: one row per ID
+            cursor.execute(
+                query=upsert_outcomes_query(
+                    table,
+                    f"SELECT DISTINCT ON (id) {column_list} "  # nosec B608
+                    f"FROM {table}_staging ORDER BY id",
+                )
+            )
+            written[table] = dict(zip(UPSERT_OUTCOMES, cursor.fetchone()))
+            written[table]["unchanged"] = len(table_rows) - sum(written[table].values())
+        SAVE_IMPORT_PROGRESS.execute(
+            cursor,
+            {"source": source, "byte_offset": byte_offset, "records": records},
+        )
+        connection.commit()
+    except BaseException:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+        connection.close()
+    return written
+
+
+GET_IMPORT_PROGRESS = Statement(
+    "get_import_progress",
+    "SELECT byte_offset, records FROM catalog_imports WHERE source = %(source)s;",
+)
+
+
+@instrumented("get_import_progress")
+def get_import_progress(
+    source: str,
+) -> Optional[Tuple[int, int]]:
+    """Get the progress of the import of a file.
+
+    Parameters
+    ----------
+    source : str
+        The name of the imported file.
+
+    Returns
+    -------
+    tuple
+        The position in the file of the end of the last records loaded, and the
+        number of records read up to there, or None if the file was never
+        imported.
+    """
+    with open_cursor() as (connection, cursor):
+        GET_IMPORT_PROGRESS.execute(cursor, {"source": source})
+        progress = cursor.fetchone()
+    return progress
+
+
+GET_RANDOM_ARTIST_SONG = Statement(
+    "get_random_artist_song",
+    "SELECT songs.name AS song_name, artists.name AS artist_name "
+    "FROM songs "
+    "INNER JOIN artists "
+    "ON songs.artist_id = artists.id "
+    "OFFSET floor(random() * (SELECT COUNT(*) FROM songs))"
+    "LIMIT 1;",
+)
+
+
+@instrumented("get_random_artist_song")
+def get_random_artist_song():
+    """Get a random artist and song from the database.
+
+    Returns
+    -------
+    dict
+        A random song and its artist.
+    """
+    with open_cursor(readonly=True, cursor_factory=RealDictCursor) as (
+        connection,
+        cursor,
+    ):
+        GET_RANDOM_ARTIST_SONG.execute(cursor)
+        random_artist_song = cursor.fetchone()
+    return random_artist_song
+
+
+PURGE_OAUTH_STATES = Statement(
+    "purge_oauth_states",
+    "DELETE FROM oauth_states "
+    "WHERE created_at < CURRENT_TIMESTAMP - make_interval(secs => %(ttl)s);",
+)
+
+
+SAVE_OAUTH_STATE = Statement(
+    "save_oauth_state",
+    "INSERT INTO oauth_states (state) VALUES (%(state)s);",
+)
+
+
+@instrumented("save_oauth_state")
+def save_oauth_state(
+    state: str,
+    ttl_seconds: int,
+):
+    """Save a pending state of the Spotify authorization flow.
+
+    The states older than ``ttl_seconds`` are purged at the same time.
+
+    Parameters
+    ----------
+    state : str
+        The random state sent to the Spotify Authorization URL.
+    ttl_seconds : int
+        The number of seconds a state remains valid.
+    """
+    with open_cursor() as (connection, cursor):
+        PURGE_OAUTH_STATES.execute(cursor, {"ttl": ttl_seconds})
+        SAVE_OAUTH_STATE.execute(cursor, {"state": state})
+        connection.commit()
+
+
+CONSUME_OAUTH_STATE = Statement(
+    "consume_oauth_state",
+    "DELETE FROM oauth_states WHERE state = %(state)s "
+    "AND created_at >= CURRENT_TIMESTAMP - make_interval(secs => %(ttl)s) "
+    "RETURNING state;",
+)
+
+
+@instrumented("consume_oauth_state")
+def consume_oauth_state(
+    state: str,
+    ttl_seconds: int,
+) -> bool:
+    """Check that a state is pending and remove it, so it can only be used once.
+
+    Parameters
+    ----------
+    state : str
+        The state returned by Spotify.
+    ttl_seconds : int
+        The number of seconds a state remains valid.
+
+    Returns
+    -------
+    bool
+        True if the state was pending and has not expired, False otherwise.
+    """
+    with open_cursor() as (connection, cursor):
+        CONSUME_OAUTH_STATE.execute(cursor, {"state": state, "ttl": ttl_seconds})
+        is_valid = cursor.fetchone() is not None
+        connection.commit()
+    return is_valid
+
+
+SAVE_SPOTIFY_TOKENS = Statement(
+    "save_spotify_tokens",
+    "INSERT INTO spotify_tokens "
+    "(id, access_token, refresh_token, token_expiration_date) "
+    "VALUES (1, %(access_token)s, %(refresh_token)s, "
+    "%(token_expiration_date)s) "
+    "ON CONFLICT (id) DO UPDATE SET "
+    "access_token = EXCLUDED.access_token, "
+    "refresh_token = COALESCE("
+    "EXCLUDED.refresh_token, spotify_tokens.refresh_token), "
+    "token_expiration_date = EXCLUDED.token_expiration_date, "
+    "updated_at = CURRENT_TIMESTAMP;",
+)
+
+
+@instrumented("save_spotify_tokens")
+def save_spotify_tokens(
+    access_token: str,
+    refresh_token: str,
+    token_expiration_date: datetime,
+):
+    """Save the Spotify tokens of the application.
+
+    Parameters
+    ----------
+    access_token : str
+        The access token for the Spotify API.
+    refresh_token : str
+        The refresh token for the Spotify API. If None, the saved one is kept
+        (Spotify does not always return a new refresh token).
+    token_expiration_date : datetime
+        The expiration date of the access token.
+    """
+    with open_cursor() as (connection, cursor):
+        SAVE_SPOTIFY_TOKENS.execute(
+            cursor,
+            {
+                "access_token": access_token,
+                "refresh_token": refresh_token,
+                "token_expiration_date": token_expiration_date,
+            },
+        )
+        connection.commit()
+
+
+GET_SPOTIFY_TOKENS = Statement(
+    "get_spotify_tokens",
+    "SELECT access_token, refresh_token, token_expiration_date "
+    "FROM spotify_tokens WHERE id = 1;",
+)
+
+
+@instrumented("get_spotify_tokens")
+def get_spotify_tokens():
+    """Get the Spotify tokens of the application.
+
+    Returns
+    -------
+    dict
+        The access token, refresh token and token expiration date, or None if no
+        token has been saved yet.
+    """
+    with open_cursor(cursor_factory=RealDictCursor) as (connection, cursor):
+        GET_SPOTIFY_TOKENS.execute(cursor)
+        tokens = cursor.fetchone()
+    return tokens
+
+
+USE_REFRESH_TOKEN = Statement(
+    "use_refresh_token",
+    "INSERT INTO used_refresh_tokens (token_id, expires_at) "
+    "VALUES (%(token_id)s, %(expires_at)s) "
+    "ON CONFLICT (token_id) DO NOTHING RETURNING token_id;",
+)
+PURGE_USED_REFRESH_TOKENS = Statement(
+    "purge_used_refresh_tokens",
+    "DELETE FROM used_refresh_tokens "
+    "WHERE expires_at < EXTRACT(EPOCH FROM CURRENT_TIMESTAMP);",
+)
+
+
+@instrumented("use_refresh_token")
+def use_refresh_token(
+    token_id: str,
+    expires_at: int,
+) -> bool:
+    """Mark a refresh token as used, so it can only be exchanged once.
+
+    The used tokens that have expired are purged at the same time.
+
+    Parameters
+    ----------
+    token_id : str
+        The ID of the refresh token (its ``jti`` claim).
+    expires_at : int
+        The expiration of the refresh token (Unix time).
+
+    Returns
+    -------
+    bool
+        True if the token had not been used yet, False otherwise.
+    """
+    with open_cursor() as (connection, cursor):
+        PURGE_USED_REFRESH_TOKENS.execute(cursor)
+        USE_REFRESH_TOKEN.execute(
+            cursor, {"token_id": token_id, "expires_at": expires_at}
+        )
+        is_first_use = cursor.fetchone() is not None
+        connection.commit()
+    return is_first_use
+
+
+REVOKE_SESSION = Statement(
+    "revoke_session",
+    "INSERT INTO revoked_sessions (session_id, expires_at) "
+    "VALUES (%(session_id)s, %(expires_at)s) "
+    "ON CONFLICT (session_id) DO UPDATE SET "
+    "expires_at = GREATEST(revoked_sessions.expires_at, EXCLUDED.expires_at);",
+)
+PURGE_REVOKED_SESSIONS = Statement(
+    "purge_revoked_sessions",
+    "DELETE FROM revoked_sessions "
+    "WHERE expires_at < EXTRACT(EPOCH FROM CURRENT_TIMESTAMP);",
+)
+
+
+@instrumented("revoke_session")
+def revoke_session(
+    session_id: str,
+    expires_at: int,
+):
+    """Revoke a session of a quizzify user.
+
+    The revoked sessions that have expired are purged at the same time.
+
+    Parameters
+    ----------
+    session_id : str
+        The ID of the session (the ``sid`` claim of its tokens).
+    expires_at : int
+        When all the tokens of the session have expired (Unix time).
+    """
+    with open_cursor() as (connection, cursor):
+        PURGE_REVOKED_SESSIONS.execute(cursor)
+        REVOKE_SESSION.execute(
+            cursor, {"session_id": session_id, "expires_at": expires_at}
+        )
+        connection.commit()
+
+
+GET_REVOKED_SESSIONS = Statement(
+    "get_revoked_sessions",
+    "SELECT session_id, expires_at FROM revoked_sessions "
+    "WHERE expires_at >= EXTRACT(EPOCH FROM CURRENT_TIMESTAMP);",
+)
+
+
+@instrumented("get_revoked_sessions")
+def get_revoked_sessions() -> list:
+    """Get the revoked sessions whose tokens have not all expired yet.
+
+    Returns
+    -------
+    list
+        The ID and the expiration (Unix time) of each revoked session.
+    """
+    with open_cursor() as (connection, cursor):
+        GET_REVOKED_SESSIONS.execute(cursor)
+        sessions = cursor.fetchall()
+    return sessions
+
+
+@instrumented("get_names_sample")
+def get_names_sample(
+    table: str,
+    size: int,
+) -> list:
+    """Get the distinct names of a random sample of a catalog table.
+
+    Parameters
+    ----------
+    table : str
+        The name of the catalog table, one of ``CATALOG_COLUMNS``.
+    size : int
+        The number of rows sampled.
+
+    Returns
+    -------
+    list
+        The names of the sampled rows, without duplicates.
+
+    Raises
+    ------
+    ValueError
+        If the table is not a catalog table.
+    """
+    if table not in CATALOG_COLUMNS:
+        raise ValueError(f"Unknown catalog table: {table}")
+    with open_cursor(readonly=True) as (connection, cursor):
+        # the table name comes from CATALOG_COLUMNS, not from the user
+        cursor.execute(
+            query=(
+                f"SELECT DISTINCT name FROM (SELECT name FROM {table} "  # nosec B608
+                "WHERE name IS NOT NULL ORDER BY random() LIMIT %(size)s) AS sample;"
+            ),
+            vars={"size": size},
+        )
+        names = cursor.fetchall()
+    return flatten_list(names)
+
+
+@instrumented("iter_question_sources")
+def iter_question_sources(
+    question_type: str,
+    only_new: bool = True,
+    itersize: int = STREAM_ITERSIZE,
+):
+    """Stream the catalog rows a type of question is built from.
+
+    Parameters
+    ----------
+    question_type : str
+        The type of question, one of ``QUESTION_SOURCES``.
+    only_new : bool
+        Whether to skip the subjects that already have a question of this type in
+        the question bank.
+    itersize : int
+        The number of rows fetched from the server at each round trip.
+
+    Yields
+    ------
+    dict
+        The rows, one at a time.
+
+    Raises
+    ------
+    ValueError
+        If the type of question is unknown.
+    """
+    if question_type not in QUESTION_SOURCES:
+        raise ValueError(f"Unknown question type: {question_type}")
+    query = QUESTION_SOURCES[question_type]
+    if only_new:
+        # anti-join on the unique index of the question bank
+        query += (
+            " AND NOT EXISTS (SELECT 1 FROM question_bank q "
+            f"WHERE q.question_type = '{question_type}' AND q.subject_id = s.id)"
+        )
+    yield from stream_rows(
+        query=query + ";",
+        cursor_name=f"iter_{question_type}_sources",
+        cursor_factory=RealDictCursor,
+        itersize=itersize,
+    )
+
+
+@instrumented("iter_question_subjects")
+def iter_question_subjects(
+    question_type: str,
+    itersize: int = STREAM_ITERSIZE,
+):
+    """Stream the subjects that have a question of a type in the question bank.
+
+    Parameters
+    ----------
+    question_type : str
+        The type of question, one of ``QUESTION_SOURCES`` or
+        ``GRAPH_QUESTION_TYPES``.
+    itersize : int
+        The number of IDs fetched from the server at each round trip.
+
+    Yields
+    ------
+    str
+        The IDs of the subjects, one at a time.
+
+    Raises
+    ------
+    ValueError
+        If the type of question is unknown.
+    """
+    if question_type not in (*QUESTION_SOURCES, *GRAPH_QUESTION_TYPES):
+        raise ValueError(f"Unknown question type: {question_type}")
+    # the type of question is one of the known types, not user input
+    for (subject_id,) in stream_rows(
+        query=(
+            "SELECT subject_id FROM question_bank "  # nosec B608
+            f"WHERE question_type = '{question_type}';"
+        ),
+        cursor_name=f"iter_{question_type}_subjects",
+        itersize=itersize,
+    ):
+        yield subject_id
+
+
+@instrumented("save_questions")
+def save_questions(
+    questions: Iterable[tuple],
+    replace: bool = False,
+    batch_size: int = QUESTION_BATCH_SIZE,
+) -> int:
+    """Save questions into the question bank, in a single transaction.
+
+    The questions are copied by batches into a temporary table, then inserted
+    into the question bank, skipping the subjects that already have a question
+    of the same type. Until the transaction is committed, the quizzes keep
+    sampling the previous questions.
+
+    A rebuild (``replace``) updates the questions of the subjects already in the
+    bank in place instead, then deletes the questions that were not generated
+    again: the IDs of the questions are kept, and with them their ratings and the
+    references of the answer history.
+
+    The questions are then numbered again (``RANK_QUESTIONS``) if any was added
+    or deleted, for the random sampling.
+
+    Parameters
+    ----------
+    questions : Iterable[tuple]
+        The questions, as (question_type, subject_id, question, answer, choices)
+        tuples.
+    replace : bool
+        Whether to replace the questions already in the bank.
+    batch_size : int
+        The number of questions copied at once.
+
+    Returns
+    -------
+    int
+        The number of questions inserted.
+    """
+    connection = connect_to_db()
+    cursor = connection.cursor()
+    inserted = 0
+    conflict = (
+        "DO UPDATE SET question = EXCLUDED.question, answer = EXCLUDED.answer, "
+        "choices = EXCLUDED.choices "
+        "WHERE (current.question, current.answer, current.choices) "
+        "IS DISTINCT FROM (EXCLUDED.question, EXCLUDED.answer, EXCLUDED.choices)"
+        if replace
+        else "DO NOTHING"
+    )
+    try:
+        cursor.execute(
+            query=(
+                "CREATE TEMPORARY TABLE question_bank_staging "
+                "(question_type VARCHAR(30), subject_id VARCHAR(50), "
+                "question VARCHAR(300), answer VARCHAR(100), choices JSONB) "
+                "ON COMMIT DROP;"
+            )
+        )
+        if replace:
+            # the questions generated again, the others are deleted at the end
+            cursor.execute(
+                query=(
+                    "CREATE TEMPORARY TABLE question_bank_kept "
+                    "(question_type VARCHAR(30), subject_id VARCHAR(50)) "
+                    "ON COMMIT DROP;"
+                )
+            )
+        questions = iter(questions)
+        while batch := list(itertools.islice(questions, batch_size)):
+            buffer = io.StringIO()
+            writer = csv.writer(buffer, lineterminator="\n")
+            for question_type, subject_id, question, answer, choices in batch:
+                writer.writerow(
+                    (question_type, subject_id, question, answer, json.dumps(choices))
+                )
+            buffer.seek(0)
+            cursor.copy_expert(
+                "COPY question_bank_staging FROM STDIN WITH (FORMAT csv);", buffer
+            )
+            cursor.execute(
+                query=(
+                    "WITH written AS ("
+                    "INSERT INTO question_bank AS current "
+                    "(question_type, subject_id, question, answer, choices) "
+                    "SELECT question_type, subject_id, question, answer, choices "
+                    "FROM question_bank_staging "
+                    f"ON CONFLICT (question_type, subject_id) {conflict} "
+                    # xmax is only set on the row versions written by an update
+                    "RETURNING (xmax = 0) AS inserted"
+                    ") SELECT count(*) FILTER (WHERE inserted) FROM written;"
+                )
+            )
+            inserted += cursor.fetchone()[0]
+            if replace:
+                cursor.execute(
+                    query=(
+                        "INSERT INTO question_bank_kept "
+                        "SELECT question_type, subject_id FROM question_bank_staging;"
+                    )
+                )
+            cursor.execute(query="TRUNCATE question_bank_staging;")
+        if replace:
+            cursor.execute(query="ANALYZE question_bank_kept;")
+            cursor.execute(
+                query=(
+                    "DELETE FROM question_bank q WHERE NOT EXISTS ("
+                    "SELECT 1 FROM question_bank_kept k "
+                    "WHERE k.question_type = q.question_type "
+                    "AND k.subject_id = q.subject_id);"
+                )
+            )
+            deleted = cursor.rowcount
+        else:
+            deleted = 0
+        if inserted or deleted:
+            cursor.execute(query=RANK_QUESTIONS)
+        connection.commit()
+    except BaseException:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+        connection.close()
+    return inserted
+
+
+# number the questions from 1 in the bank and in their type, only rewriting the
+# rows whose rank changed (the new questions, and the ones after a deleted one)
+RANK_QUESTIONS = (
+    "UPDATE question_bank q SET bank_rank = r.bank_rank, type_rank = r.type_rank "
+    "FROM (SELECT id, row_number() OVER (ORDER BY id) AS bank_rank, "
+    "row_number() OVER (PARTITION BY question_type ORDER BY id) AS type_rank "
+    "FROM question_bank) r "
+    "WHERE q.id = r.id AND (q.bank_rank, q.type_rank) "
+    "IS DISTINCT FROM (r.bank_rank, r.type_rank);"
+)
+
+
+def random_question_query(
+    rank: str,
+    type_filter: str,
+) -> str:
+    """Build the query drawing a random question, by rank, with a type filter."""
+    return (
+        "SELECT id, question_type, question, answer, choices FROM question_bank "
+        f"WHERE {type_filter}{rank} >= ("  # nosec B608
+        f"SELECT 1 + floor(random() * max({rank}))::int "
+        f"FROM question_bank WHERE {type_filter}TRUE) "
+        f"ORDER BY {rank} LIMIT 1;"
+    )
+
+
+GET_RANDOM_QUESTION = Statement(
+    "get_random_question", random_question_query("bank_rank", "")
+)
+GET_RANDOM_QUESTION_OF_TYPE = Statement(
+    "get_random_question_of_type",
+    random_question_query("type_rank", "question_type = %(type)s AND "),
+)
+
+
+@instrumented("get_random_question")
+def get_random_question(
+    question_type: Optional[str] = None,
+):
+    """Get a random question from the question bank.
+
+    A random rank is drawn between 1 and the number of questions (of the type),
+    then the question of this rank is read: both are index lookups, whatever the
+    size of the bank. The ranks are dense, unlike the IDs (the questions of the
+    types are interleaved, and the deleted ones leave gaps), so every question is
+    as likely to be drawn.
+
+    Parameters
+    ----------
+    question_type : str, optional
+        The type of question (any type by default).
+
+    Returns
+    -------
+    dict
+        A random question, or None if the question bank has no question of this
+        type.
+    """
+    with open_cursor(readonly=True, cursor_factory=RealDictCursor) as (
+        connection,
+        cursor,
+    ):
+        if question_type is None:
+            GET_RANDOM_QUESTION.execute(cursor)
+        else:
+            GET_RANDOM_QUESTION_OF_TYPE.execute(cursor, {"type": question_type})
+        question = cursor.fetchone()
+    return question
+
+
+GET_QUESTION = Statement(
+    "get_question",
+    "SELECT id, question_type, question, answer, choices FROM question_bank "
+    "WHERE id = %(question_id)s;",
+)
+
+
+@instrumented("get_question")
+def get_question(
+    question_id: int,
+):
+    """Get a question of the question bank by its ID.
+
+    Parameters
+    ----------
+    question_id : int
+        The ID of the question.
+
+    Returns
+    -------
+    dict
+        The question, or None if there is no question with this ID.
+    """
+    with open_cursor(readonly=True, cursor_factory=RealDictCursor) as (
+        connection,
+        cursor,
+    ):
+        GET_QUESTION.execute(cursor, {"question_id": question_id})
+        question = cursor.fetchone()
+    return question
+
+
+SAVE_LISTENING_POOLS = Statement(
+    "save_listening_pools",
+    "INSERT INTO listening_pools (username, artists, tracks, albums) "
+    "VALUES (%(username)s, %(artists)s, %(tracks)s, %(albums)s) "
+    "ON CONFLICT (username) DO UPDATE SET "
+    "artists = EXCLUDED.artists, tracks = EXCLUDED.tracks, "
+    "albums = EXCLUDED.albums, fetched_at = CURRENT_TIMESTAMP;",
+)
+
+
+@instrumented("save_listening_pools")
+def save_listening_pools(
+    username: str,
+    artists: list,
+    tracks: list,
+    albums: list,
+):
+    """Save the candidates of the personal quizzes of a user.
+
+    Parameters
+    ----------
+    username : str
+        The username of the user.
+    artists : list
+        The names of the artists.
+    tracks : list
+        The tracks, as [id, name, artist name, album name, duration in ms] lists.
+    albums : list
+        The albums, as [id, name, artist name, release year] lists.
+    """
+    with open_cursor() as (connection, cursor):
+        SAVE_LISTENING_POOLS.execute(
+            cursor,
+            {
+                "username": username,
+                "artists": json.dumps(artists),
+                "tracks": json.dumps(tracks),
+                "albums": json.dumps(albums),
+            },
+        )
+        connection.commit()
+
+
+GET_LISTENING_POOLS = Statement(
+    "get_listening_pools",
+    "SELECT artists, tracks, albums, fetched_at FROM listening_pools "
+    "WHERE username = %(username)s;",
+)
+
+
+@instrumented("get_listening_pools")
+def get_listening_pools(
+    username: str,
+):
+    """Get the candidates of the personal quizzes of a user.
+
+    Parameters
+    ----------
+    username : str
+        The username of the user.
+
+    Returns
+    -------
+    dict
+        The artists, tracks and albums of the user and the date they were fetched
+        at, or None if they have never been fetched.
+    """
+    with open_cursor(readonly=True, cursor_factory=RealDictCursor) as (
+        connection,
+        cursor,
+    ):
+        GET_LISTENING_POOLS.execute(cursor, {"username": username})
+        pools = cursor.fetchone()
+    return pools
+
+
+@instrumented("get_recent_listening_pools")
+def get_recent_listening_pools(
+    limit: int,
+):
+    """Get the candidates of the personal quizzes of the most recent users.
+
+    Parameters
+    ----------
+    limit : int
+        The number of users.
+
+    Returns
+    -------
+    list
+        The username, artists, tracks and albums of the users and the date they
+        were fetched at, the most recently fetched first.
+    """
+    with open_cursor(readonly=True, cursor_factory=RealDictCursor) as (
+        connection,
+        cursor,
+    ):
+        cursor.execute(
+            query=(
+                "SELECT username, artists, tracks, albums, fetched_at "
+                "FROM listening_pools ORDER BY fetched_at DESC LIMIT %(limit)s;"
+            ),
+            vars={"limit": limit},
+        )
+        pools = cursor.fetchall()
+    return pools
+
+
+RECORD_ANSWER = Statement(
+    "record_answer",
+    "WITH question AS ("
+    "SELECT q.id, q.question_type, q.answer, "
+    "COALESCE(songs.artist_id, albums.artist_id) AS artist_id, "
+    "ratings.rating AS question_rating, ratings.answered AS question_answered "
+    "FROM question_bank q "
+    "LEFT JOIN songs ON songs.id = q.subject_id "
+    "LEFT JOIN albums ON albums.id = q.subject_id "
+    "LEFT JOIN question_ratings ratings ON ratings.question_id = q.id "
+    "WHERE q.id = %(question_id)s "
+    "AND EXISTS (SELECT 1 FROM users WHERE username = %(username)s)"
+    "), answer AS ("
+    "INSERT INTO answer_history "
+    "(username, question_id, question_type, artist_id, choice, correct) "
+    "SELECT %(username)s, id, question_type, artist_id, %(choice)s::varchar, "
+    "answer = %(choice)s::varchar FROM question "
+    "RETURNING answered_at, question_type, artist_id, correct::int AS correct"
+    "), by_type AS ("
+    "INSERT INTO user_answer_stats "
+    "(username, question_type, answered, correct, last_answered_at) "
+    "SELECT %(username)s, question_type, 1, correct, answered_at FROM answer "
+    "ON CONFLICT (username, question_type) DO UPDATE SET "
+    "answered = user_answer_stats.answered + 1, "
+    "correct = user_answer_stats.correct + EXCLUDED.correct, "
+    "last_answered_at = EXCLUDED.last_answered_at"
+    "), by_user_artist AS ("
+    "INSERT INTO user_artist_stats "
+    "(username, artist_id, answered, correct, last_answered_at) "
+    "SELECT %(username)s, artist_id, 1, correct, answered_at FROM answer "
+    "WHERE artist_id IS NOT NULL "
+    "ON CONFLICT (username, artist_id) DO UPDATE SET "
+    "answered = user_artist_stats.answered + 1, "
+    "correct = user_artist_stats.correct + EXCLUDED.correct, "
+    "last_answered_at = EXCLUDED.last_answered_at"
+    "), by_artist AS ("
+    "INSERT INTO artist_answer_stats (artist_id, answered, correct, last_answered_at) "
+    "SELECT artist_id, 1, correct, answered_at FROM answer "
+    "WHERE artist_id IS NOT NULL "
+    "ON CONFLICT (artist_id) DO UPDATE SET "
+    "answered = artist_answer_stats.answered + 1, "
+    "correct = artist_answer_stats.correct + EXCLUDED.correct, "
+    "last_answered_at = EXCLUDED.last_answered_at"
+    ") "
+    "SELECT question.answer, answer.correct::bool AS correct, "
+    "question.question_rating, question.question_answered, "
+    "user_ratings.rating AS user_rating, user_ratings.answered AS user_answered "
+    "FROM question CROSS JOIN answer "
+    "LEFT JOIN user_ratings ON user_ratings.username = %(username)s;",
+)
+
+
+@instrumented("record_answer")
+def record_answer(
+    username: str,
+    question_id: int,
+    choice: str,
+):
+    """Record the answer of a user to a question of the question bank.
+
+    The answer is appended to the history and added to the statistics of the user
+    (per type of question and per artist) and of the artist, in one statement. The
+    ratings of the question and of the user are read in the same statement, for
+    the update of the ratings in memory (``quizzify.databases.ratings``).
+
+    Parameters
+    ----------
+    username : str
+        The username of the user.
+    question_id : int
+        The ID of the question in the question bank.
+    choice : str
+        The choice of the user.
+
+    Returns
+    -------
+    dict
+        The right answer and whether the choice is right, with the rating of the
+        question and of the user and their number of answers (None if they were
+        never rated), or None if the question or the user does not exist.
+    """
+    with open_cursor(cursor_factory=RealDictCursor) as (connection, cursor):
+        RECORD_ANSWER.execute(
+            cursor, {"username": username, "question_id": question_id, "choice": choice}
+        )
+        result = cursor.fetchone()
+        connection.commit()
+    return result
+
+
+SAVE_QUESTION_RATINGS = Statement(
+    "save_question_ratings",
+    "INSERT INTO question_ratings (question_id, rating, answered, correct) "
+    "SELECT d.question_id, %(initial)s + d.delta, d.answered, d.correct "
+    "FROM unnest(%(question_ids)s::bigint[], %(deltas)s::real[], "
+    "%(answered)s::int[], %(correct)s::int[]) "
+    "AS d(question_id, delta, answered, correct) "
+    # the questions removed from the bank since their answers are skipped
+    "WHERE EXISTS (SELECT 1 FROM question_bank WHERE id = d.question_id) "
+    "ON CONFLICT (question_id) DO UPDATE SET "
+    "rating = question_ratings.rating + EXCLUDED.rating - %(initial)s, "
+    "answered = question_ratings.answered + EXCLUDED.answered, "
+    "correct = question_ratings.correct + EXCLUDED.correct;",
+)
+SAVE_USER_RATINGS = Statement(
+    "save_user_ratings",
+    "INSERT INTO user_ratings (username, rating, answered) "
+    "SELECT d.username, %(initial)s + d.delta, d.answered "
+    "FROM unnest(%(usernames)s::varchar[], %(deltas)s::real[], %(answered)s::int[]) "
+    "AS d(username, delta, answered) "
+    "WHERE EXISTS (SELECT 1 FROM users WHERE username = d.username) "
+    "ON CONFLICT (username) DO UPDATE SET "
+    "rating = user_ratings.rating + EXCLUDED.rating - %(initial)s, "
+    "answered = user_ratings.answered + EXCLUDED.answered "
+    "RETURNING username, rating, answered;",
+)
+
+
+@instrumented("save_ratings")
+def save_ratings(
+    questions: Sequence[Tuple[int, float, int, int]],
+    users: Sequence[Tuple[str, float, int]],
+    initial_rating: float,
+) -> Sequence[Tuple[str, float, int]]:
+    """Add the changes of the ratings of questions and users, in one transaction.
+
+    The changes are added to the stored ratings rather than overwriting them, so
+    the workers flushing the changes of their answers do not lose each other's.
+    The rows are locked in the order given: sort them to avoid deadlocks between
+    workers.
+
+    Parameters
+    ----------
+    questions : Sequence[Tuple[int, float, int, int]]
+        The ID of each question, the change of its rating, and the number of
+        answers and of right answers since the last flush.
+    users : Sequence[Tuple[str, float, int]]
+        The username of each user, the change of its rating, and the number of
+        answers since the last flush.
+    initial_rating : float
+        The rating of the questions and users rated for the first time, before
+        their change.
+
+    Returns
+    -------
+    Sequence[Tuple[str, float, int]]
+        The rating and number of answers of the users, once updated.
+    """
+    connection = connect_to_db()
+    cursor = connection.cursor()
+    try:
+        if questions:
+            question_ids, deltas, answered, correct = zip(*questions)
+            SAVE_QUESTION_RATINGS.execute(
+                cursor,
+                {
+                    "initial": initial_rating,
+                    "question_ids": list(question_ids),
+                    "deltas": list(deltas),
+                    "answered": list(answered),
+                    "correct": list(correct),
+                },
+            )
+        ratings = []
+        if users:
+            usernames, deltas, answered = zip(*users)
+            SAVE_USER_RATINGS.execute(
+                cursor,
+                {
+                    "initial": initial_rating,
+                    "usernames": list(usernames),
+                    "deltas": list(deltas),
+                    "answered": list(answered),
+                },
+            )
+            ratings = cursor.fetchall()
+        connection.commit()
+    except BaseException:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+        connection.close()
+    return ratings
+
+
+GET_USER_RATING = Statement(
+    "get_user_rating",
+    "SELECT rating, answered FROM user_ratings WHERE username = %(username)s;",
+)
+
+
+@instrumented("get_user_rating")
+def get_user_rating(
+    username: str,
+) -> Optional[Tuple[float, int]]:
+    """Get the rating of the skill of a user.
+
+    Parameters
+    ----------
+    username : str
+        The username of the user.
+
+    Returns
+    -------
+    Tuple[float, int]
+        The rating of the user and its number of answers, or None if the user was
+        never rated.
+    """
+    with open_cursor(readonly=True) as (connection, cursor):
+        GET_USER_RATING.execute(cursor, {"username": username})
+        rating = cursor.fetchone()
+    return rating
+
+
+@instrumented("iter_question_ratings")
+def iter_question_ratings(
+    itersize: int = STREAM_ITERSIZE,
+):
+    """Stream the ratings of the questions of the question bank.
+
+    Parameters
+    ----------
+    itersize : int
+        The number of ratings fetched from the server at each round trip.
+
+    Yields
+    ------
+    tuple
+        The ID, type, rating and number of answers of each rated question.
+    """
+    yield from stream_rows(
+        query=(
+            "SELECT r.question_id, q.question_type, r.rating, r.answered "
+            "FROM question_ratings r JOIN question_bank q ON q.id = r.question_id;"
+        ),
+        cursor_name="iter_question_ratings",
+        itersize=itersize,
+    )
+
+
+GET_USER_ANSWER_STATS = Statement(
+    "get_user_answer_stats",
+    "SELECT question_type, answered, correct, last_answered_at "
+    "FROM user_answer_stats WHERE username = %(username)s ORDER BY question_type;",
+)
+GET_USER_ARTIST_STATS = Statement(
+    "get_user_artist_stats",
+    "SELECT stats.artist_id, artists.name AS artist_name, stats.answered, "
+    "stats.correct FROM user_artist_stats stats "
+    "LEFT JOIN artists ON artists.id = stats.artist_id "
+    "WHERE stats.username = %(username)s "
+    "ORDER BY stats.answered DESC, stats.artist_id LIMIT %(limit)s;",
+)
+
+
+@instrumented("get_user_answer_stats")
+def get_user_answer_stats(
+    username: str,
+    artists_limit: int,
+):
+    """Get the statistics of the answers of a user, from the rollups.
+
+    Parameters
+    ----------
+    username : str
+        The username of the user.
+    artists_limit : int
+        The number of artists returned, the most answered about first.
+
+    Returns
+    -------
+    dict
+        The statistics per type of question (``types``) and per artist
+        (``artists``), empty if the user has never answered.
+    """
+    with open_cursor(readonly=True, cursor_factory=RealDictCursor) as (
+        connection,
+        cursor,
+    ):
+        GET_USER_ANSWER_STATS.execute(cursor, {"username": username})
+        types = cursor.fetchall()
+        GET_USER_ARTIST_STATS.execute(
+            cursor, {"username": username, "limit": artists_limit}
+        )
+        artists = cursor.fetchall()
+    return {"types": types, "artists": artists}
+
+
+GET_ARTIST_ANSWER_STATS = Statement(
+    "get_artist_answer_stats",
+    "SELECT stats.artist_id, artists.name AS artist_name, stats.answered, "
+    "stats.correct FROM artist_answer_stats stats "
+    "LEFT JOIN artists ON artists.id = stats.artist_id "
+    "WHERE stats.artist_id = %(artist_id)s;",
+)
+
+
+@instrumented("get_artist_answer_stats")
+def get_artist_answer_stats(
+    artist_id: str,
+):
+    """Get the statistics of the answers about an artist, from the rollups.
+
+    Parameters
+    ----------
+    artist_id : str
+        The ID of the artist.
+
+    Returns
+    -------
+    dict
+        The statistics of the artist, or None if no question about this artist
+        has been answered.
+    """
+    with open_cursor(readonly=True, cursor_factory=RealDictCursor) as (
+        connection,
+        cursor,
+    ):
+        GET_ARTIST_ANSWER_STATS.execute(cursor, {"artist_id": artist_id})
+        stats = cursor.fetchone()
+    return stats
+
+
+def search_query(
+    table: str,
+    after: bool,
+) -> str:
+    """Build the query searching a catalog table by name.
+
+    The candidates match the words of the search (or their prefixes) or are
+    similar to it (trigrams), both found with the GIN indexes of ``init.sql``.
+    They are ranked by score, then ID, and the next pages start after the last
+    (score, ID) pair instead of skipping rows with ``OFFSET``.
+    """
+    keyset = "WHERE score < %(score)s OR (score = %(score)s AND id > %(id)s) "
+    # the table name comes from SEARCH_TABLES, not from the user
+    return (
+        "SELECT id, name, popularity, score FROM ("
+        "SELECT id, name, popularity, round((("
+        "ts_rank(to_tsvector('simple', name), to_tsquery('simple', %(words)s), 32) "
+        "+ similarity(name, %(text)s)) "
+        f"* (1 + {SEARCH_POPULARITY_WEIGHT} * coalesce(popularity, 0) / 100.0)"
+        ")::numeric, 6) AS score "
+        f"FROM {table} "  # nosec B608
+        "WHERE to_tsvector('simple', name) @@ to_tsquery('simple', %(words)s) "
+        "OR name %% %(text)s"
+        f") candidates {keyset if after else ''}"
+        "ORDER BY score DESC, id LIMIT %(limit)s;"
+    )
+
+
+SEARCHES = {
+    (table, after): Statement(
+        f"search_{table}_after" if after else f"search_{table}",
+        search_query(table, after),
+    )
+    for table in SEARCH_TABLES
+    for after in (False, True)
+}
+
+
+def prefix_tsquery(
+    text: str,
+) -> Optional[str]:
+    """Build a full-text query matching all the words of a text, or their prefixes.
+
+    Parameters
+    ----------
+    text : str
+        The text searched.
+
+    Returns
+    -------
+    str
+        The query, e.g. ``'summer':* & 'nig':*``, or None if the text has no word.
+    """
+    words = re.findall(r"\w+", text.lower())
+    if not words:
+        return None
+    return " & ".join(f"'{word}':*" for word in words)
+
+
+@instrumented("search_catalog")
+def search_catalog(
+    table: str,
+    text: str,
+    limit: int,
+    after: Optional[Tuple[Decimal, str]] = None,
+):
+    """Search a catalog table by name, the most relevant and popular first.
+
+    Parameters
+    ----------
+    table : str
+        The name of the catalog table, one of ``SEARCH_TABLES``.
+    text : str
+        The text searched, with at least one word.
+    limit : int
+        The number of results.
+    after : tuple, optional
+        The score and ID of the last result of the previous page.
+
+    Returns
+    -------
+    list
+        The ID, name, popularity and score of the results.
+
+    Raises
+    ------
+    ValueError
+        If the table cannot be searched or the text has no word.
+    """
+    if table not in SEARCH_TABLES:
+        raise ValueError(f"Unknown catalog table: {table}")
+    words = prefix_tsquery(text)
+    if words is None:
+        raise ValueError("The text searched has no word.")
+    values = {"words": words, "text": text, "limit": limit}
+    if after is not None:
+        values["score"], values["id"] = after
+    with open_cursor(readonly=True, cursor_factory=RealDictCursor) as (
+        connection,
+        cursor,
+    ):
+        SEARCHES[table, after is not None].execute(cursor, values)
+        results = cursor.fetchall()
+    return results
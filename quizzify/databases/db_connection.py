@@ -1,31 +1,413 @@
-import os
+import itertools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional
 
 import psycopg2
-from dotenv import load_dotenv
+from psycopg2.extensions import connection as Connection
+from psycopg2.pool import PoolError, ThreadedConnectionPool
 
-load_dotenv()
+from quizzify.config import get_settings
+from quizzify.utils.metrics import (
+    DB_CONNECT_LATENCY,
+    DB_CONNECTIONS,
+    DB_POOL_IN_USE,
+    DB_POOL_WAIT_LATENCY,
+    DB_REPLICA_LAG,
+    DB_ROUTED_CONNECTIONS,
+)
 
-POSTGRES_USER = os.environ.get("POSTGRES_USER")
-POSTGRES_PASSWORD = os.environ.get("POSTGRES_PASSWORD")
-POSTGRES_HOST = os.environ.get("POSTGRES_HOST")
-POSTGRES_PORT = os.environ.get("POSTGRES_PORT")
-POSTGRES_DB = os.environ.get("POSTGRES_DB")
+logger = logging.getLogger(__name__)
 
+# replication lag of a replica, in seconds (0 when it has replayed all it received)
+REPLICA_LAG_QUERY = (
+    "SELECT CASE "
+    "WHEN NOT pg_is_in_recovery() THEN 0 "
+    "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE extract(epoch FROM now() - pg_last_xact_replay_timestamp()) END;"
+)
 
-def connect_to_db():
+
+class InstrumentedConnection(Connection):
+    """Connection to the database keeping the open connections gauge up to date.
+
+    A connection handed out by a ``ConnectionPool`` goes back to the pool when it
+    is closed, so the code using it does not change with the pool.
+
+    Attributes
+    ----------
+    pool : ConnectionPool, optional
+        The pool the connection goes back to when it is closed, if any.
+    prepared_statements : set
+        The names of the statements prepared on the connection.
+    """
+
+    pool: Optional["ConnectionPool"] = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared_statements: set = set()
+        # counted in the open connections gauge, until closed
+        self._counted = True
+
+    def close(self):
+        """Give the connection back to its pool, or close it."""
+        # detach first: the pool closes the connections it does not keep
+        pool, self.pool = self.pool, None
+        if pool is not None:
+            # a connection closed by the server goes back too, to free its slot
+            pool.putconn(self, close=bool(self.closed))
+            return
+        if self._counted:
+            self._counted = False
+            DB_CONNECTIONS.dec()
+        super().close()
+
+
+class ConnectionPool(ThreadedConnectionPool):
+    """Thread-safe pool of connections to the database.
+
+    Unlike ``ThreadedConnectionPool``, which raises an error as soon as all its
+    connections are used, a request for a connection waits up to ``timeout``
+    seconds for one to be given back.
+
+    Attributes
+    ----------
+    timeout : float
+        The number of seconds to wait for a free connection.
+    """
+
+    def __init__(
+        self,
+        minconn: int,
+        maxconn: int,
+        timeout: float,
+        **kwargs,
+    ):
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(maxconn)
+        super().__init__(
+            minconn, maxconn, connection_factory=InstrumentedConnection, **kwargs
+        )
+
+    def _connect(self, key=None):
+        """Open a new connection."""
+        with DB_CONNECT_LATENCY.time():
+            connection = super()._connect(key)
+        DB_CONNECTIONS.inc()
+        return connection
+
+    def getconn(self, key=None):
+        """Take a connection from the pool, waiting for a free one if needed.
+
+        Raises
+        ------
+        PoolError
+            If no connection was given back before the timeout.
+        """
+        with DB_POOL_WAIT_LATENCY.time():
+            if not self._slots.acquire(timeout=self.timeout):
+                raise PoolError("No connection available in the pool.")
+        try:
+            connection = super().getconn(key)
+            if connection.closed:
+                # the server closed the idle connection: open a new one
+                super().putconn(connection, close=True)
+                connection = super().getconn(key)
+        except BaseException:
+            self._slots.release()
+            raise
+        connection.pool = self
+        DB_POOL_IN_USE.inc()
+        return connection
+
+    def putconn(self, conn, key=None, close=False):
+        """Give a connection back to the pool (its transaction is rolled back)."""
+        try:
+            super().putconn(conn, key, close)
+        finally:
+            DB_POOL_IN_USE.dec()
+            self._slots.release()
+
+    def closeall(self):
+        """Close all the connections, including the ones in use."""
+        with self._lock:
+            for connection in self._used.values():
+                connection.pool = None
+        super().closeall()
+
+
+class Replica:
+    """A read replica of the database, with its own pool of connections.
+
+    The replication lag is measured at most every ``check_interval`` seconds, by
+    the thread asking for a connection (the other threads use the last
+    measure). A replica that cannot be reached, or lags behind by more than
+    ``max_lag`` seconds, is not used until the next measure.
+
+    Attributes
+    ----------
+    name : str
+        The address of the replica (``host:port``).
+    lag : float, optional
+        The last replication lag measured, or None if the replica was unreachable.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        max_lag: float,
+        check_interval: float,
+        **pool_kwargs,
+    ):
+        self.name = f"{host}:{port}"
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.lag: Optional[float] = None
+        self.pool: Optional[ConnectionPool] = None
+        self._pool_kwargs = dict(pool_kwargs, host=host, port=port)
+        self._checked_at = float("-inf")
+        self._check_lock = threading.Lock()
+        self._pool_lock = threading.Lock()
+
+    def _getconn(self):
+        """Take a connection from the pool of the replica, opening it if needed."""
+        if self.pool is None:
+            with self._pool_lock:
+                if self.pool is None:
+                    self.pool = ConnectionPool(**self._pool_kwargs)
+        return self.pool.getconn()
+
+    def check(self):
+        """Measure the replication lag of the replica."""
+        try:
+            connection = self._getconn()
+            try:
+                cursor = connection.cursor()
+                cursor.execute(REPLICA_LAG_QUERY)
+                lag = cursor.fetchone()[0]
+                cursor.close()
+            finally:
+                connection.close()
+        except (psycopg2.Error, PoolError) as error:
+            logger.warning("The replica %s is unreachable: %s", self.name, error)
+            # its idle connections are broken: open new ones once it is back
+            self.close()
+            lag = None
+        self.lag = None if lag is None else float(lag)
+        self._checked_at = time.monotonic()
+        DB_REPLICA_LAG.labels(self.name).set(
+            float("inf") if self.lag is None else self.lag
+        )
+
+    def is_usable(self) -> bool:
+        """Check whether the replica is reachable and up to date enough."""
+        if time.monotonic() - self._checked_at >= self.check_interval:
+            # a single thread measures the lag, the others use the last measure
+            if self._check_lock.acquire(blocking=False):
+                try:
+                    self.check()
+                finally:
+                    self._check_lock.release()
+        return self.lag is not None and self.lag <= self.max_lag
+
+    def connect(self):
+        """Take a connection to the replica, or return None if it is not usable."""
+        if not self.is_usable():
+            return None
+        try:
+            return self._getconn()
+        except (psycopg2.Error, PoolError) as error:
+            logger.warning("The replica %s is unreachable: %s", self.name, error)
+            self.lag = None
+            return None
+
+    def close(self):
+        """Close the connections to the replica."""
+        if self.pool is not None:
+            self.pool.closeall()
+            self.pool = None
+
+
+_pool: Optional[ConnectionPool] = None
+_replicas: List[Replica] = []
+_next_replica = itertools.count()
+_pool_lock = threading.Lock()
+
+
+class WriteMarker:
+    """Time until which the reads following a write go to the primary.
+
+    The marker is an object held by a context variable, rather than the time
+    itself: ``run_in_threadpool`` runs each call in a copy of the context of the
+    request, and the copies share the marker of the request, so the write of one
+    call is seen by the next ones.
+    """
+
+    __slots__ = ("primary_until",)
+
+    def __init__(self):
+        self.primary_until = 0.0
+
+
+# marker of the writes of the current request (or context, outside of a request)
+_write_marker: ContextVar[Optional[WriteMarker]] = ContextVar(
+    "write_marker", default=None
+)
+# whether the reads go to the primary, in a use_primary() block
+_use_primary: ContextVar[bool] = ContextVar("use_primary", default=False)
+
+
+def open_pool() -> ConnectionPool:
+    """Open the pool of connections of the process, if not open yet.
+
+    The pool is opened by the lifespan of the application, in each worker (never
+    before the workers are forked), or on the first connection otherwise. The
+    pools of the read replicas (``QUIZZIFY_DB_REPLICAS``) are opened on their
+    first use, so an unreachable replica does not prevent the worker to start.
+
+    Returns
+    -------
+    ConnectionPool
+        The pool of connections to the primary.
+    """
+    global _pool, _replicas
+    with _pool_lock:
+        if _pool is None:
+            settings = get_settings()
+            pool_kwargs = dict(
+                minconn=settings.db_pool_min_size,
+                maxconn=settings.db_pool_max_size,
+                timeout=settings.db_pool_timeout,
+                dbname=settings.postgres_db,
+                user=settings.postgres_user,
+                password=settings.postgres_password,
+            )
+            _pool = ConnectionPool(
+                host=settings.postgres_host,
+                port=settings.postgres_port,
+                **pool_kwargs,
+            )
+            _replicas = [
+                Replica(
+                    host,
+                    port,
+                    max_lag=settings.db_replica_max_lag,
+                    check_interval=settings.db_replica_check_interval,
+                    **pool_kwargs,
+                )
+                for host, port in settings.db_replicas
+            ]
+        return _pool
+
+
+def close_pool():
+    """Close the pools of connections of the process, if open."""
+    global _pool, _replicas
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+        for replica in _replicas:
+            replica.close()
+        _replicas = []
+
+
+@contextmanager
+def use_primary():
+    """Send the reads of the block to the primary, to read your own writes."""
+    token = _use_primary.set(True)
+    try:
+        yield
+    finally:
+        _use_primary.reset(token)
+
+
+@contextmanager
+def read_your_writes():
+    """Share the writes of the block with all the contexts copied from it.
+
+    Without it, a write is only seen by the reads of the context (or thread) it
+    was made in: not by the next ``run_in_threadpool`` call of a request.
+    """
+    token = _write_marker.set(WriteMarker())
+    try:
+        yield
+    finally:
+        _write_marker.reset(token)
+
+
+class ReadYourWritesMiddleware:
+    """ASGI middleware following the writes of each request across its threads.
+
+    The reads of a request after its writes go to the primary, whichever call of
+    ``run_in_threadpool`` made the write.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        """Forward the request to the application with its own write marker."""
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+        with read_your_writes():
+            await self.app(scope, receive, send)
+
+
+def connect_to_db(
+    readonly: bool = False,
+):
     """
     Connect to the PostgreSQL database.
 
+    The connection comes from the pool of the process: closing it gives it back
+    to the pool. Read-only connections go to the read replicas, in turn, unless
+    none is usable (unreachable or lagging behind), or the current request wrote
+    less than ``QUIZZIFY_DB_READ_YOUR_WRITES`` seconds ago, or is in a
+    ``use_primary()`` block: they go to the primary then. The writes of a request
+    are followed by ``ReadYourWritesMiddleware`` (or a ``read_your_writes()``
+    block); elsewhere, only by the context they were made in.
+
+    Parameters
+    ----------
+    readonly : bool
+        Whether the connection is only used to read.
+
     Returns
     -------
     connection : psycopg2.extensions.connection
         The connection to the PostgreSQL database.
     """
-    connection = psycopg2.connect(
-        dbname=POSTGRES_DB,
-        user=POSTGRES_USER,
-        password=POSTGRES_PASSWORD,
-        host=POSTGRES_HOST,
-        port=POSTGRES_PORT,
-    )
-    return connection
+    pool = _pool or open_pool()
+    marker = _write_marker.get()
+    if not readonly:
+        if marker is None:
+            marker = WriteMarker()
+            _write_marker.set(marker)
+        marker.primary_until = (
+            time.monotonic() + get_settings().db_read_your_writes_seconds
+        )
+        DB_ROUTED_CONNECTIONS.labels("primary").inc()
+        return pool.getconn()
+    if (
+        _replicas
+        and not _use_primary.get()
+        and (marker is None or time.monotonic() >= marker.primary_until)
+    ):
+        start = next(_next_replica)
+        for index in range(len(_replicas)):
+            replica = _replicas[(start + index) % len(_replicas)]
+            connection = replica.connect()
+            if connection is not None:
+                DB_ROUTED_CONNECTIONS.labels("replica").inc()
+                return connection
+        DB_ROUTED_CONNECTIONS.labels("replica_fallback").inc()
+    else:
+        DB_ROUTED_CONNECTIONS.labels("primary").inc()
+    return pool.getconn()
@@ -0,0 +1,136 @@
+"""Maintain the monthly partitions of the answer history.
+
+``answer_history`` is partitioned by month of ``answered_at``: a partition is
+created for the current month and the next ``PARTITIONS_AHEAD`` months, so the
+answers never wait for a partition, and the partitions older than
+``QUIZZIFY_HISTORY_RETENTION_MONTHS`` are dropped, which is instant whatever their
+size, unlike a ``DELETE``. The statistics are kept in the rollup tables, so they
+outlive the history they were computed from.
+
+The maintenance runs in the background jobs of the API; run it by hand when the
+scheduler is disabled.
+
+Usage::
+
+    python -m quizzify.databases.history
+"""
+
+import argparse
+import logging
+import re
+from datetime import date, datetime
+from typing import Optional, Tuple
+
+from quizzify.config import get_settings
+from quizzify.databases.db_connection import connect_to_db
+
+logger = logging.getLogger(__name__)
+
+# number of monthly partitions created ahead of the current month
+PARTITIONS_AHEAD = 2
+# name of a monthly partition, e.g. answer_history_y2026m10
+PARTITION_NAME = re.compile(r"^answer_history_y(\d{4})m(\d{2})$")
+
+
+def add_months(
+    month: date,
+    months: int,
+) -> date:
+    """Return the first day of the month ``months`` months after a month."""
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    """Return the name of the partition of a month."""
+    return f"answer_history_y{month.year:04d}m{month.month:02d}"
+
+
+def maintain_partitions(
+    now: Optional[datetime] = None,
+    retention_months: Optional[int] = None,
+) -> Tuple[list, list]:
+    """Create the upcoming partitions of the history and drop the expired ones.
+
+    The maintenance holds a transaction-level advisory lock, so that the workers
+    running it at the same time do not create the same partition twice.
+
+    Parameters
+    ----------
+    now : datetime, optional
+        The current date (now by default).
+    retention_months : int, optional
+        The number of past months kept besides the current one
+        (``QUIZZIFY_HISTORY_RETENTION_MONTHS`` by default).
+
+    Returns
+    -------
+    tuple
+        The names of the partitions created and of the partitions dropped.
+    """
+    now = now or datetime.now()
+    if retention_months is None:
+        retention_months = get_settings().history_retention_months
+    current = date(now.year, now.month, 1)
+    oldest = add_months(current, -retention_months)
+
+    connection = connect_to_db()
+    cursor = connection.cursor()
+    cursor.execute("SELECT pg_advisory_xact_lock(hashtext('quizzify.history'));")
+    cursor.execute(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE parent.relname = 'answer_history';"
+    )
+    existing = {row[0] for row in cursor.fetchall()}
+
+    created = []
+    for months in range(PARTITIONS_AHEAD + 1):
+        month = add_months(current, months)
+        name = partition_name(month)
+        if name in existing:
+            continue
+        # the names and bounds are built from dates, not from user input
+        cursor.execute(
+            f"CREATE TABLE {name} PARTITION OF answer_history "  # nosec B608
+            f"FOR VALUES FROM ('{month}') TO ('{add_months(month, 1)}');"
+        )
+        created.append(name)
+
+    dropped = []
+    for name in sorted(existing):
+        match = PARTITION_NAME.match(name)
+        if match and date(int(match[1]), int(match[2]), 1) < oldest:
+            cursor.execute(f"DROP TABLE {name};")
+            dropped.append(name)
+    connection.commit()
+    cursor.close()
+    connection.close()
+    if created or dropped:
+        logger.info(
+            "History partitions created: %s, dropped: %s.",
+            ", ".join(created) or "none",
+            ", ".join(dropped) or "none",
+        )
+    return created, dropped
+
+
+def main():
+    """Maintain the partitions of the history from the command line."""
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--retention-months",
+        type=int,
+        default=None,
+        help="past months kept (QUIZZIFY_HISTORY_RETENTION_MONTHS by default)",
+    )
+    args = parser.parse_args()
+
+    created, dropped = maintain_partitions(retention_months=args.retention_months)
+    logger.info("%d partitions created, %d dropped.", len(created), len(dropped))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,472 @@
+"""Import the tracks of a dataset dump into the catalog.
+
+Public datasets of Spotify tracks come as large CSV or JSON Lines files, one track
+per line, with the IDs and names of its album and artists. The importer reads the
+file by chunks of whole lines, parses and validates the records of each chunk into
+``Artist``, ``Album`` and ``Song`` rows in a pool of processes (the parsing is the
+costly part, so it scales with the number of cores), then loads the new rows with
+``COPY`` from the main process, one transaction per chunk, while the pool parses
+the next chunks.
+
+The rows whose IDs are already in the catalog are dropped by the workers, which
+check them against compact ``IdSet`` copies of the catalog IDs; the artists and
+albums repeated across the chunks are dropped by the main process. With
+``--refresh`` (e.g. a new dump of tracks already imported), the workers keep all
+the rows and hash their values instead: the rows whose hash differs from the one
+stored in the catalog are updated, the unchanged ones are skipped by the upsert
+(``crud.copy_catalog_rows``), and the numbers of rows inserted, updated, hashed
+(stored before the content hashes, so rewritten once) and unchanged are
+reported. The changes of the rows already in the catalog snapshot are only seen
+by the question bank after ``--full`` rebuilds.
+
+The position in the file of the last chunk loaded is saved in the
+``catalog_imports`` table in the same transaction as its rows: an interrupted
+import resumes from there (``--restart`` reads the file from the start again).
+
+The columns of the records are found by name (``FIELDS``); a record without an ID
+or name of the track, its album or its artist, or with an invalid value, is
+counted as rejected. The CSV records must not span several lines.
+
+Usage::
+
+    python -m quizzify.databases.importer tracks.csv [--workers 8] [--restart]
+        [--refresh]
+"""
+
+import argparse
+import ast
+import csv
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import re
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from quizzify.databases import crud
+from quizzify.utils.id_set import IdSet, decode_base62
+from quizzify.utils.schemas import Album, Artist, Song
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl", ".json": "jsonl"}
+# number of bytes read at once, rounded up to the end of a line
+CHUNK_BYTES = 8 * 1024**2
+# number of chunks parsed ahead of the one being loaded, per worker
+CHUNKS_AHEAD = 2
+# seconds between two progress reports
+PROGRESS_INTERVAL = 10.0
+# names of each field in the records, the first one found is read
+FIELDS = {
+    "id": ("id", "track_id"),
+    "name": ("name", "track_name"),
+    "album_id": ("album_id",),
+    "album_name": ("album", "album_name"),
+    "artist_id": ("artist_id", "artist_ids", "artists_id"),
+    "artist_name": ("artist", "artist_name", "artists"),
+    "popularity": ("popularity", "track_popularity"),
+    "duration_ms": ("duration_ms",),
+    "track_number": ("track_number",),
+    "release_date": ("release_date", "album_release_date", "year"),
+    "total_tracks": ("total_tracks", "album_total_tracks"),
+}
+# the catalog columns are VARCHAR(100)
+MAX_NAME_LENGTH = 100
+RELEASE_DATE = re.compile(r"^(\d{4})(?:-(\d{2}))?(?:-(\d{2}))?")
+# first item of a list literal of strings without escapes, e.g. "['a', 'b']"
+FIRST_ITEM = re.compile(r"""^\[\s*(?:'([^'\\]*)'|"([^"\\]*)")\s*[,\]]""")
+# outcomes of the upsert of a row
+OUTCOMES = crud.UPSERT_OUTCOMES + ("unchanged",)
+STREAMS_OF_IDS = {
+    "artists": crud.iter_artists_ids,
+    "albums": crud.iter_albums_ids,
+    "songs": crud.iter_songs_ids,
+}
+
+# IDs of the catalog, set in each worker of the pool by ``init_worker``
+_known_ids: Dict[str, IdSet] = {}
+
+
+def first_value(value):
+    """Return the first item of a list, or of a list literal such as "['a', 'b']"."""
+    if isinstance(value, str) and value.startswith("["):
+        match = FIRST_ITEM.match(value)
+        if match:
+            return match[1] if match[1] is not None else match[2]
+        # escaped quotes: parse the whole literal, which is much slower
+        try:
+            value = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            return None
+    if isinstance(value, (list, tuple)):
+        return value[0] if value else None
+    return value
+
+
+def parse_release_date(value) -> Optional[date]:
+    """Parse a release date of Spotify, precise to the year, month or day."""
+    if value in (None, ""):
+        return None
+    match = RELEASE_DATE.match(str(value))
+    if match is None:
+        raise ValueError(f"Invalid release date: {value}")
+    year, month, day = (int(part) if part else 1 for part in match.groups())
+    return date(year, month, day)
+
+
+def parse_record(
+    record: Dict,
+) -> Tuple[Artist, Album, Song]:
+    """Validate a record of a track into the rows of its artist, album and song.
+
+    Parameters
+    ----------
+    record : dict
+        The fields of the record, by column name.
+
+    Returns
+    -------
+    tuple
+        The artist, the album and the song.
+
+    Raises
+    ------
+    ValueError
+        If a required field is missing or a value is invalid (including
+        ``pydantic.ValidationError``).
+    """
+    fields = {}
+    for field, names in FIELDS.items():
+        value = next((record[name] for name in names if name in record), None)
+        fields[field] = None if value == "" else value
+    # the first artist of a track is its main artist
+    artist_id = first_value(fields["artist_id"])
+    artist_name = first_value(fields["artist_name"])
+    if not all((fields["id"], fields["name"], fields["album_id"], artist_id)):
+        raise ValueError("Missing ID or name.")
+    if not (fields["album_name"] and artist_name):
+        raise ValueError("Missing ID or name.")
+    release_date = parse_release_date(fields["release_date"])
+    artist = Artist(id=artist_id, name=artist_name[:MAX_NAME_LENGTH])
+    album = Album(
+        id=fields["album_id"],
+        name=fields["album_name"][:MAX_NAME_LENGTH],
+        artist_id=artist_id,
+        release_year=release_date.year if release_date else None,
+        release_date=release_date,
+        total_tracks=fields["total_tracks"],
+    )
+    song = Song(
+        id=fields["id"],
+        name=fields["name"][:MAX_NAME_LENGTH],
+        artist_id=artist_id,
+        album_id=fields["album_id"],
+        popularity=fields["popularity"],
+        duration_ms=fields["duration_ms"],
+        track_number=fields["track_number"],
+    )
+    return artist, album, song
+
+
+def iter_records(
+    data: bytes,
+    file_format: str,
+    columns: Optional[Sequence[str]] = None,
+) -> Iterator[Optional[Dict]]:
+    """Decode the records of a chunk of whole lines (None for a malformed one)."""
+    lines = data.decode("utf-8", errors="replace").splitlines()
+    if file_format == "jsonl":
+        for line in lines:
+            if line.strip():
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    record = None
+                yield record if isinstance(record, dict) else None
+        return
+    for row in csv.reader(lines):
+        if row:
+            yield dict(zip(columns, row)) if len(row) == len(columns) else None
+
+
+def init_worker(known_ids: Dict[str, IdSet]):
+    """Keep the IDs of the catalog in a worker of the pool."""
+    _known_ids.update(known_ids)
+
+
+def parse_chunk(
+    data: bytes,
+    file_format: str,
+    columns: Optional[Sequence[str]] = None,
+) -> Tuple[Dict[str, List[tuple]], int, int]:
+    """Parse a chunk of a dump into the rows of the catalog it does not hold yet.
+
+    Run in the workers of the pool: only the new rows (all the rows when the
+    worker was given no IDs of the catalog, to refresh it), as tuples of the
+    ``crud.CATALOG_COLUMNS`` followed by their ``crud.content_hash``, are sent
+    back to the main process.
+
+    Parameters
+    ----------
+    data : bytes
+        The chunk, made of whole lines.
+    file_format : str
+        The format of the file: ``csv`` or ``jsonl``.
+    columns : Sequence[str], optional
+        The columns of the CSV file, from its header.
+
+    Returns
+    -------
+    tuple
+        The new rows of each table, without duplicates, the number of records
+        and the number of rejected records.
+    """
+    parsed = []
+    records = 0
+    for record in iter_records(data, file_format, columns):
+        records += 1
+        try:
+            if record is None:
+                raise ValueError("Malformed record.")
+            parsed.append(parse_record(record))
+        except ValueError:
+            continue
+    try:
+        decode_base62([model.id for models in parsed for model in models])
+    except ValueError:
+        # rare: find the records with an ID that is not a Spotify ID
+        parsed = [models for models in parsed if all(map(is_spotify_id, models))]
+
+    rows = {table: [] for table in crud.CATALOG_COLUMNS}
+    # the catalog tables are listed in the order of the rows of a record
+    for table, models in zip(crud.CATALOG_COLUMNS, zip(*parsed)):
+        by_id = {}
+        for model in models:
+            by_id.setdefault(model.id, model)
+        ids = list(by_id)
+        known = _known_ids.get(table)
+        new_ids = known.new_ids(ids) if known is not None else ids
+        table_columns = crud.CATALOG_COLUMNS[table]
+        for spotify_id in new_ids:
+            row = tuple(getattr(by_id[spotify_id], column) for column in table_columns)
+            rows[table].append(row + (crud.content_hash(row),))
+    return rows, records, records - len(parsed)
+
+
+def is_spotify_id(model) -> bool:
+    """Check that the ID of a row is a valid Spotify ID."""
+    try:
+        decode_base62([model.id])
+    except ValueError:
+        return False
+    return True
+
+
+def iter_chunks(
+    path: Path,
+    start: int,
+    chunk_bytes: int = CHUNK_BYTES,
+) -> Iterator[Tuple[bytes, int]]:
+    """Read a file by chunks of whole lines.
+
+    Parameters
+    ----------
+    path : Path
+        The file.
+    start : int
+        The position to start from, at the beginning of a line.
+    chunk_bytes : int
+        The number of bytes read at once, before reading up to the end of the
+        line.
+
+    Yields
+    ------
+    tuple
+        The chunk and the position of its end in the file.
+    """
+    with open(path, "rb") as file:
+        file.seek(start)
+        while data := file.read(chunk_bytes):
+            if not data.endswith(b"\n"):
+                data += file.readline()
+            yield data, file.tell()
+
+
+def read_header(path: Path) -> Tuple[List[str], int]:
+    """Read the columns of a CSV file and the position of its first record."""
+    with open(path, "rb") as file:
+        header = file.readline()
+        columns = next(csv.reader([header.decode("utf-8-sig")]))
+        return [column.strip() for column in columns], file.tell()
+
+
+def import_dataset(
+    path: Path,
+    file_format: Optional[str] = None,
+    workers: Optional[int] = None,
+    restart: bool = False,
+    chunk_bytes: int = CHUNK_BYTES,
+    refresh: bool = False,
+) -> Dict[str, Dict[str, int]]:
+    """Import the tracks of a dump into the catalog.
+
+    Parameters
+    ----------
+    path : Path
+        The CSV or JSON Lines file.
+    file_format : str, optional
+        The format of the file, ``csv`` or ``jsonl`` (from its extension by
+        default).
+    workers : int, optional
+        The number of parsing processes (the number of cores by default).
+    restart : bool
+        Whether to read the file from the start, instead of from the end of the
+        last chunk loaded by a previous import.
+    chunk_bytes : int
+        The number of bytes parsed at once.
+    refresh : bool
+        Whether to update the rows already in the catalog whose values changed,
+        instead of skipping their IDs.
+
+    Returns
+    -------
+    dict
+        The number of records read and rejected, and of rows inserted, updated,
+        hashed and unchanged in each table.
+
+    Raises
+    ------
+    ValueError
+        If the format of the file is unknown.
+    """
+    path = Path(path)
+    file_format = file_format or FORMATS.get(path.suffix.lower())
+    if file_format not in ("csv", "jsonl"):
+        raise ValueError(f"Unknown format of {path}, use --format.")
+    source = str(path.resolve())
+    size = path.stat().st_size
+    columns, start = read_header(path) if file_format == "csv" else (None, 0)
+    progress = None if restart else crud.get_import_progress(source)
+    offset, records = progress if progress else (start, 0)
+    stats = {"records": 0, "rejected": 0}
+    for outcome in OUTCOMES:
+        stats[outcome] = {table: 0 for table in crud.CATALOG_COLUMNS}
+    if offset >= size:
+        logger.info("%s is already imported.", path)
+        return stats
+    logger.info("Importing %s from byte %d of %d.", path, offset, size)
+
+    # the pool is forked: the workers share the IDs of the catalog with the
+    # main process instead of receiving a copy
+    known_ids = {}
+    if not refresh:
+        known_ids = {
+            table: IdSet.from_ids(stream()) for table, stream in STREAMS_OF_IDS.items()
+        }
+    # artists and albums appear in many chunks: the ones inserted by this import
+    seen = {"artists": set(), "albums": set()}
+    workers = workers or os.cpu_count() or 1
+    started = last_report = time.perf_counter()
+    imported_bytes = 0
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("fork"),
+        initializer=init_worker,
+        initargs=(known_ids,),
+    ) as pool:
+        chunks = iter_chunks(path, offset, chunk_bytes)
+        pending = deque()
+        # keep the workers busy while the main process loads a chunk, without
+        # reading the whole file ahead
+        for data, end in itertools.islice(chunks, workers * CHUNKS_AHEAD):
+            pending.append((pool.submit(parse_chunk, data, file_format, columns), end))
+        while pending:
+            future, end = pending.popleft()
+            for data, next_end in itertools.islice(chunks, 1):
+                pending.append(
+                    (pool.submit(parse_chunk, data, file_format, columns), next_end)
+                )
+            rows, chunk_records, rejected = future.result()
+            for table, ids in seen.items():
+                rows[table] = [row for row in rows[table] if row[0] not in ids]
+                ids.update(row[0] for row in rows[table])
+            records += chunk_records
+            written = crud.copy_catalog_rows(rows, source, end, records)
+            imported_bytes += end - offset
+            offset = end
+            stats["records"] += chunk_records
+            stats["rejected"] += rejected
+            for table, counts in written.items():
+                for outcome, count in counts.items():
+                    stats[outcome][table] += count
+
+            now = time.perf_counter()
+            if now - last_report >= PROGRESS_INTERVAL or not pending:
+                last_report = now
+                report_progress(stats, offset, size, imported_bytes, now - started)
+    return stats
+
+
+def report_progress(
+    stats: Dict[str, int],
+    offset: int,
+    size: int,
+    imported_bytes: int,
+    elapsed: float,
+):
+    """Log the progress of an import and its throughput."""
+    elapsed = max(elapsed, 1e-9)
+    logger.info(
+        "%.1f%% of the file (%.0f/%.0f MB) at %.1f MB/s, %.0f records/s: "
+        "%d records, %d rejected; %s.",
+        100 * offset / size,
+        offset / 1024**2,
+        size / 1024**2,
+        imported_bytes / 1024**2 / elapsed,
+        stats["records"] / elapsed,
+        stats["records"],
+        stats["rejected"],
+        "; ".join(
+            f"{outcome} "
+            + ", ".join(f"{count} {table}" for table, count in stats[outcome].items())
+            for outcome in OUTCOMES
+        ),
+    )
+
+
+def main():
+    """Import a dataset dump from the command line."""
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--format", choices=("csv", "jsonl"))
+    parser.add_argument("--workers", type=int)
+    parser.add_argument(
+        "--restart", action="store_true", help="read the file from the start again"
+    )
+    parser.add_argument("--chunk-mb", type=float, default=CHUNK_BYTES / 1024**2)
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="update the rows already in the catalog whose values changed",
+    )
+    args = parser.parse_args()
+
+    import_dataset(
+        args.path,
+        args.format,
+        args.workers,
+        args.restart,
+        int(args.chunk_mb * 1024**2),
+        args.refresh,
+    )
+
+
+if __name__ == "__main__":
+    main()
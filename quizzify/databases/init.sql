@@ -1,6 +1,40 @@
 -- This file is used to create the tables in the database when the server starts up.
 -- The tables are only created if they do not already exist in the database.
 
+-- trigram indexes and similarity of the catalog search
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Relation Artists
+
+-- column_name  |     data_type
+----------------+-------------------
+-- id           | character varying
+-- name         | character varying
+-- popularity   | integer
+-- image_url    | character varying
+-- content_hash | bigint
+
+DROP TABLE IF EXISTS artists CASCADE;
+
+CREATE TABLE artists (
+    id VARCHAR(50) PRIMARY KEY,
+    name VARCHAR(100),
+    popularity INT,
+    image_url VARCHAR(150),
+    -- hash of the other columns: the upserts skip the rows that did not change
+    content_hash BIGINT
+);
+
+-- search by name: full-text (words and prefixes) and trigrams (typos, substrings)
+CREATE INDEX artists_name_tsv_idx ON artists USING gin (to_tsvector('simple', name));
+CREATE INDEX artists_name_trgm_idx ON artists USING gin (name gin_trgm_ops);
+
+-- listing pages (crud.LISTINGS), in descending order then by ID
+CREATE INDEX artists_popularity_idx ON artists ((COALESCE(popularity, 0)), id);
+
+----------------------------------------------------------------------------------------
+----------------------------------------------------------------------------------------
+
 -- Relation Albums
 
 -- column_name  |     data_type
@@ -11,8 +45,9 @@
 -- popularity   | integer
 -- release_date | date
 -- total_tracks | integer
+-- content_hash | bigint
 
-DROP TABLE IF EXISTS albums;
+DROP TABLE IF EXISTS albums CASCADE;
 
 CREATE TABLE albums (
     id VARCHAR(50) PRIMARY KEY,
@@ -21,28 +56,24 @@ CREATE TABLE albums (
     popularity INT,
     release_date DATE,
     total_tracks INT,
+    -- hash of the other columns: the upserts skip the rows that did not change
+    content_hash BIGINT,
     FOREIGN KEY (artist_id) REFERENCES artists(id)
 );
 
-----------------------------------------------------------------------------------------
-----------------------------------------------------------------------------------------
-
--- Relation Artists
+-- search by name: full-text (words and prefixes) and trigrams (typos, substrings)
+CREATE INDEX albums_name_tsv_idx ON albums USING gin (to_tsvector('simple', name));
+CREATE INDEX albums_name_trgm_idx ON albums USING gin (name gin_trgm_ops);
 
--- column_name |     data_type
----------------+-------------------
--- id          | character varying
--- name        | character varying
--- popularity  | integer
--- image_url   | character varying
-
--- DROP TABLE IF EXISTS artists;
-CREATE TABLE artists (
-    id VARCHAR(50) PRIMARY KEY,
-    name VARCHAR(100),
-    popularity INT,
-    image_url VARCHAR(150)
-);
+-- listing pages (crud.LISTINGS), in descending order then by ID
+CREATE INDEX albums_popularity_idx ON albums ((COALESCE(popularity, 0)), id);
+CREATE INDEX albums_release_date_idx
+    ON albums ((COALESCE(release_date, DATE '0001-01-01')), id);
+CREATE INDEX albums_artist_id_idx ON albums (artist_id, id);
+CREATE INDEX albums_artist_popularity_idx
+    ON albums (artist_id, (COALESCE(popularity, 0)), id);
+CREATE INDEX albums_artist_release_date_idx
+    ON albums (artist_id, (COALESCE(release_date, DATE '0001-01-01')), id);
 
 ----------------------------------------------------------------------------------------
 ----------------------------------------------------------------------------------------
@@ -57,6 +88,7 @@ CREATE TABLE artists (
 -- popularity   | integer
 -- duration_ms  | integer
 -- track_number | integer
+-- content_hash | bigint
 
 DROP TABLE IF EXISTS songs;
 
@@ -68,10 +100,25 @@ CREATE TABLE songs (
     popularity INT,
     duration_ms INT,
     track_number INT,
+    -- hash of the other columns: the upserts skip the rows that did not change
+    content_hash BIGINT,
     FOREIGN KEY (artist_id) REFERENCES artists(id),
     FOREIGN KEY (album_id) REFERENCES albums(id)
 );
 
+-- search by name: full-text (words and prefixes) and trigrams (typos, substrings)
+CREATE INDEX songs_name_tsv_idx ON songs USING gin (to_tsvector('simple', name));
+CREATE INDEX songs_name_trgm_idx ON songs USING gin (name gin_trgm_ops);
+
+-- listing pages (crud.LISTINGS), in descending order then by ID
+CREATE INDEX songs_popularity_idx ON songs ((COALESCE(popularity, 0)), id);
+CREATE INDEX songs_artist_id_idx ON songs (artist_id, id);
+CREATE INDEX songs_artist_popularity_idx
+    ON songs (artist_id, (COALESCE(popularity, 0)), id);
+CREATE INDEX songs_album_id_idx ON songs (album_id, id);
+CREATE INDEX songs_album_popularity_idx
+    ON songs (album_id, (COALESCE(popularity, 0)), id);
+
 ----------------------------------------------------------------------------------------
 ----------------------------------------------------------------------------------------
 
@@ -120,3 +167,317 @@ CREATE TABLE spotify_users (
     FOREIGN KEY (user_id) REFERENCES users(user_id)
 );
 
+
+----------------------------------------------------------------------------------------
+----------------------------------------------------------------------------------------
+
+-- Relation OAuth States
+-- Pending states of the Spotify authorization flow, shared by all the API workers.
+-- column_name |          data_type
+---------------+-----------------------------
+-- state       | character varying
+-- created_at  | timestamp without time zone
+
+DROP TABLE IF EXISTS oauth_states;
+
+CREATE TABLE oauth_states (
+    state VARCHAR(50) PRIMARY KEY,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+----------------------------------------------------------------------------------------
+----------------------------------------------------------------------------------------
+
+-- Relation Used Refresh Tokens
+-- Refresh tokens of the quizzify sessions already exchanged, each kept until it expires
+-- so that it cannot be used twice (see quizzify.utils.sessions).
+-- column_name |     data_type
+---------------+-------------------
+-- token_id    | character varying
+-- expires_at  | bigint
+
+DROP TABLE IF EXISTS used_refresh_tokens;
+
+CREATE TABLE used_refresh_tokens (
+    token_id VARCHAR(50) PRIMARY KEY,
+    expires_at BIGINT NOT NULL
+);
+
+CREATE INDEX used_refresh_tokens_expires_at_idx ON used_refresh_tokens (expires_at);
+
+----------------------------------------------------------------------------------------
+----------------------------------------------------------------------------------------
+
+-- Relation Revoked Sessions
+-- Revoked quizzify sessions, loaded by each API worker, each kept until all the tokens
+-- of the session have expired (Unix time).
+-- column_name |     data_type
+---------------+-------------------
+-- session_id  | character varying
+-- expires_at  | bigint
+
+DROP TABLE IF EXISTS revoked_sessions;
+
+CREATE TABLE revoked_sessions (
+    session_id VARCHAR(50) PRIMARY KEY,
+    expires_at BIGINT NOT NULL
+);
+
+CREATE INDEX revoked_sessions_expires_at_idx ON revoked_sessions (expires_at);
+
+----------------------------------------------------------------------------------------
+----------------------------------------------------------------------------------------
+
+-- Relation Spotify Tokens
+-- Spotify tokens of the application, shared by all the API workers (single row).
+--       column_name     |          data_type
+-------------------------+-----------------------------
+-- id                    | smallint
+-- access_token          | character varying
+-- refresh_token         | character varying
+-- token_expiration_date | timestamp without time zone
+-- updated_at            | timestamp without time zone
+
+DROP TABLE IF EXISTS spotify_tokens;
+
+CREATE TABLE spotify_tokens (
+    id SMALLINT PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    access_token VARCHAR(500),
+    refresh_token VARCHAR(500),
+    token_expiration_date TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+----------------------------------------------------------------------------------------
+----------------------------------------------------------------------------------------
+
+-- Relation Catalog Imports
+-- Progress of the imports of dataset dumps by quizzify.databases.importer: the bytes of
+-- the file loaded so far, committed with the rows they hold, so an import resumes there.
+--  column_name |          data_type
+----------------+-----------------------------
+-- source       | character varying
+-- byte_offset  | bigint
+-- records      | bigint
+-- updated_at   | timestamp without time zone
+
+DROP TABLE IF EXISTS catalog_imports;
+
+CREATE TABLE catalog_imports (
+    source VARCHAR(300) PRIMARY KEY,
+    byte_offset BIGINT NOT NULL,
+    records BIGINT NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+----------------------------------------------------------------------------------------
+----------------------------------------------------------------------------------------
+
+-- Relation Question Bank
+-- Questions precomputed from the catalog by quizzify.databases.question_bank, so that
+-- a quiz samples them with an index lookup instead of joining the catalog.
+--  column_name  |     data_type
+-----------------+-------------------
+-- id            | bigint
+-- question_type | character varying
+-- subject_id    | character varying
+-- question      | character varying
+-- answer        | character varying
+-- choices       | jsonb
+-- bank_rank     | integer
+-- type_rank     | integer
+-- created_at    | timestamp without time zone
+
+DROP TABLE IF EXISTS question_bank CASCADE;
+
+CREATE TABLE question_bank (
+    id BIGSERIAL PRIMARY KEY,
+    question_type VARCHAR(30) NOT NULL,
+    -- the song or album the question is about
+    subject_id VARCHAR(50) NOT NULL,
+    question VARCHAR(300) NOT NULL,
+    answer VARCHAR(100) NOT NULL,
+    -- the answer and its distractors, shuffled
+    choices JSONB NOT NULL,
+    -- dense positions (1 to the number of questions) in the bank and among the
+    -- questions of the type, numbered by the builds: the IDs have gaps
+    bank_rank INTEGER,
+    type_rank INTEGER,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    -- one question per subject and type: rebuilds only add the missing ones
+    UNIQUE (question_type, subject_id)
+);
+
+-- random sampling of a question, of any type or of a given type
+CREATE INDEX question_bank_rank_idx ON question_bank (bank_rank);
+CREATE INDEX question_bank_type_rank_idx ON question_bank (question_type, type_rank);
+
+----------------------------------------------------------------------------------------
+----------------------------------------------------------------------------------------
+
+-- Relation Listening Pools
+-- Candidates of the personal quizzes of a user, taken from its Spotify listening
+-- history (top artists and tracks, saved albums) at login and refreshed after a TTL.
+--  column_name |          data_type
+---------------+-----------------------------
+-- username    | character varying, foreign key
+-- artists     | jsonb
+-- tracks      | jsonb
+-- albums      | jsonb
+-- fetched_at  | timestamp without time zone
+
+DROP TABLE IF EXISTS listening_pools;
+
+CREATE TABLE listening_pools (
+    username VARCHAR(100) PRIMARY KEY,
+    -- [name, ...]
+    artists JSONB NOT NULL,
+    -- [[id, name, artist name, album name, duration in ms], ...]
+    tracks JSONB NOT NULL,
+    -- [[id, name, artist name, release year], ...]
+    albums JSONB NOT NULL,
+    fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (username) REFERENCES users(username) ON DELETE CASCADE
+);
+
+----------------------------------------------------------------------------------------
+----------------------------------------------------------------------------------------
+
+-- Relation Scheduled Jobs
+-- Schedule of the background jobs run by a single API worker at a time.
+--    column_name   |          data_type
+--------------------+-----------------------------
+-- name             | character varying
+-- next_run_at      | timestamp without time zone
+-- last_started_at  | timestamp without time zone
+-- last_finished_at | timestamp without time zone
+-- last_status      | character varying
+
+DROP TABLE IF EXISTS scheduled_jobs;
+
+CREATE TABLE scheduled_jobs (
+    name VARCHAR(100) PRIMARY KEY,
+    -- NULL once a job will not run anymore
+    next_run_at TIMESTAMP,
+    last_started_at TIMESTAMP,
+    last_finished_at TIMESTAMP,
+    last_status VARCHAR(20)
+);
+
+----------------------------------------------------------------------------------------
+----------------------------------------------------------------------------------------
+
+-- Relation Answer History
+-- Append-only log of the answers of the users to the questions of the question bank,
+-- partitioned by month of answered_at. The monthly partitions are created ahead and
+-- dropped after the retention period by quizzify.databases.history.
+--  column_name  |          data_type
+-----------------+-----------------------------
+-- answered_at   | timestamp without time zone
+-- username      | character varying
+-- question_id   | bigint
+-- question_type | character varying
+-- artist_id     | character varying
+-- choice        | character varying
+-- correct       | boolean
+
+DROP TABLE IF EXISTS answer_history;
+
+CREATE TABLE answer_history (
+    answered_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    username VARCHAR(100) NOT NULL,
+    question_id BIGINT NOT NULL,
+    question_type VARCHAR(30) NOT NULL,
+    -- the artist of the song or album the question is about
+    artist_id VARCHAR(50),
+    choice VARCHAR(100) NOT NULL,
+    correct BOOLEAN NOT NULL
+) PARTITION BY RANGE (answered_at);
+
+-- history of a user, created on each partition
+CREATE INDEX answer_history_username_idx ON answer_history (username, answered_at);
+
+----------------------------------------------------------------------------------------
+----------------------------------------------------------------------------------------
+
+-- Relations Answer Statistics
+-- Rollups of the answer history, incremented with each answer, so that the statistics
+-- are read without aggregating the history (and outlive its retention period).
+--    column_name    |          data_type
+---------------------+-----------------------------
+-- username          | character varying, foreign key
+-- question_type     | character varying
+-- artist_id         | character varying
+-- answered          | integer
+-- correct           | integer
+-- last_answered_at  | timestamp without time zone
+
+DROP TABLE IF EXISTS user_answer_stats;
+
+CREATE TABLE user_answer_stats (
+    username VARCHAR(100) NOT NULL,
+    question_type VARCHAR(30) NOT NULL,
+    answered INT NOT NULL,
+    correct INT NOT NULL,
+    last_answered_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (username, question_type),
+    FOREIGN KEY (username) REFERENCES users(username) ON DELETE CASCADE
+);
+
+DROP TABLE IF EXISTS user_artist_stats;
+
+CREATE TABLE user_artist_stats (
+    username VARCHAR(100) NOT NULL,
+    artist_id VARCHAR(50) NOT NULL,
+    answered INT NOT NULL,
+    correct INT NOT NULL,
+    last_answered_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (username, artist_id),
+    FOREIGN KEY (username) REFERENCES users(username) ON DELETE CASCADE
+);
+
+-- best known artists of a user
+CREATE INDEX user_artist_stats_answered_idx ON user_artist_stats (username, answered);
+
+DROP TABLE IF EXISTS artist_answer_stats;
+
+CREATE TABLE artist_answer_stats (
+    artist_id VARCHAR(50) PRIMARY KEY,
+    answered INT NOT NULL,
+    correct INT NOT NULL,
+    last_answered_at TIMESTAMP NOT NULL
+);
+
+----------------------------------------------------------------------------------------
+----------------------------------------------------------------------------------------
+
+-- Relations Ratings
+-- Elo ratings of the difficulty of the questions and of the skill of the users, updated
+-- in memory by each worker with the answers and added here by batches
+-- (quizzify.databases.ratings).
+--  column_name  |     data_type
+-----------------+-------------------
+-- question_id   | bigint, foreign key
+-- username      | character varying, foreign key
+-- rating        | real
+-- answered      | integer
+-- correct       | integer
+
+DROP TABLE IF EXISTS question_ratings;
+
+CREATE TABLE question_ratings (
+    question_id BIGINT PRIMARY KEY,
+    rating REAL NOT NULL,
+    answered INT NOT NULL,
+    correct INT NOT NULL,
+    FOREIGN KEY (question_id) REFERENCES question_bank(id) ON DELETE CASCADE
+);
+
+DROP TABLE IF EXISTS user_ratings;
+
+CREATE TABLE user_ratings (
+    username VARCHAR(100) PRIMARY KEY,
+    rating REAL NOT NULL,
+    answered INT NOT NULL,
+    FOREIGN KEY (username) REFERENCES users(username) ON DELETE CASCADE
+);
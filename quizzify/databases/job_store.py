@@ -0,0 +1,200 @@
+import threading
+from datetime import datetime
+from typing import Dict, Optional
+
+import psycopg2
+
+from quizzify.config import get_settings
+
+# first key of the advisory locks of the jobs, the second one being the hash of
+# the name of the job, so they do not collide with other advisory locks
+JOB_LOCK_NAMESPACE = "quizzify.jobs"
+
+
+class PostgresJobStore:
+    """Locks and schedule of the background jobs, shared by all the API workers.
+
+    A job runs in a single worker at a time: the worker running it holds a
+    session-level advisory lock, on a connection dedicated to the worker (outside
+    of the pool, as the locks are held for as long as the jobs run). The lock is
+    released when the job ends, or when the worker dies and its connection is
+    closed. The next run of each job is saved in the ``scheduled_jobs`` table, so
+    a job runs once per period, whichever worker gets there first.
+
+    Methods
+    -------
+    try_lock(name: str)
+        Take the lock of a job, if no other worker holds it.
+    unlock(name: str)
+        Release the lock of a job.
+    get_next_run(name: str)
+        Get the date of the next run of a job, as scheduled by the last run.
+    save_run(name: str, started_at: datetime, status: str, next_run_at)
+        Save the outcome of a run and the date of the next one.
+    close()
+        Close the connection, releasing the locks.
+    """
+
+    def __init__(self):
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def _execute(self, query: str, vars: dict):
+        """Run a query on the connection of the worker and return the first row."""
+        with self._lock:
+            if self._connection is None:
+                settings = get_settings()
+                self._connection = psycopg2.connect(
+                    dbname=settings.postgres_db,
+                    user=settings.postgres_user,
+                    password=settings.postgres_password,
+                    host=settings.postgres_host,
+                    port=settings.postgres_port,
+                )
+                self._connection.autocommit = True
+            try:
+                cursor = self._connection.cursor()
+                cursor.execute(query, vars)
+                row = cursor.fetchone() if cursor.description else None
+                cursor.close()
+            except (psycopg2.OperationalError, psycopg2.InterfaceError):
+                # the connection is broken (the locks it held are released):
+                # the next query opens a new one
+                self._connection.close()
+                self._connection = None
+                raise
+            return row
+
+    def try_lock(self, name: str) -> bool:
+        """Take the lock of a job, if no other worker holds it."""
+        return self._execute(
+            "SELECT pg_try_advisory_lock(hashtext(%(namespace)s), hashtext(%(name)s));",
+            {"namespace": JOB_LOCK_NAMESPACE, "name": name},
+        )[0]
+
+    def unlock(self, name: str):
+        """Release the lock of a job."""
+        self._execute(
+            "SELECT pg_advisory_unlock(hashtext(%(namespace)s), hashtext(%(name)s));",
+            {"namespace": JOB_LOCK_NAMESPACE, "name": name},
+        )
+
+    def get_next_run(self, name: str) -> Optional[datetime]:
+        """Get the date of the next run of a job, or None if it never ran."""
+        row = self._execute(
+            "SELECT next_run_at FROM scheduled_jobs WHERE name = %(name)s;",
+            {"name": name},
+        )
+        return row[0] if row else None
+
+    def save_run(
+        self,
+        name: str,
+        started_at: datetime,
+        status: str,
+        next_run_at: Optional[datetime],
+    ):
+        """Save the outcome of a run and the date of the next one."""
+        self._execute(
+            "INSERT INTO scheduled_jobs "
+            "(name, next_run_at, last_started_at, last_finished_at, last_status) "
+            "VALUES (%(name)s, %(next_run_at)s, %(started_at)s, CURRENT_TIMESTAMP, "
+            "%(status)s) "
+            "ON CONFLICT (name) DO UPDATE SET "
+            "next_run_at = EXCLUDED.next_run_at, "
+            "last_started_at = EXCLUDED.last_started_at, "
+            "last_finished_at = EXCLUDED.last_finished_at, "
+            "last_status = EXCLUDED.last_status;",
+            {
+                "name": name,
+                "next_run_at": next_run_at,
+                "started_at": started_at,
+                "status": status,
+            },
+        )
+
+    def close(self):
+        """Close the connection of the worker, releasing its locks."""
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+class InMemoryJobStore:
+    """Local stand-in for the shared job store, for a single worker.
+
+    It behaves like ``PostgresJobStore`` but keeps the locks and the schedule in
+    the memory of the process: use it for development and tests only.
+    """
+
+    def __init__(self):
+        self._locked = set()
+        self._next_runs: Dict[str, Optional[datetime]] = {}
+        self._lock = threading.Lock()
+
+    def try_lock(self, name: str) -> bool:
+        """Take the lock of a job, if not held yet."""
+        with self._lock:
+            if name in self._locked:
+                return False
+            self._locked.add(name)
+            return True
+
+    def unlock(self, name: str):
+        """Release the lock of a job."""
+        with self._lock:
+            self._locked.discard(name)
+
+    def get_next_run(self, name: str) -> Optional[datetime]:
+        """Get the date of the next run of a job, or None if it never ran."""
+        with self._lock:
+            return self._next_runs.get(name)
+
+    def save_run(
+        self,
+        name: str,
+        started_at: datetime,
+        status: str,
+        next_run_at: Optional[datetime],
+    ):
+        """Save the date of the next run of a job."""
+        with self._lock:
+            self._next_runs[name] = next_run_at
+
+    def close(self):
+        """Release the locks."""
+        with self._lock:
+            self._locked.clear()
+
+
+JOB_STORES = {
+    "postgres": PostgresJobStore,
+    "memory": InMemoryJobStore,
+}
+_job_store = None
+
+
+def get_job_store():
+    """Return the job store of the worker.
+
+    The backend follows the ``QUIZZIFY_STATE_STORE`` environment variable:
+    ``postgres`` (shared by all the workers) or ``memory``.
+
+    Returns
+    -------
+    PostgresJobStore or InMemoryJobStore
+        The job store, created on the first call.
+    """
+    global _job_store
+    if _job_store is None:
+        _job_store = JOB_STORES[get_settings().state_store]()
+    return _job_store
+
+
+def close_job_store():
+    """Close the job store of the worker, if open."""
+    global _job_store
+    if _job_store is not None:
+        _job_store.close()
+        _job_store = None
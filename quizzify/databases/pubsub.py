@@ -0,0 +1,278 @@
+import asyncio
+import logging
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+import psycopg2
+from psycopg2 import sql
+
+from quizzify.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# callback receiving the messages of a channel, called from the event loop
+Subscriber = Callable[[str], None]
+# seconds before opening a lost listening connection again, doubled after each
+# failure up to the maximum
+RECONNECT_DELAY = 1.0
+RECONNECT_MAX_DELAY = 60.0
+
+
+class PostgresPubSub:
+    """Publish/subscribe between the API workers, backed by PostgreSQL.
+
+    The messages are received with ``LISTEN`` on a connection dedicated to the
+    worker (outside of the pool, as it listens for the whole life of the worker).
+    The connection is watched by the event loop, so the subscribers are called
+    from the loop, in the order of publication. If the connection is lost, it is
+    opened again in the background and listens to the channels again (the
+    messages published meanwhile are lost).
+
+    The messages are sent with ``NOTIFY`` on a second connection, by a single
+    thread: publishing never blocks the event loop, and the messages of a worker
+    are sent in the order they were published. A message is limited to 8000
+    bytes.
+
+    Methods
+    -------
+    subscribe(channel: str, callback: Subscriber)
+        Call ``callback`` with each message published on ``channel``.
+    unsubscribe(channel: str, callback: Subscriber)
+        Stop calling ``callback``.
+    publish(channel: str, message: str)
+        Send a message to the subscribers of ``channel``, in every worker.
+    close()
+        Close the connections.
+    """
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._connection = None
+        self._fd = None
+        self._reconnecting: Optional[asyncio.Task] = None
+        # the publishing connection is only used by the thread of the executor
+        self._publisher = None
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="pubsub-publisher"
+        )
+
+    @staticmethod
+    def _open():
+        """Open a connection to the database, in autocommit mode."""
+        settings = get_settings()
+        connection = psycopg2.connect(
+            dbname=settings.postgres_db,
+            user=settings.postgres_user,
+            password=settings.postgres_password,
+            host=settings.postgres_host,
+            port=settings.postgres_port,
+        )
+        connection.autocommit = True
+        return connection
+
+    def _attach(self, connection):
+        """Listen with a connection, watched by the event loop."""
+        self._connection = connection
+        self._fd = connection.fileno()
+        asyncio.get_running_loop().add_reader(self._fd, self._on_readable)
+
+    def _connect(self):
+        """Open the listening connection, on first use."""
+        if self._connection is None:
+            self._attach(self._open())
+        return self._connection
+
+    def _connection_lost(self):
+        """Drop the broken listening connection and open a new one in background."""
+        if self._connection is not None:
+            asyncio.get_running_loop().remove_reader(self._fd)
+            self._connection.close()
+            self._connection = None
+        if self._reconnecting is None:
+            self._reconnecting = asyncio.get_running_loop().create_task(
+                self._reconnect()
+            )
+
+    async def _reconnect(self):
+        """Open the listening connection again and listen to the channels again."""
+        delay = RECONNECT_DELAY
+        loop = asyncio.get_running_loop()
+        while self._connection is None:
+            await asyncio.sleep(delay)
+            try:
+                connection = await loop.run_in_executor(None, self._open)
+            except psycopg2.Error:
+                logger.warning("Pub/sub connection failed, retrying in %.0f s.", delay)
+                delay = min(RECONNECT_MAX_DELAY, delay * 2)
+                continue
+            if self._connection is None:
+                self._attach(connection)
+            else:
+                # a subscription reconnected meanwhile
+                connection.close()
+        self._reconnecting = None
+        logger.info("Pub/sub connection restored.")
+        for channel in list(self._subscribers):
+            self._listen(sql.SQL("LISTEN {};").format(sql.Identifier(channel)))
+
+    def _on_readable(self):
+        """Read the notifications received by the connection."""
+        try:
+            self._connection.poll()
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            logger.exception("Pub/sub connection lost.")
+            self._connection_lost()
+            return
+        self._dispatch()
+
+    def _dispatch(self):
+        """Call the subscribers of the notifications already read."""
+        if self._connection is None:
+            return
+        notifies = self._connection.notifies
+        while notifies:
+            notify = notifies.pop(0)
+            for callback in list(self._subscribers.get(notify.channel, ())):
+                callback(notify.payload)
+
+    def _listen(self, query):
+        """Run a LISTEN or UNLISTEN query on the listening connection."""
+        try:
+            cursor = self._connect().cursor()
+            cursor.execute(query)
+            cursor.close()
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            # the channels are listened to again once reconnected
+            logger.exception("Pub/sub connection lost.")
+            self._connection_lost()
+            return
+        # the notifications read along with the result do not wake up the loop
+        if self._connection.notifies:
+            asyncio.get_running_loop().call_soon(self._dispatch)
+
+    def _notify(self, channel: str, message: str):
+        """Send a notification, from the thread of the executor."""
+        for attempt in range(2):
+            try:
+                if self._publisher is None:
+                    self._publisher = self._open()
+                cursor = self._publisher.cursor()
+                cursor.execute("SELECT pg_notify(%s, %s);", (channel, message))
+                cursor.close()
+                return
+            except (psycopg2.OperationalError, psycopg2.InterfaceError):
+                if self._publisher is not None:
+                    self._publisher.close()
+                    self._publisher = None
+                # a connection closed by a restart of the server: one more try
+                if attempt:
+                    raise
+
+    def subscribe(self, channel: str, callback: Subscriber):
+        """Call ``callback`` with each message published on ``channel``."""
+        new_channel = channel not in self._subscribers
+        self._subscribers[channel].add(callback)
+        if new_channel:
+            self._listen(sql.SQL("LISTEN {};").format(sql.Identifier(channel)))
+
+    def unsubscribe(self, channel: str, callback: Subscriber):
+        """Stop calling ``callback`` with the messages of ``channel``."""
+        subscribers = self._subscribers.get(channel)
+        if subscribers is None:
+            return
+        subscribers.discard(callback)
+        if not subscribers:
+            del self._subscribers[channel]
+            self._listen(sql.SQL("UNLISTEN {};").format(sql.Identifier(channel)))
+
+    async def publish(self, channel: str, message: str):
+        """Send a message to the subscribers of ``channel``, in every worker."""
+        await asyncio.get_running_loop().run_in_executor(
+            self._executor, self._notify, channel, message
+        )
+
+    def close(self):
+        """Close the connections."""
+        self._subscribers.clear()
+        if self._reconnecting is not None:
+            self._reconnecting.cancel()
+            self._reconnecting = None
+        if self._connection is not None:
+            asyncio.get_running_loop().remove_reader(self._fd)
+            self._connection.close()
+            self._connection = None
+        self._executor.submit(self._close_publisher)
+        self._executor.shutdown(wait=True)
+
+    def _close_publisher(self):
+        """Close the publishing connection, from the thread of the executor."""
+        if self._publisher is not None:
+            self._publisher.close()
+            self._publisher = None
+
+
+class InMemoryPubSub:
+    """Local stand-in for the publish/subscribe between workers, for one worker.
+
+    It behaves like ``PostgresPubSub`` but the messages never leave the process:
+    use it with a single worker, for development, tests and benchmarks.
+    """
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+
+    def subscribe(self, channel: str, callback: Subscriber):
+        """Call ``callback`` with each message published on ``channel``."""
+        self._subscribers[channel].add(callback)
+
+    def unsubscribe(self, channel: str, callback: Subscriber):
+        """Stop calling ``callback`` with the messages of ``channel``."""
+        subscribers = self._subscribers.get(channel)
+        if subscribers is not None:
+            subscribers.discard(callback)
+            if not subscribers:
+                del self._subscribers[channel]
+
+    async def publish(self, channel: str, message: str):
+        """Send a message to the subscribers of ``channel``."""
+        loop = asyncio.get_running_loop()
+        # delivered asynchronously, like a notification
+        for callback in list(self._subscribers.get(channel, ())):
+            loop.call_soon(callback, message)
+
+    def close(self):
+        """Forget the subscribers."""
+        self._subscribers.clear()
+
+
+PUBSUBS = {
+    "postgres": PostgresPubSub,
+    "memory": InMemoryPubSub,
+}
+_pubsub: Optional[PostgresPubSub] = None
+
+
+def get_pubsub():
+    """Return the publish/subscribe backend of the worker.
+
+    The backend is chosen with the ``QUIZZIFY_PUBSUB`` environment variable:
+    ``postgres`` (shared by all the workers) or ``memory``.
+
+    Returns
+    -------
+    PostgresPubSub or InMemoryPubSub
+        The backend, created on the first call.
+    """
+    global _pubsub
+    if _pubsub is None:
+        _pubsub = PUBSUBS[get_settings().pubsub]()
+    return _pubsub
+
+
+def close_pubsub():
+    """Close the publish/subscribe backend of the worker, if open."""
+    global _pubsub
+    if _pubsub is not None:
+        _pubsub.close()
+        _pubsub = None
@@ -0,0 +1,532 @@
+"""Build the question bank from the catalog.
+
+The builder scans the catalog tables with server-side cursors, generates the
+questions with their distractors and copies them into the ``question_bank``
+table, from which a quiz samples a question with an index lookup.
+
+The "connection" questions (``crud.GRAPH_QUESTION_TYPES``) relate several rows,
+e.g. two albums of the same artist: they are generated from the catalog graph
+(``quizzify.utils.catalog_graph``) instead of a join per question. The graph is
+read from the catalog snapshot shared by the workers, which the builder first
+refreshes with the new rows (``quizzify.databases.catalog_snapshot``).
+
+By default, only the songs and albums without a question yet are scanned, so
+running the builder after an ingestion only adds the questions of the new rows.
+``--full`` rebuilds the whole bank and the catalog snapshot (e.g. after catalog
+rows were updated or deleted): the questions of a subject and type keep their ID,
+and so their ratings, and only the questions not generated again are deleted.
+
+Usage::
+
+    python -m quizzify.databases.question_bank [--full] [--seed 42]
+"""
+
+import argparse
+import logging
+import random
+import time
+from typing import Iterable, Iterator, Optional, Sequence
+
+import numpy as np
+
+from quizzify.databases import crud
+from quizzify.databases.catalog_snapshot import export_catalog_snapshot
+from quizzify.utils.catalog_graph import NO_NODE, CatalogGraph
+from quizzify.utils.id_set import IdSet
+
+logger = logging.getLogger(__name__)
+
+QUESTION_TYPES = (*crud.QUESTION_SOURCES, *crud.GRAPH_QUESTION_TYPES)
+# number of wrong choices of a multiple choice question
+DISTRACTORS = 3
+# number of catalog rows the distractors are drawn from
+DISTRACTOR_POOL_SIZE = 50_000
+# minimum difference of duration between the songs of a "which is longer" question
+MIN_DURATION_GAP_MS = 10_000
+# number of subjects whose neighbors are looked up at once in the catalog graph
+GRAPH_CHUNK_SIZE = 10_000
+# number of candidates drawn for the distractors of a question of the graph, per
+# source of candidates
+GRAPH_CANDIDATES = 8
+# table of the subjects of each type of question of the graph
+GRAPH_SUBJECTS = {"same_album": "songs", "shared_artist": "albums"}
+
+
+def pick_distractors(
+    answer: str,
+    pool: Sequence[str],
+    rng: random.Random,
+    count: int = DISTRACTORS,
+) -> Optional[list]:
+    """Draw wrong choices different from the answer and from each other.
+
+    Parameters
+    ----------
+    answer : str
+        The right answer.
+    pool : Sequence[str]
+        The candidates, without duplicates.
+    rng : random.Random
+        The random number generator.
+    count : int
+        The number of distractors.
+
+    Returns
+    -------
+    list
+        The distractors, or None if the pool does not have enough candidates.
+    """
+    if len(pool) <= count:
+        return None
+    # the pool has no duplicates, so at most one draw is the answer
+    candidates = rng.sample(pool, count + 1)
+    return [candidate for candidate in candidates if candidate != answer][:count]
+
+
+def multiple_choice(
+    answer: str,
+    distractors: list,
+    rng: random.Random,
+) -> list:
+    """Shuffle the answer with its distractors."""
+    choices = [answer, *distractors]
+    rng.shuffle(choices)
+    return choices
+
+
+def song_artist_questions(
+    rows: Iterable[dict],
+    artist_names: Sequence[str],
+    rng: random.Random,
+) -> Iterator[tuple]:
+    """Generate "who sings X" questions.
+
+    Parameters
+    ----------
+    rows : Iterable[dict]
+        The songs, with the name of their artist.
+    artist_names : Sequence[str]
+        The artist names the distractors are drawn from.
+    rng : random.Random
+        The random number generator.
+
+    Yields
+    ------
+    tuple
+        The questions, in the format of ``crud.save_questions``.
+    """
+    for row in rows:
+        distractors = pick_distractors(row["artist_name"], artist_names, rng)
+        if distractors is None:
+            continue
+        yield (
+            "song_artist",
+            row["id"],
+            f'Who sings "{row["name"]}"?',
+            row["artist_name"],
+            multiple_choice(row["artist_name"], distractors, rng),
+        )
+
+
+def song_album_questions(
+    rows: Iterable[dict],
+    album_names: Sequence[str],
+    rng: random.Random,
+) -> Iterator[tuple]:
+    """Generate "which album contains Y" questions.
+
+    Parameters
+    ----------
+    rows : Iterable[dict]
+        The songs, with the name of their album.
+    album_names : Sequence[str]
+        The album names the distractors are drawn from.
+    rng : random.Random
+        The random number generator.
+
+    Yields
+    ------
+    tuple
+        The questions, in the format of ``crud.save_questions``.
+    """
+    for row in rows:
+        distractors = pick_distractors(row["album_name"], album_names, rng)
+        if distractors is None:
+            continue
+        yield (
+            "song_album",
+            row["id"],
+            f'Which album contains "{row["name"]}"?',
+            row["album_name"],
+            multiple_choice(row["album_name"], distractors, rng),
+        )
+
+
+def album_year_questions(
+    rows: Iterable[dict],
+    rng: random.Random,
+) -> Iterator[tuple]:
+    """Generate "what year was Z released" questions.
+
+    The distractors are close years, so that the question is not answered by
+    ruling out the unlikely decades.
+
+    Parameters
+    ----------
+    rows : Iterable[dict]
+        The albums, with their release year.
+    rng : random.Random
+        The random number generator.
+
+    Yields
+    ------
+    tuple
+        The questions, in the format of ``crud.save_questions``.
+    """
+    offsets = [offset for offset in range(-5, 6) if offset]
+    for row in rows:
+        year = row["release_year"]
+        distractors = [str(year + offset) for offset in rng.sample(offsets, 3)]
+        yield (
+            "album_year",
+            row["id"],
+            f'What year was "{row["name"]}" released?',
+            str(year),
+            multiple_choice(str(year), distractors, rng),
+        )
+
+
+def song_longer_questions(
+    rows: Iterable[dict],
+    rng: random.Random,
+) -> Iterator[tuple]:
+    """Generate "which is longer" questions.
+
+    Each song is compared with the previous song of the scan whose duration
+    differs by at least ``MIN_DURATION_GAP_MS``.
+
+    Parameters
+    ----------
+    rows : Iterable[dict]
+        The songs, with their duration.
+    rng : random.Random
+        The random number generator.
+
+    Yields
+    ------
+    tuple
+        The questions, in the format of ``crud.save_questions``.
+    """
+    previous = None
+    for row in rows:
+        if previous is None or row["name"] == previous["name"]:
+            previous = row
+            continue
+        if abs(row["duration_ms"] - previous["duration_ms"]) < MIN_DURATION_GAP_MS:
+            continue
+        longer = max(row, previous, key=lambda song: song["duration_ms"])
+        yield (
+            "song_longer",
+            row["id"],
+            f'Which song is longer: "{row["name"]}" or "{previous["name"]}"?',
+            longer["name"],
+            multiple_choice(row["name"], [previous["name"]], rng),
+        )
+        previous = row
+
+
+def graph_subjects(
+    graph: CatalogGraph,
+    question_type: str,
+    only_new: bool,
+) -> np.ndarray:
+    """Return the nodes of the subjects of a type of question of the graph.
+
+    Parameters
+    ----------
+    graph : CatalogGraph
+        The catalog graph.
+    question_type : str
+        The type of question, one of ``crud.GRAPH_QUESTION_TYPES``.
+    only_new : bool
+        Whether to skip the subjects already in the question bank.
+
+    Returns
+    -------
+    np.ndarray
+        The nodes of the subjects.
+    """
+    table = GRAPH_SUBJECTS[question_type]
+    nodes = np.arange(graph.size(table), dtype=np.int32)
+    if not only_new:
+        return nodes
+    known = IdSet.from_ids(crud.iter_question_subjects(question_type))
+    if not len(known):
+        return nodes
+    ids = graph.ids[table]
+    is_new = np.concatenate(
+        [
+            ~known.contains(ids[start : start + GRAPH_CHUNK_SIZE])
+            for start in range(0, len(ids), GRAPH_CHUNK_SIZE)
+        ]
+        or [np.empty(0, dtype=bool)]
+    )
+    return nodes[is_new]
+
+
+def pick_graph_distractors(
+    candidates: Sequence[int],
+    names: Sequence[str],
+    excluded: set,
+) -> Optional[list]:
+    """Pick the names of the first valid candidates as distractors.
+
+    Parameters
+    ----------
+    candidates : Sequence[int]
+        The nodes of the candidates, by order of preference (``NO_NODE`` for the
+        rejected ones).
+    names : Sequence[str]
+        The names of the nodes.
+    excluded : set
+        The names that cannot be distractors (e.g. the answer).
+
+    Returns
+    -------
+    list
+        The distractors, or None if there are not enough valid candidates.
+    """
+    distractors = []
+    for candidate in candidates:
+        if candidate == NO_NODE or names[candidate] in excluded:
+            continue
+        excluded.add(names[candidate])
+        distractors.append(names[candidate])
+        if len(distractors) == DISTRACTORS:
+            return distractors
+    return None
+
+
+def same_album_questions(
+    graph: CatalogGraph,
+    songs: np.ndarray,
+    rng: random.Random,
+) -> Iterator[tuple]:
+    """Generate "which song is on the same album as X" questions.
+
+    The answer is another song of the album. The distractors are songs of the
+    same artist from its other albums, completed with random songs when the
+    artist does not have enough of them.
+
+    Parameters
+    ----------
+    graph : CatalogGraph
+        The catalog graph.
+    songs : np.ndarray
+        The nodes of the songs the questions are about.
+    rng : random.Random
+        The random number generator.
+
+    Yields
+    ------
+    tuple
+        The questions, in the format of ``crud.save_questions``.
+    """
+    if not graph.size("songs"):
+        return
+    generator = np.random.default_rng(rng.getrandbits(64))
+    song_albums = graph.parents["songs", "albums"]
+    song_artists = graph.parents["songs", "artists"]
+    names = graph.names["songs"]
+    for start in range(0, len(songs), GRAPH_CHUNK_SIZE):
+        chunk = songs[start : start + GRAPH_CHUNK_SIZE]
+        albums = song_albums[chunk]
+        siblings = graph.sample_neighbors(
+            "album_songs", albums, generator, exclude=chunk
+        )[:, 0]
+        candidates = np.concatenate(
+            [
+                graph.sample_neighbors(
+                    "artist_songs", song_artists[chunk], generator, GRAPH_CANDIDATES
+                ),
+                generator.integers(
+                    graph.size("songs"), size=(len(chunk), GRAPH_CANDIDATES)
+                ),
+            ],
+            axis=1,
+        )
+        # the songs of the same album are not distractors
+        candidates[song_albums[candidates] == albums[:, None]] = NO_NODE
+        for song, sibling, row in zip(
+            chunk.tolist(), siblings.tolist(), candidates.tolist()
+        ):
+            if sibling == NO_NODE or names[sibling] == names[song]:
+                continue
+            answer = names[sibling]
+            distractors = pick_graph_distractors(row, names, {answer, names[song]})
+            if distractors is None:
+                continue
+            yield (
+                "same_album",
+                graph.ids["songs"][song],
+                f'Which song is on the same album as "{names[song]}"?',
+                answer,
+                multiple_choice(answer, distractors, rng),
+            )
+
+
+def shared_artist_questions(
+    graph: CatalogGraph,
+    albums: np.ndarray,
+    rng: random.Random,
+) -> Iterator[tuple]:
+    """Generate "which artist released both X and Y" questions.
+
+    The second album is another album of the artist, the distractors are random
+    artists.
+
+    Parameters
+    ----------
+    graph : CatalogGraph
+        The catalog graph.
+    albums : np.ndarray
+        The nodes of the albums the questions are about.
+    rng : random.Random
+        The random number generator.
+
+    Yields
+    ------
+    tuple
+        The questions, in the format of ``crud.save_questions``.
+    """
+    if not graph.size("artists"):
+        return
+    generator = np.random.default_rng(rng.getrandbits(64))
+    album_artists = graph.parents["albums", "artists"]
+    album_names, artist_names = graph.names["albums"], graph.names["artists"]
+    for start in range(0, len(albums), GRAPH_CHUNK_SIZE):
+        chunk = albums[start : start + GRAPH_CHUNK_SIZE]
+        artists = album_artists[chunk]
+        others = graph.sample_neighbors(
+            "artist_albums", artists, generator, exclude=chunk
+        )[:, 0]
+        candidates = generator.integers(
+            graph.size("artists"), size=(len(chunk), GRAPH_CANDIDATES)
+        )
+        for album, artist, other, row in zip(
+            chunk.tolist(), artists.tolist(), others.tolist(), candidates.tolist()
+        ):
+            if other == NO_NODE or album_names[other] == album_names[album]:
+                continue
+            answer = artist_names[artist]
+            distractors = pick_graph_distractors(row, artist_names, {answer})
+            if distractors is None:
+                continue
+            yield (
+                "shared_artist",
+                graph.ids["albums"][album],
+                f'Which artist released both "{album_names[album]}" and '
+                f'"{album_names[other]}"?',
+                answer,
+                multiple_choice(answer, distractors, rng),
+            )
+
+
+def generate_questions(
+    question_type: str,
+    only_new: bool,
+    rng: random.Random,
+    graph: Optional[CatalogGraph] = None,
+) -> Iterator[tuple]:
+    """Generate the questions of a type from the catalog.
+
+    Parameters
+    ----------
+    question_type : str
+        The type of question, one of ``QUESTION_TYPES``.
+    only_new : bool
+        Whether to skip the subjects already in the question bank.
+    rng : random.Random
+        The random number generator.
+    graph : CatalogGraph, optional
+        The catalog graph, required by the types of ``crud.GRAPH_QUESTION_TYPES``.
+
+    Yields
+    ------
+    tuple
+        The questions, in the format of ``crud.save_questions``.
+    """
+    if question_type in crud.GRAPH_QUESTION_TYPES:
+        subjects = graph_subjects(graph, question_type, only_new)
+        if question_type == "same_album":
+            yield from same_album_questions(graph, subjects, rng)
+        else:
+            yield from shared_artist_questions(graph, subjects, rng)
+        return
+    rows = crud.iter_question_sources(question_type, only_new=only_new)
+    if question_type == "song_artist":
+        artist_names = crud.get_names_sample("artists", DISTRACTOR_POOL_SIZE)
+        yield from song_artist_questions(rows, artist_names, rng)
+    elif question_type == "song_album":
+        album_names = crud.get_names_sample("albums", DISTRACTOR_POOL_SIZE)
+        yield from song_album_questions(rows, album_names, rng)
+    elif question_type == "album_year":
+        yield from album_year_questions(rows, rng)
+    else:
+        yield from song_longer_questions(rows, rng)
+
+
+def build_question_bank(
+    full: bool = False,
+    question_types: Sequence[str] = QUESTION_TYPES,
+    seed: Optional[int] = None,
+) -> int:
+    """Build the question bank.
+
+    Parameters
+    ----------
+    full : bool
+        Whether to rebuild the whole bank (and the catalog snapshot), instead of
+        only adding the questions of the songs and albums without one.
+    question_types : Sequence[str]
+        The types of question to build.
+    seed : int, optional
+        The seed of the random number generator.
+
+    Returns
+    -------
+    int
+        The number of questions added.
+    """
+    rng = random.Random(seed)
+    graph = None
+    if set(question_types) & set(crud.GRAPH_QUESTION_TYPES):
+        graph = export_catalog_snapshot(full)
+    questions = (
+        question
+        for question_type in question_types
+        for question in generate_questions(question_type, not full, rng, graph)
+    )
+    return crud.save_questions(questions, replace=full)
+
+
+def main():
+    """Build the question bank from the command line."""
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--full", action="store_true", help="rebuild the whole question bank"
+    )
+    parser.add_argument(
+        "--types", nargs="+", choices=QUESTION_TYPES, default=QUESTION_TYPES
+    )
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    inserted = build_question_bank(args.full, args.types, args.seed)
+    logger.info("%d questions added in %.1f s.", inserted, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    main()
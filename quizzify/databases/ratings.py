@@ -0,0 +1,224 @@
+"""Adaptive difficulty: Elo ratings of the questions and of the users.
+
+Each answer updates the rating of the difficulty of the question and the rating of
+the skill of the user (``quizzify.utils.ratings``). The ratings stored in the
+database are read with the answer, in the statement recording it; the changes are
+accumulated in memory by each worker and added to the stored ratings by batches,
+by the ``flush_ratings`` job. The counts of answers of the questions give their
+correct-answer rate, as ``artist_answer_stats`` does for the artists.
+
+The adaptive questions are drawn from buckets of rated questions of similar
+difficulty, loaded in memory by each worker and rebuilt from time to time: serving
+a question near the skill of a user is an index in an array and a lookup of the
+question by its ID, whatever the size of the catalog.
+"""
+
+import logging
+import random
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from quizzify.databases import crud
+from quizzify.utils.ratings import (
+    INITIAL_RATING,
+    RatingBuckets,
+    rating_updates,
+    target_difficulty,
+)
+
+logger = logging.getLogger(__name__)
+
+# number of answers before a question is sampled by its rating
+MIN_ANSWERS = 3
+# probability of serving a random question instead, so new questions get rated
+EXPLORATION_RATE = 0.2
+# the skills of the users are reloaded from the database past this many
+MAX_CACHED_SKILLS = 100_000
+
+# changes of the ratings not flushed yet: [rating, answered, correct] by question
+# and [rating, answered] by user
+_pending_questions: Dict[int, List] = {}
+_pending_users: Dict[str, List] = {}
+# last known rating and number of answers of the users, pending changes included
+_skills: Dict[str, Tuple[float, int]] = {}
+# buckets of the rated questions by type (None for all the types)
+_buckets: Dict[Optional[str], RatingBuckets] = {}
+# the answers are recorded by the threads of the threadpool
+_lock = threading.Lock()
+
+
+def record_result(
+    username: str,
+    question_id: int,
+    result: dict,
+) -> float:
+    """Update the ratings of a user and a question with an answer.
+
+    Parameters
+    ----------
+    username : str
+        The username of the user.
+    question_id : int
+        The ID of the question.
+    result : dict
+        The result of ``crud.record_answer``: whether the answer is right, and the
+        stored ratings of the question and the user.
+
+    Returns
+    -------
+    float
+        The new rating of the user.
+    """
+    with _lock:
+        user = _pending_users.setdefault(username, [0.0, 0])
+        question = _pending_questions.setdefault(question_id, [0.0, 0, 0])
+        skill = (result["user_rating"] or INITIAL_RATING) + user[0]
+        difficulty = (result["question_rating"] or INITIAL_RATING) + question[0]
+        user_answered = (result["user_answered"] or 0) + user[1]
+        skill_change, difficulty_change = rating_updates(
+            skill,
+            difficulty,
+            result["correct"],
+            user_answered,
+            (result["question_answered"] or 0) + question[1],
+        )
+        user[0] += skill_change
+        user[1] += 1
+        question[0] += difficulty_change
+        question[1] += 1
+        question[2] += int(result["correct"])
+        _skills[username] = (skill + skill_change, user_answered + 1)
+    return skill + skill_change
+
+
+def get_skill(
+    username: str,
+) -> float:
+    """Return the rating of the skill of a user.
+
+    The rating is read from the database the first time, then updated in memory
+    with the answers of the user.
+
+    Parameters
+    ----------
+    username : str
+        The username of the user.
+
+    Returns
+    -------
+    float
+        The rating of the user.
+    """
+    skill = _skills.get(username)
+    if skill is None:
+        skill = crud.get_user_rating(username) or (INITIAL_RATING, 0)
+        with _lock:
+            pending = _pending_users.get(username, (0.0, 0))
+            skill = _skills.setdefault(
+                username, (skill[0] + pending[0], skill[1] + pending[1])
+            )
+    return skill[0]
+
+
+def _merge_changes(
+    pending: Dict,
+    changes: Dict,
+):
+    """Add changes of ratings to the pending changes."""
+    for key, values in changes.items():
+        current = pending.setdefault(key, [0] * len(values))
+        for index, value in enumerate(values):
+            current[index] += value
+
+
+def flush_ratings() -> int:
+    """Add the changes of the ratings accumulated in memory to the stored ratings.
+
+    Returns
+    -------
+    int
+        The number of ratings updated.
+    """
+    global _pending_questions, _pending_users
+    with _lock:
+        questions, _pending_questions = _pending_questions, {}
+        users, _pending_users = _pending_users, {}
+    if not questions and not users:
+        return 0
+    try:
+        ratings = crud.save_ratings(
+            sorted((key, *changes) for key, changes in questions.items()),
+            sorted((key, *changes) for key, changes in users.items()),
+            INITIAL_RATING,
+        )
+    except Exception:
+        # kept for the next flush
+        with _lock:
+            _merge_changes(_pending_questions, questions)
+            _merge_changes(_pending_users, users)
+        raise
+    with _lock:
+        if len(_skills) > MAX_CACHED_SKILLS:
+            _skills.clear()
+        # the stored ratings include the changes of the other workers
+        for username, rating, answered in ratings:
+            pending = _pending_users.get(username, (0.0, 0))
+            _skills[username] = (rating + pending[0], answered + pending[1])
+    return len(questions) + len(users)
+
+
+def reload_rating_buckets() -> int:
+    """Rebuild the buckets of the questions rated enough from the stored ratings.
+
+    Returns
+    -------
+    int
+        The number of questions in the buckets.
+    """
+    ids, types, ratings = [], [], []
+    for question_id, question_type, rating, answered in crud.iter_question_ratings():
+        if answered >= MIN_ANSWERS:
+            ids.append(question_id)
+            types.append(question_type)
+            ratings.append(rating)
+    ids, types, ratings = np.array(ids), np.array(types), np.array(ratings)
+    buckets = {None: RatingBuckets(ids, ratings)}
+    for question_type in np.unique(types):
+        of_type = types == question_type
+        buckets[str(question_type)] = RatingBuckets(ids[of_type], ratings[of_type])
+    global _buckets
+    # a single assignment: the requests sampling the previous buckets keep them
+    _buckets = buckets
+    logger.info("%d rated questions loaded in the rating buckets.", len(ids))
+    return len(ids)
+
+
+def sample_question_id(
+    username: str,
+    question_type: Optional[str] = None,
+    rng: random.Random = random,
+) -> Optional[int]:
+    """Draw a question near the skill of a user.
+
+    Parameters
+    ----------
+    username : str
+        The username of the user.
+    question_type : str, optional
+        The type of question (any type by default).
+    rng : random.Random
+        The random number generator.
+
+    Returns
+    -------
+    int
+        The ID of a question, or None to serve a random question: to explore the
+        questions not rated yet, or if no rated question is near the skill of the
+        user.
+    """
+    buckets = _buckets.get(question_type)
+    if buckets is None or rng.random() < EXPLORATION_RATE:
+        return None
+    return buckets.sample(target_difficulty(get_skill(username)), rng)
@@ -0,0 +1,181 @@
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from quizzify.config import get_settings
+from quizzify.databases import crud
+
+
+class PostgresStateStore:
+    """Store for the state shared by all the API workers, backed by PostgreSQL.
+
+    The OAuth states and the Spotify tokens are saved in the ``oauth_states`` and
+    ``spotify_tokens`` tables, so any worker can complete a login started by
+    another one and reuse the tokens it fetched. The used refresh tokens and the
+    revoked sessions of the quizzify users are saved in the ``used_refresh_tokens``
+    and ``revoked_sessions`` tables.
+
+    Methods
+    -------
+    save_state(state: str)
+        Save a pending OAuth state.
+    consume_state(state: str)
+        Check that an OAuth state is pending and remove it.
+    save_tokens(access_token: str, refresh_token: str, token_expiration_date)
+        Save the Spotify tokens.
+    get_tokens()
+        Get the Spotify tokens.
+    use_refresh_token(token_id: str, expires_at: int)
+        Mark a session refresh token as used, if it was not already.
+    revoke_session(session_id: str, expires_at: int)
+        Revoke a session until its tokens expire.
+    get_revoked_sessions()
+        Get the revoked sessions.
+    """
+
+    def __init__(
+        self,
+        state_ttl: Optional[int] = None,
+    ):
+        self.state_ttl = state_ttl or get_settings().oauth_state_ttl
+
+    def save_state(self, state: str):
+        """Save a pending OAuth state."""
+        crud.save_oauth_state(state=state, ttl_seconds=self.state_ttl)
+
+    def consume_state(self, state: str) -> bool:
+        """Check that an OAuth state is pending and remove it."""
+        return crud.consume_oauth_state(state=state, ttl_seconds=self.state_ttl)
+
+    def save_tokens(self, access_token, refresh_token, token_expiration_date):
+        """Save the Spotify tokens."""
+        crud.save_spotify_tokens(
+            access_token=access_token,
+            refresh_token=refresh_token,
+            token_expiration_date=token_expiration_date,
+        )
+
+    def get_tokens(self) -> Optional[Dict]:
+        """Get the Spotify tokens, or None if no token has been saved yet."""
+        return crud.get_spotify_tokens()
+
+    def use_refresh_token(self, token_id: str, expires_at: int) -> bool:
+        """Mark a session refresh token as used; False if it already was."""
+        return crud.use_refresh_token(token_id=token_id, expires_at=expires_at)
+
+    def revoke_session(self, session_id: str, expires_at: int):
+        """Revoke a session until its tokens expire (Unix time)."""
+        crud.revoke_session(session_id=session_id, expires_at=expires_at)
+
+    def get_revoked_sessions(self) -> List[Tuple[str, int]]:
+        """Get the revoked sessions and their expiration (Unix time)."""
+        return crud.get_revoked_sessions()
+
+
+class InMemoryStateStore:
+    """Local stand-in for the shared state store, for a single worker.
+
+    It behaves like ``PostgresStateStore`` but keeps everything in the memory of
+    the process: use it for development and tests only.
+    """
+
+    def __init__(
+        self,
+        state_ttl: Optional[int] = None,
+    ):
+        self.state_ttl = state_ttl or get_settings().oauth_state_ttl
+        self._states: Dict[str, float] = {}
+        self._tokens: Optional[Dict] = None
+        self._used_refresh_tokens: Dict[str, int] = {}
+        self._revoked_sessions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def save_state(self, state: str):
+        """Save a pending OAuth state."""
+        now = time.monotonic()
+        with self._lock:
+            self._states = {
+                saved_state: created_at
+                for saved_state, created_at in self._states.items()
+                if now - created_at <= self.state_ttl
+            }
+            self._states[state] = now
+
+    def consume_state(self, state: str) -> bool:
+        """Check that an OAuth state is pending and remove it."""
+        with self._lock:
+            created_at = self._states.pop(state, None)
+        return created_at is not None and (
+            time.monotonic() - created_at <= self.state_ttl
+        )
+
+    def save_tokens(self, access_token, refresh_token, token_expiration_date):
+        """Save the Spotify tokens."""
+        with self._lock:
+            if refresh_token is None and self._tokens:
+                refresh_token = self._tokens["refresh_token"]
+            self._tokens = {
+                "access_token": access_token,
+                "refresh_token": refresh_token,
+                "token_expiration_date": token_expiration_date,
+            }
+
+    def get_tokens(self) -> Optional[Dict]:
+        """Get the Spotify tokens, or None if no token has been saved yet."""
+        with self._lock:
+            return dict(self._tokens) if self._tokens else None
+
+    def use_refresh_token(self, token_id: str, expires_at: int) -> bool:
+        """Mark a session refresh token as used; False if it already was."""
+        now = time.time()
+        with self._lock:
+            self._used_refresh_tokens = {
+                used: expires
+                for used, expires in self._used_refresh_tokens.items()
+                if expires >= now
+            }
+            if token_id in self._used_refresh_tokens:
+                return False
+            self._used_refresh_tokens[token_id] = expires_at
+            return True
+
+    def revoke_session(self, session_id: str, expires_at: int):
+        """Revoke a session until its tokens expire (Unix time)."""
+        with self._lock:
+            self._revoked_sessions[session_id] = max(
+                expires_at, self._revoked_sessions.get(session_id, expires_at)
+            )
+
+    def get_revoked_sessions(self) -> List[Tuple[str, int]]:
+        """Get the revoked sessions and their expiration (Unix time)."""
+        now = time.time()
+        with self._lock:
+            return [
+                (session_id, expires)
+                for session_id, expires in self._revoked_sessions.items()
+                if expires >= now
+            ]
+
+
+STATE_STORES = {
+    "postgres": PostgresStateStore,
+    "memory": InMemoryStateStore,
+}
+_state_store = None
+
+
+def get_state_store():
+    """Return the state store of the application.
+
+    The backend is chosen with the ``QUIZZIFY_STATE_STORE`` environment variable:
+    ``postgres`` (shared by all the workers) or ``memory``.
+
+    Returns
+    -------
+    PostgresStateStore or InMemoryStateStore
+        The state store, created on the first call.
+    """
+    global _state_store
+    if _state_store is None:
+        _state_store = STATE_STORES[get_settings().state_store]()
+    return _state_store
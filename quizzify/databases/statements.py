@@ -0,0 +1,94 @@
+"""Server-side prepared statements of the database functions.
+
+A statement is named once, at import, and prepared (``PREPARE``) on each pooled
+connection the first time it runs there: the next calls on this connection only
+send ``EXECUTE`` with the parameters, so PostgreSQL neither parses nor analyzes
+the query again, and can reuse a generic plan after a few executions. The
+connections of the pool live as long as the worker, so a statement is prepared
+once per connection, not once per call.
+
+Set ``QUIZZIFY_DB_PREPARED_STATEMENTS=false`` to send the queries as they are,
+e.g. behind a pooler in transaction mode, where the session of a connection may
+change between two transactions.
+"""
+
+import re
+import time
+from typing import Dict, Optional
+
+from quizzify.config import get_settings
+from quizzify.utils.metrics import DB_PREPARE_LATENCY, DB_PREPARED_STATEMENTS
+
+# named placeholder of a psycopg2 query
+PLACEHOLDER = re.compile(r"%\((\w+)\)s")
+
+STATEMENTS: Dict[str, "Statement"] = {}
+
+
+class Statement:
+    """A SQL query, prepared on each connection on first use.
+
+    Attributes
+    ----------
+    name : str
+        The unique name of the prepared statement.
+    query : str
+        The query, with ``%(name)s`` placeholders.
+    params : list
+        The names of the parameters, in the order of their ``$n`` placeholder.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        query: str,
+    ):
+        if name in STATEMENTS:
+            raise ValueError(f"The statement {name} is already registered.")
+        self.name = name
+        self.query = query
+        self.params: list = []
+
+        def number(match: re.Match) -> str:
+            """Replace a named placeholder by its positional one."""
+            if match.group(1) not in self.params:
+                self.params.append(match.group(1))
+            return f"${self.params.index(match.group(1)) + 1}"
+
+        # the PREPARE query is sent without parameters: "%%" is not escaped there
+        body = PLACEHOLDER.sub(number, query).replace("%%", "%").strip().rstrip(";")
+        self.prepare_query = f"PREPARE {name} AS {body};"
+        arguments = ", ".join(["%s"] * len(self.params))
+        self.execute_query = (
+            f"EXECUTE {name} ({arguments});" if self.params else f"EXECUTE {name};"
+        )
+        STATEMENTS[name] = self
+
+    def execute(
+        self,
+        cursor,
+        vars: Optional[dict] = None,
+    ):
+        """Run the statement with a cursor, preparing it on its connection first.
+
+        Parameters
+        ----------
+        cursor : psycopg2.extensions.cursor
+            The cursor, of a pooled connection.
+        vars : dict, optional
+            The values of the parameters.
+        """
+        # the connections out of the pools keep track of their statements
+        prepared = getattr(cursor.connection, "prepared_statements", None)
+        if not isinstance(prepared, set) or not get_settings().db_prepared_statements:
+            cursor.execute(query=self.query, vars=vars)
+            return
+        if self.name in prepared:
+            DB_PREPARED_STATEMENTS.labels(self.name, "reused").inc()
+        else:
+            start = time.perf_counter()
+            cursor.execute(self.prepare_query)
+            DB_PREPARE_LATENCY.labels(self.name).observe(time.perf_counter() - start)
+            DB_PREPARED_STATEMENTS.labels(self.name, "prepared").inc()
+            prepared.add(self.name)
+        cursor.execute(self.execute_query, [vars[param] for param in self.params])
@@ -0,0 +1,63 @@
+"""Gunicorn configuration for the production run mode of the API.
+
+Run the API with several Uvicorn workers::
+
+    gunicorn -c quizzify/gunicorn.conf.py quizzify.main:app
+
+The OAuth states and the Spotify tokens are kept in the shared state store
+(``QUIZZIFY_STATE_STORE=postgres``), so any worker can serve any request.
+"""
+
+import logging
+import multiprocessing
+import os
+import shutil
+
+# the metrics of the workers are aggregated through files written in this
+# directory: it must be set before prometheus_client is imported by the app
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/quizzify-metrics")  # nosec B108
+shutil.rmtree(os.environ["PROMETHEUS_MULTIPROC_DIR"], ignore_errors=True)
+os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"])
+
+logger = logging.getLogger(__name__)
+
+# one worker per core by default
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+bind = os.environ.get("QUIZZIFY_BIND", "0.0.0.0:8000")  # nosec B104
+# import the application once in the master, then fork the workers: they start
+# faster and share the memory of the imported modules (copy-on-write)
+preload_app = True
+# on SIGTERM, workers stop accepting connections and get this many seconds to
+# finish the in-flight requests before being killed
+graceful_timeout = int(os.environ.get("QUIZZIFY_GRACEFUL_TIMEOUT", 30))
+timeout = int(os.environ.get("QUIZZIFY_WORKER_TIMEOUT", 60))
+keepalive = 5
+# recycle the workers from time to time to contain memory leaks
+max_requests = int(os.environ.get("QUIZZIFY_MAX_REQUESTS", 10_000))
+max_requests_jitter = max_requests // 10
+logconfig = os.environ.get("QUIZZIFY_LOG_CONFIG", "quizzify/logging.conf")
+
+
+def on_starting(server):
+    """Refuse to start several workers that would not accept each other's tokens."""
+    from quizzify.utils.sessions import check_signing_key
+
+    check_signing_key(server.cfg.workers)
+
+
+def post_fork(server, worker):
+    """Log the start of a worker."""
+    server.log.info(f"Worker {worker.pid} started.")
+
+
+def worker_exit(server, worker):
+    """Log the end of a worker, once its in-flight requests are done."""
+    server.log.info(f"Worker {worker.pid} stopped.")
+
+
+def child_exit(server, worker):
+    """Discard the live gauges of a dead worker."""
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
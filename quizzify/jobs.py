@@ -0,0 +1,176 @@
+"""Background jobs of the API, run by the scheduler of each worker."""
+
+import logging
+from datetime import datetime, timedelta
+
+from starlette.concurrency import run_in_threadpool
+
+from quizzify.api.auth.service import load_revoked_sessions
+from quizzify.api.personalization.service import warm_pools
+from quizzify.config import get_settings
+from quizzify.databases.catalog_snapshot import reload_catalog_graph
+from quizzify.databases.history import maintain_partitions
+from quizzify.databases.question_bank import build_question_bank
+from quizzify.databases.ratings import flush_ratings, reload_rating_buckets
+from quizzify.spotify.spotify_token_manager import SpotifyTokenManager
+from quizzify.utils.scheduler import (
+    CronTrigger,
+    IntervalTrigger,
+    OnceTrigger,
+    Scheduler,
+)
+
+logger = logging.getLogger(__name__)
+
+# seconds between two checks of the expiration of the Spotify access token
+TOKEN_CHECK_INTERVAL = 60
+# the access token is refreshed when it expires in less than this many seconds
+TOKEN_REFRESH_MARGIN = 300
+# when the partitions of the answer history are created and dropped (cron)
+HISTORY_MAINTENANCE_CRON = "0 1 * * *"
+# seconds between two checks for a new catalog snapshot
+CATALOG_SNAPSHOT_CHECK_INTERVAL = 60
+# seconds between two loads of the revoked sessions, in case a notification of
+# another worker was missed
+REVOKED_SESSIONS_SYNC_INTERVAL = 300
+# seconds between two flushes of the changes of the ratings of a worker
+RATINGS_FLUSH_INTERVAL = 10
+# seconds between two rebuilds of the rating buckets of a worker
+RATING_BUCKETS_RELOAD_INTERVAL = 600
+
+
+def refresh_spotify_token():
+    """Refresh the Spotify access token before it expires.
+
+    The token is refreshed ahead of time, so no request waits for Spotify to
+    refresh it.
+    """
+    token_manager = SpotifyTokenManager()
+    # another worker may have refreshed it
+    token_manager.load_tokens()
+    expiration_date = token_manager.token_expiration_date
+    if expiration_date is None or not token_manager.refresh_token:
+        return
+    if expiration_date - datetime.now() < timedelta(seconds=TOKEN_REFRESH_MARGIN):
+        token_manager.refresh_access_token()
+        logger.info("Spotify access token refreshed by the scheduler.")
+
+
+def update_question_bank():
+    """Add the questions of the songs and albums added to the catalog."""
+    added = build_question_bank(full=False)
+    logger.info("%d questions added to the question bank.", added)
+
+
+def maintain_history_partitions():
+    """Create the next partitions of the answer history and drop the expired ones."""
+    maintain_partitions()
+
+
+def swap_catalog_snapshot():
+    """Map the catalog snapshot published by another worker, if any."""
+    reload_catalog_graph()
+
+
+async def sync_revoked_sessions():
+    """Load the sessions revoked by the workers in the revocation list."""
+    await load_revoked_sessions()
+
+
+def save_ratings():
+    """Add the changes of the ratings of the answers to the stored ratings."""
+    flushed = flush_ratings()
+    if flushed:
+        logger.info("%d ratings flushed.", flushed)
+
+
+def rebuild_rating_buckets():
+    """Rebuild the buckets of questions sampled by their rating."""
+    reload_rating_buckets()
+
+
+async def warm_caches():
+    """Fill the in-memory caches of a worker that just started."""
+    await run_in_threadpool(SpotifyTokenManager().load_tokens)
+    sessions = await load_revoked_sessions()
+    logger.info("%d revoked sessions loaded in memory.", sessions)
+    users = await warm_pools()
+    logger.info("Listening history of %d users loaded in memory.", users)
+    await run_in_threadpool(reload_rating_buckets)
+
+
+def register_jobs(scheduler: Scheduler):
+    """Register the background jobs of the API.
+
+    Parameters
+    ----------
+    scheduler : Scheduler
+        The scheduler of the worker.
+
+    Raises
+    ------
+    ValueError
+        If ``QUIZZIFY_QUESTION_BANK_CRON`` is not a valid cron expression.
+    """
+    scheduler.add_job(
+        "refresh_spotify_token",
+        refresh_spotify_token,
+        IntervalTrigger(TOKEN_CHECK_INTERVAL),
+        jitter=10,
+    )
+    scheduler.add_job(
+        "update_question_bank",
+        update_question_bank,
+        CronTrigger(get_settings().question_bank_cron),
+        jitter=300,
+    )
+    scheduler.add_job(
+        "maintain_history_partitions",
+        maintain_history_partitions,
+        CronTrigger(HISTORY_MAINTENANCE_CRON),
+        jitter=300,
+    )
+    # each worker makes sure the history can be written to when it starts (the
+    # maintenance is idempotent and serialized by an advisory lock)
+    scheduler.add_job(
+        "create_history_partitions",
+        maintain_history_partitions,
+        OnceTrigger(),
+        jitter=5,
+        single_instance=False,
+    )
+    # each worker maps the published catalog snapshot
+    scheduler.add_job(
+        "swap_catalog_snapshot",
+        swap_catalog_snapshot,
+        IntervalTrigger(CATALOG_SNAPSHOT_CHECK_INTERVAL),
+        jitter=10,
+        single_instance=False,
+    )
+    # each worker has its own revocation list
+    scheduler.add_job(
+        "sync_revoked_sessions",
+        sync_revoked_sessions,
+        IntervalTrigger(REVOKED_SESSIONS_SYNC_INTERVAL),
+        jitter=30,
+        single_instance=False,
+    )
+    # each worker flushes the ratings it updated, and samples its own buckets
+    scheduler.add_job(
+        "save_ratings",
+        save_ratings,
+        IntervalTrigger(RATINGS_FLUSH_INTERVAL),
+        jitter=2,
+        single_instance=False,
+    )
+    scheduler.add_job(
+        "rebuild_rating_buckets",
+        rebuild_rating_buckets,
+        IntervalTrigger(RATING_BUCKETS_RELOAD_INTERVAL),
+        jitter=60,
+        single_instance=False,
+    )
+    # each worker has its own caches
+    scheduler.add_job(
+        "warm_caches", warm_caches, OnceTrigger(), jitter=5, single_instance=False
+    )
@@ -1,23 +1,85 @@
 import logging.config
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 
 from quizzify.api.albums.router import router as albums_router
 from quizzify.api.artists.router import router as artists_router
 from quizzify.api.auth.router import router as auth_router
+from quizzify.api.exports.router import router as exports_router
+from quizzify.api.personalization.router import router as personalization_router
 from quizzify.api.questions.router import router as questions_router
+from quizzify.api.rooms.router import router as rooms_router
+from quizzify.api.rooms.service import close_rooms
+from quizzify.api.search.router import router as search_router
 from quizzify.api.songs.router import router as songs_router
+from quizzify.api.stats.router import router as stats_router
+from quizzify.config import get_settings
+from quizzify.databases.db_connection import (
+    ReadYourWritesMiddleware,
+    close_pool,
+    open_pool,
+)
+from quizzify.databases.job_store import close_job_store
+from quizzify.databases.pubsub import close_pubsub
+from quizzify.databases.ratings import flush_ratings
+from quizzify.jobs import register_jobs
+from quizzify.spotify.spotify_client import close_session, open_session
+from quizzify.spotify.spotify_token_manager import SpotifyTokenManager
+from quizzify.utils.metrics import (
+    InstrumentedJSONResponse,
+    MetricsMiddleware,
+    metrics_response,
+)
+from quizzify.utils.scheduler import Scheduler
+from quizzify.utils.tracing import TracingMiddleware
 
 # get root logger
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create the clients of the worker on startup and release them on shutdown.
+
+    Nothing is connected when the module is imported: with Gunicorn, the app is
+    imported once by the master, then each worker opens its own clients.
+    """
+    # fail fast on an invalid configuration
+    settings = get_settings()
+    open_pool()
+    open_session()
+    app.state.token_manager = SpotifyTokenManager()
+    app.state.scheduler = Scheduler()
+    if settings.scheduler_enabled:
+        register_jobs(app.state.scheduler)
+    app.state.scheduler.start()
+    yield
+    await app.state.scheduler.stop()
+    # the changes of the ratings since the last flush
+    try:
+        flush_ratings()
+    except Exception:
+        logger.exception("The last changes of the ratings could not be flushed.")
+    close_job_store()
+    close_rooms()
+    close_pubsub()
+    close_session()
+    close_pool()
+
+
 app = FastAPI(
+    lifespan=lifespan,
     title="Quizzify",
     description="Music Quiz API",
     version="0.1.0",
     docs_url="/docs",
+    default_response_class=InstrumentedJSONResponse,
 )
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(TracingMiddleware)
+app.add_middleware(ReadYourWritesMiddleware)
 
 
 @app.get("/")
@@ -26,8 +88,21 @@ def index():
     return {"Quizzify": "Music Quiz API"}
 
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Return the metrics of the API in the Prometheus text format."""
+    return metrics_response()
+
+
 app.include_router(auth_router, prefix="/auth", tags=["Authentication"])
 app.include_router(albums_router, prefix="/albums", tags=["Albums"])
 app.include_router(artists_router, prefix="/artists", tags=["Artists"])
+app.include_router(exports_router, prefix="/exports", tags=["Exports"])
+app.include_router(
+    personalization_router, prefix="/personalization", tags=["Personalization"]
+)
 app.include_router(questions_router, prefix="/questions", tags=["Questions"])
+app.include_router(rooms_router, prefix="/rooms", tags=["Rooms"])
+app.include_router(search_router, prefix="/search", tags=["Search"])
 app.include_router(songs_router, prefix="/songs", tags=["Songs"])
+app.include_router(stats_router, prefix="/stats", tags=["Statistics"])
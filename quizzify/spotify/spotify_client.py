@@ -0,0 +1,224 @@
+import math
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests  # type: ignore[import-untyped]
+from fastapi import HTTPException, status
+from requests.adapters import HTTPAdapter  # type: ignore[import-untyped]
+
+from quizzify.config import get_settings
+from quizzify.utils.circuit_breaker import CircuitBreaker
+from quizzify.utils.metrics import (
+    SPOTIFY_REQUEST_LATENCY,
+    SPOTIFY_RESPONSES,
+    SPOTIFY_RETRIES,
+)
+from quizzify.utils.tracing import start_span
+
+# connections kept alive to each Spotify host (one per thread of the threadpool)
+SESSION_POOL_SIZE = 40
+# exponential backoff between two attempts, in seconds (before the jitter)
+BACKOFF_BASE = 0.25
+BACKOFF_MAX = 4.0
+# longer Retry-After delays are not waited for: the breaker fails fast meanwhile
+MAX_RETRY_AFTER = 5.0
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+# circuit breakers, per Spotify host (accounts service and Web API)
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def open_session() -> requests.Session:
+    """Open the HTTP session shared by the requests to Spotify, if not open yet.
+
+    The session keeps the connections to Spotify alive between requests (no TCP
+    and TLS handshake per request). It is opened by the lifespan of the
+    application, or by the first request otherwise.
+
+    Returns
+    -------
+    requests.Session
+        The HTTP session.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=SESSION_POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def close_session():
+    """Close the HTTP session and its connections, if open."""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def get_breaker(url: str) -> CircuitBreaker:
+    """Return the circuit breaker of the Spotify host of a URL."""
+    host = urlsplit(url).netloc
+    breaker = _breakers.get(host)
+    if breaker is None:
+        settings = get_settings()
+        with _session_lock:
+            breaker = _breakers.setdefault(
+                host,
+                CircuitBreaker(
+                    f"spotify:{host}",
+                    failure_threshold=settings.spotify_breaker_threshold,
+                    reset_timeout=settings.spotify_breaker_reset,
+                ),
+            )
+    return breaker
+
+
+def parse_retry_after(response: requests.Response) -> Optional[float]:
+    """Return the number of seconds to wait asked by a response, if any.
+
+    The ``Retry-After`` header holds either a number of seconds or a date.
+    """
+    value = response.headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(retry_at.timestamp() - time.time(), 0.0)
+
+
+def backoff(attempt: int) -> float:
+    """Return the delay before a new attempt: exponential, with full jitter."""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2**attempt))
+
+
+def send_request(
+    method: str,
+    url: str,
+    endpoint: str,
+    **kwargs,
+) -> requests.Response:
+    """Send a request to Spotify, retrying it and failing fast when Spotify is down.
+
+    Every outbound call to Spotify (accounts service or Web API) goes through
+    this function. The 5xx responses, connection errors and timeouts are retried
+    up to ``QUIZZIFY_SPOTIFY_MAX_RETRIES`` times, with an exponential backoff and
+    jitter, and so are the 429 responses, after the delay asked by their
+    ``Retry-After`` header. Each attempt waits ``QUIZZIFY_SPOTIFY_TIMEOUT``
+    seconds at most, unless ``timeout`` is given.
+
+    The failures open the circuit breaker of the Spotify host: the requests are
+    then rejected at once, until a probe succeeds.
+
+    Parameters
+    ----------
+    method : str
+        The HTTP method (e.g. ``get`` or ``post``).
+    url : str
+        The URL of the request.
+    endpoint : str
+        The name of the endpoint used to label the metrics (e.g. ``token``).
+    **kwargs
+        The arguments of the request (headers, data, timeout...).
+
+    Returns
+    -------
+    requests.Response
+        The response from Spotify, possibly an error after the last attempt.
+
+    Raises
+    ------
+    HTTPException
+        With a 503 status code if the circuit breaker is open or Spotify cannot
+        be reached.
+    """
+    settings = get_settings()
+    kwargs.setdefault("timeout", settings.spotify_timeout)
+    breaker = get_breaker(url)
+    attempts = settings.spotify_max_retries + 1
+    for attempt in range(attempts):
+        is_last = attempt == attempts - 1
+        wait = breaker.allow()
+        if wait:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Spotify is unavailable, please retry later.",
+                headers={"Retry-After": str(math.ceil(wait))},
+            )
+        retry_after = None
+        try:
+            response = _send(method, url, endpoint, **kwargs)
+        except requests.RequestException as error:
+            breaker.record_failure()
+            # a request timing out may have been processed: only resend reads
+            retriable = isinstance(error, requests.ConnectionError) or (
+                isinstance(error, requests.Timeout) and method.lower() == "get"
+            )
+            if is_last or not retriable:
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Spotify is unavailable, please retry later.",
+                ) from error
+            reason = (
+                "timeout" if isinstance(error, requests.Timeout) else "connection_error"
+            )
+        else:
+            if response.status_code == 429:
+                retry_after = parse_retry_after(response)
+                if retry_after is not None and retry_after > MAX_RETRY_AFTER:
+                    breaker.record_failure(retry_after=retry_after)
+                    return response
+                # Spotify is up, it only limits the rate of the requests
+                breaker.record_success()
+            elif response.status_code >= 500:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+                return response
+            if is_last:
+                return response
+            reason = str(response.status_code)
+        finally:
+            # an unexpected error is neither a success nor a failure of Spotify:
+            # the next call is the probe, rather than all of them being rejected
+            breaker.end_probe()
+        SPOTIFY_RETRIES.labels(endpoint, reason).inc()
+        time.sleep(retry_after if retry_after is not None else backoff(attempt))
+
+
+def _send(
+    method: str,
+    url: str,
+    endpoint: str,
+    **kwargs,
+) -> requests.Response:
+    """Send a request to Spotify once, record its latency and status and trace it."""
+    status_code = "error"
+    start = time.perf_counter()
+    try:
+        with start_span(
+            f"spotify.{endpoint}", **{"http.method": method.upper(), "http.url": url}
+        ) as span:
+            session = _session or open_session()
+            response = session.request(method.upper(), url, **kwargs)
+            status_code = str(response.status_code)
+            span.set_attribute("http.status_code", response.status_code)
+        return response
+    finally:
+        SPOTIFY_REQUEST_LATENCY.labels(endpoint).observe(time.perf_counter() - start)
+        SPOTIFY_RESPONSES.labels(endpoint, status_code).inc()
@@ -0,0 +1,116 @@
+import logging
+
+from fastapi import HTTPException, status
+
+from quizzify.config import get_settings
+from quizzify.spotify.spotify_client import send_request
+from quizzify.spotify.spotify_token_manager import SpotifyTokenManager
+from quizzify.utils.tracing import traced
+
+logger = logging.getLogger(__name__)
+
+# maximum number of items returned by a page of the Spotify Web API
+PAGE_SIZE = 50
+
+
+def _get_items(
+    path: str,
+    endpoint: str,
+    params: dict,
+) -> list:
+    """Get the items of a page of the current user's library.
+
+    Parameters
+    ----------
+    path : str
+        The path of the endpoint, relative to the Web API (e.g. ``me/albums``).
+    endpoint : str
+        The name of the endpoint used to label the metrics.
+    params : dict
+        The query parameters.
+
+    Returns
+    -------
+    list
+        The items of the page.
+    """
+    access_token = SpotifyTokenManager().access_token
+
+    if not access_token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or missing access token",
+        )
+
+    response = send_request(
+        method="get",
+        url=f"{get_settings().spotify_base_url}/{path}",
+        endpoint=endpoint,
+        headers={"Authorization": f"Bearer {access_token}"},
+        params=params,
+    )
+    if response.status_code != 200:
+        raise HTTPException(
+            status_code=response.status_code,
+            detail=f"Failed to retrieve {path}",
+        )
+    return response.json()["items"]
+
+
+@traced("spotify.get_top_artists")
+def get_top_artists(limit: int = PAGE_SIZE) -> list:
+    """Get the artists the user listens to the most.
+
+    Parameters
+    ----------
+    limit : int
+        The number of artists (at most 50).
+
+    Returns
+    -------
+    list
+        The artist objects of the Spotify Web API.
+    """
+    return _get_items(
+        "me/top/artists",
+        "me_top_artists",
+        {"limit": limit, "time_range": "medium_term"},
+    )
+
+
+@traced("spotify.get_top_tracks")
+def get_top_tracks(limit: int = PAGE_SIZE) -> list:
+    """Get the tracks the user listens to the most.
+
+    Parameters
+    ----------
+    limit : int
+        The number of tracks (at most 50).
+
+    Returns
+    -------
+    list
+        The track objects of the Spotify Web API.
+    """
+    return _get_items(
+        "me/top/tracks", "me_top_tracks", {"limit": limit, "time_range": "medium_term"}
+    )
+
+
+@traced("spotify.get_saved_albums")
+def get_saved_albums(limit: int = PAGE_SIZE) -> list:
+    """Get the albums saved in the user's library, most recent first.
+
+    Parameters
+    ----------
+    limit : int
+        The number of albums (at most 50).
+
+    Returns
+    -------
+    list
+        The album objects of the Spotify Web API.
+    """
+    return [
+        item["album"] for item in _get_items("me/albums", "me_albums", {"limit": limit})
+    ]
@@ -1,21 +1,20 @@
-import os
 from datetime import datetime, timedelta
 
-import requests  # type: ignore[import-untyped]
-from dotenv import load_dotenv
-
+from quizzify.config import get_settings
+from quizzify.databases.state_store import get_state_store
+from quizzify.spotify.spotify_client import send_request
 from quizzify.utils.helpers import encode_str_to_base64
+from quizzify.utils.metrics import CACHE_ENTRIES, record_cache_lookup
 from quizzify.utils.singleton import Singleton
 
-load_dotenv()
-
 
 class SpotifyTokenManager(metaclass=Singleton):
     """Service for authenticating and authorizing the Spotify API.
 
     This class handles the authentication and authorization for the Spotify API.
     It also handles the refreshing of the access token. This class is a singleton
-    class, so it can be used across the application.
+    class, so it can be used across the application. The tokens are saved in the
+    shared state store, so that every API worker uses the same tokens.
 
     Attributes
     ----------
@@ -44,20 +43,22 @@ class SpotifyTokenManager(metaclass=Singleton):
         Exchange the authorization code for an access token.
     refresh_access_token()
         Refresh the access token.
+    load_tokens()
+        Load the tokens saved in the shared state store.
     """
 
-    client_id = os.environ.get("SPOTIFY_CLIENT_ID")
-    client_secret = os.environ.get("SPOTIFY_CLIENT_SECRET")
-    token_url = str(os.environ.get("SPOTIFY_TOKEN_URL"))
-    auth_url = str(os.environ.get("SPOTIFY_AUTH_URL"))
-    auth_scope = os.environ.get("SPOTIFY_AUTH_SCOPE")
-    redirect_uri = os.environ.get("SPOTIFY_REDIRECT_URI")
-
     # Singleton instance
     # _instance = None
 
     def __init__(self):
         super().__init__()
+        settings = get_settings()
+        self.client_id = settings.spotify_client_id
+        self.client_secret = settings.spotify_client_secret
+        self.token_url = str(settings.spotify_token_url)
+        self.auth_url = str(settings.spotify_auth_url)
+        self.auth_scope = settings.spotify_auth_scope
+        self.redirect_uri = settings.spotify_redirect_uri
         self.__access_token = None
         self.__refresh_token = None
         self.__token_expiration_date = None
@@ -83,6 +84,9 @@ class SpotifyTokenManager(metaclass=Singleton):
     @property
     def access_token(self):
         """Return the access token for the Spotify API."""
+        if not self.__access_token or self.is_token_expired:
+            # another worker may have fetched or refreshed the token
+            self.load_tokens()
         return self.__access_token
 
     @property
@@ -101,6 +105,24 @@ class SpotifyTokenManager(metaclass=Singleton):
         """
         return datetime.now() > self.token_expiration_date
 
+    def load_tokens(self):
+        """Load the tokens saved in the shared state store, if any."""
+        tokens = get_state_store().get_tokens()
+        CACHE_ENTRIES.labels("spotify_token").set(1 if tokens else 0)
+        if tokens:
+            self.__access_token = tokens["access_token"]
+            self.__refresh_token = tokens["refresh_token"]
+            self.__token_expiration_date = tokens["token_expiration_date"]
+
+    def _save_tokens(self, refresh_token=None):
+        """Save the tokens in the shared state store."""
+        CACHE_ENTRIES.labels("spotify_token").set(1)
+        get_state_store().save_tokens(
+            access_token=self.__access_token,
+            refresh_token=refresh_token,
+            token_expiration_date=self.__token_expiration_date,
+        )
+
     def get_access_token(self):
         """Return the access token for the Spotify API.
 
@@ -118,6 +140,11 @@ class SpotifyTokenManager(metaclass=Singleton):
         ValueError
             If no valid access token or refresh token is available.
         """
+        is_cached = bool(self.__access_token) and not self.is_token_expired
+        record_cache_lookup("spotify_token", hit=is_cached)
+        if not is_cached:
+            # another worker may have fetched or refreshed the token
+            self.load_tokens()
         if self.__access_token and not self.is_token_expired:
             return self.to_dict()
         elif self.__refresh_token:
@@ -136,10 +163,9 @@ class SpotifyTokenManager(metaclass=Singleton):
         state : str
             The state from the Spotify API.
         """
-        # Check if state matches
-        current_state = os.environ.get("STATE")
-        if state is not None and state != current_state:
-            raise ValueError("State not provided")
+        # Check if state matches one generated by any of the workers
+        if state is not None and not get_state_store().consume_state(state):
+            raise ValueError("Invalid or expired state")
 
         if code is None:
             raise ValueError("Authorization code not provided")
@@ -158,11 +184,12 @@ class SpotifyTokenManager(metaclass=Singleton):
             "Content-Type": "application/x-www-form-urlencoded",
             "Authorization": "Basic " + str(encoded_auth_info),
         }
-        response = requests.post(
+        response = send_request(
+            method="post",
             url=self.token_url,
+            endpoint="token",
             data=token_data,
             headers=header_data,
-            timeout=120,  # 2 minutes
         )
 
         if response.status_code == 200:
@@ -173,6 +200,7 @@ class SpotifyTokenManager(metaclass=Singleton):
             self.__token_expiration_date = datetime.now() + timedelta(
                 seconds=token_expiration
             )
+            self._save_tokens(refresh_token=self.__refresh_token)
         else:
             # Handle the error as needed
             raise Exception("Failed to retrieve access token")
@@ -192,6 +220,9 @@ class SpotifyTokenManager(metaclass=Singleton):
         Exception
             If the access token could not be refreshed.
         """
+        if not self.__refresh_token:
+            # another worker may have fetched the tokens
+            self.load_tokens()
         if not self.__refresh_token:
             raise Exception("Refresh token not available")
 
@@ -206,11 +237,12 @@ class SpotifyTokenManager(metaclass=Singleton):
             "Content-Type": "application/x-www-form-urlencoded",
             "Authorization": "Basic " + str(encoded_auth_info),
         }
-        response = requests.post(
+        response = send_request(
+            method="post",
             url=self.token_url,
+            endpoint="token",
             data=token_data,
             headers=header_data,
-            timeout=120,  # 2 minutes
         )
 
         if response.status_code == 200:
@@ -220,5 +252,9 @@ class SpotifyTokenManager(metaclass=Singleton):
             self.__token_expiration_date = datetime.now() + timedelta(
                 seconds=token_expiration
             )
+            # Spotify may rotate the refresh token
+            if "refresh_token" in raw_response:
+                self.__refresh_token = raw_response["refresh_token"]
+            self._save_tokens(refresh_token=raw_response.get("refresh_token"))
         else:
             raise Exception("Failed to refresh access token")
@@ -1,32 +1,61 @@
 import logging
-import os
+import threading
+from collections import OrderedDict
 
-import requests  # type: ignore[import-untyped]
-from dotenv import load_dotenv
 from fastapi import HTTPException, status
 
+from quizzify.config import get_settings
+from quizzify.spotify.spotify_client import send_request
 from quizzify.spotify.spotify_token_manager import SpotifyTokenManager
-
-# load environment variables
-load_dotenv()
-# define base URL for Spotify API
-SPOTIFY_BASE_URL = os.environ.get("SPOTIFY_BASE_URL")
-# instantiate token manager for Spotify access token
-spotify_auth = SpotifyTokenManager()
+from quizzify.utils.metrics import CACHE_ENTRIES, record_cache_lookup
+from quizzify.utils.tracing import traced
 
 logger = logging.getLogger(__name__)
 
+# maximum number of profiles kept to answer while Spotify is unavailable
+PROFILE_CACHE_SIZE = 100
+
+# last profile fetched with each access token (least recent first)
+_profiles: OrderedDict = OrderedDict()
+_profiles_lock = threading.Lock()
+
+
+def _cache_profile(access_token: str, user_info: dict):
+    """Keep the profile fetched with an access token."""
+    with _profiles_lock:
+        _profiles[access_token] = user_info
+        _profiles.move_to_end(access_token)
+        if len(_profiles) > PROFILE_CACHE_SIZE:
+            _profiles.popitem(last=False)
+        CACHE_ENTRIES.labels("spotify_profile").set(len(_profiles))
+
+
+def _cached_profile(access_token: str, error: HTTPException) -> dict:
+    """Return the profile last fetched with an access token, or raise the error."""
+    with _profiles_lock:
+        user_info = _profiles.get(access_token)
+    record_cache_lookup("spotify_profile", user_info is not None)
+    if user_info is None:
+        raise error
+    logger.warning(
+        "Spotify is unavailable (%s), using the cached profile.", error.status_code
+    )
+    return dict(user_info)
+
 
+@traced("spotify.get_user_info")
 def get_spotify_user_info():
     """Get the user's information from Spotify.
 
+    While Spotify is unavailable (5xx or 429 responses, open circuit breaker),
+    the profile last fetched with the same access token is returned, if any.
+
     Returns
     -------
     dict
         The user's information from Spotify.
     """
-    global spotify_auth
-    access_token = spotify_auth.access_token
+    access_token = SpotifyTokenManager().access_token
 
     if not access_token:
         raise HTTPException(
@@ -35,12 +64,16 @@ def get_spotify_user_info():
         )
 
     headers = {"Authorization": f"Bearer {access_token}"}
-    api_url = f"{SPOTIFY_BASE_URL}/me/"
-    response = requests.get(
-        api_url,
-        headers=headers,
-        timeout=120,
-    )
+    api_url = f"{get_settings().spotify_base_url}/me/"
+    try:
+        response = send_request(
+            method="get",
+            url=api_url,
+            endpoint="me",
+            headers=headers,
+        )
+    except HTTPException as error:
+        return _cached_profile(access_token, error)
 
     if response.status_code == 200:
         raw_user_info = response.json()
@@ -52,9 +85,12 @@ def get_spotify_user_info():
             "country": raw_user_info["country"],
             "spotify_uri": raw_user_info["uri"],
         }
+        _cache_profile(access_token, user_info)
         return user_info
-    else:
-        raise HTTPException(
-            status_code=response.status_code,
-            detail="Failed to retrieve user information",
-        )
+    error = HTTPException(
+        status_code=response.status_code,
+        detail="Failed to retrieve user information",
+    )
+    if response.status_code == 429 or response.status_code >= 500:
+        return _cached_profile(access_token, error)
+    raise error
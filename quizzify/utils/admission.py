@@ -0,0 +1,225 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Optional
+
+from fastapi import HTTPException, Request, status
+
+from quizzify.config import get_settings
+from quizzify.utils.metrics import (
+    ADMISSION_DECISIONS,
+    ADMISSION_IN_FLIGHT,
+    ADMISSION_QUEUE_LATENCY,
+    ADMISSION_QUEUED,
+)
+
+# maximum number of clients tracked by a rate limiter
+RATE_LIMIT_MAX_KEYS = 100_000
+
+
+async def client_ip(request: Request) -> str:
+    """Return the IP address of the client.
+
+    Behind a proxy, run the server with ``--proxy-headers`` (``--forwarded-allow-ips``)
+    so that the address comes from the ``X-Forwarded-For`` header.
+    """
+    return request.client.host if request.client else "unknown"
+
+
+async def account_email(request: Request) -> str:
+    """Return the email of the account a request logs in to.
+
+    The body has already been read by FastAPI, so it is not read twice.
+    """
+    try:
+        body = await request.json()
+    except ValueError:
+        body = None
+    email = body.get("email") if isinstance(body, dict) else None
+    return str(email).strip().lower() if email else await client_ip(request)
+
+
+class RateLimiter:
+    """Token bucket rate limit, per client.
+
+    Each client (an IP address, an account...) has a bucket of ``burst`` tokens,
+    refilled at ``rate`` tokens per second. A request takes a token, or is
+    rejected with a 429 status code and a ``Retry-After`` header if the bucket is
+    empty. The buckets of the clients seen least recently are dropped beyond
+    ``max_keys`` clients, to bound the memory.
+
+    The limiter is a FastAPI dependency (``dependencies=[Depends(limiter)]``). It
+    is only used from the event loop, so it needs no lock, but its buckets are
+    local to a worker: with N workers, a client gets up to N times the rate.
+
+    Attributes
+    ----------
+    name : str
+        The name of the limiter, used in the metrics.
+    rate : float
+        The number of requests per second allowed per client.
+    burst : int
+        The number of requests a client can send at once.
+    key : Callable[[Request], Awaitable[str]]
+        The function identifying the client of a request.
+    max_keys : int
+        The maximum number of clients tracked.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rate: float,
+        burst: int,
+        key: Callable[[Request], Awaitable[str]] = client_ip,
+        max_keys: int = RATE_LIMIT_MAX_KEYS,
+    ):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.key = key
+        self.max_keys = max_keys
+        # tokens left and time of the last update, per client (least recent first)
+        self._buckets: OrderedDict = OrderedDict()
+
+    def acquire(
+        self,
+        key: str,
+        now: Optional[float] = None,
+    ) -> float:
+        """Take a token from the bucket of a client.
+
+        Parameters
+        ----------
+        key : str
+            The client.
+        now : float, optional
+            The current time (``time.monotonic()`` by default).
+
+        Returns
+        -------
+        float
+            0 if the request is admitted, otherwise the number of seconds until
+            a token is available.
+        """
+        now = time.monotonic() if now is None else now
+        tokens, updated_at = self._buckets.pop(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated_at) * self.rate)
+        if tokens >= 1:
+            tokens -= 1
+            retry_after = 0.0
+        else:
+            retry_after = (1 - tokens) / self.rate
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return retry_after
+
+    async def __call__(self, request: Request):
+        """Admit the request, or reject it with a 429 status code."""
+        if not get_settings().rate_limit_enabled:
+            return
+        retry_after = self.acquire(await self.key(request))
+        if retry_after:
+            ADMISSION_DECISIONS.labels(self.name, "rate_limited").inc()
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests, please retry later.",
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
+        ADMISSION_DECISIONS.labels(self.name, "admitted").inc()
+
+
+class ConcurrencyLimiter:
+    """Cap on the number of requests processed at once by a route.
+
+    Requests beyond ``limit`` wait in a queue of ``queue_size`` requests for at
+    most ``queue_timeout`` seconds. When the queue is full, or the wait times
+    out, the request is shed with a 503 status code and a ``Retry-After`` header
+    instead of piling up in the threadpool.
+
+    The limiter is a FastAPI dependency (``dependencies=[Depends(limiter)]``),
+    holding its slot until the endpoint returns. Its slots are local to a worker.
+
+    Attributes
+    ----------
+    name : str
+        The name of the limiter, used in the metrics.
+    limit : int
+        The number of requests processed at once.
+    queue_size : int
+        The number of requests waiting for a slot
+        (``QUIZZIFY_ADMISSION_QUEUE_SIZE`` by default).
+    queue_timeout : float
+        The number of seconds a request waits for a slot
+        (``QUIZZIFY_ADMISSION_QUEUE_TIMEOUT`` by default).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        limit: int,
+        queue_size: Optional[int] = None,
+        queue_timeout: Optional[float] = None,
+    ):
+        settings = get_settings()
+        self.name = name
+        self.limit = limit
+        self.queue_size = (
+            settings.admission_queue_size if queue_size is None else queue_size
+        )
+        self.queue_timeout = queue_timeout or settings.admission_queue_timeout
+        self._semaphore = asyncio.Semaphore(limit)
+        self._queued = 0
+
+    def _shed(self, decision: str):
+        """Count the rejected request and raise a 503 error."""
+        ADMISSION_DECISIONS.labels(self.name, decision).inc()
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="The server is busy, please retry later.",
+            headers={"Retry-After": str(math.ceil(self.queue_timeout))},
+        )
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold a concurrency slot, waiting in the queue if needed.
+
+        Raises
+        ------
+        HTTPException
+            With a 503 status code if the queue is full or the wait timed out.
+        """
+        if self._semaphore.locked():
+            if self._queued >= self.queue_size:
+                self._shed("queue_full")
+            self._queued += 1
+            ADMISSION_QUEUED.labels(self.name).inc()
+            start = time.perf_counter()
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                self._shed("queue_timeout")
+            finally:
+                self._queued -= 1
+                ADMISSION_QUEUED.labels(self.name).dec()
+                ADMISSION_QUEUE_LATENCY.labels(self.name).observe(
+                    time.perf_counter() - start
+                )
+        else:
+            await self._semaphore.acquire()
+
+        ADMISSION_DECISIONS.labels(self.name, "admitted").inc()
+        ADMISSION_IN_FLIGHT.labels(self.name).inc()
+        try:
+            yield
+        finally:
+            ADMISSION_IN_FLIGHT.labels(self.name).dec()
+            self._semaphore.release()
+
+    async def __call__(self):
+        """Hold a concurrency slot while the endpoint runs."""
+        async with self.slot():
+            yield
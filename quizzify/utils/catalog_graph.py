@@ -0,0 +1,425 @@
+import itertools
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from quizzify.utils.snapshot import FixedStringColumn, StringColumn, encode_strings
+
+# catalog tables held by the graph, parents first
+GRAPH_TABLES = ("artists", "albums", "songs")
+# parent tables of the rows of each table, in the order of their columns after
+# the ID and the name
+GRAPH_PARENTS = {
+    "artists": (),
+    "albums": ("artists",),
+    "songs": ("artists", "albums"),
+}
+# relations of the graph: (parent table, child table)
+RELATIONS = {
+    "artist_albums": ("artists", "albums"),
+    "album_songs": ("albums", "songs"),
+    "artist_songs": ("artists", "songs"),
+}
+# index of a missing node (unknown or NULL parent, no neighbor to sample)
+NO_NODE = -1
+
+
+class SortedIdIndex:
+    """Node of each ID of a graph loaded from arrays, found by binary search.
+
+    Attributes
+    ----------
+    sorted_ids : np.ndarray
+        The IDs, as a sorted fixed-width bytes array.
+    nodes : np.ndarray
+        The node of each sorted ID.
+    """
+
+    def __init__(
+        self,
+        sorted_ids: np.ndarray,
+        nodes: np.ndarray,
+    ):
+        self.sorted_ids = sorted_ids
+        self.nodes = nodes
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def __contains__(self, id_: str) -> bool:
+        return self.get(id_) is not None
+
+    def get(self, id_: str, default: Optional[int] = None) -> Optional[int]:
+        """Return the node of an ID, or ``default`` if it is not in the graph."""
+        node = int(self.lookup([id_])[0])
+        return default if node == NO_NODE else node
+
+    def lookup(self, ids: Sequence[str]) -> np.ndarray:
+        """Return the nodes of a batch of IDs (``NO_NODE`` if not in the graph)."""
+        keys = np.array([id_.encode() for id_ in ids], dtype=self.sorted_ids.dtype)
+        if not len(self.sorted_ids):
+            return np.full(len(keys), NO_NODE, dtype=np.int32)
+        positions = np.minimum(
+            np.searchsorted(self.sorted_ids, keys), len(self.sorted_ids) - 1
+        )
+        # longer IDs are truncated by the conversion: compare the lengths too
+        found = (self.sorted_ids[positions] == keys) & (
+            np.char.str_len(keys) == np.array([len(id_) for id_ in ids])
+        )
+        return np.where(found, self.nodes[positions], NO_NODE).astype(np.int32)
+
+
+class CatalogGraph:
+    """Relations between the artists, albums and songs, as CSR adjacency arrays.
+
+    The nodes of each table are numbered in their order of insertion. Each
+    relation (e.g. ``album_songs``) is stored in compressed sparse row format: the
+    children of the parent ``i`` are ``indices[indptr[i]:indptr[i + 1]]``, in
+    ascending order, so the neighbors of a whole batch of nodes are gathered with
+    a few NumPy operations instead of a SQL join per node.
+
+    New rows are merged into the arrays without rebuilding them: since their
+    nodes are numbered after the existing ones, they are appended to the rows of
+    their parents with a single pass over the arrays. Updated or deleted catalog
+    rows are only taken into account by a full rebuild.
+
+    The whole graph is exported as flat arrays (``to_arrays``), the IDs as a
+    fixed-width column and the names in a string heap, so that it can be saved in
+    a snapshot file and opened again without copying it (``from_arrays``). A
+    graph opened from arrays is copied in memory by its first ``add``.
+
+    Attributes
+    ----------
+    ids : dict
+        The IDs of the nodes of each table.
+    names : dict
+        The names of the nodes of each table.
+    index : dict
+        The node of each ID, per table.
+    parents : dict
+        The parent node of each node (``NO_NODE`` if unknown), per (child table,
+        parent table).
+
+    Methods
+    -------
+    add(table: str, rows: Iterable[tuple])
+        Add rows of a catalog table to the graph.
+    new_ids(table: str, ids: Sequence[str])
+        Return the IDs of a batch that are not in the graph.
+    to_arrays()
+        Export the graph as flat arrays.
+    from_arrays(arrays: Mapping[str, np.ndarray])
+        Load a graph from the arrays returned by ``to_arrays``.
+    neighbors(relation: str, nodes: np.ndarray)
+        Get the children of a batch of nodes.
+    sample_neighbors(relation: str, nodes: np.ndarray, rng, size: int, exclude)
+        Draw random children of a batch of nodes.
+    """
+
+    def __init__(self):
+        self.ids: Dict[str, list] = {table: [] for table in GRAPH_TABLES}
+        self.names: Dict[str, list] = {table: [] for table in GRAPH_TABLES}
+        self.index: Dict[str, dict] = {table: {} for table in GRAPH_TABLES}
+        self.parents: Dict[Tuple[str, str], np.ndarray] = {
+            (table, parent): np.empty(0, dtype=np.int32)
+            for table, parents in GRAPH_PARENTS.items()
+            for parent in parents
+        }
+        self._csr: Dict[str, Tuple[np.ndarray, np.ndarray]] = {
+            relation: (np.zeros(1, dtype=np.int64), np.empty(0, dtype=np.int32))
+            for relation in RELATIONS
+        }
+
+    @classmethod
+    def from_arrays(
+        cls,
+        arrays: Mapping[str, np.ndarray],
+    ) -> "CatalogGraph":
+        """Load a graph from the arrays returned by ``to_arrays``.
+
+        The arrays are used as they are (e.g. mapped from a snapshot file), the
+        IDs and names being decoded on access.
+
+        Parameters
+        ----------
+        arrays : Mapping[str, np.ndarray]
+            The arrays of the graph.
+
+        Returns
+        -------
+        CatalogGraph
+            The graph.
+        """
+        graph = cls()
+        for table in GRAPH_TABLES:
+            graph.ids[table] = FixedStringColumn(arrays[f"{table}.ids"])
+            graph.names[table] = StringColumn(
+                arrays[f"{table}.names.heap"], arrays[f"{table}.names.offsets"]
+            )
+            graph.index[table] = SortedIdIndex(
+                arrays[f"{table}.sorted_ids"], arrays[f"{table}.sorted_nodes"]
+            )
+        for table, parent in graph.parents:
+            graph.parents[table, parent] = arrays[f"{table}.{parent}"]
+        for relation in RELATIONS:
+            graph._csr[relation] = (
+                arrays[f"{relation}.indptr"],
+                arrays[f"{relation}.indices"],
+            )
+        return graph
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """Export the graph as flat arrays.
+
+        Returns
+        -------
+        dict
+            The arrays of the graph, by name.
+        """
+        arrays = {}
+        for table in GRAPH_TABLES:
+            encoded = [id_.encode() for id_ in self.ids[table]]
+            width = max(map(len, encoded), default=1)
+            ids = np.array(encoded, dtype=f"S{width}")
+            order = np.argsort(ids, kind="stable")
+            arrays[f"{table}.ids"] = ids
+            arrays[f"{table}.sorted_ids"] = ids[order]
+            arrays[f"{table}.sorted_nodes"] = order.astype(np.int32)
+            heap, offsets = encode_strings(self.names[table])
+            arrays[f"{table}.names.heap"] = heap
+            arrays[f"{table}.names.offsets"] = offsets
+        for (table, parent), nodes in self.parents.items():
+            arrays[f"{table}.{parent}"] = nodes
+        for relation, (indptr, indices) in self._csr.items():
+            arrays[f"{relation}.indptr"] = indptr
+            arrays[f"{relation}.indices"] = indices
+        return arrays
+
+    def _copy_in_memory(self):
+        """Copy the IDs and names of a graph loaded from arrays in memory."""
+        for table in GRAPH_TABLES:
+            if isinstance(self.ids[table], list):
+                continue
+            self.ids[table] = list(self.ids[table])
+            self.names[table] = list(self.names[table])
+            self.index[table] = {id_: node for node, id_ in enumerate(self.ids[table])}
+
+    def new_ids(
+        self,
+        table: str,
+        ids: Sequence[str],
+    ) -> List[str]:
+        """Return the IDs of a batch that are not in the graph.
+
+        Parameters
+        ----------
+        table : str
+            The catalog table, one of ``GRAPH_TABLES``.
+        ids : Sequence[str]
+            The IDs to check.
+
+        Returns
+        -------
+        list
+            The new IDs.
+        """
+        index = self.index[table]
+        if isinstance(index, SortedIdIndex):
+            nodes = index.lookup(ids)
+            return [id_ for id_, node in zip(ids, nodes.tolist()) if node == NO_NODE]
+        return [id_ for id_ in ids if id_ not in index]
+
+    def size(self, table: str) -> int:
+        """Return the number of nodes of a table."""
+        return len(self.ids[table])
+
+    @property
+    def nbytes(self) -> int:
+        """Return the memory used by the adjacency arrays, in bytes."""
+        return sum(array.nbytes for array in self.parents.values()) + sum(
+            indptr.nbytes + indices.nbytes for indptr, indices in self._csr.values()
+        )
+
+    def add(
+        self,
+        table: str,
+        rows: Iterable[tuple],
+    ) -> int:
+        """Add rows of a catalog table to the graph.
+
+        The rows already in the graph are skipped. The parents must be added
+        before their children: a row whose parent is not in the graph yet is
+        added without this relation.
+
+        Parameters
+        ----------
+        table : str
+            The catalog table, one of ``GRAPH_TABLES``.
+        rows : Iterable[tuple]
+            The rows, as (id, name, *parent ids) tuples (see ``GRAPH_PARENTS``).
+
+        Returns
+        -------
+        int
+            The number of nodes added.
+
+        Raises
+        ------
+        ValueError
+            If the table is not a table of the graph.
+        """
+        if table not in GRAPH_TABLES:
+            raise ValueError(f"Unknown catalog table: {table}")
+        rows = iter(rows)
+        first = next(rows, None)
+        if first is None:
+            return 0
+        self._copy_in_memory()
+        rows = itertools.chain([first], rows)
+        ids, names, index = self.ids[table], self.names[table], self.index[table]
+        parent_tables = GRAPH_PARENTS[table]
+        parent_nodes = [[] for _ in parent_tables]
+        first = len(ids)
+        for row in rows:
+            if row[0] in index:
+                continue
+            index[row[0]] = len(ids)
+            ids.append(row[0])
+            names.append(row[1])
+            for nodes, parent, parent_id in zip(parent_nodes, parent_tables, row[2:]):
+                nodes.append(self.index[parent].get(parent_id, NO_NODE))
+
+        children = np.arange(first, len(ids), dtype=np.int32)
+        for parent, nodes in zip(parent_tables, parent_nodes):
+            nodes = np.asarray(nodes, dtype=np.int32)
+            self.parents[table, parent] = np.concatenate(
+                [self.parents[table, parent], nodes]
+            )
+            self._merge(self._relation(parent, table), nodes, children)
+        # the new nodes start with no child
+        for relation, (parent, _) in RELATIONS.items():
+            if parent == table:
+                self._merge(relation, np.empty(0, np.int32), np.empty(0, np.int32))
+        return len(children)
+
+    @staticmethod
+    def _relation(parent: str, child: str) -> str:
+        """Return the name of the relation from a parent table to a child table."""
+        return next(
+            relation
+            for relation, tables in RELATIONS.items()
+            if tables == (parent, child)
+        )
+
+    def _merge(
+        self,
+        relation: str,
+        parents: np.ndarray,
+        children: np.ndarray,
+    ):
+        """Append new edges to the rows of a relation, in a single pass.
+
+        The children must be numbered after all the children already in the
+        relation, so that the rows stay sorted.
+        """
+        indptr, indices = self._csr[relation]
+        size = self.size(RELATIONS[relation][0])
+        known = parents != NO_NODE
+        parents, children = parents[known], children[known]
+
+        old_counts = np.zeros(size, dtype=np.int64)
+        old_counts[: len(indptr) - 1] = np.diff(indptr)
+        counts = old_counts + np.bincount(parents, minlength=size)
+        new_indptr = np.zeros(size + 1, dtype=np.int64)
+        np.cumsum(counts, out=new_indptr[1:])
+
+        merged = np.empty(new_indptr[-1], dtype=np.int32)
+        # the existing edges keep their rank in their row
+        rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+        merged[new_indptr[rows] + np.arange(len(indices)) - indptr[rows]] = indices
+        # the new edges come after them, in ascending order of child
+        order = np.argsort(parents, kind="stable")
+        parents, children = parents[order], children[order]
+        ranks = np.arange(len(parents)) - np.searchsorted(parents, parents)
+        merged[new_indptr[parents] + old_counts[parents] + ranks] = children
+        self._csr[relation] = new_indptr, merged
+
+    def neighbors(
+        self,
+        relation: str,
+        nodes: Sequence[int],
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Get the children of a batch of nodes.
+
+        Parameters
+        ----------
+        relation : str
+            The relation, one of ``RELATIONS``.
+        nodes : Sequence[int]
+            The parent nodes (``NO_NODE`` for a node without children).
+
+        Returns
+        -------
+        tuple
+            The children of all the nodes, concatenated in the order of the
+            nodes, and the number of children of each node.
+        """
+        indptr, indices = self._csr[relation]
+        nodes = np.asarray(nodes, dtype=np.int64)
+        starts = indptr[nodes]
+        counts = np.where(nodes != NO_NODE, indptr[nodes + 1] - starts, 0)
+        ends = np.cumsum(counts)
+        total = int(ends[-1]) if len(ends) else 0
+        positions = np.arange(total) + np.repeat(starts - ends + counts, counts)
+        return indices[positions], counts
+
+    def sample_neighbors(
+        self,
+        relation: str,
+        nodes: Sequence[int],
+        rng: np.random.Generator,
+        size: int = 1,
+        exclude: Optional[Sequence[int]] = None,
+    ) -> np.ndarray:
+        """Draw random children of a batch of nodes, with replacement.
+
+        Parameters
+        ----------
+        relation : str
+            The relation, one of ``RELATIONS``.
+        nodes : Sequence[int]
+            The parent nodes (``NO_NODE`` for a node without children).
+        rng : np.random.Generator
+            The random number generator.
+        size : int
+            The number of children drawn for each node.
+        exclude : Sequence[int], optional
+            A child of each node that must not be drawn (e.g. the subject of a
+            question among its siblings).
+
+        Returns
+        -------
+        np.ndarray
+            The children drawn, of shape (number of nodes, size), ``NO_NODE``
+            when a node has no (other) child.
+        """
+        indptr, indices = self._csr[relation]
+        nodes = np.asarray(nodes, dtype=np.int64)
+        starts = indptr[nodes][:, None]
+        counts = np.where(nodes != NO_NODE, indptr[nodes + 1] - indptr[nodes], 0)
+        counts = counts[:, None]
+        if exclude is not None:
+            # draw among the other children, the excluded one being swapped
+            # with the last child of the row
+            counts = counts - 1
+        if not len(indices):
+            return np.full((len(nodes), size), NO_NODE, dtype=np.int32)
+        has_child = counts > 0
+        ranks = np.floor(rng.random((len(nodes), size)) * counts).astype(np.int64)
+        drawn = np.where(
+            has_child, indices[np.where(has_child, starts + ranks, 0)], NO_NODE
+        )
+        if exclude is not None:
+            last = indices[np.where(has_child, starts + counts, 0)]
+            drawn = np.where(drawn == np.asarray(exclude)[:, None], last, drawn)
+        return drawn.astype(np.int32)
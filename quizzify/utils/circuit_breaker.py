@@ -0,0 +1,140 @@
+import threading
+import time
+from typing import Optional
+
+from quizzify.utils.metrics import (
+    CIRCUIT_BREAKER_REJECTIONS,
+    CIRCUIT_BREAKER_STATE,
+    CIRCUIT_BREAKER_TRANSITIONS,
+)
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+# values of the state gauge (the highest being the worst)
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitBreaker:
+    """Fail fast while a remote service keeps failing.
+
+    The breaker is closed while the calls succeed. After ``failure_threshold``
+    consecutive failures, it opens: the calls are rejected without being sent for
+    ``reset_timeout`` seconds (or as long as the service asked, with a
+    ``Retry-After`` header). Then it is half-open: a single call goes through, as
+    a probe, closing the breaker if it succeeds or opening it again otherwise.
+
+    The breaker is local to a worker and thread-safe, as the calls to the remote
+    service are sent from the thread pool.
+
+    Attributes
+    ----------
+    name : str
+        The name of the breaker, used in the metrics.
+    failure_threshold : int
+        The number of consecutive failures opening the breaker.
+    reset_timeout : float
+        The number of seconds the breaker stays open.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int,
+        reset_timeout: float,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self._failures = 0
+        self._open_until = 0.0
+        # the thread sending the probe, while half-open
+        self._probing: Optional[int] = None
+        self._lock = threading.Lock()
+        CIRCUIT_BREAKER_STATE.labels(name).set(STATE_VALUES[CLOSED])
+
+    def _set_state(self, state: str):
+        """Change the state of the breaker (with the lock held)."""
+        if state != self.state:
+            self.state = state
+            CIRCUIT_BREAKER_STATE.labels(self.name).set(STATE_VALUES[state])
+            CIRCUIT_BREAKER_TRANSITIONS.labels(self.name, state).inc()
+
+    def allow(
+        self,
+        now: Optional[float] = None,
+    ) -> float:
+        """Check whether a call can be sent.
+
+        Parameters
+        ----------
+        now : float, optional
+            The current time (``time.monotonic()`` by default).
+
+        Returns
+        -------
+        float
+            0 if the call can be sent, otherwise the number of seconds until the
+            breaker lets a probe through.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if self.state == OPEN and now >= self._open_until:
+                self._set_state(HALF_OPEN)
+            if self.state == CLOSED:
+                return 0.0
+            if self.state == HALF_OPEN and self._probing is None:
+                self._probing = threading.get_ident()
+                return 0.0
+            CIRCUIT_BREAKER_REJECTIONS.labels(self.name).inc()
+            if self.state == OPEN:
+                return self._open_until - now
+            # the probe in flight will not take longer than that
+            return self.reset_timeout
+
+    def record_success(self):
+        """Record a successful call, closing the breaker."""
+        with self._lock:
+            self._failures = 0
+            self._probing = None
+            self._set_state(CLOSED)
+
+    def record_failure(
+        self,
+        retry_after: Optional[float] = None,
+        now: Optional[float] = None,
+    ):
+        """Record a failed call, opening the breaker if needed.
+
+        Parameters
+        ----------
+        retry_after : float, optional
+            The number of seconds the service asked to wait, if any: the breaker
+            opens for that long, whatever the number of failures.
+        now : float, optional
+            The current time (``time.monotonic()`` by default).
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._failures += 1
+            if retry_after is not None:
+                open_for = retry_after
+            elif self.state == HALF_OPEN or self._failures >= self.failure_threshold:
+                open_for = self.reset_timeout
+            else:
+                return
+            self._open_until = now + open_for
+            self._probing = None
+            self._set_state(OPEN)
+
+    def end_probe(self):
+        """End the probe sent by the calling thread, if any, without an outcome.
+
+        Called once the call is over, whatever happened: a probe interrupted by an
+        unexpected error would otherwise leave the breaker half-open, rejecting
+        every call.
+        """
+        with self._lock:
+            if self._probing == threading.get_ident():
+                self._probing = None
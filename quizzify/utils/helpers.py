@@ -1,8 +1,6 @@
 import base64
 import secrets
 
-from email_validator import EmailNotValidError, validate_email
-
 
 def generate_random_string(
     length: int,
@@ -70,6 +68,9 @@ def check_email(email: str) -> bool:
     bool
         True if the email is valid, False otherwise.
     """
+    # imported on first use: email_validator is slow to import
+    from email_validator import EmailNotValidError, validate_email
+
     try:
         # Check that the email address is valid. Turn on check_deliverability
         # for first-time validations like on account creation pages (but not
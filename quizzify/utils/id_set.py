@@ -0,0 +1,272 @@
+from itertools import islice
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# alphabet used by Spotify to encode its 128-bit IDs in base62
+BASE62_ALPHABET = "0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ"
+# length of a Spotify ID in base62
+SPOTIFY_ID_LENGTH = 22
+# a decoded ID: a 128-bit integer stored as two unsigned 64-bit halves
+ID_DTYPE = np.dtype([("hi", np.uint64), ("lo", np.uint64)])
+
+# lookup table from an ASCII code to its base62 digit (-1 if not a digit)
+_DIGITS = np.full(256, -1, dtype=np.int16)
+_DIGITS[[ord(char) for char in BASE62_ALPHABET]] = np.arange(len(BASE62_ALPHABET))
+# the digits are accumulated by groups of 5 (62**5 < 2**30) to limit the passes
+_GROUP_SIZE = 5
+_GROUP_WEIGHTS = len(BASE62_ALPHABET) ** np.arange(_GROUP_SIZE - 1, -1, -1)
+_GROUP_BASE = np.uint64(len(BASE62_ALPHABET) ** _GROUP_SIZE)
+_PADDED_LENGTH = -(-SPOTIFY_ID_LENGTH // _GROUP_SIZE) * _GROUP_SIZE
+_LIMB_MASK = np.uint64(0xFFFFFFFF)
+_LIMB_BITS = np.uint64(32)
+
+
+def decode_base62(
+    ids: Sequence[str],
+) -> np.ndarray:
+    """Decode base62 Spotify IDs to 128-bit integers.
+
+    The decoding is vectorized over all the IDs: the digits are combined by groups
+    of 5, then accumulated in four 32-bit limbs (held in 64-bit integers to keep
+    the carry).
+
+    Parameters
+    ----------
+    ids : Sequence[str]
+        The IDs to decode (at most 22 base62 characters each).
+
+    Returns
+    -------
+    np.ndarray
+        The decoded IDs, as an array of ``ID_DTYPE``.
+
+    Raises
+    ------
+    ValueError
+        If an ID is too long, contains a non base62 character or does not fit in
+        128 bits.
+    """
+    try:
+        # one more byte than needed to detect IDs that are too long
+        chars = np.asarray(ids, dtype=f"S{SPOTIFY_ID_LENGTH + 1}")
+    except UnicodeEncodeError as error:
+        raise ValueError("IDs must only contain base62 characters.") from error
+    if (np.char.str_len(chars) > SPOTIFY_ID_LENGTH).any():
+        raise ValueError(f"IDs must be at most {SPOTIFY_ID_LENGTH} characters long.")
+    # shorter IDs are padded with NUL bytes on the right, while leading zeros do
+    # not change the value: right-justify them with zeros
+    chars = chars.astype(f"S{SPOTIFY_ID_LENGTH}")
+    is_short = np.char.str_len(chars) < SPOTIFY_ID_LENGTH
+    if is_short.any():
+        chars[is_short] = np.char.rjust(chars[is_short], SPOTIFY_ID_LENGTH, b"0")
+
+    digits = np.zeros((len(chars), _PADDED_LENGTH), dtype=np.int64)
+    digits[:, _PADDED_LENGTH - SPOTIFY_ID_LENGTH :] = _DIGITS[
+        chars.view(np.uint8).reshape(len(chars), SPOTIFY_ID_LENGTH)
+    ]
+    if (digits < 0).any():
+        raise ValueError("IDs must only contain base62 characters.")
+    groups = (digits.reshape(len(chars), -1, _GROUP_SIZE) @ _GROUP_WEIGHTS).T
+    groups = groups.astype(np.uint64)
+
+    limbs = np.zeros((4, len(chars)), dtype=np.uint64)
+    for carry in groups:
+        for limb in limbs:
+            value = limb * _GROUP_BASE + carry
+            limb[:] = value & _LIMB_MASK
+            carry = value >> _LIMB_BITS
+        if carry.any():
+            raise ValueError("IDs must fit in 128 bits.")
+
+    decoded = np.empty(len(chars), dtype=ID_DTYPE)
+    decoded["hi"] = (limbs[3] << _LIMB_BITS) | limbs[2]
+    decoded["lo"] = (limbs[1] << _LIMB_BITS) | limbs[0]
+    return decoded
+
+
+def _sort_unique(
+    hi: np.ndarray,
+    lo: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Sort 128-bit integers given as two halves and remove the duplicates.
+
+    Parameters
+    ----------
+    hi : np.ndarray
+        The high 64 bits of the integers.
+    lo : np.ndarray
+        The low 64 bits of the integers.
+
+    Returns
+    -------
+    tuple
+        The sorted unique high and low halves, and the index of the first
+        occurrence of each one in the input arrays.
+    """
+    # lexsort is stable: the first occurrence of duplicates comes first
+    order = np.lexsort((lo, hi))
+    hi, lo = hi[order], lo[order]
+    is_first = np.ones(len(hi), dtype=bool)
+    is_first[1:] = (hi[1:] != hi[:-1]) | (lo[1:] != lo[:-1])
+    return hi[is_first], lo[is_first], order[is_first]
+
+
+class IdSet:
+    """Compact set of Spotify IDs backed by sorted NumPy arrays.
+
+    Each ID is stored as a 128-bit integer, split in two 64-bit halves (16 bytes)
+    instead of a Python string held in a list or a set (around 100 bytes per ID).
+    Membership is checked for a whole batch at once with a binary search on the
+    high halves (``np.searchsorted``), which are almost always unique.
+
+    Attributes
+    ----------
+    hi : np.ndarray
+        The high 64 bits of the IDs, sorted.
+    lo : np.ndarray
+        The low 64 bits of the IDs, sorted for a given high half.
+
+    Methods
+    -------
+    from_ids(ids: Iterable[str], chunk_size: int)
+        Build a set from an iterable of IDs (e.g. ``crud.iter_songs_ids()``).
+    contains(ids: Sequence[str])
+        Check which IDs of a batch belong to the set.
+    new_ids(ids: Sequence[str])
+        Return the IDs of a batch that do not belong to the set.
+    add(ids: Sequence[str])
+        Add a batch of IDs to the set.
+    """
+
+    def __init__(
+        self,
+        values: Optional[np.ndarray] = None,
+    ):
+        if values is None:
+            values = np.empty(0, dtype=ID_DTYPE)
+        self.hi, self.lo, _ = _sort_unique(values["hi"], values["lo"])
+
+    @classmethod
+    def from_ids(
+        cls,
+        ids: Iterable[str],
+        chunk_size: int = 1_000_000,
+    ) -> "IdSet":
+        """Build a set from an iterable of IDs.
+
+        The IDs are decoded by chunks so that a generator (such as
+        ``crud.iter_songs_ids()``) is never fully materialized as strings.
+
+        Parameters
+        ----------
+        ids : Iterable[str]
+            The IDs to add to the set.
+        chunk_size : int
+            The number of IDs decoded at once.
+
+        Returns
+        -------
+        IdSet
+            The set of IDs.
+        """
+        iterator = iter(ids)
+        chunks = []
+        while chunk := list(islice(iterator, chunk_size)):
+            chunks.append(decode_base62(chunk))
+        if not chunks:
+            return cls()
+        return cls(np.concatenate(chunks))
+
+    def __len__(self) -> int:
+        """Return the number of IDs in the set."""
+        return len(self.hi)
+
+    def __contains__(self, spotify_id: str) -> bool:
+        """Check if an ID belongs to the set."""
+        return bool(self.contains([spotify_id])[0])
+
+    @property
+    def nbytes(self) -> int:
+        """Return the memory used by the IDs, in bytes."""
+        return self.hi.nbytes + self.lo.nbytes
+
+    def _contains_decoded(
+        self,
+        hi: np.ndarray,
+        lo: np.ndarray,
+    ) -> np.ndarray:
+        """Check which decoded IDs belong to the set."""
+        left = np.searchsorted(self.hi, hi, side="left")
+        right = np.searchsorted(self.hi, hi, side="right")
+        found = np.zeros(len(hi), dtype=bool)
+        is_single = right - left == 1
+        found[is_single] = self.lo[left[is_single]] == lo[is_single]
+        # IDs sharing their high half are rare: look them up one by one
+        for index in np.flatnonzero(right - left > 1):
+            candidates = self.lo[left[index] : right[index]]
+            position = np.searchsorted(candidates, lo[index])
+            found[index] = (
+                position < len(candidates) and candidates[position] == lo[index]
+            )
+        return found
+
+    def contains(
+        self,
+        ids: Sequence[str],
+    ) -> np.ndarray:
+        """Check which IDs of a batch belong to the set.
+
+        Parameters
+        ----------
+        ids : Sequence[str]
+            The IDs to check.
+
+        Returns
+        -------
+        np.ndarray
+            A boolean mask, True for the IDs that belong to the set.
+        """
+        keys = decode_base62(ids)
+        return self._contains_decoded(keys["hi"], keys["lo"])
+
+    def new_ids(
+        self,
+        ids: Sequence[str],
+    ) -> List[str]:
+        """Return the IDs of a batch that do not belong to the set.
+
+        Duplicates within the batch are only returned once, in their order of
+        first appearance.
+
+        Parameters
+        ----------
+        ids : Sequence[str]
+            The IDs to check.
+
+        Returns
+        -------
+        list
+            The new IDs.
+        """
+        keys = decode_base62(ids)
+        hi, lo, first_indexes = _sort_unique(keys["hi"], keys["lo"])
+        is_new = ~self._contains_decoded(hi, lo)
+        return [ids[index] for index in np.sort(first_indexes[is_new])]
+
+    def add(
+        self,
+        ids: Sequence[str],
+    ):
+        """Add a batch of IDs to the set.
+
+        Parameters
+        ----------
+        ids : Sequence[str]
+            The IDs to add.
+        """
+        keys = decode_base62(ids)
+        self.hi, self.lo, _ = _sort_unique(
+            np.concatenate([self.hi, keys["hi"]]),
+            np.concatenate([self.lo, keys["lo"]]),
+        )
@@ -0,0 +1,383 @@
+import functools
+import inspect
+import os
+import time
+from typing import Optional
+
+from fastapi.responses import JSONResponse, Response
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# buckets (in seconds) suited to the latencies of an API, from 1 ms to 10 s
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+# buckets (in seconds) suited to the background jobs, from 10 ms to 30 minutes
+JOB_BUCKETS = (0.01, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 1800.0)
+
+REQUEST_LATENCY = Histogram(
+    "quizzify_http_request_duration_seconds",
+    "Latency of the HTTP requests, per route.",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+RESPONSE_RENDER_LATENCY = Histogram(
+    "quizzify_http_response_render_duration_seconds",
+    "Time spent serializing the JSON responses.",
+    buckets=LATENCY_BUCKETS,
+)
+DB_QUERY_LATENCY = Histogram(
+    "quizzify_db_query_duration_seconds",
+    "Latency of the database functions (connection included), per function.",
+    ["function"],
+    buckets=LATENCY_BUCKETS,
+)
+DB_CONNECT_LATENCY = Histogram(
+    "quizzify_db_connect_duration_seconds",
+    "Time spent opening a connection to the database.",
+    buckets=LATENCY_BUCKETS,
+)
+DB_CONNECTIONS = Gauge(
+    "quizzify_db_connections",
+    "Number of open connections to the database.",
+    multiprocess_mode="livesum",
+)
+DB_POOL_IN_USE = Gauge(
+    "quizzify_db_pool_connections_in_use",
+    "Number of connections of the pool handed out to the application.",
+    multiprocess_mode="livesum",
+)
+DB_POOL_WAIT_LATENCY = Histogram(
+    "quizzify_db_pool_wait_duration_seconds",
+    "Time spent waiting for a free connection of the pool.",
+    buckets=LATENCY_BUCKETS,
+)
+DB_PREPARED_STATEMENTS = Counter(
+    "quizzify_db_prepared_statements_total",
+    "Executions of the prepared statements, per statement and whether it was "
+    "prepared on the connection first (prepared) or already (reused).",
+    ["statement", "result"],
+)
+DB_PREPARE_LATENCY = Histogram(
+    "quizzify_db_prepare_duration_seconds",
+    "Time spent preparing a statement on a connection (parse and analysis), "
+    "saved by each reuse.",
+    ["statement"],
+    buckets=LATENCY_BUCKETS,
+)
+DB_ROUTED_CONNECTIONS = Counter(
+    "quizzify_db_routed_connections_total",
+    "Connections handed out, per target "
+    "(primary, replica or replica_fallback when no replica is usable).",
+    ["target"],
+)
+DB_REPLICA_LAG = Gauge(
+    "quizzify_db_replica_lag_seconds",
+    "Replication lag of a read replica, as last measured (+Inf if unreachable).",
+    ["replica"],
+    multiprocess_mode="livemax",
+)
+SPOTIFY_REQUEST_LATENCY = Histogram(
+    "quizzify_spotify_request_duration_seconds",
+    "Latency of the requests sent to Spotify, per endpoint.",
+    ["endpoint"],
+    buckets=LATENCY_BUCKETS,
+)
+SPOTIFY_RESPONSES = Counter(
+    "quizzify_spotify_responses_total",
+    "Responses received from Spotify, per endpoint and status code.",
+    ["endpoint", "status"],
+)
+SPOTIFY_RETRIES = Counter(
+    "quizzify_spotify_retries_total",
+    "Requests to Spotify sent again, per endpoint and reason "
+    "(status code, connection_error or timeout).",
+    ["endpoint", "reason"],
+)
+CIRCUIT_BREAKER_STATE = Gauge(
+    "quizzify_circuit_breaker_state",
+    "State of a circuit breaker: 0 closed, 1 half-open, 2 open (worst worker).",
+    ["breaker"],
+    multiprocess_mode="livemax",
+)
+CIRCUIT_BREAKER_TRANSITIONS = Counter(
+    "quizzify_circuit_breaker_transitions_total",
+    "Changes of state of a circuit breaker, per new state.",
+    ["breaker", "state"],
+)
+CIRCUIT_BREAKER_REJECTIONS = Counter(
+    "quizzify_circuit_breaker_rejections_total",
+    "Calls rejected without being sent, because the circuit breaker was open.",
+    ["breaker"],
+)
+PASSWORD_HASHING_LATENCY = Histogram(
+    "quizzify_password_hashing_duration_seconds",
+    "Time spent hashing or checking passwords with bcrypt.",
+    ["operation"],
+    buckets=LATENCY_BUCKETS,
+)
+CACHE_ENTRIES = Gauge(
+    "quizzify_cache_entries",
+    "Number of entries held by an in-memory cache.",
+    ["cache"],
+    multiprocess_mode="livesum",
+)
+CACHE_REQUESTS = Counter(
+    "quizzify_cache_requests_total",
+    "Lookups in an in-memory cache, per result (hit or miss).",
+    ["cache", "result"],
+)
+ADMISSION_DECISIONS = Counter(
+    "quizzify_admission_decisions_total",
+    "Decisions of the admission control, per limiter "
+    "(admitted, rate_limited, queue_full or queue_timeout).",
+    ["limiter", "decision"],
+)
+ADMISSION_QUEUE_LATENCY = Histogram(
+    "quizzify_admission_queue_duration_seconds",
+    "Time spent waiting for a concurrency slot, per limiter.",
+    ["limiter"],
+    buckets=LATENCY_BUCKETS,
+)
+ADMISSION_IN_FLIGHT = Gauge(
+    "quizzify_admission_in_flight",
+    "Number of requests holding a concurrency slot, per limiter.",
+    ["limiter"],
+    multiprocess_mode="livesum",
+)
+ADMISSION_QUEUED = Gauge(
+    "quizzify_admission_queued",
+    "Number of requests waiting for a concurrency slot, per limiter.",
+    ["limiter"],
+    multiprocess_mode="livesum",
+)
+ROOMS = Gauge(
+    "quizzify_rooms",
+    "Number of live quiz rooms hosted by the workers.",
+    multiprocess_mode="livesum",
+)
+WEBSOCKET_CONNECTIONS = Gauge(
+    "quizzify_websocket_connections",
+    "Number of players connected to the live quiz rooms.",
+    multiprocess_mode="livesum",
+)
+BROADCAST_FANOUT_LATENCY = Histogram(
+    "quizzify_room_broadcast_fanout_duration_seconds",
+    "Time spent queuing a room message for all the local players.",
+    buckets=LATENCY_BUCKETS,
+)
+SLOW_CONSUMERS = Counter(
+    "quizzify_room_slow_consumers_total",
+    "Players disconnected because they did not read the room messages fast enough.",
+)
+JOB_DURATION = Histogram(
+    "quizzify_job_duration_seconds",
+    "Duration of the runs of the background jobs, per job.",
+    ["job"],
+    buckets=JOB_BUCKETS,
+)
+JOB_RUNS = Counter(
+    "quizzify_job_runs_total",
+    "Fire times of the background jobs, per job and outcome "
+    "(success, failure, locked or not_due).",
+    ["job", "result"],
+)
+FUNCTION_LATENCY = Histogram(
+    "quizzify_function_duration_seconds",
+    "Latency of the functions instrumented with the instrument decorator.",
+    ["function"],
+    buckets=LATENCY_BUCKETS,
+)
+
+
+def timed(
+    histogram: Histogram,
+    **labels: str,
+):
+    """Decorate a function to observe its duration in a histogram.
+
+    The labels are resolved once, when the function is decorated, so the cost of
+    a call is two ``perf_counter()`` calls and one observation. Coroutine
+    functions are timed until they return, and generator functions until they
+    are exhausted (or closed).
+
+    Parameters
+    ----------
+    histogram : Histogram
+        The histogram to observe the durations in.
+    **labels : str
+        The values of the histogram's labels.
+
+    Returns
+    -------
+    Callable
+        The decorator.
+    """
+
+    def decorator(func):
+        observe = (histogram.labels(**labels) if labels else histogram).observe
+
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    observe(time.perf_counter() - start)
+
+            return async_wrapper
+
+        if inspect.isgeneratorfunction(func):
+
+            @functools.wraps(func)
+            def generator_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return (yield from func(*args, **kwargs))
+                finally:
+                    observe(time.perf_counter() - start)
+
+            return generator_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                observe(time.perf_counter() - start)
+
+        return wrapper
+
+    return decorator
+
+
+def instrument(
+    name: Optional[str] = None,
+):
+    """Decorate a function to observe its duration in the shared histogram.
+
+    Any module can instrument its hot paths with ``@instrument()``: the
+    durations are exported in ``quizzify_function_duration_seconds``, labelled
+    with the qualified name of the function.
+
+    Parameters
+    ----------
+    name : str, optional
+        The label of the function (defaults to ``module.qualname``).
+
+    Returns
+    -------
+    Callable
+        The decorator.
+    """
+
+    def decorator(func):
+        function = name or f"{func.__module__}.{func.__qualname__}"
+        return timed(FUNCTION_LATENCY, function=function)(func)
+
+    return decorator
+
+
+def record_cache_lookup(
+    cache: str,
+    hit: bool,
+):
+    """Count a lookup in an in-memory cache.
+
+    Parameters
+    ----------
+    cache : str
+        The name of the cache.
+    hit : bool
+        True if the entry was found in the cache.
+    """
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+class MetricsMiddleware:
+    """ASGI middleware observing the latency of every HTTP request.
+
+    The requests are labelled with the path template of the matched route (e.g.
+    ``/exports/{table}``) rather than the raw path, to bound the number of series.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        """Forward the request to the application and time it."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # the router adds the matched route to the scope
+            route = scope.get("route")
+            REQUEST_LATENCY.labels(
+                scope["method"],
+                route.path if route else "unmatched",
+                str(status_code),
+            ).observe(time.perf_counter() - start)
+
+
+class InstrumentedJSONResponse(JSONResponse):
+    """JSON response observing the time spent serializing its content."""
+
+    def render(self, content) -> bytes:
+        """Serialize the content to JSON."""
+        with RESPONSE_RENDER_LATENCY.time():
+            return super().render(content)
+
+
+def metrics_response() -> Response:
+    """Export the metrics in the Prometheus text format.
+
+    When the API runs with several workers (``PROMETHEUS_MULTIPROC_DIR`` is set),
+    the metrics of all the workers are aggregated.
+
+    Returns
+    -------
+    Response
+        The metrics of the application.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(content=generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,103 @@
+"""Opaque cursors of the keyset-paginated endpoints.
+
+A page ends with the cursor of its last row: the sort, the value of the sort key
+and the ID of the row. The next page is read from the index right after this
+position (``WHERE (key, id) < (...)``) instead of skipping the previous rows with
+``OFFSET``, so its latency does not grow with the number of the page, and rows
+inserted meanwhile neither shift nor duplicate the results.
+"""
+
+import base64
+import binascii
+import json
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from typing import Optional, Sequence, Tuple
+
+from fastapi import HTTPException, status
+
+# type of the sort key of each sort (None when the rows are sorted by ID only)
+SORT_KEYS = {
+    "id": None,
+    "popularity": int,
+    "release_date": date.fromisoformat,
+    "relevance": Decimal,
+}
+
+
+def encode_cursor(
+    sort: str,
+    key,
+    id_: str,
+) -> str:
+    """Encode the position of a row in the results sorted by ``sort``."""
+    position = [sort, None if key is None else str(key), id_]
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+
+def decode_cursor(
+    cursor: str,
+    sort: str,
+) -> Tuple:
+    """Decode the position of the last row of the previous page.
+
+    Parameters
+    ----------
+    cursor : str
+        The cursor, as returned with the previous page.
+    sort : str
+        The sort of the results, one of ``SORT_KEYS``.
+
+    Returns
+    -------
+    tuple
+        The sort key (None for the ``id`` sort) and the ID of the row.
+
+    Raises
+    ------
+    HTTPException
+        If the cursor is invalid, or was returned for another sort.
+    """
+    try:
+        cursor_sort, key, id_ = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if cursor_sort != sort or not isinstance(id_, str):
+            raise ValueError(cursor_sort)
+        if SORT_KEYS[sort] is not None:
+            key = SORT_KEYS[sort](key)
+        return key, id_
+    except (binascii.Error, ValueError, TypeError, InvalidOperation):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor.",
+        )
+
+
+def next_cursor(
+    rows: Sequence[dict],
+    limit: int,
+    sort: str,
+    key: str = "sort_key",
+) -> Optional[str]:
+    """Return the cursor of the page after ``rows``, or None on the last page.
+
+    Parameters
+    ----------
+    rows : Sequence[dict]
+        The rows of the page, with their ``id`` and their sort key (except for
+        the ``id`` sort).
+    limit : int
+        The number of rows asked for.
+    sort : str
+        The sort of the results, one of ``SORT_KEYS``.
+    key : str
+        The column of the sort key.
+
+    Returns
+    -------
+    str
+        The cursor, or None if the page is not full.
+    """
+    if not rows or len(rows) < limit:
+        return None
+    last = rows[-1]
+    return encode_cursor(sort, last.get(key), last["id"])
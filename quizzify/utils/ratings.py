@@ -0,0 +1,181 @@
+"""Elo ratings of the skill of the users and of the difficulty of the questions.
+
+Each answer is a match between a user and a question: the probability that the
+user answers right is logistic in the difference between the two ratings (the
+Rasch model of item response theory, on the Elo scale), and both ratings move
+toward the observed outcome. The ratings of the users and questions answered
+only a few times move faster, as they are not known yet.
+"""
+
+import math
+import random
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+# rating of a user or a question never answered
+INITIAL_RATING = 1500.0
+# a difference of this many points is a 10:1 odds of answering right
+RATING_SCALE = 400.0
+# step of the updates of a rating answered a few times, and of a settled one
+K_FACTOR_MAX = 64.0
+K_FACTOR_MIN = 16.0
+# number of answers after which the step of the updates is halved
+K_FACTOR_HALF_LIFE = 20
+# probability that a user answers right the questions served to them
+TARGET_SUCCESS = 0.7
+# width (in points) and range of the rating buckets, the outer buckets being open
+BUCKET_WIDTH = 50.0
+BUCKETS_LOW = 700.0
+BUCKETS_HIGH = 2300.0
+# number of buckets away from the target searched for a question
+MAX_BUCKET_DISTANCE = 4
+
+
+def expected_score(
+    skill: float,
+    difficulty: float,
+) -> float:
+    """Return the probability that a user answers a question right."""
+    return 1.0 / (1.0 + 10.0 ** ((difficulty - skill) / RATING_SCALE))
+
+
+def k_factor(
+    answered: int,
+) -> float:
+    """Return the step of the updates of a rating answered this many times."""
+    return max(K_FACTOR_MIN, K_FACTOR_MAX / (1.0 + answered / K_FACTOR_HALF_LIFE))
+
+
+def rating_updates(
+    skill: float,
+    difficulty: float,
+    correct: bool,
+    user_answered: int = 0,
+    question_answered: int = 0,
+) -> Tuple[float, float]:
+    """Compute the updates of the ratings of a user and a question after an answer.
+
+    Parameters
+    ----------
+    skill : float
+        The rating of the user.
+    difficulty : float
+        The rating of the question.
+    correct : bool
+        Whether the user answered right.
+    user_answered : int
+        The number of questions the user answered before.
+    question_answered : int
+        The number of times the question was answered before.
+
+    Returns
+    -------
+    Tuple[float, float]
+        The changes of the skill of the user and of the difficulty of the question.
+    """
+    surprise = float(correct) - expected_score(skill, difficulty)
+    return (
+        k_factor(user_answered) * surprise,
+        -k_factor(question_answered) * surprise,
+    )
+
+
+def target_difficulty(
+    skill: float,
+    success: float = TARGET_SUCCESS,
+) -> float:
+    """Return the difficulty of the questions a user answers right with a probability.
+
+    Parameters
+    ----------
+    skill : float
+        The rating of the user.
+    success : float
+        The probability of answering right.
+
+    Returns
+    -------
+    float
+        The rating of the questions to serve to the user.
+    """
+    return skill - RATING_SCALE * math.log10(success / (1.0 - success))
+
+
+def num_buckets() -> int:
+    """Return the number of rating buckets."""
+    return int(math.ceil((BUCKETS_HIGH - BUCKETS_LOW) / BUCKET_WIDTH))
+
+
+def bucket_of(
+    ratings,
+):
+    """Return the bucket of ratings (an array of them, or a single one)."""
+    buckets = np.floor((np.asarray(ratings) - BUCKETS_LOW) / BUCKET_WIDTH)
+    return np.clip(buckets, 0, num_buckets() - 1).astype(np.int64)
+
+
+class RatingBuckets:
+    """Questions grouped by buckets of difficulty, to sample one of a given rating.
+
+    The IDs are sorted by bucket in a flat array, with the offsets of the buckets
+    (like the rows of a CSR matrix): drawing a question of a bucket is an index in
+    the array, whatever the number of questions.
+
+    Parameters
+    ----------
+    ids : Sequence[int]
+        The IDs of the questions.
+    ratings : Sequence[float]
+        The difficulty of each question.
+    """
+
+    def __init__(
+        self,
+        ids: Sequence[int],
+        ratings: Sequence[float],
+    ):
+        buckets = bucket_of(ratings)
+        order = np.argsort(buckets, kind="stable")
+        self.ids = np.asarray(ids, dtype=np.int64)[order]
+        # a list: indexing it is faster than indexing an array
+        counts = np.bincount(buckets, minlength=num_buckets())
+        self.offsets = [0] + np.cumsum(counts).tolist()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def sample(
+        self,
+        difficulty: float,
+        rng: random.Random = random,
+    ) -> Optional[int]:
+        """Draw a question from the bucket of a difficulty, or the nearest one.
+
+        Parameters
+        ----------
+        difficulty : float
+            The rating of the question to draw.
+        rng : random.Random
+            The random number generator.
+
+        Returns
+        -------
+        int
+            The ID of a question, or None if no bucket within
+            ``MAX_BUCKET_DISTANCE`` of the difficulty has a question.
+        """
+        # in Python: the scalar operations of numpy cost microseconds
+        last = len(self.offsets) - 2
+        target = min(
+            max(math.floor((difficulty - BUCKETS_LOW) / BUCKET_WIDTH), 0), last
+        )
+        for distance in range(MAX_BUCKET_DISTANCE + 1):
+            # the harder bucket first: the target is already on the easy side
+            for bucket in (target + distance, target - distance)[: 1 + bool(distance)]:
+                if not 0 <= bucket <= last:
+                    continue
+                start, end = self.offsets[bucket], self.offsets[bucket + 1]
+                if start < end:
+                    return int(self.ids[start + rng.randrange(end - start)])
+        return None
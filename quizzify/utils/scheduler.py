@@ -0,0 +1,371 @@
+"""In-process scheduler of the background jobs of the API.
+
+Each worker runs the scheduler in its event loop, from the lifespan of the app.
+A job is a function without arguments (a coroutine function, or a regular
+function run in the thread pool) fired by a trigger:
+
+- ``IntervalTrigger``: every given number of seconds;
+- ``CronTrigger``: at the times matching a cron expression (minute, hour, day of
+  the month, month and day of the week, in local time);
+- ``OnceTrigger``: once, shortly after the worker starts.
+
+Random jitter is added to the fire times so the workers do not all hit the
+database (or Spotify) at the same instant. Single-instance jobs run in one worker
+at a time and once per period across the workers, with the locks and the shared
+schedule of the job store.
+"""
+
+import asyncio
+import inspect
+import logging
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from quizzify.databases.job_store import get_job_store
+from quizzify.utils.metrics import JOB_DURATION, JOB_RUNS
+
+logger = logging.getLogger(__name__)
+
+# ranges of the fields of a cron expression
+CRON_FIELDS = (
+    ("minute", 0, 59),
+    ("hour", 0, 23),
+    ("day", 1, 31),
+    ("month", 1, 12),
+    # 0 and 7 are Sunday
+    ("weekday", 0, 7),
+)
+# a cron expression matching no date within this many days never fires (e.g. on
+# February 30th)
+CRON_HORIZON_DAYS = 5 * 366
+# seconds before retrying a job after an error of the job store (e.g. a restart
+# of the database), doubled after each consecutive error up to the maximum
+STORE_RETRY_DELAY = 5.0
+STORE_RETRY_MAX_DELAY = 300.0
+
+
+class IntervalTrigger:
+    """Fire every ``seconds`` seconds, the first time one period after start."""
+
+    def __init__(
+        self,
+        seconds: float,
+    ):
+        if seconds <= 0:
+            raise ValueError("The interval must be positive.")
+        self.interval = timedelta(seconds=seconds)
+
+    def next_run(self, after: datetime) -> Optional[datetime]:
+        """Return the first fire time after a date."""
+        return after + self.interval
+
+
+class OnceTrigger:
+    """Fire once, ``delay`` seconds after start."""
+
+    def __init__(
+        self,
+        delay: float = 0,
+    ):
+        self.delay = timedelta(seconds=delay)
+        self._fired = False
+
+    def next_run(self, after: datetime) -> Optional[datetime]:
+        """Return the fire time, then None once it has been returned."""
+        if self._fired:
+            return None
+        self._fired = True
+        return after + self.delay
+
+
+def parse_cron_field(
+    field: str,
+    low: int,
+    high: int,
+) -> frozenset:
+    """Parse a field of a cron expression.
+
+    Parameters
+    ----------
+    field : str
+        The field: ``*``, a value, a range ``a-b``, a step ``*/n`` or ``a-b/n``, or
+        a comma-separated list of those.
+    low, high : int
+        The range of the values of the field.
+
+    Returns
+    -------
+    frozenset
+        The values matched by the field.
+
+    Raises
+    ------
+    ValueError
+        If the field is malformed or out of range.
+    """
+    values = set()
+    for part in field.split(","):
+        span, _, step = part.partition("/")
+        if span == "*":
+            start, stop = low, high
+        elif "-" in span:
+            start, stop = (int(value) for value in span.split("-", 1))
+        else:
+            start = stop = int(span)
+        if not low <= start <= stop <= high:
+            raise ValueError(f"Invalid cron field {field!r}.")
+        values.update(range(start, stop + 1, int(step) if step else 1))
+    return frozenset(values)
+
+
+class CronTrigger:
+    """Fire at the times matching a cron expression, in local time.
+
+    The expression has five fields: minute, hour, day of the month, month and day
+    of the week (0 or 7 being Sunday). As with cron, a day matches if either of
+    the day fields matches, when both are restricted.
+    """
+
+    def __init__(
+        self,
+        expression: str,
+    ):
+        fields = expression.split()
+        if len(fields) != len(CRON_FIELDS):
+            raise ValueError(f"Invalid cron expression {expression!r}.")
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            parse_cron_field(field, low, high)
+            for field, (_, low, high) in zip(fields, CRON_FIELDS)
+        )
+        self.weekdays = frozenset(weekday % 7 for weekday in weekdays)
+        self._any_day = fields[2] == "*"
+        self._any_weekday = fields[4] == "*"
+
+    def _matches_day(self, date: datetime) -> bool:
+        """Check whether the day fields match a date."""
+        day = date.day in self.days
+        # datetime counts the days of the week from Monday, cron from Sunday
+        weekday = (date.weekday() + 1) % 7 in self.weekdays
+        if self._any_day or self._any_weekday:
+            return day and weekday
+        return day or weekday
+
+    def next_run(self, after: datetime) -> Optional[datetime]:
+        """Return the first fire time after a date, or None if there is none."""
+        date = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        horizon = date + timedelta(days=CRON_HORIZON_DAYS)
+        # skip whole months, days and hours first: a few hundred steps at most
+        while date < horizon:
+            if date.month not in self.months:
+                date = (date.replace(day=1) + timedelta(days=32)).replace(
+                    day=1, hour=0, minute=0
+                )
+            elif not self._matches_day(date):
+                date = (date + timedelta(days=1)).replace(hour=0, minute=0)
+            elif date.hour not in self.hours:
+                date = (date + timedelta(hours=1)).replace(minute=0)
+            elif date.minute not in self.minutes:
+                date += timedelta(minutes=1)
+            else:
+                return date
+        return None
+
+
+class Job:
+    """A function run by the scheduler.
+
+    Attributes
+    ----------
+    name : str
+        The name of the job, used to label its metrics and lock.
+    func : Callable
+        The function, without arguments.
+    trigger : IntervalTrigger, CronTrigger or OnceTrigger
+        When the function runs.
+    jitter : float
+        The maximum number of seconds randomly added to each fire time.
+    single_instance : bool
+        Whether the job runs in one worker at a time, once per period, instead of
+        in every worker.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable,
+        trigger,
+        jitter: float = 0,
+        single_instance: bool = True,
+    ):
+        self.name = name
+        self.func = func
+        self.trigger = trigger
+        self.jitter = jitter
+        self.single_instance = single_instance
+
+    def next_run(self, after: datetime) -> Optional[datetime]:
+        """Return the next fire time of the job, jitter included."""
+        next_run_at = self.trigger.next_run(after)
+        if next_run_at is not None and self.jitter:
+            next_run_at += timedelta(seconds=random.uniform(0, self.jitter))
+        return next_run_at
+
+
+class Scheduler:
+    """Run the background jobs of a worker in its event loop.
+
+    Methods
+    -------
+    add_job(name: str, func: Callable, trigger, jitter: float, single_instance: bool)
+        Register a job, before the scheduler starts.
+    start()
+        Start running the jobs.
+    stop()
+        Cancel the jobs, waiting for them to stop.
+    """
+
+    def __init__(self):
+        self.jobs: Dict[str, Job] = {}
+        self._tasks: List[asyncio.Task] = []
+
+    def add_job(
+        self,
+        name: str,
+        func: Callable,
+        trigger,
+        jitter: float = 0,
+        single_instance: bool = True,
+    ) -> Job:
+        """Register a job.
+
+        Parameters
+        ----------
+        name : str
+            The unique name of the job.
+        func : Callable
+            The function, without arguments: a coroutine function, or a regular
+            function run in the thread pool.
+        trigger : IntervalTrigger, CronTrigger or OnceTrigger
+            When the function runs.
+        jitter : float
+            The maximum number of seconds randomly added to each fire time.
+        single_instance : bool
+            Whether the job runs in one worker at a time, once per period.
+
+        Returns
+        -------
+        Job
+            The registered job.
+        """
+        if name in self.jobs:
+            raise ValueError(f"The job {name} is already registered.")
+        self.jobs[name] = Job(name, func, trigger, jitter, single_instance)
+        return self.jobs[name]
+
+    def start(self):
+        """Start running the jobs, in the running event loop."""
+        loop = asyncio.get_running_loop()
+        self._tasks = [
+            loop.create_task(self._run_job(job)) for job in self.jobs.values()
+        ]
+
+    async def stop(self):
+        """Cancel the jobs and wait for them to stop."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _run_job(self, job: Job):
+        """Run a job at each of its fire times, until cancelled."""
+        next_run_at = job.next_run(datetime.now())
+        errors = 0
+        while next_run_at is not None:
+            await asyncio.sleep(
+                max(0.0, (next_run_at - datetime.now()).total_seconds())
+            )
+            try:
+                if job.single_instance:
+                    next_run_at = await self.run_single_instance(job)
+                else:
+                    await self.run_once(job)
+                    next_run_at = job.next_run(datetime.now())
+                errors = 0
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # the job store failed: the task must outlive it
+                delay = min(STORE_RETRY_MAX_DELAY, STORE_RETRY_DELAY * 2**errors)
+                errors += 1
+                logger.exception(
+                    "The job store failed for %s, retrying in %.0f seconds.",
+                    job.name,
+                    delay,
+                )
+                JOB_RUNS.labels(job.name, "error").inc()
+                next_run_at = datetime.now() + timedelta(seconds=delay)
+
+    async def run_once(self, job: Job) -> bool:
+        """Run a job now, recording its duration and outcome.
+
+        Returns
+        -------
+        bool
+            True if the job succeeded.
+        """
+        start = time.perf_counter()
+        try:
+            if inspect.iscoroutinefunction(job.func):
+                await job.func()
+            else:
+                await run_in_threadpool(job.func)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("The job %s failed.", job.name)
+            JOB_RUNS.labels(job.name, "failure").inc()
+            return False
+        finally:
+            JOB_DURATION.labels(job.name).observe(time.perf_counter() - start)
+        JOB_RUNS.labels(job.name, "success").inc()
+        return True
+
+    async def run_single_instance(self, job: Job) -> Optional[datetime]:
+        """Run a job now unless another worker runs it or already did.
+
+        Returns
+        -------
+        datetime
+            The next fire time of the job in this worker, or None if it is over.
+        """
+        store = get_job_store()
+        if not await run_in_threadpool(store.try_lock, job.name):
+            JOB_RUNS.labels(job.name, "locked").inc()
+            return job.next_run(datetime.now())
+        try:
+            started_at = datetime.now()
+            scheduled_at = await run_in_threadpool(store.get_next_run, job.name)
+            if scheduled_at is not None and scheduled_at > started_at:
+                # another worker ran it: follow the schedule it saved
+                JOB_RUNS.labels(job.name, "not_due").inc()
+                return scheduled_at + timedelta(seconds=random.uniform(0, job.jitter))
+            succeeded = await self.run_once(job)
+            # the shared schedule has no jitter, each worker adds its own
+            scheduled_at = job.trigger.next_run(datetime.now())
+            await run_in_threadpool(
+                store.save_run,
+                job.name,
+                started_at,
+                "success" if succeeded else "failure",
+                scheduled_at,
+            )
+        finally:
+            await run_in_threadpool(store.unlock, job.name)
+        if scheduled_at is None:
+            return None
+        return scheduled_at + timedelta(seconds=random.uniform(0, job.jitter))
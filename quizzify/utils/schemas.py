@@ -0,0 +1,398 @@
+from datetime import date
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class User(BaseModel):
+    """Schema for a quizzify user account.
+
+    Attributes
+    ----------
+    username : str, optional
+        The username of the account (not required to log in).
+    email : str
+        The user's email.
+    password : str
+        The user's password in plain text.
+    """
+
+    username: Optional[str] = None
+    email: str
+    password: str
+
+
+class NewUser(User):
+    """Schema for the creation of a quizzify user account.
+
+    Attributes
+    ----------
+    username : str
+        The username of the account (required to register).
+    """
+
+    username: str
+
+
+class Session(BaseModel):
+    """Schema for the tokens of a session of a quizzify user.
+
+    Attributes
+    ----------
+    username : str
+        The username of the user.
+    access_token : str
+        The token to send with each request (``Authorization: Bearer <token>``).
+    refresh_token : str
+        The token to exchange, once, for new tokens of the session.
+    token_type : str
+        The type of the tokens (``bearer``).
+    expires_in : int
+        The number of seconds the access token is valid.
+    """
+
+    username: str
+    access_token: str
+    refresh_token: str
+    token_type: str = "bearer"
+    expires_in: int
+
+
+class RefreshToken(BaseModel):
+    """Schema for the refresh token of a session.
+
+    Attributes
+    ----------
+    refresh_token : str
+        The refresh token returned by the login or the last refresh.
+    """
+
+    refresh_token: str
+
+
+class Artist(BaseModel):
+    """Schema for an artist of the music catalog.
+
+    Attributes
+    ----------
+    id : str
+        The Spotify ID of the artist.
+    name : str
+        The name of the artist.
+    image_url : str, optional
+        The URL of the artist's image.
+    popularity : int, optional
+        The popularity of the artist (0-100).
+    """
+
+    id: str
+    name: str
+    image_url: Optional[str] = None
+    popularity: Optional[int] = None
+
+
+class Album(BaseModel):
+    """Schema for an album of the music catalog.
+
+    Attributes
+    ----------
+    id : str
+        The Spotify ID of the album.
+    name : str
+        The name of the album.
+    artist_id : str, optional
+        The Spotify ID of the album's artist.
+    image_url : str, optional
+        The URL of the album's cover.
+    release_year : int, optional
+        The year the album was released.
+    release_date : date, optional
+        The day the album was released (the first day of its year or month when
+        only those are known).
+    total_tracks : int, optional
+        The number of tracks of the album.
+    popularity : int, optional
+        The popularity of the album (0-100).
+    """
+
+    id: str
+    name: str
+    artist_id: Optional[str] = None
+    image_url: Optional[str] = None
+    release_year: Optional[int] = None
+    release_date: Optional[date] = None
+    total_tracks: Optional[int] = None
+    popularity: Optional[int] = None
+
+
+class Song(BaseModel):
+    """Schema for a song of the music catalog.
+
+    Attributes
+    ----------
+    id : str
+        The Spotify ID of the song.
+    name : str
+        The name of the song.
+    artist_id : str
+        The Spotify ID of the song's artist.
+    album_id : str
+        The Spotify ID of the song's album.
+    popularity : int, optional
+        The popularity of the song (0-100).
+    duration_ms : int, optional
+        The duration of the song in milliseconds.
+    track_number : int, optional
+        The position of the song on its album.
+    """
+
+    id: str
+    name: str
+    artist_id: str
+    album_id: str
+    popularity: Optional[int] = None
+    duration_ms: Optional[int] = None
+    track_number: Optional[int] = None
+
+
+class Question(BaseModel):
+    """Schema for a question of the question bank.
+
+    Attributes
+    ----------
+    id : int, optional
+        The ID of the question in the question bank (None for the questions of
+        the personal quizzes).
+    question_type : str
+        The type of question (e.g. song_artist).
+    question : str
+        The text of the question.
+    answer : str
+        The right answer.
+    choices : list[str]
+        The answer and its distractors, shuffled.
+    """
+
+    id: Optional[int] = None
+    question_type: str
+    question: str
+    answer: str
+    choices: list[str]
+
+
+class QuestionPrompt(BaseModel):
+    """Schema for a question of the question bank, as served to be answered.
+
+    The right answer is left out: it is only revealed by the correction of the
+    answer (``AnswerResult``).
+
+    Attributes
+    ----------
+    id : int
+        The ID of the question in the question bank.
+    question_type : str
+        The type of question (e.g. song_artist).
+    question : str
+        The text of the question.
+    choices : list[str]
+        The answer and its distractors, shuffled.
+    """
+
+    id: int
+    question_type: str
+    question: str
+    choices: list[str]
+
+
+class Room(BaseModel):
+    """Schema for a live quiz room.
+
+    Attributes
+    ----------
+    room_id : str
+        The ID of the room.
+    rounds : int
+        The number of questions of the game.
+    round_seconds : float
+        The number of seconds to answer a question.
+    websocket_path : str
+        The path the players connect to, with their name as ``name`` parameter.
+    """
+
+    room_id: str
+    rounds: int
+    round_seconds: float
+    websocket_path: str
+
+
+class Answer(BaseModel):
+    """Schema for the answer of a user to a question of the question bank.
+
+    The user is the one of the session token of the request.
+
+    Attributes
+    ----------
+    choice : str
+        The choice of the user.
+    """
+
+    choice: str
+
+
+class AnswerResult(BaseModel):
+    """Schema for the correction of an answer.
+
+    Attributes
+    ----------
+    correct : bool
+        Whether the choice is the right answer.
+    answer : str
+        The right answer.
+    """
+
+    correct: bool
+    answer: str
+
+
+class AnswerStats(BaseModel):
+    """Schema for the statistics of a set of answers.
+
+    Attributes
+    ----------
+    answered : int
+        The number of answers.
+    correct : int
+        The number of right answers.
+    accuracy : float
+        The fraction of right answers (0 without answers).
+    """
+
+    answered: int = 0
+    correct: int = 0
+    accuracy: float = 0.0
+
+
+class QuestionTypeStats(AnswerStats):
+    """Schema for the statistics of the answers to a type of question.
+
+    Attributes
+    ----------
+    question_type : str
+        The type of question (e.g. song_artist).
+    """
+
+    question_type: str
+
+
+class ArtistStats(AnswerStats):
+    """Schema for the statistics of the answers about an artist.
+
+    Attributes
+    ----------
+    artist_id : str
+        The Spotify ID of the artist.
+    artist_name : str, optional
+        The name of the artist (None if it left the catalog).
+    """
+
+    artist_id: str
+    artist_name: Optional[str] = None
+
+
+class UserStats(AnswerStats):
+    """Schema for the statistics of the answers of a user.
+
+    Attributes
+    ----------
+    username : str
+        The username of the user.
+    question_types : list[QuestionTypeStats]
+        The statistics per type of question.
+    artists : list[ArtistStats]
+        The statistics of the artists the user answered the most about.
+    """
+
+    username: str
+    question_types: list[QuestionTypeStats]
+    artists: list[ArtistStats]
+
+
+class SearchResult(BaseModel):
+    """Schema for a result of a catalog search.
+
+    Attributes
+    ----------
+    id : str
+        The Spotify ID of the artist, album or song.
+    name : str
+        The name of the artist, album or song.
+    popularity : int, optional
+        The popularity of the artist, album or song (0-100).
+    score : float
+        The relevance of the name, increased with the popularity.
+    """
+
+    id: str
+    name: str
+    popularity: Optional[int] = None
+    score: float
+
+
+class SearchResults(BaseModel):
+    """Schema for a page of results of a catalog search.
+
+    Attributes
+    ----------
+    results : list[SearchResult]
+        The results, the best first.
+    next_cursor : str, optional
+        The cursor of the next page (None on the last page).
+    """
+
+    results: list[SearchResult]
+    next_cursor: Optional[str] = None
+
+
+class ArtistPage(BaseModel):
+    """Schema for a page of the listing of the artists.
+
+    Attributes
+    ----------
+    items : list[Artist]
+        The artists of the page.
+    next_cursor : str, optional
+        The cursor of the next page (None on the last page).
+    """
+
+    items: list[Artist]
+    next_cursor: Optional[str] = None
+
+
+class AlbumPage(BaseModel):
+    """Schema for a page of the listing of the albums.
+
+    Attributes
+    ----------
+    items : list[Album]
+        The albums of the page.
+    next_cursor : str, optional
+        The cursor of the next page (None on the last page).
+    """
+
+    items: list[Album]
+    next_cursor: Optional[str] = None
+
+
+class SongPage(BaseModel):
+    """Schema for a page of the listing of the songs.
+
+    Attributes
+    ----------
+    items : list[Song]
+        The songs of the page.
+    next_cursor : str, optional
+        The cursor of the next page (None on the last page).
+    """
+
+    items: list[Song]
+    next_cursor: Optional[str] = None
@@ -0,0 +1,291 @@
+"""Signed session tokens of the quizzify users.
+
+A user checks its password once, at login, and receives two tokens: a short-lived
+access token sent with each request (``Authorization: Bearer <token>``) and a
+long-lived refresh token exchanged for new tokens when the access token expires.
+Both are JSON Web Tokens signed with HMAC-SHA256 (``QUIZZIFY_SESSION_SECRET``),
+so a worker validates a token with a hash of a few hundred bytes, compared in
+constant time, instead of a bcrypt check and a database lookup.
+
+The tokens are stateless: a session is revoked (logout, reused refresh token) by
+adding its ID to the ``RevocationList`` of each worker, which is checked with a
+dictionary lookup. A refresh token can only be used once: each refresh rotates
+both tokens, and the reuse of a refresh token revokes the whole session.
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import secrets
+import threading
+import time
+from typing import Dict, Iterable, Literal, Optional, Tuple
+
+from fastapi import Depends, HTTPException, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+
+from quizzify.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+TokenType = Literal["access", "refresh"]
+# the only header issued and accepted: the algorithm is never read from a token
+TOKEN_HEADER = (
+    base64.urlsafe_b64encode(b'{"alg":"HS256","typ":"JWT"}').rstrip(b"=").decode()
+)
+# a revocation list is purged when it grows by this many sessions
+PURGE_INTERVAL = 1024
+
+_signing_key: Optional[bytes] = None
+
+
+def check_signing_key(
+    workers: int,
+):
+    """Check that the workers of the API share the key of the session tokens.
+
+    Parameters
+    ----------
+    workers : int
+        The number of workers of the API.
+
+    Raises
+    ------
+    RuntimeError
+        If ``QUIZZIFY_SESSION_SECRET`` is not set and there are several workers:
+        each one would sign with its own random key and reject the tokens of the
+        others.
+    """
+    if workers > 1 and get_settings().session_secret is None:
+        raise RuntimeError(
+            f"QUIZZIFY_SESSION_SECRET must be set to run {workers} workers: the "
+            "session tokens issued by a worker are checked by the others."
+        )
+
+
+def signing_key() -> bytes:
+    """Return the key the session tokens are signed with.
+
+    Without ``QUIZZIFY_SESSION_SECRET``, a random key is generated: the tokens are
+    then only valid in the worker that issued them, until it restarts. This is
+    only allowed with a single worker (``check_signing_key``), for development.
+    """
+    global _signing_key
+    if _signing_key is None:
+        secret = get_settings().session_secret
+        if secret is None:
+            logger.warning(
+                "QUIZZIFY_SESSION_SECRET is not set: the session tokens are signed "
+                "with a random key and invalidated when the API restarts."
+            )
+            _signing_key = secrets.token_bytes(32)
+        else:
+            _signing_key = secret.encode()
+    return _signing_key
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _sign(message: bytes, key: bytes) -> str:
+    return _b64encode(hmac.new(key, message, hashlib.sha256).digest())
+
+
+def unauthorized(detail: str) -> HTTPException:
+    """Return the error of a request without a valid session token."""
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+def encode_token(
+    claims: Dict,
+    key: Optional[bytes] = None,
+) -> str:
+    """Sign claims into a token.
+
+    Parameters
+    ----------
+    claims : dict
+        The claims of the token (JSON serializable).
+    key : bytes, optional
+        The signing key (``signing_key()`` by default).
+
+    Returns
+    -------
+    str
+        The token, ``<header>.<payload>.<signature>`` in base64url.
+    """
+    payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode())
+    message = f"{TOKEN_HEADER}.{payload}"
+    return f"{message}.{_sign(message.encode(), key or signing_key())}"
+
+
+def decode_token(
+    token: str,
+    token_type: TokenType,
+    key: Optional[bytes] = None,
+    now: Optional[float] = None,
+) -> Dict:
+    """Check the signature, type and expiration of a token and return its claims.
+
+    Parameters
+    ----------
+    token : str
+        The token.
+    token_type : str
+        The expected type of the token: ``access`` or ``refresh``.
+    key : bytes, optional
+        The signing key (``signing_key()`` by default).
+    now : float, optional
+        The current Unix time (``time.time()`` by default).
+
+    Returns
+    -------
+    dict
+        The claims of the token.
+
+    Raises
+    ------
+    HTTPException
+        401 if the token is malformed, forged, of another type or expired.
+    """
+    parts = token.split(".")
+    if len(parts) != 3 or parts[0] != TOKEN_HEADER:
+        raise unauthorized("Invalid session token.")
+    header, payload, signature = parts
+    expected = _sign(f"{header}.{payload}".encode(), key or signing_key())
+    # constant time: the time taken does not reveal how much of a forgery matched
+    if not hmac.compare_digest(signature.encode(), expected.encode()):
+        raise unauthorized("Invalid session token.")
+    claims = json.loads(_b64decode(payload))
+    if claims.get("typ") != token_type:
+        raise unauthorized("Invalid session token.")
+    if claims["exp"] <= (time.time() if now is None else now):
+        raise unauthorized("Session token expired.")
+    return claims
+
+
+def issue_tokens(
+    username: str,
+    session_id: Optional[str] = None,
+    now: Optional[float] = None,
+) -> Tuple[str, str, Dict]:
+    """Issue the access and refresh tokens of a session.
+
+    Parameters
+    ----------
+    username : str
+        The username of the user.
+    session_id : str, optional
+        The ID of the session to extend (a new session by default).
+    now : float, optional
+        The current Unix time (``time.time()`` by default).
+
+    Returns
+    -------
+    tuple
+        The access token, the refresh token and the claims of the refresh token.
+    """
+    settings = get_settings()
+    now = int(time.time() if now is None else now)
+    session_id = session_id or secrets.token_urlsafe(16)
+    access = {
+        "sub": username,
+        "sid": session_id,
+        "typ": "access",
+        "iat": now,
+        "exp": now + settings.session_ttl,
+    }
+    refresh = {
+        "sub": username,
+        "sid": session_id,
+        "jti": secrets.token_urlsafe(16),
+        "typ": "refresh",
+        "iat": now,
+        "exp": now + settings.session_refresh_ttl,
+    }
+    return encode_token(access), encode_token(refresh), refresh
+
+
+class RevocationList:
+    """Revoked sessions of a worker, each kept until all its tokens have expired.
+
+    Methods
+    -------
+    add(session_id: str, expires_at: float)
+        Revoke a session until ``expires_at`` (Unix time).
+    update(sessions: Iterable[Tuple[str, float]])
+        Revoke sessions loaded from the state store.
+    """
+
+    def __init__(self):
+        self._sessions: Dict[str, float] = {}
+        self._added = 0
+        self._lock = threading.Lock()
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def add(self, session_id: str, expires_at: float):
+        """Revoke a session until ``expires_at`` (Unix time)."""
+        self.update([(session_id, expires_at)])
+
+    def update(self, sessions: Iterable[Tuple[str, float]]):
+        """Revoke sessions loaded from the state store, with their expiration."""
+        with self._lock:
+            for session_id, expires_at in sessions:
+                self._sessions[session_id] = expires_at
+                self._added += 1
+            if self._added >= PURGE_INTERVAL:
+                self._added = 0
+                now = time.time()
+                self._sessions = {
+                    session_id: expires_at
+                    for session_id, expires_at in self._sessions.items()
+                    if expires_at > now
+                }
+
+
+# sessions revoked in any worker, kept up to date by quizzify.api.auth.service
+revoked_sessions = RevocationList()
+
+bearer = HTTPBearer(auto_error=False)
+
+
+def current_session(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer),
+) -> Dict:
+    """Return the claims of the access token of a request (a FastAPI dependency).
+
+    Raises
+    ------
+    HTTPException
+        401 if the request has no valid access token, or if its session is
+        revoked.
+    """
+    if credentials is None:
+        raise unauthorized("Not authenticated.")
+    claims = decode_token(credentials.credentials, "access")
+    if claims["sid"] in revoked_sessions:
+        raise unauthorized("Session revoked.")
+    return claims
+
+
+def current_user(
+    claims: Dict = Depends(current_session),
+) -> str:
+    """Return the username of the session of a request (a FastAPI dependency)."""
+    return claims["sub"]
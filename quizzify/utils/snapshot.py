@@ -0,0 +1,251 @@
+"""Versioned snapshot files of columnar arrays, shared by the workers with mmap.
+
+A snapshot is a single file: a magic number, the size of a JSON header listing the
+arrays (dtype, shape and offset), the header, then the raw data of the arrays,
+aligned. The variable length strings are stored as a heap of UTF-8 bytes and the
+offsets of each string in the heap (``encode_strings``).
+
+A snapshot is written to a temporary file, renamed to its versioned name, then
+published by replacing the ``<name>.CURRENT`` file of the directory, so a reader
+either sees the previous version or the new one, never a partial file. The readers
+map the file read-only: the pages are shared by all the processes through the
+page cache instead of being copied in the memory of each one.
+"""
+
+import json
+import mmap
+import os
+import re
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+SNAPSHOT_MAGIC = b"QZSNAP01"
+# the data of each array starts at a multiple of this many bytes
+ALIGNMENT = 64
+# file holding the name of the published snapshot
+POINTER_FILE = "CURRENT"
+# versioned name of a snapshot, e.g. catalog-v00000042.snapshot
+SNAPSHOT_NAME = re.compile(r"^(?P<name>\w+)-v(?P<version>\d{8})\.snapshot$")
+# number of versions kept in the directory: the workers that did not swap yet
+# keep reading the previous one (a deleted file stays mapped until it is closed)
+SNAPSHOTS_KEPT = 2
+
+
+def data_offset(header_size: int) -> int:
+    """Return the position of the data of the arrays, after a header."""
+    return -(-(len(SNAPSHOT_MAGIC) + 8 + header_size) // ALIGNMENT) * ALIGNMENT
+
+
+def encode_strings(strings: Iterable[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Encode strings as a heap of UTF-8 bytes and their offsets in the heap.
+
+    Parameters
+    ----------
+    strings : Iterable[str]
+        The strings.
+
+    Returns
+    -------
+    tuple
+        The heap (``uint8``) and the offsets (``int64``, one more than the
+        strings: the string ``i`` is ``heap[offsets[i]:offsets[i + 1]]``).
+    """
+    encoded = [string.encode() for string in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(string) for string in encoded], out=offsets[1:])
+    heap = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    return heap, offsets
+
+
+class StringColumn(Sequence[str]):
+    """Read-only sequence of strings stored in a heap (see ``encode_strings``)."""
+
+    def __init__(
+        self,
+        heap: np.ndarray,
+        offsets: np.ndarray,
+    ):
+        self.heap = heap
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[str, List[str]]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        start, end = self.offsets[index], self.offsets[index + 1]
+        return self.heap[start:end].tobytes().decode()
+
+
+class FixedStringColumn(Sequence[str]):
+    """Read-only sequence of strings stored in a fixed-width bytes array."""
+
+    def __init__(self, array: np.ndarray):
+        self.array = array
+
+    def __len__(self) -> int:
+        return len(self.array)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[str, List[str]]:
+        if isinstance(index, slice):
+            return [value.decode() for value in self.array[index].tolist()]
+        return self.array[index].decode()
+
+
+class Snapshot:
+    """Read-only snapshot file, mapped in memory.
+
+    The arrays are views of the mapping: nothing is read from the file until
+    their pages are accessed, and the mapping is closed once the snapshot and all
+    its arrays are garbage collected.
+
+    Attributes
+    ----------
+    path : Path
+        The file of the snapshot.
+    version : int
+        The version of the snapshot.
+    arrays : dict
+        The arrays of the snapshot, by name.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        with open(self.path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[: len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+            raise ValueError(f"Not a snapshot file: {self.path}")
+        start = len(SNAPSHOT_MAGIC) + 8
+        header_size = int.from_bytes(self._mmap[len(SNAPSHOT_MAGIC) : start], "little")
+        header = json.loads(self._mmap[start : start + header_size])
+        data_start = data_offset(header_size)
+        self.version = header["version"]
+        self.arrays: Dict[str, np.ndarray] = {}
+        for name, (dtype, shape, offset) in header["arrays"].items():
+            count = int(np.prod(shape))
+            if not count:
+                self.arrays[name] = np.empty(shape, dtype=dtype)
+                continue
+            self.arrays[name] = np.frombuffer(
+                self._mmap, dtype=dtype, count=count, offset=data_start + offset
+            ).reshape(shape)
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.arrays[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.arrays
+
+
+def list_versions(
+    directory: Union[str, Path],
+    name: str,
+) -> List[int]:
+    """List the versions of the snapshots of a directory, in ascending order."""
+    directory = Path(directory)
+    if not directory.is_dir():
+        return []
+    versions = []
+    for path in directory.iterdir():
+        match = SNAPSHOT_NAME.match(path.name)
+        if match and match["name"] == name:
+            versions.append(int(match["version"]))
+    return sorted(versions)
+
+
+def snapshot_path(
+    directory: Union[str, Path],
+    name: str,
+    version: int,
+) -> Path:
+    """Return the file of a version of a snapshot."""
+    return Path(directory) / f"{name}-v{version:08d}.snapshot"
+
+
+def write_snapshot(
+    directory: Union[str, Path],
+    name: str,
+    arrays: Dict[str, np.ndarray],
+) -> Path:
+    """Write a new version of a snapshot and publish it.
+
+    Parameters
+    ----------
+    directory : str or Path
+        The directory of the snapshots (created if needed).
+    name : str
+        The name of the snapshot.
+    arrays : dict
+        The arrays to write, by name.
+
+    Returns
+    -------
+    Path
+        The file of the new version.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    versions = list_versions(directory, name)
+    version = versions[-1] + 1 if versions else 1
+
+    layout, offset = {}, 0
+    for array_name, array in arrays.items():
+        offset = -(-offset // ALIGNMENT) * ALIGNMENT
+        layout[array_name] = [array.dtype.str, list(array.shape), offset]
+        offset += array.nbytes
+    header = json.dumps({"version": version, "arrays": layout}).encode()
+    data_start = data_offset(len(header))
+
+    with tempfile.NamedTemporaryFile(dir=directory, delete=False) as file:
+        try:
+            file.write(SNAPSHOT_MAGIC)
+            file.write(len(header).to_bytes(8, "little"))
+            file.write(header)
+            for array_name, array in arrays.items():
+                padding = data_start + layout[array_name][2] - file.tell()
+                file.write(b"\0" * padding)
+                file.write(np.ascontiguousarray(array).data)
+            file.flush()
+            os.fsync(file.fileno())
+        except BaseException:
+            os.unlink(file.name)
+            raise
+    # readable by the workers, whatever user they run as
+    os.chmod(file.name, 0o644)
+    path = snapshot_path(directory, name, version)
+    os.replace(file.name, path)
+    publish(directory, name, path)
+
+    for old_version in versions[: max(len(versions) + 1 - SNAPSHOTS_KEPT, 0)]:
+        snapshot_path(directory, name, old_version).unlink(missing_ok=True)
+    return path
+
+
+def publish(
+    directory: Union[str, Path],
+    name: str,
+    path: Union[str, Path],
+):
+    """Make a snapshot file the current one of its name, atomically."""
+    pointer = Path(directory) / f"{name}.{POINTER_FILE}"
+    with tempfile.NamedTemporaryFile("w", dir=directory, delete=False) as file:
+        file.write(Path(path).name)
+    os.chmod(file.name, 0o644)
+    os.replace(file.name, pointer)
+
+
+def current_snapshot(
+    directory: Union[str, Path],
+    name: str,
+) -> Optional[Path]:
+    """Return the file of the published snapshot of a name, if any."""
+    pointer = Path(directory) / f"{name}.{POINTER_FILE}"
+    try:
+        path = Path(directory) / pointer.read_text().strip()
+    except FileNotFoundError:
+        return None
+    return path if path.exists() else None
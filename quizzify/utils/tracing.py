@@ -0,0 +1,450 @@
+import atexit
+import functools
+import inspect
+import json
+import logging
+import queue
+import random
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import requests  # type: ignore[import-untyped]
+
+from quizzify.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = "quizzify"
+
+# span of the code being executed, propagated through function calls and tasks
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+@dataclass
+class Span:
+    """A timed operation within a trace.
+
+    Attributes
+    ----------
+    name : str
+        The name of the operation (e.g. ``db.get_user_by_email``).
+    trace_id : str
+        The ID of the trace (32 hexadecimal characters).
+    span_id : str
+        The ID of the span (16 hexadecimal characters).
+    parent_id : str, optional
+        The ID of the parent span, None for the root span of a trace.
+    sampled : bool
+        Whether the trace is recorded and exported.
+    start_time_ns : int
+        The start time, in nanoseconds since the epoch.
+    end_time_ns : int
+        The end time, in nanoseconds since the epoch.
+    attributes : dict
+        Additional information on the operation.
+    status : str
+        ``ok``, or ``error`` if an exception was raised during the operation.
+    """
+
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str] = None
+    sampled: bool = True
+    start_time_ns: int = 0
+    end_time_ns: int = 0
+    attributes: Dict = field(default_factory=dict)
+    status: str = "ok"
+
+    def set_attribute(self, key: str, value):
+        """Add information on the operation."""
+        if self.sampled:
+            self.attributes[key] = value
+
+    def to_dict(self) -> Dict:
+        """Return the span as a dictionary (the format of the span files)."""
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_time_ns": self.start_time_ns,
+            "end_time_ns": self.end_time_ns,
+            "duration_ms": (self.end_time_ns - self.start_time_ns) / 1e6,
+            "attributes": self.attributes,
+            "status": self.status,
+        }
+
+    def to_otlp(self) -> Dict:
+        """Return the span in the OTLP/JSON format."""
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id or "",
+            "name": self.name,
+            "kind": 1,  # internal
+            "startTimeUnixNano": str(self.start_time_ns),
+            "endTimeUnixNano": str(self.end_time_ns),
+            "attributes": [
+                {"key": key, "value": {"stringValue": str(value)}}
+                for key, value in self.attributes.items()
+            ],
+            "status": {"code": 2 if self.status == "error" else 1},
+        }
+
+
+class FileSpanExporter:
+    """Export spans to a local file, one JSON object per line."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or get_settings().trace_file
+
+    def export(self, spans: List[Span]):
+        """Append the spans to the file."""
+        with open(self.path, "a", encoding="utf-8") as file:
+            for span in spans:
+                file.write(json.dumps(span.to_dict()) + "\n")
+
+
+class OTLPSpanExporter:
+    """Export spans to an OpenTelemetry collector, with OTLP/JSON over HTTP."""
+
+    def __init__(self, endpoint: Optional[str] = None):
+        self.endpoint = endpoint or get_settings().trace_otlp_endpoint
+
+    def export(self, spans: List[Span]):
+        """Send the spans to the collector."""
+        payload = {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [
+                            {
+                                "key": "service.name",
+                                "value": {"stringValue": SERVICE_NAME},
+                            }
+                        ]
+                    },
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": SERVICE_NAME},
+                            "spans": [span.to_otlp() for span in spans],
+                        }
+                    ],
+                }
+            ]
+        }
+        requests.post(self.endpoint, json=payload, timeout=5)
+
+
+class BatchSpanProcessor:
+    """Queue the finished spans and export them by batches in a background thread.
+
+    Exporting never blocks a request: when the queue is full, spans are dropped.
+    """
+
+    def __init__(
+        self,
+        exporter,
+        max_queue_size: int = 10_000,
+        batch_size: int = 512,
+        flush_interval: float = 2.0,
+    ):
+        self.exporter = exporter
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def on_end(self, span: Span):
+        """Queue a finished span."""
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            logger.warning("Span queue full, dropping span %s.", span.name)
+
+    def _start(self):
+        """Start the export thread (after a fork, each worker starts its own)."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="span-exporter", daemon=True
+                )
+                self._thread.start()
+                atexit.register(self.flush)
+
+    def _run(self):
+        """Export the queued spans periodically."""
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def flush(self):
+        """Export all the queued spans."""
+        batch: List[Span] = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+            if len(batch) == self.batch_size:
+                self._export(batch)
+                batch = []
+        if batch:
+            self._export(batch)
+
+    def _export(self, batch: List[Span]):
+        """Export a batch of spans, without ever raising."""
+        try:
+            self.exporter.export(batch)
+        except Exception:
+            logger.exception("Failed to export %d spans.", len(batch))
+
+
+class Tracer:
+    """Create spans, take the sampling decisions and hand the spans to a processor.
+
+    The current span is kept in a context variable, so nested spans are linked to
+    their parent across function calls, ``await`` and threads started with a copy
+    of the context (as done by FastAPI for sync endpoints and dependencies).
+
+    Attributes
+    ----------
+    processor : BatchSpanProcessor, optional
+        The processor exporting the finished spans (None to disable tracing).
+    sample_rate : float, optional
+        The fraction of the traces recorded (``QUIZZIFY_TRACE_SAMPLE_RATE`` by
+        default).
+    """
+
+    def __init__(
+        self,
+        processor: Optional[BatchSpanProcessor] = None,
+        sample_rate: Optional[float] = None,
+    ):
+        if sample_rate is None:
+            sample_rate = get_settings().trace_sample_rate
+        self.processor = processor
+        self.sample_rate = sample_rate if processor else 0.0
+
+    @contextmanager
+    def start_span(
+        self,
+        name: str,
+        trace_id: Optional[str] = None,
+        parent_id: Optional[str] = None,
+        sampled: Optional[bool] = None,
+        activate: bool = True,
+        **attributes,
+    ):
+        """Start a span, child of the current span, for the duration of the block.
+
+        Parameters
+        ----------
+        name : str
+            The name of the operation.
+        trace_id : str, optional
+            The ID of the trace, to continue a trace started by a client.
+        parent_id : str, optional
+            The ID of the remote parent span, to continue a trace.
+        sampled : bool, optional
+            The sampling decision of the remote parent.
+        activate : bool
+            Whether the span becomes the current span within the block. Disable it
+            when the block may span several contexts (e.g. a generator consumed by
+            a thread pool), as a context variable cannot be reset in another one.
+        **attributes
+            Additional information on the operation.
+
+        Yields
+        ------
+        Span
+            The span (not recorded if the trace is not sampled).
+        """
+        parent = _current_span.get()
+        if parent is not None and not parent.sampled:
+            # the trace is not recorded: do not pay for a new span
+            yield parent
+            return
+
+        if parent is not None:
+            trace_id, parent_id, sampled = parent.trace_id, parent.span_id, True
+        elif sampled is None:
+            sampled = random.random() < self.sample_rate  # nosec B311
+        span = Span(
+            name=name,
+            trace_id=trace_id or secrets.token_hex(16),
+            span_id=secrets.token_hex(8),
+            parent_id=parent_id,
+            sampled=bool(sampled) and self.processor is not None,
+            start_time_ns=time.time_ns(),
+            attributes=attributes,
+        )
+        token = _current_span.set(span) if activate else None
+        try:
+            yield span
+        except BaseException as error:
+            span.status = "error"
+            span.set_attribute("exception", type(error).__name__)
+            raise
+        finally:
+            if token is not None:
+                _current_span.reset(token)
+            if span.sampled:
+                span.end_time_ns = time.time_ns()
+                self.processor.on_end(span)  # type: ignore[union-attr]
+
+
+EXPORTERS = {
+    "file": FileSpanExporter,
+    "otlp": OTLPSpanExporter,
+}
+_tracer: Optional[Tracer] = None
+
+
+def get_tracer() -> Tracer:
+    """Return the tracer of the application, configured from the environment."""
+    global _tracer
+    if _tracer is None:
+        exporter = get_settings().trace_exporter
+        processor = None
+        if exporter != "none":
+            processor = BatchSpanProcessor(EXPORTERS[exporter]())
+        _tracer = Tracer(processor=processor)
+    return _tracer
+
+
+def set_tracer(tracer: Tracer):
+    """Replace the tracer of the application (e.g. to export spans in tests)."""
+    global _tracer
+    _tracer = tracer
+
+
+def get_current_span() -> Optional[Span]:
+    """Return the span of the code being executed, if any."""
+    return _current_span.get()
+
+
+def start_span(name: str, **attributes):
+    """Start a span with the tracer of the application (see ``Tracer.start_span``)."""
+    return get_tracer().start_span(name, **attributes)
+
+
+def traced(
+    name: Optional[str] = None,
+):
+    """Decorate a function to record each call in a span.
+
+    Parameters
+    ----------
+    name : str, optional
+        The name of the span (defaults to ``module.qualname``).
+
+    Returns
+    -------
+    Callable
+        The decorator.
+    """
+
+    def decorator(func):
+        span_name = name or f"{func.__module__}.{func.__qualname__}"
+
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with start_span(span_name):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        if inspect.isgeneratorfunction(func):
+
+            @functools.wraps(func)
+            def generator_wrapper(*args, **kwargs):
+                with start_span(span_name, activate=False):
+                    return (yield from func(*args, **kwargs))
+
+            return generator_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with start_span(span_name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def parse_traceparent(header: Optional[str]):
+    """Parse a W3C ``traceparent`` header.
+
+    Parameters
+    ----------
+    header : str, optional
+        The header, e.g. ``00-<trace id>-<parent span id>-01``.
+
+    Returns
+    -------
+    tuple
+        The trace ID, the parent span ID and the sampling decision, or Nones if
+        the header is missing or invalid.
+    """
+    parts = header.split("-") if header else []
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None, None, None
+    try:
+        sampled = bool(int(parts[3], 16) & 1)
+    except ValueError:
+        return None, None, None
+    return parts[1], parts[2], sampled
+
+
+class TracingMiddleware:
+    """ASGI middleware recording a root span for every HTTP request.
+
+    A trace started by the client (``traceparent`` header) is continued.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        """Forward the request to the application within a span."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        trace_id, parent_id, sampled = parse_traceparent(
+            headers.get(b"traceparent", b"").decode("latin-1")
+        )
+
+        with start_span(
+            f"{scope['method']} {scope['path']}",
+            trace_id=trace_id,
+            parent_id=parent_id,
+            sampled=sampled,
+        ) as span:
+
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    span.set_attribute("http.status_code", message["status"])
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                # name the span after the route template once it is matched
+                route = scope.get("route")
+                if route is not None and span.sampled:
+                    span.name = f"{scope['method']} {route.path}"
@@ -0,0 +1,86 @@
+import asyncio
+import threading
+from unittest.mock import patch
+
+import pytest
+from fastapi import HTTPException
+
+from quizzify.api.auth import service
+from quizzify.databases.pubsub import InMemoryPubSub
+from quizzify.databases.state_store import InMemoryStateStore
+from quizzify.utils import sessions
+
+
+@pytest.fixture(autouse=True)
+def backends():
+    store, pubsub = InMemoryStateStore(), InMemoryPubSub()
+    with patch.object(sessions, "_signing_key", b"secret"), patch.object(
+        service, "get_state_store", return_value=store
+    ), patch.object(service, "get_pubsub", return_value=pubsub):
+        yield store, pubsub
+
+
+def test_refresh_rotates_the_tokens():
+    session = service.new_session("user")
+
+    refreshed = asyncio.run(service.refresh_session(session.refresh_token))
+
+    assert refreshed.username == "user"
+    assert refreshed.refresh_token != session.refresh_token
+    claims = sessions.decode_token(refreshed.access_token, "access")
+    assert claims["sid"] == sessions.decode_token(session.access_token, "access")["sid"]
+
+
+def test_reused_refresh_token_revokes_the_session(backends):
+    store, _ = backends
+    session = service.new_session("user")
+    refreshed = asyncio.run(service.refresh_session(session.refresh_token))
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(service.refresh_session(session.refresh_token))
+
+    assert error.value.status_code == 401
+    session_id = sessions.decode_token(session.access_token, "access")["sid"]
+    assert session_id in sessions.revoked_sessions
+    assert [sid for sid, _ in store.get_revoked_sessions()] == [session_id]
+    # the tokens issued by the last refresh are revoked too
+    with pytest.raises(HTTPException):
+        asyncio.run(service.refresh_session(refreshed.refresh_token))
+
+
+def test_revocations_of_other_workers_are_followed(backends):
+    store, pubsub = backends
+    store.revoke_session("stored", expires_at=2**40)
+
+    async def revoke_elsewhere():
+        await service.load_revoked_sessions()
+        await pubsub.publish(service.REVOCATION_CHANNEL, '{"sid":"new","exp":2000}')
+        await asyncio.sleep(0)
+
+    asyncio.run(revoke_elsewhere())
+
+    assert "stored" in sessions.revoked_sessions
+    assert "new" in sessions.revoked_sessions
+
+
+def test_login_with_an_unknown_email_is_unauthorized():
+    with patch.object(service.crud, "get_user_by_email", return_value=None):
+        with pytest.raises(HTTPException) as error:
+            asyncio.run(service.login_user("nobody@example.com", "password"))
+    assert error.value.status_code == 401
+
+
+def test_login_redirect_saves_the_state_outside_of_the_event_loop(backends):
+    store, _ = backends
+    threads = []
+    save_state = store.save_state
+
+    def record_thread(state):
+        threads.append(threading.current_thread())
+        save_state(state)
+
+    with patch.object(store, "save_state", side_effect=record_thread):
+        url = asyncio.run(service.login_redirect_url())
+
+    assert threads and threads[0] is not threading.main_thread()
+    assert "state=" in url
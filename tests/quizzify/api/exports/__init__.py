@@ -0,0 +1 @@
+"""Test module for the catalog exports."""
@@ -0,0 +1,33 @@
+import datetime
+import json
+
+from quizzify.api.exports.service import to_csv, to_ndjson
+
+ROWS = [
+    {"id": "a1", "name": "Album, One", "release_date": datetime.date(1999, 1, 2)},
+    {"id": "a2", "name": "Album Two", "release_date": None},
+    {"id": "a3", "name": "Album Three", "release_date": None},
+]
+
+
+def test_to_ndjson_chunks():
+    chunks = list(to_ndjson(ROWS, chunk_size=2))
+    assert len(chunks) == 2
+    lines = "".join(chunks).splitlines()
+    assert [json.loads(line)["id"] for line in lines] == ["a1", "a2", "a3"]
+    assert json.loads(lines[0])["release_date"] == "1999-01-02"
+
+
+def test_to_csv_writes_header_once():
+    chunks = list(to_csv(ROWS, columns=("id", "name", "release_date"), chunk_size=2))
+    assert len(chunks) == 2
+    assert "".join(chunks).splitlines() == [
+        "id,name,release_date",
+        'a1,"Album, One",1999-01-02',
+        "a2,Album Two,",
+        "a3,Album Three,",
+    ]
+
+
+def test_to_csv_empty_table():
+    assert list(to_csv([], columns=("id", "name"))) == ["id,name\n"]
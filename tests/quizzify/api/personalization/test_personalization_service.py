@@ -0,0 +1,134 @@
+import asyncio
+import random
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+
+from quizzify.api.personalization import service
+
+QUEEN = {"id": "artist1", "name": "Queen"}
+ALBUM = {
+    "id": "album1",
+    "name": "A Night at the Opera",
+    "artists": [QUEEN],
+    "release_date": "1975-11-21",
+}
+TRACKS = [
+    {
+        "id": f"track{index}",
+        "name": f"Track {index}",
+        "artists": [{"id": f"artist{index}", "name": f"Artist {index}"}],
+        "album": {**ALBUM, "id": f"album{index}", "name": f"Album {index}"},
+        "duration_ms": 120_000 + 30_000 * index,
+    }
+    for index in range(6)
+]
+
+
+@contextmanager
+def spotify_logged_in_as(username):
+    """Log in Spotify with the account a user registered with."""
+    with patch.object(
+        service, "get_spotify_user_info", return_value={"spotify_id": "spotify1"}
+    ), patch.object(service.crud, "get_username_by_spotify_id", return_value=username):
+        yield
+
+
+@pytest.fixture(autouse=True)
+def pools_cache():
+    # every test starts with an empty cache
+    service._pools.clear()
+    yield
+    service._pools.clear()
+
+
+def test_build_pools_removes_duplicates():
+    pools = service.build_pools([QUEEN, QUEEN], TRACKS, [ALBUM, {**ALBUM}])
+
+    assert pools["artists"][0] == "Queen"
+    assert len(pools["artists"]) == 1 + len(TRACKS)
+    assert pools["tracks"][0] == ["track0", "Track 0", "Artist 0", "Album 0", 120_000]
+    assert pools["albums"][0] == ["album1", "A Night at the Opera", "Queen", 1975]
+    assert len(pools["albums"]) == len(TRACKS)
+
+
+def test_personal_questions_come_from_the_pools():
+    pools = service.build_pools([QUEEN], TRACKS, [ALBUM])
+
+    questions = service.generate_personal_questions(pools, 10, random.Random(0))
+
+    assert len(questions) == 10
+    for question in questions:
+        assert question.id is None
+        assert question.answer in question.choices
+        assert set(question.choices) <= {
+            *pools["artists"],
+            *(album[1] for album in pools["albums"]),
+            *(
+                str(album[3] + offset)
+                for album in pools["albums"]
+                for offset in range(-5, 6)
+            ),
+            *(track[1] for track in pools["tracks"]),
+        }
+
+
+def test_expired_pools_are_used_and_refreshed():
+    pools = {
+        **service.build_pools([QUEEN], TRACKS, [ALBUM]),
+        "fetched_at": datetime.now() - timedelta(days=1),
+    }
+
+    async def get_pools():
+        with patch(
+            "quizzify.databases.crud.get_listening_pools", return_value=pools
+        ) as get_listening_pools, patch.object(
+            service, "schedule_refresh"
+        ) as schedule_refresh:
+            assert await service.get_pools("alice") is pools
+            # the second call hits the cache of the worker
+            assert await service.get_pools("alice") is pools
+        get_listening_pools.assert_called_once_with("alice")
+        schedule_refresh.assert_called_with("alice")
+
+    asyncio.run(get_pools())
+
+
+def test_refreshes_of_a_user_are_deduplicated():
+    history = {
+        "get_top_artists": [QUEEN],
+        "get_top_tracks": TRACKS,
+        "get_saved_albums": [ALBUM],
+    }
+
+    async def refresh():
+        first = service.schedule_refresh("alice")
+        assert service.schedule_refresh("alice") is first
+        return await first
+
+    with patch.multiple(
+        "quizzify.spotify.spotify_listening_history",
+        **{name: lambda items=items: items for name, items in history.items()},
+    ), spotify_logged_in_as("alice"), patch(
+        "quizzify.databases.crud.save_listening_pools"
+    ) as save_listening_pools:
+        pools = asyncio.run(refresh())
+
+    save_listening_pools.assert_called_once()
+    assert service._pools["alice"] is pools
+    assert not service._refreshes
+
+
+def test_history_of_another_spotify_account_is_not_saved():
+    with spotify_logged_in_as("bob"), patch.object(
+        service.spotify_listening_history, "get_top_artists"
+    ) as get_top_artists, patch(
+        "quizzify.databases.crud.save_listening_pools"
+    ) as save_listening_pools:
+        assert asyncio.run(service.refresh_pools("alice")) is None
+
+    get_top_artists.assert_not_called()
+    save_listening_pools.assert_not_called()
+    assert "alice" not in service._pools
@@ -0,0 +1,37 @@
+from unittest.mock import patch
+
+from quizzify.api.questions import service
+from quizzify.utils import schemas
+
+QUESTION = {
+    "id": 1,
+    "question_type": "song_artist",
+    "question": "Who sings Bohemian Rhapsody?",
+    "answer": "Queen",
+    "choices": ["ABBA", "Queen", "Muse", "Blur"],
+}
+
+
+def test_served_questions_do_not_reveal_the_answer():
+    with patch.object(service.crud, "get_random_question", return_value=QUESTION):
+        question = service.get_random_question()
+
+    assert "answer" not in question.model_dump()
+    assert question.choices == QUESTION["choices"]
+
+
+def test_the_answer_is_revealed_by_the_correction():
+    result = {
+        "answer": "Queen",
+        "correct": False,
+        "user_rating": None,
+        "user_answered": None,
+        "question_rating": None,
+        "question_answered": None,
+    }
+    with patch.object(service.crud, "record_answer", return_value=result), patch.object(
+        service.ratings, "record_result"
+    ):
+        correction = service.answer_question(1, schemas.Answer(choice="ABBA"), "user")
+
+    assert correction == schemas.AnswerResult(correct=False, answer="Queen")
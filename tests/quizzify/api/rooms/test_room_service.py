@@ -0,0 +1,90 @@
+from unittest.mock import patch
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from quizzify.api.rooms import service
+from quizzify.api.rooms.router import router
+from quizzify.databases.pubsub import InMemoryPubSub
+
+QUESTION = {
+    "id": 1,
+    "question_type": "song_artist",
+    "question": 'Who sings "Bohemian Rhapsody"?',
+    "answer": "Queen",
+    "choices": ["ABBA", "Queen", "Muse", "Blur"],
+}
+
+
+@pytest.fixture
+def client():
+    # single worker: the in-memory backend stands in for PostgreSQL
+    app = FastAPI()
+    app.include_router(router, prefix="/rooms")
+    with patch("quizzify.databases.pubsub._pubsub", InMemoryPubSub()), patch(
+        "quizzify.databases.crud.get_random_question", return_value=QUESTION
+    ), patch.object(service, "RESULTS_SECONDS", 0), patch.object(
+        service, "PLAYERS_UPDATE_SECONDS", 0
+    ):
+        with TestClient(app) as client:
+            yield client
+
+
+def receive_event(websocket, event_type: str) -> dict:
+    """Skip the events of the room until one of the given type."""
+    while (event := websocket.receive_json())["type"] != event_type:
+        pass
+    return event
+
+
+def test_record_answer_scores_right_answers_once():
+    game = service.Game("room", rounds=1, round_seconds=10)
+    game.players = {"p1": "Alice", "p2": "Bob"}
+    game.question, game.deadline = QUESTION, 100.0
+
+    assert game.record_answer("p1", 1, "Queen", now=95.0) == 750
+    assert game.record_answer("p1", 1, "ABBA", now=96.0) is None
+    assert game.record_answer("p2", 1, "Queen", now=101.0) is None
+    assert game.record_answer("p2", 2, "Queen", now=95.0) is None
+    assert game.leaderboard()[0] == {"player_id": "p1", "name": "Alice", "score": 750}
+
+
+def test_players_get_the_same_events(client):
+    room = client.post("/rooms", params={"rounds": 1, "round_seconds": 5}).json()
+
+    with client.websocket_connect(room["websocket_path"] + "?name=Alice") as alice:
+        assert alice.receive_json()["type"] == "joined"
+        with client.websocket_connect(room["websocket_path"] + "?name=Bob") as bob:
+            # the joins are acknowledged to the player only
+            assert bob.receive_json()["players"] == 2
+            while receive_event(alice, "players")["players"] != 2:
+                pass
+
+            alice.send_json({"type": "start"})
+            question = receive_event(alice, "question")
+            assert receive_event(bob, "question") == question
+            assert question["choices"] == QUESTION["choices"]
+
+            for player in (alice, bob):
+                player.send_json(
+                    {"type": "answer", "question_id": 1, "choice": "Queen"}
+                )
+            results = alice.receive_json()
+            assert results["type"] == "results"
+            assert results["counts"] == {"Queen": 2}
+            assert bob.receive_json() == results
+
+            end = alice.receive_json()
+            assert end["type"] == "end" and len(end["leaderboard"]) == 2
+
+
+def test_unknown_room_is_closed(client):
+    with patch.object(service, "JOIN_TIMEOUT", 0.1):
+        with client.websocket_connect("/rooms/unknown/ws?name=Alice") as websocket:
+            message = websocket.receive()
+    assert message == {
+        "type": "websocket.close",
+        "code": 4404,
+        "reason": "Unknown room",
+    }
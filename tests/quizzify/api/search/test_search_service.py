@@ -0,0 +1,36 @@
+from decimal import Decimal
+from unittest.mock import patch
+
+import pytest
+from fastapi import HTTPException
+
+from quizzify.api.search import service
+
+
+def rows(count):
+    return [
+        {"id": f"id{i}", "name": "Summer", "popularity": 50, "score": Decimal("0.5")}
+        for i in range(count)
+    ]
+
+
+def test_next_page_starts_after_the_last_result():
+    with patch.object(service.crud, "search_catalog", return_value=rows(2)) as search:
+        page = service.search("songs", "summer", limit=2)
+        service.search("songs", "summer", limit=2, cursor=page.next_cursor)
+
+    assert search.call_args.args == ("songs", "summer", 2, (Decimal("0.5"), "id1"))
+
+
+def test_last_page_has_no_cursor():
+    with patch.object(service.crud, "search_catalog", return_value=rows(1)):
+        page = service.search("songs", "summer", limit=2)
+
+    assert page.next_cursor is None
+
+
+def test_search_without_words():
+    with pytest.raises(HTTPException) as error:
+        service.search("songs", "?!", limit=2)
+
+    assert error.value.status_code == 422
@@ -0,0 +1,40 @@
+from unittest.mock import patch
+
+import pytest
+from fastapi import HTTPException
+
+from quizzify.api.stats import service
+
+
+def test_user_stats_from_rollups():
+    rollups = {
+        "types": [
+            {"question_type": "album_year", "answered": 4, "correct": 1},
+            {"question_type": "song_artist", "answered": 6, "correct": 6},
+        ],
+        "artists": [
+            {"artist_id": "a1", "artist_name": "Artist", "answered": 3, "correct": 2}
+        ],
+    }
+    with patch.object(service.crud, "get_user_answer_stats", return_value=rollups):
+        stats = service.get_user_stats("user", artists=10)
+
+    assert (stats.answered, stats.correct, stats.accuracy) == (10, 7, 0.7)
+    assert [row.accuracy for row in stats.question_types] == [0.25, 1.0]
+    assert stats.artists[0].accuracy == 0.6667
+
+
+def test_user_stats_without_answers():
+    rollups = {"types": [], "artists": []}
+    with patch.object(service.crud, "get_user_answer_stats", return_value=rollups):
+        stats = service.get_user_stats("user", artists=10)
+
+    assert (stats.answered, stats.accuracy) == (0, 0.0)
+
+
+def test_unknown_artist_stats():
+    with patch.object(service.crud, "get_artist_answer_stats", return_value=None):
+        with pytest.raises(HTTPException) as error:
+            service.get_artist_stats("a1")
+
+    assert error.value.status_code == 404
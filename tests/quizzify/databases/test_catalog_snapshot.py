@@ -0,0 +1,70 @@
+from unittest.mock import patch
+
+import pytest
+
+from quizzify.databases import catalog_snapshot
+
+ROWS = {
+    "artists": [("ar1", "Queen")],
+    "albums": [("al1", "A Night at the Opera", "ar1")],
+    "songs": [("s1", "Bohemian Rhapsody", "ar1", "al1")],
+}
+
+
+@pytest.fixture(autouse=True)
+def snapshot_dir(tmp_path):
+    with patch.object(catalog_snapshot, "get_settings") as get_settings, patch.object(
+        catalog_snapshot, "_graph", None
+    ), patch.object(catalog_snapshot, "_version", None):
+        get_settings.return_value.catalog_snapshot_dir = str(tmp_path)
+        yield tmp_path
+
+
+@pytest.fixture
+def crud():
+    with patch.object(catalog_snapshot, "crud") as crud:
+        crud.iter_graph_rows.side_effect = lambda table: iter(ROWS[table])
+        yield crud
+
+
+def test_no_snapshot_yet():
+    assert catalog_snapshot.get_catalog_graph() is None
+
+
+def test_first_export_reads_the_whole_catalog(crud):
+    graph = catalog_snapshot.export_catalog_snapshot()
+
+    assert graph.ids["songs"][:] == ["s1"]
+    assert catalog_snapshot.get_catalog_graph() is graph
+    assert catalog_snapshot._version == 1
+
+
+def test_export_only_fetches_the_new_rows(crud):
+    catalog_snapshot.export_catalog_snapshot()
+    ids = {"artists": ["ar1"], "albums": ["al1"], "songs": ["s1", "s2"]}
+    with patch.dict(
+        catalog_snapshot.CATALOG_IDS,
+        {table: (lambda ids=ids[table]: iter(ids)) for table in ids},
+    ):
+        crud.get_graph_rows.return_value = [("s2", "Love of My Life", "ar1", "al1")]
+        graph = catalog_snapshot.export_catalog_snapshot()
+
+    crud.get_graph_rows.assert_called_once_with("songs", ["s2"])
+    assert graph.ids["songs"][:] == ["s1", "s2"]
+    assert graph.neighbors("album_songs", [0])[0].tolist() == [0, 1]
+    assert catalog_snapshot._version == 2
+
+
+def test_export_without_new_rows_keeps_the_snapshot(crud, snapshot_dir):
+    catalog_snapshot.export_catalog_snapshot()
+    with patch.dict(
+        catalog_snapshot.CATALOG_IDS,
+        {
+            table: (lambda rows=rows: iter(row[0] for row in rows))
+            for table, rows in ROWS.items()
+        },
+    ):
+        catalog_snapshot.export_catalog_snapshot()
+
+    assert not crud.get_graph_rows.called
+    assert catalog_snapshot._version == 1
@@ -0,0 +1,194 @@
+from datetime import date
+from unittest.mock import MagicMock, patch
+
+import psycopg2
+import pytest
+
+from quizzify.databases import crud
+
+
+@pytest.fixture
+def connection():
+    # Mock the connection returned by connect_to_db
+    connection = MagicMock()
+    with patch("quizzify.databases.crud.connect_to_db", return_value=connection):
+        yield connection
+
+
+def test_iter_songs_ids_uses_named_cursor(connection):
+    cursor = connection.cursor.return_value
+    cursor.__iter__.return_value = iter([("id1",), ("id2",)])
+
+    songs_ids = crud.iter_songs_ids(itersize=500)
+    # nothing is fetched before the generator is consumed
+    connection.cursor.assert_not_called()
+
+    assert list(songs_ids) == ["id1", "id2"]
+    connection.cursor.assert_called_once_with(
+        name="iter_songs_ids", cursor_factory=None
+    )
+    assert cursor.itersize == 500
+    cursor.close.assert_called_once()
+    connection.close.assert_called_once()
+
+
+def test_stream_rows_closes_connection_when_stopped_early(connection):
+    cursor = connection.cursor.return_value
+    cursor.__iter__.return_value = iter([("id1",), ("id2",), ("id3",)])
+
+    rows = crud.stream_rows(query="SELECT id FROM songs;", cursor_name="test")
+    assert next(rows) == ("id1",)
+    rows.close()
+
+    cursor.close.assert_called_once()
+    connection.close.assert_called_once()
+
+
+def test_iter_catalog_unknown_table():
+    with pytest.raises(ValueError, match="Unknown catalog table"):
+        next(crud.iter_catalog("users"))
+
+
+def test_get_random_question_filters_on_type(connection):
+    cursor = connection.cursor.return_value
+
+    crud.get_random_question("album_year")
+
+    query = cursor.execute.call_args.kwargs["query"]
+    assert query.count("question_type = %(type)s") == 2
+    assert cursor.execute.call_args.kwargs["vars"] == {"type": "album_year"}
+    connection.close.assert_called_once()
+
+
+def test_prefix_tsquery():
+    assert crud.prefix_tsquery("Summer nig'ht!") == "'summer':* & 'nig':* & 'ht':*"
+    assert crud.prefix_tsquery(" - ") is None
+
+
+def test_search_catalog_continues_after_the_cursor(connection):
+    cursor = connection.cursor.return_value
+
+    crud.search_catalog("songs", "summer", 10, after=(0.5, "id1"))
+
+    query = cursor.execute.call_args.kwargs["query"]
+    assert "FROM songs" in query and "score < %(score)s" in query
+    assert cursor.execute.call_args.kwargs["vars"]["id"] == "id1"
+
+
+def test_list_catalog_uses_the_index_of_its_filters(connection):
+    cursor = connection.cursor.return_value
+
+    crud.list_catalog(
+        "songs",
+        50,
+        "popularity",
+        filters={"album_id": "al1", "artist_id": None},
+        after=(40, "id1"),
+    )
+
+    query = cursor.execute.call_args.kwargs["query"]
+    assert "WHERE album_id = %(album_id)s AND (COALESCE(popularity, 0), id) <" in query
+    assert cursor.execute.call_args.kwargs["vars"] == {
+        "album_id": "al1",
+        "limit": 50,
+        "key": 40,
+        "id": "id1",
+    }
+
+
+@pytest.mark.parametrize(
+    "table, sort, filters",
+    [("users", "id", {}), ("songs", "release_date", {}), ("artists", "id", {"x": 1})],
+)
+def test_list_catalog_unknown_listing(table, sort, filters):
+    with pytest.raises(ValueError):
+        crud.list_catalog(table, 50, sort, filters=filters)
+
+
+def test_failed_query_gives_the_connection_back(connection):
+    cursor = connection.cursor.return_value
+    cursor.execute.side_effect = psycopg2.errors.UniqueViolation
+
+    with pytest.raises(psycopg2.errors.UniqueViolation):
+        crud.create_user("user1", "alice", "alice@example.com", "hash")
+
+    connection.commit.assert_not_called()
+    cursor.close.assert_called_once()
+    connection.close.assert_called_once()
+
+
+def test_content_hash_changes_with_the_values():
+    row = ("id1", "Song", "artist1", "album1", 50, 200_000, 1)
+
+    assert crud.content_hash(row) == crud.content_hash(list(row))
+    assert crud.content_hash(row) != crud.content_hash(row[:4] + (51,) + row[5:])
+    assert -(2**63) <= crud.content_hash(row) < 2**63
+    # the dates are hashed in ISO format
+    assert crud.content_hash(("id1", date(1975, 11, 21))) == crud.content_hash(
+        ("id1", "1975-11-21")
+    )
+
+
+@pytest.mark.parametrize(
+    "written, outcome",
+    [
+        ((1, 0, 0), "inserted"),
+        ((0, 1, 0), "updated"),
+        ((0, 0, 1), "hashed"),
+        ((0, 0, 0), "unchanged"),
+    ],
+)
+def test_insert_artist_upserts_the_changed_rows(connection, written, outcome):
+    cursor = connection.cursor.return_value
+    cursor.fetchone.return_value = written
+    artist = crud.Artist(id="artist1", name="Queen", popularity=80)
+
+    assert crud.insert_artist(artist) == outcome
+
+    query, values = cursor.execute.call_args.kwargs.values()
+    assert "WHERE current.content_hash IS DISTINCT FROM EXCLUDED.content_hash" in query
+    assert values["content_hash"] == crud.content_hash(("artist1", "Queen", 80, None))
+    connection.commit.assert_called_once()
+
+
+def test_rebuild_of_the_question_bank_keeps_the_question_ids(connection):
+    cursor = connection.cursor.return_value
+    cursor.fetchone.return_value = (1,)
+    question = ("song_artist", "song1", "Who sings Song?", "Queen", ["Queen", "ABBA"])
+
+    assert crud.save_questions([question], replace=True) == 1
+
+    queries = [call.kwargs["query"] for call in cursor.execute.call_args_list]
+    # the questions are updated in place, only the stale ones are deleted
+    assert "DELETE FROM question_bank;" not in queries
+    assert any(
+        "ON CONFLICT (question_type, subject_id) DO UPDATE" in q for q in queries
+    )
+    assert queries[-2].startswith("DELETE FROM question_bank q WHERE NOT EXISTS")
+    assert queries[-1] == crud.RANK_QUESTIONS
+    connection.commit.assert_called_once()
+
+
+@pytest.mark.parametrize("inserted", [0, 3])
+def test_incremental_build_numbers_the_new_questions(connection, inserted):
+    cursor = connection.cursor.return_value
+    cursor.fetchone.return_value = (inserted,)
+    question = ("song_artist", "song1", "Who sings Song?", "Queen", ["Queen", "ABBA"])
+
+    assert crud.save_questions([question]) == inserted
+
+    queries = [call.kwargs["query"] for call in cursor.execute.call_args_list]
+    # the new questions are appended after the ones of every type: their IDs are
+    # not dense within their type, their ranks are
+    assert (crud.RANK_QUESTIONS in queries) == bool(inserted)
+
+
+def test_random_question_of_a_type_is_drawn_by_rank(connection):
+    cursor = connection.cursor.return_value
+
+    crud.get_random_question("song_artist")
+
+    query, values = cursor.execute.call_args.kwargs.values()
+    assert "question_type = %(type)s AND type_rank >=" in query
+    assert "max(type_rank)" in query
+    assert values == {"type": "song_artist"}
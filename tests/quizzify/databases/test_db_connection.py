@@ -0,0 +1,94 @@
+import contextvars
+import time
+from unittest.mock import MagicMock, patch
+
+import psycopg2
+import pytest
+
+from quizzify.databases import db_connection
+from quizzify.databases.db_connection import (
+    Replica,
+    connect_to_db,
+    read_your_writes,
+    use_primary,
+)
+
+
+@pytest.fixture
+def replica():
+    # a primary and a replica without any server: the pools are mocks
+    replica = Replica("replica", 5432, max_lag=5, check_interval=60)
+    replica.pool = MagicMock()
+    with patch.object(db_connection, "_pool", MagicMock()), patch.object(
+        db_connection, "_replicas", [replica]
+    ):
+        yield replica
+
+
+def measured(replica: Replica, lag):
+    """Set the last replication lag measured on a replica."""
+    replica.lag = lag
+    replica._checked_at = time.monotonic()
+
+
+def read(context=None):
+    """Take a read-only connection, in a new context by default."""
+    return (context or contextvars.copy_context()).run(connect_to_db, True)
+
+
+def test_reads_go_to_the_replica(replica):
+    measured(replica, 0.5)
+
+    assert read() is replica.pool.getconn.return_value
+    write = contextvars.copy_context().run(connect_to_db)
+    assert write is db_connection._pool.getconn.return_value
+
+
+@pytest.mark.parametrize("lag", [None, 10.0])
+def test_reads_fall_back_to_the_primary(replica, lag):
+    measured(replica, lag)
+
+    assert read() is db_connection._pool.getconn.return_value
+
+
+def test_reads_after_a_write_go_to_the_primary(replica):
+    measured(replica, 0.0)
+    context = contextvars.copy_context()
+    context.run(connect_to_db)
+
+    assert read(context) is db_connection._pool.getconn.return_value
+    with use_primary():
+        assert read() is db_connection._pool.getconn.return_value
+    # the other contexts still read from the replica
+    assert read() is replica.pool.getconn.return_value
+
+
+def test_unreachable_replica_is_measured_again(replica):
+    replica.pool.getconn.side_effect = psycopg2.OperationalError
+
+    assert read() is db_connection._pool.getconn.return_value
+    assert replica.lag is None
+    # its pool is closed, to be opened again once it is back
+    assert replica.pool is None
+
+
+def test_reads_of_a_request_after_its_writes_go_to_the_primary(replica):
+    measured(replica, 0.0)
+
+    with read_your_writes():
+        # each threadpool call of a request runs in a copy of its context
+        contextvars.copy_context().run(connect_to_db)
+        assert read() is db_connection._pool.getconn.return_value
+    assert read() is replica.pool.getconn.return_value
+
+
+@pytest.mark.parametrize("closed", [0, 2])
+def test_connection_goes_back_to_its_pool_even_if_broken(closed):
+    # closed is 2 once the server dropped the connection
+    connection = MagicMock(closed=closed)
+    pool = connection.pool
+
+    db_connection.InstrumentedConnection.close(connection)
+
+    pool.putconn.assert_called_once_with(connection, close=bool(closed))
+    assert connection.pool is None
@@ -0,0 +1,42 @@
+from datetime import date, datetime
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from quizzify.databases import history
+
+
+@pytest.fixture
+def cursor():
+    connection = MagicMock()
+    with patch.object(history, "connect_to_db", return_value=connection):
+        yield connection.cursor.return_value
+
+
+@pytest.mark.parametrize(
+    "months, expected",
+    [(0, date(2026, 10, 1)), (3, date(2027, 1, 1)), (-10, date(2025, 12, 1))],
+)
+def test_add_months(months, expected):
+    assert history.add_months(date(2026, 10, 1), months) == expected
+
+
+def test_maintain_partitions(cursor):
+    cursor.fetchall.return_value = [
+        ("answer_history_y2025m09",),
+        ("answer_history_y2025m10",),
+        ("answer_history_y2026m10",),
+    ]
+
+    created, dropped = history.maintain_partitions(
+        now=datetime(2026, 10, 19), retention_months=12
+    )
+
+    assert created == ["answer_history_y2026m11", "answer_history_y2026m12"]
+    assert dropped == ["answer_history_y2025m09"]
+    queries = [call.args[0] for call in cursor.execute.call_args_list]
+    assert (
+        "CREATE TABLE answer_history_y2026m12 PARTITION OF answer_history "
+        "FOR VALUES FROM ('2026-12-01') TO ('2027-01-01');"
+    ) in queries
+    assert "DROP TABLE answer_history_y2025m09;" in queries
@@ -0,0 +1,199 @@
+import json
+from datetime import date
+from unittest.mock import patch
+
+import pytest
+
+from quizzify.databases import importer
+from quizzify.utils.id_set import IdSet
+
+COLUMNS = ["id", "name", "album", "album_id", "artists", "artist_ids", "year"]
+
+
+def spotify_id(index: int) -> str:
+    return f"{index:022d}"
+
+
+def csv_line(song: int, album: int, artist: int, name: str = "Song") -> str:
+    return (
+        f"{spotify_id(song)},{name},Album {album},{spotify_id(album)},"
+        f"\"['Artist {artist}', 'Other']\",\"['{spotify_id(artist)}']\",1975\n"
+    )
+
+
+@pytest.fixture
+def known_ids():
+    with patch.dict(importer._known_ids, clear=True):
+        yield importer._known_ids
+
+
+def test_parse_record_with_aliases():
+    record = {
+        "track_id": spotify_id(1),
+        "track_name": "Bohemian Rhapsody",
+        "album_name": "A Night at the Opera",
+        "album_id": spotify_id(2),
+        "artists": ["Queen", "Freddie Mercury"],
+        "artist_ids": [spotify_id(3), spotify_id(4)],
+        "duration_ms": "354320",
+        "popularity": 83,
+        "release_date": "1975-11",
+    }
+
+    artist, album, song = importer.parse_record(record)
+
+    assert (artist.id, artist.name) == (spotify_id(3), "Queen")
+    assert (album.release_date, album.release_year) == (date(1975, 11, 1), 1975)
+    assert (song.artist_id, song.album_id) == (spotify_id(3), spotify_id(2))
+    assert song.duration_ms == 354320
+
+
+@pytest.mark.parametrize(
+    "field, value",
+    [("track_name", ""), ("artist_id", "[]"), ("popularity", "high")],
+)
+def test_invalid_records_are_rejected(field, value):
+    record = {
+        "track_id": spotify_id(1),
+        "track_name": "Song",
+        "album": "Album",
+        "album_id": spotify_id(2),
+        "artist": "Artist",
+        "artist_id": spotify_id(3),
+        field: value,
+    }
+
+    with pytest.raises(ValueError):
+        importer.parse_record(record)
+
+
+def test_first_value_of_list_literals():
+    assert importer.first_value("['AC/DC', 'Queen']") == "AC/DC"
+    assert importer.first_value('["Guns N\' Roses"]') == "Guns N' Roses"
+    assert importer.first_value("['It\\'s']") == "It's"
+    assert importer.first_value("[]") is None
+    assert importer.first_value("Queen") == "Queen"
+
+
+def test_parse_chunk_keeps_the_new_rows_once(known_ids):
+    known_ids.update(
+        {
+            "artists": IdSet.from_ids([spotify_id(300)]),
+            "albums": IdSet.from_ids([]),
+            "songs": IdSet.from_ids([spotify_id(1)]),
+        }
+    )
+    data = (
+        csv_line(1, 200, 300)
+        + csv_line(2, 200, 300)
+        + csv_line(3, 201, 301)
+        + csv_line(4, 201, 301, name="")
+        + "not,enough,columns\n"
+        + csv_line(5, 202, 302).replace(spotify_id(5), "not-a-spotify-id")
+    ).encode()
+
+    rows, records, rejected = importer.parse_chunk(data, "csv", COLUMNS)
+
+    assert (records, rejected) == (6, 3)
+    assert [row[0] for row in rows["songs"]] == [spotify_id(2), spotify_id(3)]
+    assert [row[0] for row in rows["albums"]] == [spotify_id(200), spotify_id(201)]
+    artist = (spotify_id(301), "Artist 301", None, None)
+    assert rows["artists"] == [artist + (importer.crud.content_hash(artist),)]
+    assert rows["albums"][0][4] == date(1975, 1, 1)
+
+
+def test_refreshed_rows_are_all_kept_with_their_hash(known_ids):
+    data = (csv_line(1, 200, 300) + csv_line(1, 200, 300, name="Renamed")).encode()
+
+    rows, _, _ = importer.parse_chunk(data, "csv", COLUMNS)
+    renamed, _, _ = importer.parse_chunk(
+        csv_line(1, 200, 300, "New").encode(), "csv", COLUMNS
+    )
+
+    # the first record of an ID is kept
+    assert [row[1] for row in rows["songs"]] == ["Song"]
+    assert rows["songs"][0][-1] != renamed["songs"][0][-1]
+    assert rows["albums"][0][-1] == renamed["albums"][0][-1]
+
+
+def test_parse_json_lines(known_ids):
+    record = {
+        "id": spotify_id(1),
+        "name": "Song",
+        "album": "Album",
+        "album_id": spotify_id(2),
+        "artist": "Artist",
+        "artist_id": spotify_id(3),
+    }
+    data = f"{json.dumps(record)}\n[1, 2]\n{{broken\n".encode()
+
+    rows, records, rejected = importer.parse_chunk(data, "jsonl")
+
+    assert (records, rejected) == (3, 2)
+    assert len(rows["songs"]) == 1
+
+
+def test_chunks_end_with_whole_lines(tmp_path):
+    path = tmp_path / "tracks.jsonl"
+    path.write_bytes(b"first line\nsecond line\nthird\n")
+
+    chunks = list(importer.iter_chunks(path, start=11, chunk_bytes=4))
+
+    assert chunks == [(b"second line\n", 23), (b"third\n", 29)]
+
+
+@pytest.fixture
+def dump(tmp_path):
+    path = tmp_path / "tracks.csv"
+    path.write_text(
+        ",".join(COLUMNS)
+        + "\n"
+        + "".join(csv_line(song, 100 + song % 2, 200) for song in range(1, 5))
+    )
+    return path
+
+
+@pytest.fixture
+def crud():
+    with patch.object(importer.crud, "copy_catalog_rows") as copy, patch.object(
+        importer.crud, "get_import_progress", return_value=None
+    ) as progress, patch.dict(
+        importer.STREAMS_OF_IDS, {table: list for table in importer.STREAMS_OF_IDS}
+    ):
+        copy.side_effect = lambda rows, *_: {
+            table: {"inserted": len(table_rows), "updated": 0, "unchanged": 0}
+            for table, table_rows in rows.items()
+        }
+        yield copy, progress
+
+
+def test_import_dataset_by_chunks(dump, crud):
+    copy, _ = crud
+
+    stats = importer.import_dataset(dump, workers=2, chunk_bytes=100)
+
+    assert (stats["records"], stats["rejected"]) == (4, 0)
+    assert stats["inserted"] == {"artists": 1, "albums": 2, "songs": 4}
+    assert stats["updated"] == stats["unchanged"] == dict.fromkeys(stats["inserted"], 0)
+    # one transaction per chunk, each saving the end of the chunk
+    assert copy.call_count > 1
+    source, offset, records = copy.call_args.args[1:]
+    assert (source, offset, records) == (str(dump.resolve()), dump.stat().st_size, 4)
+
+
+def test_import_dataset_resumes(dump, crud):
+    copy, progress = crud
+    lines = dump.read_bytes().splitlines(keepends=True)
+    progress.return_value = (sum(map(len, lines[:3])), 2)
+
+    stats = importer.import_dataset(dump, workers=1)
+
+    assert stats["records"] == 2
+    assert copy.call_args.args[3] == 4
+
+
+def test_refresh_does_not_skip_the_catalog_ids(dump, crud):
+    with patch.object(importer, "IdSet") as id_set:
+        importer.import_dataset(dump, workers=1, refresh=True)
+
+    id_set.from_ids.assert_not_called()
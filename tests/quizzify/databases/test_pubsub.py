@@ -0,0 +1,84 @@
+import asyncio
+import os
+import threading
+from unittest.mock import MagicMock, patch
+
+import psycopg2
+import pytest
+from psycopg2 import sql
+
+from quizzify.databases.pubsub import PostgresPubSub
+
+
+@pytest.fixture
+def connections():
+    # Mock connections watched by the event loop through the end of a pipe
+    fds = []
+
+    def connect(**kwargs):
+        read_fd, write_fd = os.pipe()
+        fds.extend((read_fd, write_fd))
+        connection = MagicMock()
+        connection.fileno.return_value = read_fd
+        connection.notifies = []
+        cursor = connection.cursor.return_value
+
+        def execute(*args):
+            # the thread running the queries of the connection
+            cursor.thread = threading.current_thread()
+
+        cursor.execute.side_effect = execute
+        opened.append(connection)
+        return connection
+
+    opened = []
+    with patch("quizzify.databases.pubsub.psycopg2.connect", side_effect=connect):
+        yield opened
+    for fd in fds:
+        os.close(fd)
+
+
+def test_publish_runs_outside_of_the_event_loop(connections):
+    async def publish():
+        pubsub = PostgresPubSub()
+        pubsub.subscribe("room", lambda message: None)
+        await pubsub.publish("room", "hello")
+        pubsub.close()
+
+    asyncio.run(publish())
+
+    listening, publisher = connections
+    assert listening.cursor.return_value.thread is threading.main_thread()
+    publisher.cursor.return_value.execute.assert_called_once_with(
+        "SELECT pg_notify(%s, %s);", ("room", "hello")
+    )
+    assert publisher.cursor.return_value.thread is not threading.main_thread()
+    listening.close.assert_called_once()
+    publisher.close.assert_called_once()
+
+
+def test_listening_connection_reconnects_and_listens_again(connections):
+    received = []
+
+    async def lose_connection():
+        pubsub = PostgresPubSub()
+        pubsub.subscribe("room", received.append)
+        broken = connections[0]
+        broken.poll.side_effect = psycopg2.OperationalError("server closed")
+        pubsub._on_readable()
+        # opened again in the background
+        await pubsub._reconnecting
+        fresh = connections[1]
+        fresh.notifies.append(MagicMock(channel="room", payload="hello"))
+        pubsub._on_readable()
+        pubsub.close()
+        return broken, fresh
+
+    with patch("quizzify.databases.pubsub.RECONNECT_DELAY", 0.01):
+        broken, fresh = asyncio.run(lose_connection())
+
+    broken.close.assert_called_once()
+    fresh.cursor.return_value.execute.assert_called_once_with(
+        sql.SQL("LISTEN {};").format(sql.Identifier("room"))
+    )
+    assert received == ["hello"]
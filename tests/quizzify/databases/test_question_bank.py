@@ -0,0 +1,121 @@
+import random
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from quizzify.api.questions.router import QuestionType
+from quizzify.databases import question_bank
+from quizzify.utils.catalog_graph import CatalogGraph
+
+
+def test_question_types_match_the_api():
+    assert {question_type.value for question_type in QuestionType} == set(
+        question_bank.QUESTION_TYPES
+    )
+
+
+def test_distractors_never_contain_the_answer():
+    rng = random.Random(0)
+    pool = ["Queen", "ABBA", "Muse", "Blur"]
+
+    for _ in range(100):
+        distractors = question_bank.pick_distractors("Queen", pool, rng)
+        assert len(distractors) == 3
+        assert "Queen" not in distractors
+    assert question_bank.pick_distractors("Queen", pool[:3], rng) is None
+
+
+def test_song_artist_questions():
+    rows = [{"id": "id1", "name": "Bohemian Rhapsody", "artist_name": "Queen"}]
+    pool = ["Queen", "ABBA", "Muse", "Blur", "Oasis"]
+
+    [question] = question_bank.song_artist_questions(rows, pool, random.Random(0))
+
+    question_type, subject_id, text, answer, choices = question
+    assert (question_type, subject_id, answer) == ("song_artist", "id1", "Queen")
+    assert text == 'Who sings "Bohemian Rhapsody"?'
+    assert sorted(set(choices)) == sorted(choices) and "Queen" in choices
+
+
+def test_song_longer_questions_skip_close_durations():
+    rows = [
+        {"id": "id1", "name": "Short", "duration_ms": 120_000},
+        {"id": "id2", "name": "Close", "duration_ms": 125_000},
+        {"id": "id3", "name": "Long", "duration_ms": 300_000},
+    ]
+
+    questions = list(question_bank.song_longer_questions(rows, random.Random(0)))
+
+    assert [(subject_id, answer) for _, subject_id, _, answer, _ in questions] == [
+        ("id3", "Long")
+    ]
+
+
+@pytest.fixture
+def graph():
+    graph = CatalogGraph()
+    graph.add("artists", [(f"ar{i}", f"Artist {i}") for i in range(5)])
+    graph.add(
+        "albums",
+        [
+            ("al0", "Album 0", "ar0"),
+            ("al1", "Album 1", "ar0"),
+            ("al2", "Album 2", "ar1"),
+        ],
+    )
+    graph.add(
+        "songs",
+        [
+            ("s0", "Song 0", "ar0", "al0"),
+            ("s1", "Song 1", "ar0", "al0"),
+            ("s2", "Song 2", "ar0", "al1"),
+            ("s3", "Song 3", "ar0", "al1"),
+            ("s4", "Song 4", "ar1", "al2"),
+            ("s5", "Song 5", "ar1", "al2"),
+        ],
+    )
+    return graph
+
+
+def test_same_album_questions(graph):
+    songs = np.arange(graph.size("songs"), dtype=np.int32)
+
+    questions = list(question_bank.same_album_questions(graph, songs, random.Random(0)))
+
+    albums = {f"Song {i}": i // 2 for i in range(6)}
+    assert questions
+    for _, subject_id, text, answer, choices in questions:
+        subject = f"Song {subject_id[1:]}"
+        assert text == f'Which song is on the same album as "{subject}"?'
+        assert answer != subject and albums[answer] == albums[subject]
+        assert len(set(choices)) == 4 and subject not in choices
+        # the distractors are on other albums
+        assert [albums[choice] == albums[subject] for choice in choices].count(
+            True
+        ) == 1
+
+
+def test_shared_artist_questions(graph):
+    albums = np.arange(graph.size("albums"), dtype=np.int32)
+
+    questions = list(
+        question_bank.shared_artist_questions(graph, albums, random.Random(0))
+    )
+
+    # the artist of the third album has no other album
+    assert [(subject_id, answer) for _, subject_id, _, answer, _ in questions] == [
+        ("al0", "Artist 0"),
+        ("al1", "Artist 0"),
+    ]
+    assert questions[0][2] == 'Which artist released both "Album 0" and "Album 1"?'
+    assert len(set(questions[0][4])) == 4
+
+
+def test_graph_subjects_skip_the_known_subjects(graph):
+    with patch.object(question_bank.crud, "iter_question_subjects") as subjects:
+        subjects.return_value = iter(["s1", "s4"])
+        nodes = question_bank.graph_subjects(graph, "same_album", only_new=True)
+
+    assert nodes.tolist() == [0, 2, 3, 5]
+    subjects.assert_called_once_with("same_album")
@@ -0,0 +1,95 @@
+import random
+from unittest.mock import patch
+
+import pytest
+
+from quizzify.databases import ratings
+from quizzify.utils.ratings import INITIAL_RATING
+
+
+@pytest.fixture(autouse=True)
+def state():
+    with patch.object(ratings, "_pending_questions", {}), patch.object(
+        ratings, "_pending_users", {}
+    ), patch.object(ratings, "_skills", {}), patch.object(ratings, "_buckets", {}):
+        yield
+
+
+def answer(correct: bool, user_rating=None, question_rating=None) -> dict:
+    return {
+        "answer": "Queen",
+        "correct": correct,
+        "user_rating": user_rating,
+        "user_answered": None if user_rating is None else 50,
+        "question_rating": question_rating,
+        "question_answered": None if question_rating is None else 50,
+    }
+
+
+def test_answers_update_the_ratings_in_memory():
+    skill = ratings.record_result("user", 1, answer(True))
+    skill = ratings.record_result("user", 1, answer(False))
+
+    assert ratings._skills["user"] == (skill, 2)
+    assert ratings._pending_users["user"][1] == 2
+    assert ratings._pending_questions[1][1:] == [2, 1]
+    # a new user answering a new question right, then wrong
+    assert skill < INITIAL_RATING
+    assert ratings.get_skill("user") == skill
+
+
+def test_flush_adds_the_changes_to_the_stored_ratings():
+    ratings.record_result("user", 2, answer(True, 1600, 1400))
+    ratings.record_result("user", 1, answer(True, 1600, 1400))
+
+    with patch.object(ratings.crud, "save_ratings") as save_ratings:
+        save_ratings.return_value = [("user", 1700.0, 60)]
+        assert ratings.flush_ratings() == 3
+
+    questions, users, initial = save_ratings.call_args.args
+    assert [question[0] for question in questions] == [1, 2]
+    assert users[0][0] == "user" and users[0][2] == 2
+    assert initial == INITIAL_RATING
+    # the stored rating includes the answers recorded by the other workers
+    assert ratings._skills["user"] == (1700.0, 60)
+    assert ratings._pending_users == {}
+
+
+def test_failed_flush_keeps_the_changes():
+    ratings.record_result("user", 1, answer(True))
+    pending = list(ratings._pending_users["user"])
+
+    with patch.object(ratings.crud, "save_ratings", side_effect=OSError):
+        with pytest.raises(OSError):
+            ratings.flush_ratings()
+    ratings.record_result("user", 1, answer(True))
+
+    assert ratings._pending_users["user"][1] == pending[1] + 1
+    assert ratings._pending_questions[1][1:] == [2, 2]
+
+
+def test_unknown_users_are_read_once():
+    with patch.object(ratings.crud, "get_user_rating", return_value=None) as read:
+        assert ratings.get_skill("user") == INITIAL_RATING
+        assert ratings.get_skill("user") == INITIAL_RATING
+
+    read.assert_called_once_with("user")
+
+
+def test_questions_are_sampled_by_type_near_the_skill():
+    rows = [
+        (1, "song_artist", 1000.0, 10),
+        (2, "album_year", 1350.0, 10),
+        (3, "song_artist", 1350.0, 10),
+        (4, "song_artist", 1350.0, 1),
+    ]
+    ratings._skills["user"] = (1500.0, 10)
+    rng = random.Random(0)
+
+    with patch.object(ratings.crud, "iter_question_ratings", return_value=rows):
+        assert ratings.reload_rating_buckets() == 3
+    with patch.object(ratings, "EXPLORATION_RATE", 0):
+        sampled = {ratings.sample_question_id("user", rng=rng) for _ in range(50)}
+        assert sampled == {2, 3}
+        assert ratings.sample_question_id("user", "song_artist", rng) == 3
+        assert ratings.sample_question_id("user", "song_album", rng) is None
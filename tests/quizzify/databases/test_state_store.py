@@ -0,0 +1,51 @@
+from datetime import datetime
+from unittest.mock import patch
+
+from quizzify.databases.state_store import InMemoryStateStore
+
+
+def test_state_can_only_be_consumed_once():
+    store = InMemoryStateStore()
+    store.save_state("PUepTCduNgbcyH6Y")
+
+    assert store.consume_state("PUepTCduNgbcyH6Y")
+    assert not store.consume_state("PUepTCduNgbcyH6Y")
+    assert not store.consume_state("unknown_state")
+
+
+def test_state_expires():
+    store = InMemoryStateStore(state_ttl=600)
+    with patch("time.monotonic", return_value=1000.0):
+        store.save_state("PUepTCduNgbcyH6Y")
+    with patch("time.monotonic", return_value=1601.0):
+        assert not store.consume_state("PUepTCduNgbcyH6Y")
+
+
+def test_refresh_token_is_kept_when_not_rotated():
+    store = InMemoryStateStore()
+    expiration_date = datetime(2024, 1, 1)
+    store.save_tokens("access_token", "refresh_token", expiration_date)
+    store.save_tokens("new_access_token", None, expiration_date)
+
+    assert store.get_tokens() == {
+        "access_token": "new_access_token",
+        "refresh_token": "refresh_token",
+        "token_expiration_date": expiration_date,
+    }
+
+
+def test_refresh_token_can_only_be_used_once():
+    store = InMemoryStateStore()
+
+    with patch("time.time", return_value=1500.0):
+        assert store.use_refresh_token("jti", expires_at=2000)
+        assert not store.use_refresh_token("jti", expires_at=2000)
+
+
+def test_revoked_sessions_expire():
+    store = InMemoryStateStore()
+    store.revoke_session("session1", expires_at=2000)
+    store.revoke_session("session2", expires_at=1000)
+
+    with patch("time.time", return_value=1500.0):
+        assert store.get_revoked_sessions() == [("session1", 2000)]
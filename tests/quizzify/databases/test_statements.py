@@ -0,0 +1,69 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from quizzify.databases import statements
+from quizzify.databases.statements import Statement
+
+
+@pytest.fixture
+def statement():
+    with patch.object(statements, "STATEMENTS", {}):
+        yield Statement(
+            "find_user",
+            "SELECT * FROM users WHERE email = %(email)s OR username = %(name)s "
+            "OR email = %(name)s;",
+        )
+
+
+@pytest.fixture
+def cursor():
+    cursor = MagicMock()
+    cursor.connection.prepared_statements = set()
+    return cursor
+
+
+def test_placeholders_are_numbered(statement):
+    assert statement.params == ["email", "name"]
+    assert statement.prepare_query == (
+        "PREPARE find_user AS SELECT * FROM users WHERE email = $1 OR username = $2 "
+        "OR email = $2;"
+    )
+    assert statement.execute_query == "EXECUTE find_user (%s, %s);"
+
+
+def test_names_are_unique(statement):
+    with pytest.raises(ValueError):
+        Statement("find_user", "SELECT 1;")
+
+
+def test_prepared_once_per_connection(statement, cursor):
+    statement.execute(cursor, {"email": "a@b.c", "name": "a"})
+    statement.execute(cursor, {"email": "d@e.f", "name": "d"})
+
+    queries = [call.args[0] for call in cursor.execute.call_args_list]
+    assert queries == [
+        statement.prepare_query,
+        statement.execute_query,
+        statement.execute_query,
+    ]
+    assert cursor.execute.call_args.args[1] == ["d@e.f", "d"]
+    assert cursor.connection.prepared_statements == {"find_user"}
+
+
+def test_plain_query_when_disabled(statement, cursor):
+    with patch.object(statements, "get_settings") as get_settings:
+        get_settings.return_value.db_prepared_statements = False
+        statement.execute(cursor, {"email": "a@b.c", "name": "a"})
+
+    cursor.execute.assert_called_once_with(
+        query=statement.query, vars={"email": "a@b.c", "name": "a"}
+    )
+    assert not cursor.connection.prepared_statements
+
+
+def test_percent_sign_in_prepared_query():
+    with patch.object(statements, "STATEMENTS", {}):
+        statement = Statement("similar", "SELECT name %% %(text)s;")
+
+    assert statement.prepare_query == "PREPARE similar AS SELECT name % $1;"
@@ -0,0 +1,123 @@
+import socket
+import threading
+import time
+from collections import OrderedDict
+from unittest.mock import patch
+
+import httpx
+import pytest
+import uvicorn
+from fastapi import HTTPException
+
+from benchmarks import mock_spotify
+from quizzify.config import Settings
+from quizzify.spotify import spotify_client, spotify_user_info
+
+
+@pytest.fixture(scope="module")
+def mock_url():
+    # the fault-injecting mock of Spotify, served on a free local port
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(
+        uvicorn.Config(mock_spotify.app, port=port, log_level="warning")
+    )
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    yield f"http://127.0.0.1:{port}"
+    server.should_exit = True
+    thread.join()
+
+
+@pytest.fixture
+def spotify(mock_url):
+    """Reset the faults of the mock and the breakers, then return the API URL."""
+
+    def set_faults(**faults):
+        return httpx.put(f"{mock_url}/mock/faults", params=faults).json()
+
+    settings = Settings.model_validate(
+        {
+            "SPOTIFY_BASE_URL": f"{mock_url}/v1",
+            "QUIZZIFY_SPOTIFY_TIMEOUT": 1,
+            "QUIZZIFY_SPOTIFY_MAX_RETRIES": 2,
+            "QUIZZIFY_SPOTIFY_BREAKER_THRESHOLD": 3,
+            "QUIZZIFY_SPOTIFY_BREAKER_RESET": 0.5,
+        }
+    )
+    set_faults()
+    with patch.object(
+        spotify_client, "get_settings", return_value=settings
+    ), patch.object(
+        spotify_user_info, "get_settings", return_value=settings
+    ), patch.object(
+        spotify_client, "_breakers", {}
+    ), patch.object(
+        spotify_client, "BACKOFF_BASE", 0.01
+    ):
+        yield set_faults
+
+
+def test_errors_are_retried(spotify, mock_url):
+    spotify(fail_next=2)
+    response = spotify_client.send_request("get", f"{mock_url}/v1/me", endpoint="me")
+
+    assert response.status_code == 200
+    assert httpx.get(f"{mock_url}/mock/faults").json()["requests"] == 3
+
+
+def test_retry_after_is_honored(spotify, mock_url):
+    spotify(fail_next=1, error_status=429, retry_after=1)
+    start = time.perf_counter()
+    response = spotify_client.send_request("get", f"{mock_url}/v1/me", endpoint="me")
+
+    assert response.status_code == 200
+    assert time.perf_counter() - start >= 1
+
+
+def test_breaker_fails_fast_then_recovers(spotify, mock_url):
+    url = f"{mock_url}/v1/me"
+    spotify(error_rate=1.0)
+    # three failed attempts open the breaker
+    assert spotify_client.send_request("get", url, endpoint="me").status_code == 503
+    with pytest.raises(HTTPException) as error:
+        spotify_client.send_request("get", url, endpoint="me")
+    assert error.value.status_code == 503
+    assert httpx.get(f"{mock_url}/mock/faults").json()["requests"] == 3
+
+    spotify()
+    time.sleep(0.5)
+    # the probe succeeds and closes the breaker
+    assert spotify_client.send_request("get", url, endpoint="me").status_code == 200
+    assert spotify_client.get_breaker(url).state == "closed"
+
+
+def test_probe_failing_unexpectedly_does_not_block_the_breaker(spotify, mock_url):
+    url = f"{mock_url}/v1/me"
+    spotify(error_rate=1.0)
+    assert spotify_client.send_request("get", url, endpoint="me").status_code == 503
+
+    spotify()
+    time.sleep(0.5)
+    with patch.object(spotify_client, "_send", side_effect=ValueError):
+        with pytest.raises(ValueError):
+            spotify_client.send_request("get", url, endpoint="me")
+    # the next call is a probe
+    assert spotify_client.send_request("get", url, endpoint="me").status_code == 200
+
+
+def test_cached_profile_is_used_while_spotify_is_down(spotify):
+    with patch.object(
+        spotify_user_info, "SpotifyTokenManager"
+    ) as token_manager, patch.object(spotify_user_info, "_profiles", OrderedDict()):
+        token_manager.return_value.access_token = "token"
+        profile = spotify_user_info.get_spotify_user_info()
+        spotify(error_rate=1.0)
+        assert spotify_user_info.get_spotify_user_info() == profile
+
+        token_manager.return_value.access_token = "other_token"
+        with pytest.raises(HTTPException):
+            spotify_user_info.get_spotify_user_info()
@@ -0,0 +1,72 @@
+import os
+from unittest.mock import patch
+
+import pytest
+from pydantic import ValidationError
+
+from quizzify.config import Settings, get_settings
+
+
+@pytest.fixture
+def settings_cache():
+    # the settings are read once per process: start and end with a fresh cache
+    get_settings.cache_clear()
+    yield
+    get_settings.cache_clear()
+
+
+def test_defaults():
+    settings = Settings.model_validate({})
+
+    assert settings.state_store == "postgres"
+    assert settings.db_pool_min_size <= settings.db_pool_max_size
+    assert settings.rate_limit_enabled
+
+
+def test_settings_are_read_from_the_environment(settings_cache):
+    with patch.dict(
+        os.environ,
+        {
+            "SPOTIFY_BASE_URL": "http://localhost:9000/v1",
+            "POSTGRES_PORT": "5433",
+            "QUIZZIFY_RATE_LIMIT_ENABLED": "false",
+        },
+    ):
+        settings = get_settings()
+
+    assert settings.spotify_base_url == "http://localhost:9000/v1"
+    assert settings.postgres_port == 5433
+    assert not settings.rate_limit_enabled
+    # read once
+    assert get_settings() is settings
+
+
+@pytest.mark.parametrize(
+    "variable, value",
+    [
+        ("QUIZZIFY_STATE_STORE", "redis"),
+        ("QUIZZIFY_TRACE_SAMPLE_RATE", "2"),
+        ("QUIZZIFY_DB_POOL_MAX_SIZE", "ten"),
+    ],
+)
+def test_invalid_settings_are_rejected(variable, value):
+    with pytest.raises(ValidationError):
+        Settings.model_validate({variable: value})
+
+
+@pytest.mark.parametrize(
+    "environ, min_size",
+    [
+        ({"QUIZZIFY_DB_POOL_MAX_SIZE": "20"}, 20),
+        (
+            {
+                "QUIZZIFY_DB_POOL_MAX_SIZE": "20",
+                "QUIZZIFY_DB_PREPARED_STATEMENTS": "false",
+            },
+            5,
+        ),
+        ({"QUIZZIFY_DB_POOL_MIN_SIZE": "2"}, 2),
+    ],
+)
+def test_pool_keeps_its_connections_with_prepared_statements(environ, min_size):
+    assert Settings.model_validate(environ).db_pool_min_size == min_size
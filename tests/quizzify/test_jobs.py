@@ -0,0 +1,34 @@
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+
+from quizzify import jobs
+
+
+@pytest.mark.parametrize("expires_in, refreshed", [(60, True), (3600, False)])
+def test_refresh_spotify_token_before_expiration(expires_in, refreshed):
+    with patch.object(jobs, "SpotifyTokenManager") as token_manager:
+        token_manager.return_value.token_expiration_date = datetime.now() + timedelta(
+            seconds=expires_in
+        )
+        jobs.refresh_spotify_token()
+
+    assert token_manager.return_value.refresh_access_token.called == refreshed
+
+
+def test_registered_jobs():
+    scheduler = jobs.Scheduler()
+    jobs.register_jobs(scheduler)
+
+    assert not scheduler.jobs["warm_caches"].single_instance
+    assert scheduler.jobs["refresh_spotify_token"].single_instance
+    # every worker creates the partitions of the history when it starts
+    assert not scheduler.jobs["create_history_partitions"].single_instance
+    # every worker maps the catalog snapshots published by the others
+    assert not scheduler.jobs["swap_catalog_snapshot"].single_instance
+    # every worker keeps its own list of revoked sessions
+    assert not scheduler.jobs["sync_revoked_sessions"].single_instance
+    # every worker flushes its ratings and samples its own rating buckets
+    assert not scheduler.jobs["save_ratings"].single_instance
+    assert not scheduler.jobs["rebuild_rating_buckets"].single_instance
@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+from fastapi import Depends, FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from quizzify.utils.admission import ConcurrencyLimiter, RateLimiter
+
+
+def test_rate_limiter_allows_burst_then_refills():
+    limiter = RateLimiter("test", rate=2, burst=3)
+
+    assert [limiter.acquire("client", now=0.0) for _ in range(3)] == [0, 0, 0]
+    # the bucket is empty: a token is back in half a second
+    assert limiter.acquire("client", now=0.0) == pytest.approx(0.5)
+    assert limiter.acquire("client", now=0.5) == 0
+    # the other clients have their own bucket
+    assert limiter.acquire("other_client", now=0.5) == 0
+
+
+def test_rate_limiter_drops_least_recent_clients():
+    limiter = RateLimiter("test", rate=1, burst=1, max_keys=2)
+    for client in ("first", "second", "third"):
+        limiter.acquire(client, now=0.0)
+
+    assert list(limiter._buckets) == ["second", "third"]
+
+
+def test_rate_limit_dependency_returns_429():
+    limiter = RateLimiter("test", rate=0.5, burst=1)
+    app = FastAPI()
+
+    @app.get("/", dependencies=[Depends(limiter)])
+    def index():
+        return {}
+
+    client = TestClient(app)
+    assert client.get("/").status_code == 200
+    response = client.get("/")
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "2"
+
+
+def test_concurrency_limiter_sheds_when_queue_is_full():
+    limiter = ConcurrencyLimiter("test", limit=1, queue_size=1, queue_timeout=1)
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def hold_slot():
+            async with limiter.slot():
+                await release.wait()
+
+        holder = asyncio.create_task(hold_slot())
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(hold_slot())
+        await asyncio.sleep(0)
+        # one request holds the slot and one waits: the next one is shed
+        with pytest.raises(HTTPException) as error:
+            async with limiter.slot():
+                pass
+        release.set()
+        await asyncio.gather(holder, waiter)
+        return error.value
+
+    error = asyncio.run(scenario())
+    assert error.status_code == 503
+    assert error.headers == {"Retry-After": "1"}
+
+
+def test_concurrency_limiter_times_out():
+    limiter = ConcurrencyLimiter("test", limit=1, queue_size=1, queue_timeout=0.01)
+
+    async def scenario():
+        async with limiter.slot():
+            with pytest.raises(HTTPException) as error:
+                async with limiter.slot():
+                    pass
+        # the slot is released once the request is done
+        async with limiter.slot():
+            pass
+        return error.value
+
+    assert asyncio.run(scenario()).status_code == 503
+    assert limiter._queued == 0
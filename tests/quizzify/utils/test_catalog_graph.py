@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+from quizzify.utils.catalog_graph import NO_NODE, CatalogGraph
+
+ARTISTS = [("ar1", "Queen"), ("ar2", "ABBA")]
+ALBUMS = [("al1", "A Night at the Opera", "ar1"), ("al2", "Arrival", "ar2")]
+SONGS = [
+    ("s1", "Bohemian Rhapsody", "ar1", "al1"),
+    ("s2", "Dancing Queen", "ar2", "al2"),
+    ("s3", "Love of My Life", "ar1", "al1"),
+    ("s4", "Unknown", None, "al9"),
+]
+
+
+@pytest.fixture
+def graph():
+    graph = CatalogGraph()
+    graph.add("artists", ARTISTS)
+    graph.add("albums", ALBUMS)
+    graph.add("songs", SONGS)
+    return graph
+
+
+def song_ids(graph, nodes):
+    return [graph.ids["songs"][node] for node in nodes]
+
+
+def test_neighbors(graph):
+    songs, counts = graph.neighbors("album_songs", [1, 0])
+
+    assert song_ids(graph, songs) == ["s2", "s1", "s3"]
+    assert counts.tolist() == [1, 2]
+    assert graph.neighbors("artist_albums", [NO_NODE])[1].tolist() == [0]
+
+
+def test_unknown_parents_have_no_edge(graph):
+    assert graph.parents["songs", "albums"].tolist() == [0, 1, 0, NO_NODE]
+    assert graph.neighbors("artist_songs", [0, 1])[1].sum() == 3
+
+
+def test_incremental_add_matches_full_build(graph):
+    incremental = CatalogGraph()
+    incremental.add("artists", ARTISTS[:1])
+    incremental.add("albums", ALBUMS[:1])
+    incremental.add("songs", SONGS[:1])
+    incremental.add("artists", ARTISTS)
+    incremental.add("albums", ALBUMS)
+    # the rows already in the graph are skipped
+    assert incremental.add("songs", SONGS) == 3
+
+    # the rows were added in the same order, so the nodes are the same
+    for relation in ("artist_albums", "album_songs", "artist_songs"):
+        expected, expected_counts = graph.neighbors(relation, [0, 1])
+        neighbors, counts = incremental.neighbors(relation, [0, 1])
+        assert neighbors.tolist() == expected.tolist()
+        assert counts.tolist() == expected_counts.tolist()
+
+
+def test_sample_neighbors_excludes_a_node(graph):
+    rng = np.random.default_rng(0)
+
+    drawn = graph.sample_neighbors("album_songs", [0, 0, 1], rng, 20, exclude=[0, 2, 1])
+
+    assert set(drawn[0]) == {2}
+    assert set(drawn[1]) == {0}
+    # the only song of the album is excluded
+    assert set(drawn[2]) == {NO_NODE}
+
+
+def test_unknown_table(graph):
+    with pytest.raises(ValueError, match="Unknown catalog table"):
+        graph.add("users", [])
+
+
+def test_arrays_round_trip(graph):
+    loaded = CatalogGraph.from_arrays(graph.to_arrays())
+
+    assert loaded.ids["songs"][:] == ["s1", "s2", "s3", "s4"]
+    assert loaded.names["albums"][1] == "Arrival"
+    assert loaded.index["songs"].get("s3") == 2 and "s9" not in loaded.index["songs"]
+    assert loaded.new_ids("songs", ["s2", "s9", "s"]) == ["s9", "s"]
+    assert loaded.neighbors("album_songs", [0])[0].tolist() == [0, 2]
+
+
+def test_add_to_a_graph_loaded_from_arrays(graph):
+    loaded = CatalogGraph.from_arrays(graph.to_arrays())
+
+    assert loaded.add("songs", [("s5", "Fernando", "ar2", "al2")]) == 1
+    assert loaded.neighbors("album_songs", [1])[0].tolist() == [1, 4]
+    assert loaded.new_ids("songs", ["s5", "s6"]) == ["s6"]
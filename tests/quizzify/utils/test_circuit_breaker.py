@@ -0,0 +1,52 @@
+from quizzify.utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout=10)
+    breaker.record_failure(now=0.0)
+    breaker.record_failure(now=0.0)
+    breaker.record_success()
+    breaker.record_failure(now=0.0)
+    breaker.record_failure(now=0.0)
+    assert breaker.state == CLOSED
+
+    breaker.record_failure(now=1.0)
+    assert breaker.state == OPEN
+    assert breaker.allow(now=2.0) == 9.0
+
+
+def test_breaker_lets_a_single_probe_through():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=10)
+    breaker.record_failure(now=0.0)
+
+    assert breaker.allow(now=10.0) == 0
+    assert breaker.state == HALF_OPEN
+    # the other calls wait for the outcome of the probe
+    assert breaker.allow(now=10.0) > 0
+    breaker.record_failure(now=11.0)
+    assert breaker.state == OPEN
+
+    assert breaker.allow(now=21.0) == 0
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.allow(now=21.0) == 0
+
+
+def test_breaker_opens_for_the_retry_after_delay():
+    breaker = CircuitBreaker("test", failure_threshold=5, reset_timeout=10)
+    breaker.record_failure(retry_after=60, now=0.0)
+
+    assert breaker.allow(now=30.0) == 30.0
+    assert breaker.allow(now=60.0) == 0
+
+
+def test_breaker_lets_a_probe_through_after_an_unexpected_error():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=10)
+    breaker.record_failure(now=0.0)
+    assert breaker.allow(now=10.0) == 0
+
+    # the probe raised neither a success nor a failure of the service
+    breaker.end_probe()
+
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow(now=10.0) == 0
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from quizzify.utils.id_set import IdSet, decode_base62
+
+KNOWN_IDS = [
+    "4iV5W9uYEdYUVa79Axb7Rh",
+    "1301WleyT98MSxVHPZCA6M",
+    "0000000000000000000001",
+]
+
+
+def as_int(decoded):
+    return [int(hi) << 64 | int(lo) for hi, lo in decoded.tolist()]
+
+
+def test_decode_base62():
+    assert as_int(decode_base62(["0", "z", "10", "Z" * 3])) == [0, 35, 62, 62**3 - 1]
+    # the largest 128-bit integer
+    assert as_int(decode_base62(["7N42dgm5tFLK9N8MT7fHC7"])) == [2**128 - 1]
+
+
+@pytest.mark.parametrize(
+    "spotify_id, message",
+    [
+        ("7N42dgm5tFLK9N8MT7fHC8", "128 bits"),
+        ("a" * 23, "at most 22 characters"),
+        ("4iV5W9uYEdYUVa79Axb7R!", "base62"),
+        ("4iV5W9uYEdYUVa79Axb7Ré", "base62"),
+    ],
+)
+def test_decode_base62_invalid_ids(spotify_id, message):
+    with pytest.raises(ValueError, match=message):
+        decode_base62([spotify_id])
+
+
+def test_id_set_membership():
+    id_set = IdSet.from_ids(iter(KNOWN_IDS), chunk_size=2)
+    assert len(id_set) == 3
+    assert id_set.nbytes == 3 * 16
+    assert "1301WleyT98MSxVHPZCA6M" in id_set
+    assert "1301WleyT98MSxVHPZCA6N" not in id_set
+    np.testing.assert_array_equal(
+        id_set.contains(["7N42dgm5tFLK9N8MT7fHC7", "4iV5W9uYEdYUVa79Axb7Rh"]),
+        [False, True],
+    )
+
+
+def test_id_set_new_ids_and_add():
+    id_set = IdSet.from_ids(KNOWN_IDS)
+    batch = ["6rqhFgbbKwnb9MLmUQDhG6", KNOWN_IDS[0], "2", "6rqhFgbbKwnb9MLmUQDhG6"]
+    assert id_set.new_ids(batch) == ["6rqhFgbbKwnb9MLmUQDhG6", "2"]
+
+    id_set.add(id_set.new_ids(batch))
+    assert len(id_set) == 5
+    assert id_set.new_ids(batch) == []
+
+
+def test_empty_id_set():
+    id_set = IdSet.from_ids([])
+    assert len(id_set) == 0
+    assert id_set.new_ids(KNOWN_IDS) == KNOWN_IDS
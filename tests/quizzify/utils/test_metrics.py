@@ -0,0 +1,77 @@
+import asyncio
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from quizzify.utils.metrics import MetricsMiddleware, instrument
+
+
+def observations(metric, **labels):
+    return REGISTRY.get_sample_value(f"{metric}_count", labels) or 0
+
+
+def test_instrument_sync_async_and_generator_functions():
+    @instrument("test.add")
+    def add(a, b):
+        return a + b
+
+    @instrument("test.async_add")
+    async def async_add(a, b):
+        return a + b
+
+    @instrument("test.count")
+    def count(n):
+        yield from range(n)
+
+    assert add(1, 2) == 3
+    assert asyncio.run(async_add(1, 2)) == 3
+    assert list(count(3)) == [0, 1, 2]
+
+    for function in ("test.add", "test.async_add", "test.count"):
+        assert (
+            observations("quizzify_function_duration_seconds", function=function) == 1
+        )
+
+
+def test_instrument_default_name():
+    @instrument()
+    def noop():
+        pass
+
+    noop()
+    function = f"{__name__}.test_instrument_default_name.<locals>.noop"
+    assert observations("quizzify_function_duration_seconds", function=function) == 1
+
+
+def test_metrics_middleware_labels_requests_with_route_template():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/items/{item_id}")
+    def get_item(item_id: int):
+        return {"item_id": item_id}
+
+    client = TestClient(app)
+    client.get("/items/1")
+    client.get("/items/2")
+    client.get("/unknown")
+
+    assert (
+        observations(
+            "quizzify_http_request_duration_seconds",
+            method="GET",
+            route="/items/{item_id}",
+            status="200",
+        )
+        == 2
+    )
+    assert (
+        observations(
+            "quizzify_http_request_duration_seconds",
+            method="GET",
+            route="unmatched",
+            status="404",
+        )
+        == 1
+    )
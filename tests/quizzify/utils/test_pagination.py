@@ -0,0 +1,51 @@
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from fastapi import HTTPException
+
+from quizzify.utils.pagination import decode_cursor, encode_cursor, next_cursor
+
+
+@pytest.mark.parametrize(
+    "sort, key",
+    [
+        ("id", None),
+        ("popularity", 42),
+        ("release_date", date(1999, 12, 31)),
+        ("relevance", Decimal("0.123456")),
+    ],
+)
+def test_cursor_round_trip(sort, key):
+    assert decode_cursor(encode_cursor(sort, key, "id1"), sort) == (key, "id1")
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "not base64!",
+        "WyJ4Il0=",  # ["x"]
+        "e30=",  # {}
+        encode_cursor("popularity", "high", "id1"),
+    ],
+)
+def test_invalid_cursor(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor, "popularity")
+
+    assert error.value.status_code == 400
+
+
+def test_cursor_of_another_sort():
+    with pytest.raises(HTTPException):
+        decode_cursor(encode_cursor("popularity", 42, "id1"), "release_date")
+
+
+def test_next_cursor_on_the_last_page():
+    rows = [{"id": "id1", "sort_key": 42}, {"id": "id2", "sort_key": 40}]
+
+    assert next_cursor(rows, limit=3, sort="popularity") is None
+    assert decode_cursor(next_cursor(rows, 2, "popularity"), "popularity") == (
+        40,
+        "id2",
+    )
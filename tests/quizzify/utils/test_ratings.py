@@ -0,0 +1,50 @@
+import random
+
+import pytest
+
+from quizzify.utils import ratings
+
+
+def test_expected_score():
+    assert ratings.expected_score(1500, 1500) == 0.5
+    assert ratings.expected_score(1900, 1500) == pytest.approx(10 / 11)
+
+
+def test_rating_updates_move_toward_the_outcome():
+    skill_change, difficulty_change = ratings.rating_updates(1500, 1500, True)
+
+    assert skill_change == ratings.K_FACTOR_MAX / 2
+    assert difficulty_change == -skill_change
+    # a surprising failure moves the ratings more than an expected one
+    assert ratings.rating_updates(1900, 1500, False)[0] < -ratings.K_FACTOR_MAX * 0.9
+
+
+def test_settled_ratings_move_slower():
+    assert ratings.k_factor(0) == ratings.K_FACTOR_MAX
+    assert ratings.k_factor(ratings.K_FACTOR_HALF_LIFE) == ratings.K_FACTOR_MAX / 2
+    assert ratings.k_factor(10_000) == ratings.K_FACTOR_MIN
+
+
+def test_target_difficulty():
+    difficulty = ratings.target_difficulty(1500)
+
+    assert ratings.expected_score(1500, difficulty) == pytest.approx(
+        ratings.TARGET_SUCCESS
+    )
+
+
+def test_buckets_sample_the_nearest_rating():
+    buckets = ratings.RatingBuckets([1, 2, 3, 4], [1000, 1010, 1600, 5000])
+    rng = random.Random(0)
+
+    assert len(buckets) == 4
+    assert {buckets.sample(1020, rng) for _ in range(50)} == {1, 2}
+    # the nearest non-empty bucket, then the open outer buckets
+    assert buckets.sample(1620, rng) == 3
+    assert buckets.sample(1500, rng) == 3
+    assert buckets.sample(9000, rng) == 4
+    assert buckets.sample(1300, rng) is None
+
+
+def test_empty_buckets():
+    assert ratings.RatingBuckets([], []).sample(1500) is None
@@ -0,0 +1,136 @@
+import asyncio
+from datetime import datetime
+from unittest.mock import Mock, patch
+
+import psycopg2
+import pytest
+
+from quizzify.databases.job_store import InMemoryJobStore, PostgresJobStore
+from quizzify.utils.scheduler import (
+    CronTrigger,
+    IntervalTrigger,
+    OnceTrigger,
+    Scheduler,
+)
+
+
+@pytest.fixture
+def job_store():
+    # single process: the in-memory store stands in for PostgreSQL
+    store = InMemoryJobStore()
+    with patch("quizzify.utils.scheduler.get_job_store", return_value=store):
+        yield store
+
+
+def test_cron_trigger_next_run():
+    # Monday, January 1st 2024
+    monday = datetime(2024, 1, 1, 10, 0)
+
+    assert CronTrigger("30 3 * * *").next_run(monday) == datetime(2024, 1, 2, 3, 30)
+    assert CronTrigger("*/15 * * * *").next_run(monday) == datetime(2024, 1, 1, 10, 15)
+    # Sunday is 0 or 7
+    assert CronTrigger("0 12 * * 7").next_run(monday) == datetime(2024, 1, 7, 12, 0)
+    assert CronTrigger("0 0 1 3 *").next_run(monday) == datetime(2024, 3, 1, 0, 0)
+    assert CronTrigger("0 0 * * 5-7").next_run(monday) == datetime(2024, 1, 5, 0, 0)
+    assert CronTrigger("0 0 30 2 *").next_run(monday) is None
+    # either day field matches when both are restricted: the 13th or a Friday
+    assert CronTrigger("0 0 13 * 5").next_run(monday) == datetime(2024, 1, 5, 0, 0)
+
+
+@pytest.mark.parametrize(
+    "expression", ["* * * *", "60 * * * *", "0 0 0 * *", "a * * * *"]
+)
+def test_cron_trigger_rejects_invalid_expressions(expression):
+    with pytest.raises(ValueError):
+        CronTrigger(expression)
+
+
+def test_single_instance_job_runs_once_per_period(job_store):
+    func = Mock()
+    first, second = Scheduler(), Scheduler()
+    job = first.add_job("job", func, IntervalTrigger(60))
+    second.add_job("job", func, IntervalTrigger(60))
+
+    next_run_at = asyncio.run(first.run_single_instance(job))
+    # the other worker finds the job already run, and follows its schedule
+    assert asyncio.run(second.run_single_instance(second.jobs["job"])) == next_run_at
+    func.assert_called_once()
+    assert job_store.try_lock("job")
+
+
+def test_single_instance_job_skipped_while_locked(job_store):
+    func = Mock()
+    scheduler = Scheduler()
+    job = scheduler.add_job("job", func, IntervalTrigger(60))
+    job_store.try_lock("job")
+
+    assert asyncio.run(scheduler.run_single_instance(job)) is not None
+    func.assert_not_called()
+
+
+def test_failed_job_is_rescheduled(job_store):
+    scheduler = Scheduler()
+    job = scheduler.add_job("job", Mock(side_effect=RuntimeError), IntervalTrigger(60))
+
+    assert asyncio.run(scheduler.run_single_instance(job)) is not None
+    assert job_store.get_next_run("job") is not None
+    # the lock is released
+    assert job_store.try_lock("job")
+
+
+def test_scheduler_runs_jobs_until_stopped(job_store):
+    calls = []
+
+    async def job():
+        calls.append("async")
+
+    async def main():
+        scheduler = Scheduler()
+        scheduler.add_job("async", job, OnceTrigger(), single_instance=False)
+        scheduler.add_job("sync", lambda: calls.append("sync"), OnceTrigger())
+        scheduler.add_job("later", lambda: calls.append("later"), IntervalTrigger(60))
+        scheduler.start()
+        await asyncio.sleep(0.1)
+        await scheduler.stop()
+
+    asyncio.run(main())
+    assert sorted(calls) == ["async", "sync"]
+
+
+def test_job_survives_errors_of_the_job_store(job_store):
+    calls = []
+    try_lock = job_store.try_lock
+
+    def failing_try_lock(name):
+        if not calls:
+            calls.append("error")
+            raise OSError("database restarting")
+        return try_lock(name)
+
+    job_store.try_lock = failing_try_lock
+
+    async def main():
+        scheduler = Scheduler()
+        scheduler.add_job("job", lambda: calls.append("run"), OnceTrigger())
+        scheduler.start()
+        await asyncio.sleep(0.2)
+        await scheduler.stop()
+
+    with patch("quizzify.utils.scheduler.STORE_RETRY_DELAY", 0.01):
+        asyncio.run(main())
+    # retried after the error instead of ending the task of the job
+    assert calls == ["error", "run"]
+
+
+def test_postgres_job_store_reconnects_after_a_broken_connection():
+    broken, fresh = Mock(), Mock()
+    broken.cursor.return_value.execute.side_effect = psycopg2.OperationalError
+    fresh.cursor.return_value.fetchone.return_value = (True,)
+    store = PostgresJobStore()
+
+    with patch("psycopg2.connect", side_effect=[broken, fresh]):
+        with pytest.raises(psycopg2.OperationalError):
+            store.try_lock("job")
+        assert store.try_lock("job")
+
+    broken.close.assert_called_once()
@@ -0,0 +1,15 @@
+import pytest
+from pydantic import ValidationError
+
+from quizzify.utils import schemas
+
+
+def test_login_does_not_need_a_username():
+    user = schemas.User(email="alice@example.com", password="password")
+
+    assert user.username is None
+
+
+def test_registration_needs_a_username():
+    with pytest.raises(ValidationError):
+        schemas.NewUser(email="alice@example.com", password="password")
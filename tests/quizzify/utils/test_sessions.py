@@ -0,0 +1,133 @@
+from unittest.mock import patch
+
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+
+from quizzify.utils import sessions
+
+KEY = b"secret"
+
+
+@pytest.fixture(autouse=True)
+def signing_key():
+    with patch.object(sessions, "_signing_key", KEY):
+        yield
+
+
+def bearer(token: str) -> HTTPAuthorizationCredentials:
+    return HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+
+def test_token_round_trip():
+    token = sessions.encode_token({"sub": "user", "typ": "access", "exp": 2000})
+
+    claims = sessions.decode_token(token, "access", now=1000)
+
+    assert claims == {"sub": "user", "typ": "access", "exp": 2000}
+
+
+@pytest.mark.parametrize(
+    "tamper",
+    [
+        lambda token: token[:-2] + ("AA" if token[-2:] != "AA" else "BB"),
+        lambda token: token.replace(
+            token.split(".")[1], sessions._b64encode(b'{"sub":"admin"}')
+        ),
+        lambda token: "eyJhbGciOiJub25lIn0." + token.split(".", 1)[1],
+        lambda token: token.rsplit(".", 1)[0],
+    ],
+)
+def test_forged_tokens_are_rejected(tamper):
+    token = sessions.encode_token({"sub": "user", "typ": "access", "exp": 2000})
+
+    with pytest.raises(HTTPException) as error:
+        sessions.decode_token(tamper(token), "access", now=1000)
+
+    assert error.value.status_code == 401
+
+
+def test_token_of_another_key_is_rejected():
+    token = sessions.encode_token({"typ": "access", "exp": 2000}, key=b"other")
+
+    with pytest.raises(HTTPException):
+        sessions.decode_token(token, "access", now=1000)
+
+
+def test_expired_token_is_rejected():
+    token = sessions.encode_token({"typ": "access", "exp": 2000})
+
+    with pytest.raises(HTTPException) as error:
+        sessions.decode_token(token, "access", now=2000)
+
+    assert error.value.detail == "Session token expired."
+
+
+def test_refresh_token_is_not_an_access_token():
+    _, refresh_token, _ = sessions.issue_tokens("user")
+
+    with pytest.raises(HTTPException):
+        sessions.current_session(bearer(refresh_token))
+
+
+def test_issued_tokens_share_the_session():
+    access_token, refresh_token, refresh = sessions.issue_tokens("user", now=1000)
+
+    access = sessions.decode_token(access_token, "access", now=1000)
+    assert sessions.decode_token(refresh_token, "refresh", now=1000) == refresh
+    assert access["sid"] == refresh["sid"]
+    assert access["exp"] < refresh["exp"]
+    # a refresh extends the session with a new refresh token
+    _, _, extended = sessions.issue_tokens("user", refresh["sid"], now=1000)
+    assert (extended["sid"], extended["jti"]) == (refresh["sid"], extended["jti"])
+    assert extended["jti"] != refresh["jti"]
+
+
+def test_current_user_of_a_revoked_session():
+    access_token, _, refresh = sessions.issue_tokens("user")
+
+    assert sessions.current_user(sessions.current_session(bearer(access_token))) == (
+        "user"
+    )
+    with patch.object(sessions, "revoked_sessions", sessions.RevocationList()) as (
+        revoked
+    ):
+        revoked.add(refresh["sid"], refresh["exp"])
+        with pytest.raises(HTTPException) as error:
+            sessions.current_session(bearer(access_token))
+
+    assert error.value.detail == "Session revoked."
+
+
+def test_request_without_token():
+    with pytest.raises(HTTPException) as error:
+        sessions.current_session(None)
+
+    assert error.value.headers == {"WWW-Authenticate": "Bearer"}
+
+
+def test_revocation_list_purges_expired_sessions():
+    revoked = sessions.RevocationList()
+    revoked.add("expired", 1000)
+    with patch.object(sessions, "PURGE_INTERVAL", 3), patch(
+        "time.time", return_value=1500
+    ):
+        revoked.update([("session1", 2000), ("session2", 2000)])
+
+    assert "expired" not in revoked
+    assert "session1" in revoked
+    assert len(revoked) == 2
+
+
+@pytest.mark.parametrize("workers, secret", [(1, None), (4, "shared")])
+def test_check_signing_key_accepts(workers, secret):
+    with patch.object(sessions, "get_settings") as get_settings:
+        get_settings.return_value.session_secret = secret
+        sessions.check_signing_key(workers)
+
+
+def test_several_workers_need_a_shared_key():
+    with patch.object(sessions, "get_settings") as get_settings:
+        get_settings.return_value.session_secret = None
+        with pytest.raises(RuntimeError, match="QUIZZIFY_SESSION_SECRET"):
+            sessions.check_signing_key(4)
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from quizzify.utils import snapshot
+from quizzify.utils.snapshot import Snapshot, StringColumn
+
+
+def test_write_and_map(tmp_path):
+    heap, offsets = snapshot.encode_strings(["Björk", "", "Muse"])
+    arrays = {
+        "ids": np.array([b"4iV5W9uYEdYUVa79Axb7Rh", b"1"], dtype="S22"),
+        "matrix": np.arange(6, dtype=np.int32).reshape(2, 3),
+        "empty": np.empty(0, dtype=np.int64),
+        "heap": heap,
+        "offsets": offsets,
+    }
+
+    path = snapshot.write_snapshot(tmp_path, "catalog", arrays)
+    mapped = Snapshot(snapshot.current_snapshot(tmp_path, "catalog"))
+
+    assert mapped.path == path and mapped.version == 1
+    for name, array in arrays.items():
+        assert mapped[name].dtype == array.dtype
+        assert mapped[name].tolist() == array.tolist()
+    assert not mapped["matrix"].flags.writeable
+    assert StringColumn(mapped["heap"], mapped["offsets"])[:] == ["Björk", "", "Muse"]
+
+
+def test_new_versions_replace_the_old_ones(tmp_path):
+    for value in range(4):
+        snapshot.write_snapshot(tmp_path, "catalog", {"a": np.array([value])})
+
+    assert snapshot.list_versions(tmp_path, "catalog") == [3, 4]
+    current = Snapshot(snapshot.current_snapshot(tmp_path, "catalog"))
+    assert current.version == 4 and current["a"].tolist() == [3]
+
+
+def test_no_current_snapshot(tmp_path):
+    assert snapshot.current_snapshot(tmp_path / "missing", "catalog") is None
+
+
+def test_not_a_snapshot(tmp_path):
+    (tmp_path / "file").write_bytes(b"not a snapshot")
+
+    with pytest.raises(ValueError, match="Not a snapshot file"):
+        Snapshot(tmp_path / "file")
@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+
+from quizzify.utils.tracing import (
+    Tracer,
+    get_current_span,
+    parse_traceparent,
+    set_tracer,
+    start_span,
+    traced,
+)
+
+
+class ListProcessor:
+    def __init__(self):
+        self.spans = []
+
+    def on_end(self, span):
+        self.spans.append(span)
+
+
+@pytest.fixture
+def processor():
+    processor = ListProcessor()
+    set_tracer(Tracer(processor=processor, sample_rate=1.0))
+    yield processor
+    set_tracer(Tracer())
+
+
+def test_nested_spans_share_the_trace(processor):
+    @traced("inner")
+    async def inner():
+        assert get_current_span().name == "inner"
+
+    with start_span("root", route="/auth/register"):
+        asyncio.run(inner())
+        with start_span("sibling"):
+            pass
+
+    inner_span, sibling, root = processor.spans
+    assert root.parent_id is None
+    assert root.attributes == {"route": "/auth/register"}
+    assert inner_span.parent_id == root.span_id
+    assert sibling.parent_id == root.span_id
+    assert {span.trace_id for span in processor.spans} == {root.trace_id}
+    assert root.end_time_ns >= sibling.end_time_ns >= sibling.start_time_ns
+    assert get_current_span() is None
+
+
+def test_errors_are_recorded(processor):
+    with pytest.raises(KeyError):
+        with start_span("failing"):
+            raise KeyError("missing")
+
+    assert processor.spans[0].status == "error"
+    assert processor.spans[0].attributes == {"exception": "KeyError"}
+
+
+def test_unsampled_traces_are_not_exported():
+    processor = ListProcessor()
+    set_tracer(Tracer(processor=processor, sample_rate=0.0))
+    try:
+        with start_span("root"):
+            with start_span("child") as child:
+                assert not child.sampled
+    finally:
+        set_tracer(Tracer())
+    assert processor.spans == []
+
+
+def test_remote_parent_is_continued(processor):
+    trace_id, parent_id, sampled = parse_traceparent(
+        "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"
+    )
+    with start_span("root", trace_id=trace_id, parent_id=parent_id, sampled=sampled):
+        pass
+
+    assert processor.spans[0].trace_id == "0af7651916cd43dd8448eb211c80319c"
+    assert processor.spans[0].parent_id == "b7ad6b7169203331"
+
+
+@pytest.mark.parametrize("header", [None, "", "00-abc-def-01", "00-" + "a" * 32])
+def test_parse_invalid_traceparent(header):
+    assert parse_traceparent(header) == (None, None, None)